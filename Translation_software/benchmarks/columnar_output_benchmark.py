@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+'''
+Size and read-back speed of the columnar output of JSONToRelation
+(columnar_output.OutputColumnar), against the per-table CSV files of
+OutputFile, for a synthetic tracking log from tracklog_generator.py.
+Columnar output is written as npz, and also as parquet if pyarrow is
+installed.
+
+Reported are the seconds to convert the log, the bytes of all table
+files, and the seconds to read all tables back: for CSV, parsing
+every line with the csv module; for columnar output, reading every
+column with ColumnarReader.
+
+Usage:
+    columnar_output_benchmark.py [numEvents]   (default: 50000)
+'''
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.columnar_output import OutputColumnar, ColumnarReader, pyarrow
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+import tracklog_generator
+
+def convert(logFile, dest, workDir):
+    converter = JSONToRelation(InURI(logFile), dest, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(workDir, 'json_to_relation.log'))
+    converter.setParser(EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True))
+    EdXTrackLogJSONParser.resetHashCache()
+    start = timeit.default_timer()
+    converter.convert()
+    dest.close()
+    return timeit.default_timer() - start
+
+def readCSV(csvFileNames):
+    start = timeit.default_timer()
+    for csvFileName in csvFileNames:
+        with open(csvFileName) as fd:
+            for row in csv.reader(fd, quotechar="'", escapechar='\\', doublequote=False): # @UnusedVariable
+                pass
+    return timeit.default_timer() - start
+
+def readColumnar(dirName):
+    start = timeit.default_timer()
+    reader = ColumnarReader(dirName)
+    for tableName in reader.getTableNames():
+        reader.readTable(tableName)
+    return timeit.default_timer() - start
+
+def totalBytes(fileNames):
+    return sum([os.path.getsize(fileName) for fileName in fileNames])
+
+if __name__ == '__main__':
+    numEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workDir = tempfile.mkdtemp(prefix='columnarOutput')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, numEvents)
+
+        print('| %d events | Convert (s) | Table bytes | Read back (s) |' % numEvents)
+        csvDest = OutputFile(os.path.join(workDir, 'events.sql'), OutputDisposition.OutputFormat.CSV, options='wb')
+        seconds = convert(logFile, csvDest, workDir)
+        csvFileNames = [csvFd.name for csvFd in csvDest.csvTableFiles.values()]
+        print('| CSV | %.1f | %d | %.2f |' % (seconds, totalBytes(csvFileNames), min([readCSV(csvFileNames) for i in range(3)])))
+
+        for fileFormat in ['npz'] if pyarrow is None else ['npz', 'parquet']:
+            dirName = os.path.join(workDir, fileFormat)
+            seconds = convert(logFile, OutputColumnar(dirName, fileFormat=fileFormat), workDir)
+            tableFileNames = [os.path.join(dirName, fileName) for fileName in os.listdir(dirName)
+                              if fileName.endswith('.npz') or fileName.endswith('.parquet')]
+            print('| columnar %s | %.1f | %d | %.2f |' % (fileFormat, seconds, totalBytes(tableFileNames),
+                                                          min([readColumnar(dirName) for i in range(3)])))
+    finally:
+        shutil.rmtree(workDir)
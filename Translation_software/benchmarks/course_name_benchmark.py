@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''
+Cost of EdXTrackLogJSONParser.extractCanonicalCourseName() as the
+number of known course short names grows from 10 to 10,000: the
+CourseNameMatcher automaton against the former scan of all names,
+longest first, with string.find(). Also reports the one-time cost
+of building the automaton.
+'''
+
+import os
+import random
+import string
+import sys
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.courseNameMatcher import CourseNameMatcher
+from json_to_relation.test.test_courseNameMatcher import scanForCourseName
+
+def make_course_names(n, rand):
+    ''' Short names like modulestore ones: ENGR14, HRP258, EDUC115N, db '''
+    names = set()
+    while len(names) < n:
+        prefix = ''.join(rand.choice(string.ascii_uppercase) for i in range(rand.randint(2, 5)))
+        suffix = ''.join(rand.choice(string.digits) for i in range(rand.randint(0, 4)))
+        names.add(prefix + suffix + rand.choice(['', '', 'N', 'x', '-SP']))
+    return sorted(names, key=len, reverse=True)
+
+def make_track_log_strs(courseNames, n, rand):
+    ''' Page URLs and course ids, one in ten with an unknown course '''
+    strs = []
+    for i in range(n):
+        courseName = rand.choice(courseNames) if i % 10 else 'zz_unknown'
+        strs.append(rand.choice(['/courses/Engineering/%s/Winter2014/courseware/Week_%d/' % (courseName, i % 9),
+                                 'Medicine/%s/Statistics_in_Medicine' % courseName,
+                                 '/courses/Education/%s/How_to_Learn_Math/modx/i4x://Education/%s/sequential//goto_position' % (courseName, courseName)]))
+    return strs
+
+def time_per_str(extract, trackLogStrs, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = timeit.default_timer()
+        for trackLogStr in trackLogStrs:
+            extract(trackLogStr)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1e6 * best / len(trackLogStrs)
+
+if __name__ == '__main__':
+    rand = random.Random(0)
+    print('| Course names | Build (ms) | Scan (us/string) | Automaton (us/string) |')
+    for n in [10, 100, 1000, 10000]:
+        courseNames = make_course_names(n, rand)
+        trackLogStrs = make_track_log_strs(courseNames, 20000 if n < 1000 else 2000, rand)
+        start = timeit.default_timer()
+        matcher = CourseNameMatcher(courseNames)
+        build = timeit.default_timer() - start
+        for trackLogStr in trackLogStrs:
+            assert matcher.longestMatch(trackLogStr) == scanForCourseName(courseNames, trackLogStr)
+        scan = time_per_str(lambda trackLogStr: scanForCourseName(courseNames, trackLogStr), trackLogStrs)
+        automaton = time_per_str(matcher.longestMatch, trackLogStrs)
+        print('| %d | %.1f | %.2f | %.2f |' % (n, 1e3 * build, scan, automaton))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+'''
+CSV output cost of JSONToRelation: rows handed straight to
+OutputFile.writeValuesRow(), against the former round trip through
+INSERT statements that writeCSVRowsFromInsertStatement() takes apart
+again (test_csvRowSink.InsertRoundTripOutputFile). Reports the
+throughput of whole conversions of a synthetic tracking log from
+tracklog_generator.py, and the cost of the output path alone, with
+the parser's rows replayed into each destination.
+
+Usage:
+    csv_sink_benchmark.py [numEvents]   (default: 20000)
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+from json_to_relation.test.test_csvRowSink import InsertRoundTripOutputFile
+import tracklog_generator
+
+class RowRecorder(JSONToRelation):
+    '''
+    Converter that also keeps every row its parser pushes.
+    '''
+    def pushToTable(self, row, outFd=None):
+        self.rows.append(row if not isinstance(row, tuple) else (row[0], row[1], list(row[2])))
+        JSONToRelation.pushToTable(self, row, outFd)
+
+def convert(logFile, outputFileClass, outFileName, converterClass=JSONToRelation):
+    dest = outputFileClass(outFileName, OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = converterClass(InURI(logFile), dest, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(os.path.dirname(outFileName), 'json_to_relation.log'))
+    converter.rows = []
+    converter.setParser(EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True))
+    start = timeit.default_timer()
+    converter.convert()
+    return (timeit.default_timer() - start, converter)
+
+def replay(rows, converter, outputFileClass, outFileName):
+    ''' Pushes the recorded rows into a new destination '''
+    dest = outputFileClass(outFileName, OutputDisposition.OutputFormat.CSV, options='wb')
+    start = timeit.default_timer()
+    for row in rows:
+        converter.processFinishedRow(row, dest)
+    converter.processFinishedRow('FLUSH', dest)
+    dest.close()
+    return timeit.default_timer() - start
+
+if __name__ == '__main__':
+    numEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workDir = tempfile.mkdtemp(prefix='csvSink')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, numEvents)
+
+        roundTripSeconds, converter = convert(logFile, InsertRoundTripOutputFile, os.path.join(workDir, 'roundTrip.sql'), RowRecorder)
+        directSeconds, converter = convert(logFile, OutputFile, os.path.join(workDir, 'direct.sql'), RowRecorder)
+        rows = converter.rows
+        roundTripReplay = min([replay(rows, converter, InsertRoundTripOutputFile, os.path.join(workDir, 'roundTripReplay.sql')) for i in range(3)])
+        directReplay = min([replay(rows, converter, OutputFile, os.path.join(workDir, 'directReplay.sql')) for i in range(3)])
+
+        print('| %d events, %d rows | Convert (events/s) | Output path only (us/row) |' % (numEvents, len(rows)))
+        print('| INSERT round trip | %.0f | %.2f |' % (numEvents / roundTripSeconds, 1e6 * roundTripReplay / len(rows)))
+        print('| direct row sink | %.0f | %.2f |' % (numEvents / directSeconds, 1e6 * directReplay / len(rows)))
+    finally:
+        shutil.rmtree(workDir)
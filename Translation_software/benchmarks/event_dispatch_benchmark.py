@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+'''
+Per-event dispatch cost of EdXTrackLogJSONParser: the handler
+registry (getEventHandler) against the former if/elif chain of
+processOneJSONObject, replayed from test_eventDispatch.LEGACY_DISPATCH.
+Event types are drawn from the synthetic tracking logs of
+tracklog_generator.py, and from the test data files.
+'''
+
+import os
+import sys
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.test.test_eventDispatch import legacyDispatch, truthFileEventTypes
+import tracklog_generator
+
+def time_per_event(dispatch, eventTypes, repeat=5):
+    best = None
+    for i in range(repeat):
+        start = timeit.default_timer()
+        for eventType in eventTypes:
+            dispatch(eventType)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1e6 * best / len(eventTypes)
+
+if __name__ == '__main__':
+    generator = tracklog_generator.TrackLogGenerator(seed=0)
+    workloads = [('synthetic log', [event['event_type'] for event in generator.events(100000)]),
+                 ('test data types', sorted(truthFileEventTypes()) * 500)]
+
+    print('| Event types | Distinct | Legacy chain (us/event) | Registry (us/event) |')
+    for name, eventTypes in workloads:
+        legacy = time_per_event(legacyDispatch, eventTypes)
+        registry = time_per_event(EdXTrackLogJSONParser.getEventHandler, eventTypes)
+        print('| %s | %d | %.3f | %.3f |' % (name, len(set(eventTypes)), legacy, registry))
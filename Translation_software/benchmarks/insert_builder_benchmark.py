@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+'''
+Cost of building the multi-row INSERT statements of JSONToRelation:
+JSONToRelation.prepareMySQLRow(), which formats each row into its
+VALUES tuple as it comes in, against the former builder, which copied
+each row, and serialized the held-back rows into a StringIO when the
+statement was finalized. The rows of a conversion of a synthetic
+tracking log from tracklog_generator.py are replayed into each.
+
+Reports rows/sec, and, where tracemalloc is available (Python 3, or
+the pytracemalloc backport), the peak of allocated memory per row.
+
+Usage:
+    insert_builder_benchmark.py [numEvents]   (default: 20000)
+'''
+
+import copy
+from cStringIO import StringIO
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+import tracklog_generator
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+class RowRecorder(JSONToRelation):
+    '''
+    Converter that keeps every row its parser pushes.
+    '''
+    def pushToTable(self, row, outFd=None):
+        self.rows.append(row if not isinstance(row, tuple) else (row[0], row[1], list(row[2])))
+        JSONToRelation.pushToTable(self, row, outFd)
+
+class LegacyInsertBuilder(object):
+    '''
+    The former prepareMySQLRow(): rows are copied into the hold-back
+    buffer, and their size estimated from str() of each value.
+    '''
+    def __init__(self):
+        self.currOutTable = None
+        self.currInsertSig = None
+        self.currValsArray = []
+        self.valsCacheSize = 0
+
+    def prepareMySQLRow(self, insertInfo):
+        try:
+            (tableName, insertSig, valsArray) = insertInfo
+        except ValueError:
+            return self.finalizeInsertStatement()
+        newCacheSize = self.valsCacheSize + self.calculateHeldBackDataSize(valsArray)
+        if self.currInsertSig is not None:
+            if tableName == self.currOutTable and insertSig == self.currInsertSig:
+                if newCacheSize > JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
+                    insertStatement = self.finalizeInsertStatement()
+                    self.currOutTable = tableName
+                    self.currInsertSig = insertSig
+                    self.currValsArray.append(copy.copy(valsArray))
+                    return insertStatement
+                self.valsCacheSize = newCacheSize
+                self.currValsArray.append(copy.copy(valsArray))
+                return None
+            insertStatement = self.finalizeInsertStatement()
+            self.currOutTable = tableName
+            self.currInsertSig = insertSig
+            self.currValsArray = [copy.copy(valsArray)]
+            return insertStatement
+        if newCacheSize > JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
+            return "INSERT INTO %s (%s) VALUES %s;" % (tableName, insertSig, self.constructValuesStr([valsArray]).getvalue())
+        self.valsCacheSize = newCacheSize
+        self.currOutTable = tableName
+        self.currInsertSig = insertSig
+        self.currValsArray = [copy.copy(valsArray)]
+        return None
+
+    def finalizeInsertStatement(self):
+        res = None
+        if len(self.currValsArray) > 0:
+            res = "INSERT INTO %s (%s) VALUES %s;" % (self.currOutTable, self.currInsertSig, self.constructValuesStr(self.currValsArray).getvalue())
+        self.currOutTable = None
+        self.currInsertSig = None
+        self.currValsArray = []
+        return res
+
+    def constructValuesStr(self, valsArrays):
+        valsFileStr = StringIO()
+        isFirstValTuple = True
+        valueStr = OutputDisposition.valueStr
+        for insertVals in valsArrays:
+            if isFirstValTuple:
+                valsFileStr.write('\n    (')
+                isFirstValTuple = False
+            else:
+                valsFileStr.write(',\n    (')
+            valsFileStr.write(','.join([valueStr(insertVal) for insertVal in insertVals]))
+            valsFileStr.write(')')
+        return valsFileStr
+
+    def calculateHeldBackDataSize(self, valueArray):
+        arrSize = 0
+        for val in valueArray:
+            arrSize += len(str(val))
+        return arrSize + 4*len(valueArray)
+
+def recordRows(logFile, workDir):
+    dest = OutputFile(os.path.join(workDir, 'rows.sql'), OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = RowRecorder(InURI(logFile), dest, mainTableName='EdxTrackEvent',
+                            logFile=os.path.join(workDir, 'json_to_relation.log'))
+    converter.rows = []
+    converter.setParser(EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True))
+    converter.convert()
+    return (converter, [row for row in converter.rows if isinstance(row, tuple)])
+
+def replay(builder, rows):
+    '''
+    Pushes the rows through builder.prepareMySQLRow(). Returns the
+    seconds taken, the peak allocated bytes or None, and the statements.
+    '''
+    statements = []
+    if tracemalloc is not None:
+        tracemalloc.start()
+    start = timeit.default_timer()
+    for row in rows:
+        statement = builder.prepareMySQLRow(row)
+        if statement is not None:
+            statements.append(statement)
+    statement = builder.prepareMySQLRow('FLUSH')
+    if statement is not None:
+        statements.append(statement)
+    seconds = timeit.default_timer() - start
+    peakBytes = None
+    if tracemalloc is not None:
+        peakBytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (seconds, peakBytes, statements)
+
+if __name__ == '__main__':
+    numEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workDir = tempfile.mkdtemp(prefix='insertBuilder')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, numEvents)
+        (converter, rows) = recordRows(logFile, workDir)
+
+        print('| %d events, %d rows | Rows/s | Peak alloc (bytes/row) |' % (numEvents, len(rows)))
+        results = {}
+        for (name, makeBuilder) in [('former builder', LegacyInsertBuilder),
+                                    ('prepareMySQLRow', lambda: converter)]:
+            builder = makeBuilder()
+            builder.finalizeInsertStatement()
+            (seconds, peakBytes, statements) = min([replay(builder, rows) for i in range(3)])
+            results[name] = statements
+            print('| %s | %.0f | %s |' % (name, len(rows) / seconds,
+                                         'n/a' if peakBytes is None else '%.0f' % (float(peakBytes) / len(rows))))
+        if results['former builder'] != results['prepareMySQLRow']:
+            print('Note: the statements differ; the former builder never reset its size count, and splits INSERTs differently past MAX_ALLOWED_PACKET_SIZE.')
+    finally:
+        shutil.rmtree(workDir)
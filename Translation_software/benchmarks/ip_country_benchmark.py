@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+Startup and per-lookup cost of the IP to country engines of
+json_to_relation/ipToCountry.py: IpCountryDict's compiled range
+table (cold compile, and load of the cached table), MMDBCountryDict,
+and the former first-four-digits chains of IpCountryDict, replayed
+by legacy_lookup(). All use the ranges of the bundled GeoLite2 database,
+which are written as a software77.net style CSV file for the CSV engines.
+'''
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.ipToCountry import IpCountryDict, MMDBCountryDict
+
+def legacy_table(csvPath):
+    ''' The former table: first four decimal digits of the start IP --> chain of ranges '''
+    currKey = 0
+    table = {currKey : []}
+    with open(csvPath, 'r') as fd:
+        for line in fd:
+            (startIPStr,endIPStr,auth,assigned,twoLetterCountry,threeLetterCountry,country) = line.strip().split(',')  # @UnusedVariable
+            hashKey = startIPStr.strip('"').zfill(10)[0:4]
+            if hashKey != currKey:
+                table[hashKey] = []
+                currKey = hashKey
+            table[hashKey].append((int(startIPStr.strip('"')), int(endIPStr.strip('"')),
+                                   twoLetterCountry.strip('"'), threeLetterCountry.strip('"'), country.strip('"')))
+    return table
+
+def legacy_lookup(table, ipStr):
+    (oct0,oct1,oct2,oct3) = ipStr.split('.')
+    ipNum = int(oct3) + (int(oct2) * 256) + (int(oct1) * 256 * 256) + (int(oct0) * 256 * 256 * 256)
+    lookupKey = str(ipNum).zfill(10)[0:4]
+    ipRangeChain = None
+    while lookupKey > 0:
+        try:
+            ipRangeChain = table[lookupKey]
+            break
+        except KeyError:
+            lookupKey = str(int(lookupKey) - 1).zfill(4)[0:4]
+    for ipInfo in ipRangeChain or []:
+        if ipNum > ipInfo[1]:
+            continue
+        return (ipInfo[2], ipInfo[3], ipInfo[4])
+    return ('ZZ','ZZZ','unknown')
+
+def time_it(function, *args):
+    start = timeit.default_timer()
+    result = function(*args)
+    return (timeit.default_timer() - start, result)
+
+def time_per_lookup(lookup, ipStrs):
+    start = timeit.default_timer()
+    for ipStr in ipStrs:
+        lookup(ipStr)
+    return 1e6 * (timeit.default_timer() - start) / len(ipStrs)
+
+if __name__ == '__main__':
+    workDir = tempfile.mkdtemp(prefix='ipToCountry')
+    try:
+        mmdbStartup, mmdbLookup = time_it(MMDBCountryDict)
+        ranges = mmdbLookup.ipv4Ranges()
+        csvPath = os.path.join(workDir, 'ipToCountrySoftware77DotNet.csv')
+        with open(csvPath, 'w') as fd:
+            for (startIP, endIP, (twoLetter, threeLetter, country)) in ranges:
+                fd.write('"%d","%d","ripencc","1","%s","%s","%s"\n' % (startIP, endIP, twoLetter, threeLetter, country))
+
+        legacyStartup, legacy = time_it(legacy_table, csvPath)
+        coldStartup, index = time_it(IpCountryDict, csvPath)
+        warmStartup, index = time_it(IpCountryDict, csvPath)
+
+        rand = random.Random(0)
+        # Tracking logs see the same addresses many times; draw
+        # from a pool rather than uniformly:
+        pool = ['%d.%d.%d.%d' % tuple(rand.randint(1, 254) for i in range(4)) for j in range(5000)]
+        ipStrs = [rand.choice(pool) for i in range(100000)]
+
+        print('| %d ranges | Startup (s) | us/lookup |' % len(ranges))
+        print('| legacy chains | %.3f | %.2f |' % (legacyStartup, time_per_lookup(lambda ipStr: legacy_lookup(legacy, ipStr), ipStrs)))
+        print('| range table, compiled | %.3f | %.2f |' % (coldStartup, time_per_lookup(index.lookupIP, ipStrs)))
+        print('| range table, cached | %.3f | %.2f |' % (warmStartup, time_per_lookup(index.lookupIP, ipStrs)))
+        print('| MMDB reader | %.3f | %.2f |' % (mmdbStartup, time_per_lookup(mmdbLookup.lookupIP, ipStrs)))
+    finally:
+        shutil.rmtree(workDir)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+'''
+Share of JSONToRelation.convert() time spent decoding JSON, for each
+installed decoder of JSONDecoder, on a synthetic tracking log from
+tracklog_generator.py. The decoder's loads() is timed during the
+conversion, so the nested event fields that are not decoded for
+their handlers are not counted.
+
+Usage:
+    json_decode_benchmark.py [numEvents]   (default: 50000)
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.jsonDecoder import JSONDecoder
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+import tracklog_generator
+
+class TimedLoads(object):
+    '''
+    Stands in for a JSONDecoder's loads(), and adds up its time.
+    '''
+    def __init__(self, loads):
+        self.loads = loads
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, jsonStr):
+        self.calls += 1
+        start = timeit.default_timer()
+        try:
+            return self.loads(jsonStr)
+        finally:
+            self.seconds += timeit.default_timer() - start
+
+def convert(logFile, outFileName, decoderName):
+    dest = OutputFile(outFileName, OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = JSONToRelation(InURI(logFile), dest, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(os.path.dirname(outFileName), 'json_to_relation.log'))
+    parser = EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx',
+                                   useDisplayNameCache=True, jsonDecoder=decoderName)
+    converter.setParser(parser)
+    timedLoads = TimedLoads(parser.jsonDecoder.loads)
+    parser.jsonDecoder.loads = timedLoads
+    EdXTrackLogJSONParser.resetHashCache()
+    start = timeit.default_timer()
+    converter.convert()
+    return (timeit.default_timer() - start, timedLoads)
+
+if __name__ == '__main__':
+    numEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workDir = tempfile.mkdtemp(prefix='jsonDecode')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, numEvents)
+
+        print('| %d events | Convert (events/s) | loads() calls | Decode (us/call) | Decode share |' % numEvents)
+        for decoderName in JSONDecoder.availableDecoders():
+            (seconds, timedLoads) = convert(logFile, os.path.join(workDir, decoderName + '.sql'), decoderName)
+            print('| %s | %.0f | %d | %.2f | %.1f%% |' % (decoderName, numEvents / seconds, timedLoads.calls,
+                                                        1e6 * timedLoads.seconds / max(timedLoads.calls, 1),
+                                                        100 * timedLoads.seconds / seconds))
+    finally:
+        shutil.rmtree(workDir)
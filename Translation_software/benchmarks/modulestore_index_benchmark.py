@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+'''
+Instantiation cost of ModulestoreImporter on a synthetic modulestore
+excerpt: cold, when the SQLite ModulestoreIndex is built from the JSON
+file; warm, when a new process opens the existing index; and with the
+index already open in the process. For comparison, the former startup
+paths: a parse of the JSON file, and a load of the pickle cache.
+Also reports the cost of looking up display names in the index.
+
+Usage:
+    modulestore_index_benchmark.py [numEntries]   (default: 100000)
+'''
+
+import cPickle
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.modulestoreImporter import ModulestoreImporter
+
+CATEGORIES = ['video', 'problem', 'sequential', 'vertical', 'html', 'chapter']
+
+def write_modstore(jsonFileName, numEntries, rand):
+    ''' Writes numEntries modulestore entries, among 200 courses '''
+    courses = ['C%03d' % i for i in range(200)]
+    hashes = []
+    with open(jsonFileName, 'w') as fd:
+        fd.write('[')
+        for i in range(numEntries):
+            course = courses[i % len(courses)]
+            if i < len(courses):
+                category, name = ('course', 'Run_%d' % i)
+            else:
+                category, name = (rand.choice(CATEGORIES), '%032x' % rand.getrandbits(128))
+                hashes.append(name)
+            fd.write(('' if i == 0 else ',\n') +
+                     json.dumps({'_id':{'tag':'i4x', 'org':'Engineering', 'course':course, 'category':category, 'name':name, 'revision':None},
+                                 'metadata':{'display_name':'%s %d of %s' % (category, i, course)}}))
+        fd.write(']\n')
+    return hashes
+
+def time_it(function):
+    start = timeit.default_timer()
+    result = function()
+    return (timeit.default_timer() - start, result)
+
+def make_importer(jsonFileName, pickleCachePath):
+    return ModulestoreImporter(jsonFileName, useCache=False, pickleCachePath=pickleCachePath)
+
+def parse_json(jsonFileName, pickleCachePath):
+    importer = make_importer(jsonFileName, pickleCachePath)
+    importer.loadModstoreFromJSON()
+    return importer
+
+def load_pickle(pickleCachePath):
+    with open(pickleCachePath) as fd:
+        return cPickle.load(fd)
+
+def warm_startup(jsonFileName, pickleCachePath):
+    ''' As a new process would see it: no index open yet '''
+    ModulestoreImporter.modulestoreIndexCache.clear()
+    ModulestoreImporter.courseNameMatcherCache = None
+    return make_importer(jsonFileName, pickleCachePath)
+
+if __name__ == '__main__':
+    numEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workDir = tempfile.mkdtemp(prefix='modstoreIndex')
+    try:
+        jsonFileName = os.path.join(workDir, 'modulestore_latest.json')
+        pickleCachePath = os.path.join(workDir, 'hashLookup.pkl')
+        rand = random.Random(0)
+        hashes = write_modstore(jsonFileName, numEntries, rand)
+
+        coldStartup, importer = time_it(lambda: make_importer(jsonFileName, pickleCachePath))
+        warmStartup, importer = time_it(lambda: warm_startup(jsonFileName, pickleCachePath))
+        openStartup, importer = time_it(lambda: make_importer(jsonFileName, pickleCachePath))
+        parseStartup, parsed = time_it(lambda: parse_json(jsonFileName, pickleCachePath))
+        pickleStartup, pickled = time_it(lambda: load_pickle(pickleCachePath))
+
+        lookupHashes = [rand.choice(hashes) for i in range(100000)]
+        start = timeit.default_timer()
+        for hashStr in lookupHashes:
+            importer.getDisplayName(hashStr)
+        indexLookup = 1e6 * (timeit.default_timer() - start) / len(lookupHashes)
+        start = timeit.default_timer()
+        for hashStr in lookupHashes:
+            parsed.getDisplayName(hashStr)
+        dictLookup = 1e6 * (timeit.default_timer() - start) / len(lookupHashes)
+
+        print('| %d entries, %.1f MB JSON | Startup (s) | us/lookup |' % (numEntries, os.path.getsize(jsonFileName) / 1e6))
+        print('| JSON parse | %.3f | %.2f |' % (parseStartup, dictLookup))
+        print('| pickle cache | %.3f | |' % pickleStartup)
+        print('| index, cold build | %.3f | |' % coldStartup)
+        print('| index, warm | %.4f | %.2f |' % (warmStartup, indexLookup))
+        print('| index, open in process | %.4f | |' % openStartup)
+    finally:
+        shutil.rmtree(workDir)
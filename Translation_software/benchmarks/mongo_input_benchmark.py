@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+'''
+Conversion of tracking log events read from MongoDB with InMongoDB:
+documents handed to EdXTrackLogJSONParser as JSON lines, which it
+decodes again, against the dicts that pymongo decoded, for several
+cursor batch sizes. The events of tracklog_generator.py are loaded
+into a scratch collection, which is dropped afterwards. Without
+--host, the collection is a mongomock one, which measures the
+parser side only.
+
+Usage:
+    mongo_input_benchmark.py [--host HOST] [--port PORT] [--events N]
+'''
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InMongoDB
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+import tracklog_generator
+
+def convert(collection, workDir, **sourceArgs):
+    source = InMongoDB(collection.database.name, '', collection.database.name, collection.name,
+                       collection=collection, **sourceArgs)
+    dest = OutputFile(os.path.join(workDir, 'events.sql'), OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = JSONToRelation(source, dest, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(workDir, 'json_to_relation.log'))
+    converter.setParser(EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True))
+    EdXTrackLogJSONParser.resetHashCache()
+    start = timeit.default_timer()
+    converter.convert()
+    return timeit.default_timer() - start
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(prog='mongo_input_benchmark.py')
+    argParser.add_argument('--host', default=None, help='MongoDB server. Default: a mongomock collection')
+    argParser.add_argument('--port', type=int, default=27017, help='MongoDB port. Default: 27017')
+    argParser.add_argument('--events', type=int, default=20000, help='number of events. Default: 20000')
+    args = argParser.parse_args()
+
+    if args.host is None:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(args.host, args.port)
+    collection = client['mongoInputBenchmark']['events']
+    workDir = tempfile.mkdtemp(prefix='mongoInput')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, args.events)
+        collection.drop()
+        with open(logFile) as fd:
+            collection.insert_many([json.loads(line) for line in fd if len(line.strip()) > 0])
+
+        print('| %d events, %s | Batch size | Events/s |' % (args.events, 'mongomock' if args.host is None else args.host))
+        for batchSize in [100, 1000, 10000]:
+            for (name, yieldDicts) in [('JSON lines', False), ('dicts', True)]:
+                seconds = convert(collection, workDir, batchSize=batchSize, yieldDicts=yieldDicts)
+                print('| %s | %d | %.0f |' % (name, batchSize, args.events / seconds))
+    finally:
+        collection.drop()
+        shutil.rmtree(workDir)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+'''
+Throughput of JSONToRelation.convert() on one synthetic tracking log
+from tracklog_generator.py, serially, and with the JSON objects spread
+over batches in several worker processes.
+
+Usage:
+    parallel_convert_benchmark.py [numEvents [batchSize]]   (default: 50000 1000)
+'''
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+import tracklog_generator
+
+def convert(logFile, outFileName, processes, batchSize):
+    dest = OutputFile(outFileName, OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = JSONToRelation(InURI(logFile), dest, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(os.path.dirname(outFileName), 'json_to_relation.log'))
+    converter.setParser(EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True))
+    # Each run starts without memoized screen name hashes:
+    EdXTrackLogJSONParser.resetHashCache()
+    start = timeit.default_timer()
+    converter.convert(processes=processes, batchSize=batchSize)
+    return timeit.default_timer() - start
+
+if __name__ == '__main__':
+    numEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    batchSize = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    workDir = tempfile.mkdtemp(prefix='parallelConvert')
+    try:
+        logFile = os.path.join(workDir, 'tracking.log')
+        tracklog_generator.write_json_log(logFile, numEvents)
+
+        print('| %d events, %d CPUs | Convert (events/s) | Speedup |' % (numEvents, multiprocessing.cpu_count()))
+        serialSeconds = convert(logFile, os.path.join(workDir, 'serial.sql'), None, batchSize)
+        print('| serial | %.0f | 1.00 |' % (numEvents / serialSeconds))
+        for processes in [1, 2, 4]:
+            seconds = convert(logFile, os.path.join(workDir, 'parallel%d.sql' % processes), processes, batchSize)
+            print('| %d processes | %.0f | %.2f |' % (processes, numEvents / seconds, serialSeconds / seconds))
+    finally:
+        shutil.rmtree(workDir)
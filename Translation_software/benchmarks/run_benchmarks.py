@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+'''
+End-to-end throughput benchmarks of the edX translation pipelines,
+on synthetic tracking logs from tracklog_generator.py:
+
+  - json_to_relation : JSONToRelation.convert of the JSON log to CSV tables
+  - qpipe            : qpipe's translate() of the CSV tables to MOOCdb
+  - json_extractor   : edx_to_MOOCdb's JSONExtractor over the JSON log
+
+Each target runs in its own process (the pipelines share module names,
+and peak RSS is measured per target). Events/sec, peak RSS and the
+time of each stage are appended, along with the current git commit,
+to a JSON results file, so that runs can be compared across commits.
+The stages of the JSON targets are setup (building the parser), read
+(the log lines), parse (events to rows) and write (rows to CSV); qpipe
+reports the stages of its translate().
+
+edx_to_MOOCdb's parser needs the software77 IP table in its data
+directory. Without it, json_extractor looks up IPs with the
+IpCountryDict of json_to_relation, which falls back to the GeoLite
+database shipped with json_to_relation.
+
+Usage:
+    run_benchmarks.py [--sizes 10000,100000,1000000] [--targets qpipe,...]
+                      [--workDir DIR] [--results FILE] [--label LABEL]
+'''
+
+import argparse
+import csv
+import datetime
+import imp
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import tracklog_generator
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+APIPE_DIR = os.path.join(ROOT_DIR, 'edx_to_MOOCdb_piping', 'import.openedx.apipe', 'json_to_relation')
+QPIPE_DIR = os.path.join(ROOT_DIR, 'edx_to_MOOCdb_piping', 'import.openedx.qpipe')
+EDX_TO_MOOCDB_DIR = os.path.join(ROOT_DIR, 'edx_to_MOOCdb')
+
+TARGETS = ['json_to_relation', 'qpipe', 'json_extractor']
+
+
+class StageClock(object):
+    '''
+    Adds up the wall time spent in each stage. Time outside any
+    wrapped call goes to the default stage; a wrapped call made
+    within another one pauses the outer stage.
+    '''
+    def __init__(self, defaultStage):
+        self.seconds = {}
+        self.stages = [defaultStage]
+        self.last = timeit.default_timer()
+
+    def switch(self):
+        now = timeit.default_timer()
+        self.seconds[self.stages[-1]] = self.seconds.get(self.stages[-1], 0) + now - self.last
+        self.last = now
+
+    def wrap(self, stage, func):
+        ''' Returns func, with its calls timed as the given stage '''
+        def timed(*args, **kwargs):
+            self.switch()
+            self.stages.append(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.switch()
+                self.stages.pop()
+        return timed
+
+    def stop(self):
+        self.switch()
+        return self.seconds
+
+
+def run_json_to_relation(inputs, dest):
+    sys.path.insert(0, APIPE_DIR)
+    from edxTrackLogJSONParser import EdXTrackLogJSONParser
+    from input_source import InURI
+    from json_to_relation import JSONToRelation
+    from output_disposition import OutputDisposition, OutputFile
+
+    start = timeit.default_timer()
+    outFile = OutputFile(os.path.join(dest, 'tracklog.sql'), OutputDisposition.OutputFormat.CSV, options='wb')
+    converter = JSONToRelation(InURI(inputs['json']), outFile, mainTableName='EdxTrackEvent',
+                               logFile=os.path.join(dest, 'json_to_relation.log'))
+    parser = EdXTrackLogJSONParser(converter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True)
+    converter.setParser(parser)
+    setup = timeit.default_timer() - start
+
+    # Rows are written by processFinishedRow(), called while
+    # convertOneLine() parses, and after the last line:
+    clock = StageClock('read')
+    converter.convertOneLine = clock.wrap('parse', converter.convertOneLine)
+    converter.processFinishedRow = clock.wrap('write', converter.processFinishedRow)
+    parser.finish = clock.wrap('write', parser.finish)
+    converter.convert()
+    stages = clock.stop()
+    stages['setup'] = setup
+    return {'stages':stages}
+
+def run_qpipe(inputs, dest):
+    # qpipe reads its configuration relative to its directory
+    os.chdir(QPIPE_DIR)
+    sys.path.insert(0, QPIPE_DIR)
+    import main
+    from extractor import CSVExtractor
+
+    events = CSVExtractor(edx_track_event=inputs['csv'][0], answer=inputs['csv'][1], correct_map=inputs['csv'][2], join='dict')
+    summary = main.translate(events, dest + '/', os.path.join(QPIPE_DIR, 'config/'),
+                             os.path.join(dest, 'resource_hierarchy.org'), os.path.join(dest, 'problem_hierarchy.org'), 1, 'csv', '')
+    return {'rows':summary['counters'].get('events', 0),
+            'stages':dict([(stage, times['seconds']) for stage, times in summary['stages'].items()])}
+
+def run_json_extractor(inputs, dest):
+    # edx_to_MOOCdb reads its data files relative to its directory
+    os.chdir(EDX_TO_MOOCDB_DIR)
+    sys.path.insert(0, EDX_TO_MOOCDB_DIR)
+    import extractor
+    if not os.path.exists(os.path.join(EDX_TO_MOOCDB_DIR, 'data', 'ipToCountrySoftware77DotNet.csv')):
+        # Loaded under another name, as edx_to_MOOCdb has an ipToCountry module too
+        ipToCountry = imp.load_source('json_to_relation_ipToCountry', os.path.join(APIPE_DIR, 'ipToCountry.py'))
+        extractor.edxTrackLogJSONParser.IpCountryDict = ipToCountry.IpCountryDict
+
+    start = timeit.default_timer()
+    events = extractor.JSONExtractor(inputs['json'])
+    setup = timeit.default_timer() - start
+
+    # The rows go to a CSV file laid out as the EdxTrackEvent
+    # table that CSVExtractor reads:
+    clock = StageClock('read')
+    events.jsonParserInstance.processOneJSONObject = clock.wrap('parse', events.jsonParserInstance.processOneJSONObject)
+    rows = 0
+    with open(os.path.join(dest, 'EdxTrackEvent.csv'), 'wb') as fd:
+        writer = csv.DictWriter(fd, extractor.CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES, extrasaction='ignore',
+                                quotechar=extractor.cfg.QUOTECHAR, escapechar='\\')
+        writeRow = clock.wrap('write', writer.writerow)
+        for row in events:
+            writeRow(row)
+            rows += 1
+    stages = clock.stop()
+    stages['setup'] = setup
+    return {'rows':rows, 'stages':stages}
+
+def run_target(target, inputsFile, dest, resultFile):
+    '''
+    Runs one target in this process, and writes its result to resultFile.
+    Anything the pipeline prints goes to <dest>/<target>.out
+    '''
+    with open(inputsFile) as fd:
+        inputs = json.load(fd)
+    stdout = sys.stdout
+    sys.stdout = open(os.path.join(dest, target + '.out'), 'w')
+    start = timeit.default_timer()
+    try:
+        result = globals()['run_' + target](inputs, dest)
+    except Exception as e:
+        result = {'error':'%s: %s' % (e.__class__.__name__, e)}
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    result['seconds'] = timeit.default_timer() - start
+    # ru_maxrss is given in kilobytes on Linux
+    result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(resultFile, 'w') as fd:
+        json.dump(result, fd)
+
+
+def make_inputs(workDir, size, seed, users):
+    '''
+    Generates the JSON log and the CSV tables of the given size,
+    unless a previous run left them in workDir. Returns the path
+    of a JSON file describing them.
+    '''
+    name = 'tracklog_%d_s%d_u%d' % (size, seed, users)
+    inputsFile = os.path.join(workDir, name + '.inputs.json')
+    if not os.path.exists(inputsFile):
+        jsonLog = os.path.join(workDir, name + '.json')
+        tracklog_generator.write_json_log(jsonLog, size, seed=seed, users=users)
+        csvTables, rows = tracklog_generator.write_csv_tables(os.path.join(workDir, name), size, seed=seed, users=users)
+        with open(inputsFile, 'w') as fd:
+            json.dump({'events':size, 'json':jsonLog, 'csv':csvTables, 'csv_rows':rows}, fd)
+    return inputsFile
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def run_benchmarks(sizes, targets, workDir, seed=0, users=1000):
+    results = []
+    for size in sizes:
+        inputsFile = make_inputs(workDir, size, seed, users)
+        for target in targets:
+            dest = tempfile.mkdtemp(prefix=target, dir=workDir)
+            resultFile = os.path.join(dest, 'result.json')
+            subprocess.call([sys.executable, os.path.abspath(__file__), '--runTarget', target,
+                             '--inputs', inputsFile, '--dest', dest, '--result', resultFile])
+            result = {'error':'no result, the benchmark process crashed'}
+            if os.path.exists(resultFile):
+                with open(resultFile) as fd:
+                    result = json.load(fd)
+            result.update({'target':target, 'events':size})
+            if 'error' not in result:
+                result['events_per_sec'] = size / result['seconds']
+            results.append(result)
+            print_result(result)
+            shutil.rmtree(dest)
+    return results
+
+def print_result(result):
+    if 'error' in result:
+        print('| %s | %d | %s |' % (result['target'], result['events'], result['error']))
+    else:
+        stages = ', '.join(['%s %.2f s' % (stage, seconds) for stage, seconds in sorted(result.get('stages', {}).items())])
+        print('| %s | %d | %.2f s | %.0f events/s | %d kB | %s |' % (result['target'], result['events'], result['seconds'],
+                                                                   result['events_per_sec'], result['peak_rss_kb'], stages))
+
+def save_results(resultsFile, results, label='', seed=0, users=1000):
+    ''' Appends this run to the runs recorded in resultsFile '''
+    history = {'runs':[]}
+    if os.path.exists(resultsFile):
+        with open(resultsFile) as fd:
+            history = json.load(fd)
+    history['runs'].append({'commit':get_commit(),
+                            'label':label,
+                            'date':datetime.datetime.now().isoformat(),
+                            'python':platform.python_version(),
+                            'host':platform.node(),
+                            'seed':seed,
+                            'users':users,
+                            'results':results})
+    with open(resultsFile, 'w') as fd:
+        json.dump(history, fd, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='run_benchmarks.py')
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='comma-separated numbers of events. Default: 10000,100000,1000000')
+    parser.add_argument('--targets', default=','.join(TARGETS),
+                        help='comma-separated targets among %s. Default: all' % ', '.join(TARGETS))
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated logs. Default: 0')
+    parser.add_argument('--users', type=int, default=1000, help='number of users in the generated logs. Default: 1000')
+    parser.add_argument('--workDir', help='directory for the generated logs, reused across runs. Default: temporary directory')
+    parser.add_argument('--results', default=os.path.join(BENCH_DIR, 'results.json'),
+                        help='JSON file the results are appended to. Default: results.json next to this script')
+    parser.add_argument('--label', default='', help='label recorded with the results')
+    # Used internally to run each target in its own process
+    parser.add_argument('--runTarget', help=argparse.SUPPRESS)
+    parser.add_argument('--inputs', help=argparse.SUPPRESS)
+    parser.add_argument('--dest', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.runTarget:
+        run_target(args.runTarget, args.inputs, args.dest, args.result)
+        sys.exit(0)
+
+    workDir = args.workDir or tempfile.mkdtemp(prefix='tracklog_bench')
+    if not os.path.exists(workDir):
+        os.makedirs(workDir)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    targets = args.targets.split(',')
+    for target in targets:
+        if target not in TARGETS:
+            parser.error('unknown target: %s' % target)
+
+    results = run_benchmarks(sizes, targets, workDir, args.seed, args.users)
+    save_results(args.results, results, args.label, args.seed, args.users)
+    if not args.workDir:
+        shutil.rmtree(workDir)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+'''
+Cost of hashing screen names into anon_screen_name, per username:
+the former unmemoized EdXTrackLogJSONParser.makeHash (computeHash),
+the memoized makeHash, and the bulk makeHashes, cold and with the
+memo preloaded from a side file, as on a rerun over a new daily log.
+Usernames are those of the synthetic tracking logs of tracklog_generator.py.
+'''
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+import tracklog_generator
+
+def time_per_name(hashAll, usernames, sideFileDir=None):
+    EdXTrackLogJSONParser.resetHashCache()
+    if sideFileDir is not None:
+        EdXTrackLogJSONParser.loadHashCache(sideFileDir)
+    start = timeit.default_timer()
+    hashAll(usernames)
+    elapsed = timeit.default_timer() - start
+    return (1e6 * elapsed / len(usernames), EdXTrackLogJSONParser.getHashCacheStats()['hitRate'])
+
+def unmemoized(usernames):
+    for username in usernames:
+        EdXTrackLogJSONParser.computeHash(username)
+
+def memoized(usernames):
+    for username in usernames:
+        EdXTrackLogJSONParser.makeHash(username)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='screen_name_hash_benchmark.py')
+    parser.add_argument('--events', type=int, default=200000, help='number of usernames hashed. Default: 200000')
+    parser.add_argument('--users', type=int, default=5000, help='number of distinct users. Default: 5000')
+    args = parser.parse_args()
+
+    generator = tracklog_generator.TrackLogGenerator(seed=0, users=args.users)
+    usernames = [event['username'] for event in generator.events(args.events)]
+
+    sideFileDir = tempfile.mkdtemp(prefix='screenNameHashes')
+    try:
+        EdXTrackLogJSONParser.resetHashCache()
+        EdXTrackLogJSONParser.makeHashes(usernames)
+        EdXTrackLogJSONParser.saveHashCache(sideFileDir)
+
+        print('| %d usernames, %d users | us/username | hit rate |' % (len(usernames), args.users))
+        for (name, hashAll, sideFile) in [('unmemoized makeHash', unmemoized, None),
+                                          ('memoized makeHash', memoized, None),
+                                          ('makeHashes', EdXTrackLogJSONParser.makeHashes, None),
+                                          ('makeHashes, side file', EdXTrackLogJSONParser.makeHashes, sideFileDir)]:
+            (usPerName, hitRate) = time_per_name(hashAll, usernames, sideFile)
+            print('| %s | %.3f | %.3f |' % (name, usPerName, hitRate))
+    finally:
+        shutil.rmtree(sideFileDir)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+Overlap of decompression and parsing when InURI reads a gzipped
+tracking log: the stdlib gzip reader, which decompresses in the
+parsing thread line by line, against the StreamingLineReader, which
+decompresses large blocks in a background thread. The log repeats
+the events of tracklog_generator.py up to the given uncompressed size.
+Parsing is the JSON decoding of each line and of its nested event,
+the first stage of EdXTrackLogJSONParser.
+
+Reported are the seconds to only read the lines, to only parse them
+(from memory), and to do both. Overlap is the share of the shorter
+of read and parse that is hidden in the combined time.
+
+Usage:
+    streaming_input_benchmark.py [--gigabytes GB] [--events N]
+'''
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+APIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'edx_to_MOOCdb_piping', 'import.openedx.apipe')
+# json_to_relation modules import each other by their bare names
+sys.path.insert(0, APIPE_DIR)
+sys.path.append(os.path.join(APIPE_DIR, 'json_to_relation'))
+
+from json_to_relation.input_source import InURI
+import tracklog_generator
+
+def parse(line):
+    record = json.loads(line)
+    event = record.get('event', None)
+    if isinstance(event, basestring):
+        try:
+            json.loads(event)
+        except ValueError:
+            pass
+
+def readOnly(logFile, streaming):
+    start = timeit.default_timer()
+    with InURI(logFile, streaming=streaming) as fd:
+        for line in fd:
+            pass
+    return timeit.default_timer() - start
+
+def readAndParse(logFile, streaming):
+    start = timeit.default_timer()
+    with InURI(logFile, streaming=streaming) as fd:
+        for line in fd:
+            parse(line)
+    return timeit.default_timer() - start
+
+def parseOnly(lines, repeats):
+    start = timeit.default_timer()
+    for i in range(repeats):
+        for line in lines:
+            parse(line)
+    return timeit.default_timer() - start
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(prog='streaming_input_benchmark.py')
+    argParser.add_argument('--gigabytes', type=float, default=1.0, help='uncompressed size of the log. Default: 1')
+    argParser.add_argument('--events', type=int, default=100000, help='number of distinct events, repeated up to the size. Default: 100000')
+    args = argParser.parse_args()
+
+    workDir = tempfile.mkdtemp(prefix='streamingInput')
+    try:
+        eventsFile = os.path.join(workDir, 'events.log')
+        tracklog_generator.write_json_log(eventsFile, args.events)
+        with open(eventsFile, 'rb') as fd:
+            events = fd.read()
+        repeats = max(1, int(args.gigabytes * 2**30 / len(events)))
+        logFile = os.path.join(workDir, 'tracking.log.gz')
+        fd = gzip.open(logFile, 'wb')
+        for i in range(repeats):
+            fd.write(events)
+        fd.close()
+
+        parseSeconds = parseOnly(events.splitlines(True), repeats)
+        print('| %.2f GB, %.2f GB gzipped | Read (s) | Parse (s) | Read and parse (s) | Overlap |' %
+              (float(len(events)) * repeats / 2**30, float(os.path.getsize(logFile)) / 2**30))
+        for (name, streaming) in [('gzip.open', False), ('StreamingLineReader', True)]:
+            readSeconds = readOnly(logFile, streaming)
+            bothSeconds = readAndParse(logFile, streaming)
+            overlap = (readSeconds + parseSeconds - bothSeconds) / min(readSeconds, parseSeconds)
+            print('| %s | %.1f | %.1f | %.1f | %.0f%% |' % (name, readSeconds, parseSeconds, bothSeconds, 100 * max(overlap, 0)))
+    finally:
+        shutil.rmtree(workDir)
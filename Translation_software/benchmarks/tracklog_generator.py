@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+'''
+Deterministic generator of synthetic edX tracking logs, for benchmarks.
+
+Events are drawn from a seeded random generator over a synthetic
+catalog of courses (chapters, sequentials, problems and videos) and
+users, and are written either as a JSON tracking log (one event per
+line, as read by json_to_relation and edx_to_MOOCdb), or as the
+EdxTrackEvent, Answer and CorrectMap CSV tables read by qpipe's
+CSVExtractor. The same seed and cardinalities always give the same events.
+
+Usage:
+    tracklog_generator.py [--events N] [--users N] [--courses N] [--seed N]
+                          [--csv PREFIX] [log.json]
+'''
+
+import argparse
+import csv
+import datetime
+import gzip
+import hashlib
+import json
+import random
+import sys
+
+AGENTS = ['Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/30.0.1599.101 Safari/537.36',
+          'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_5) AppleWebKit/536.30.1 (KHTML, like Gecko) Version/6.0.5 Safari/536.30.1',
+          'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:20.0) Gecko/20100101 Firefox/20.0',
+          'Mozilla/5.0 (Windows NT 6.1; WOW64; Trident/7.0; rv:11.0) like Gecko',
+          'Mozilla/5.0 (iPad; CPU OS 7_0_2 like Mac OS X) AppleWebKit/537.51.1 (KHTML, like Gecko) Version/7.0 Mobile/11A501 Safari/9537.53']
+
+# Relative frequency of each kind of event
+KINDS = [('navigation', 35), ('video', 30), ('problem', 20), ('forum', 10), ('ora', 5)]
+
+# Fields of qpipe's CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES
+EDX_TRACK_EVENT_FIELDNAMES = ['_id','event_id','agent','event_source','event_type','ip','page','session','time','anon_screen_name','downtime_for','student_id','instructor_id','course_id','course_display_name','resource_display_name','organization','sequence_id','goto_from','goto_dest','problem_id','problem_choice','question_location','submission_id','attempts','long_answer','student_file','can_upload_file','feedback','feedback_response_selected','transcript_id','transcript_code','rubric_selection','rubric_category','video_id','video_code','video_current_time','video_speed','video_old_time','video_new_time','video_seek_type','video_new_speed','video_old_speed','book_interaction_type','success','answer_id','hint','hintmode','msg','npoints','queuestate','orig_score','new_score','orig_total','new_total','event_name','group_user','group_action','position','badly_formatted','correctMap_fk','answer_fk','state_fk','load_info_fk']
+
+HOST = 'https://www.edx.org'
+
+
+class TrackLogGenerator(object):
+    '''
+    Generates time-ordered synthetic tracking log events. Each event is
+    a dict holding the fields of a JSON tracking log line, plus the
+    relational rows qpipe would read for it, under the 'rows' key.
+    '''
+
+    def __init__(self, seed=0, users=1000, courses=2, chapters=8, sequentials=4, problems=3, videos=2,
+                 start=datetime.datetime(2014, 2, 3, 8, 0, 0), mean_gap_ms=500):
+        self.rng = random.Random(seed)
+        self.mean_gap_ms = mean_gap_ms
+        self.time = start
+        self.serial = 0
+
+        self.kinds = []
+        for kind, weight in KINDS:
+            self.kinds.extend([kind] * weight)
+
+        self.courses = [self.make_course(i, chapters, sequentials, problems, videos) for i in range(courses)]
+        self.users = [self.make_user(i) for i in range(users)]
+
+    def hex_id(self):
+        return '%032x' % self.rng.getrandbits(128)
+
+    def make_course(self, number, chapters, sequentials, problems, videos):
+        org, code, run = 'Org%d' % number, 'C%03d' % number, '2014_T1'
+        course = {'course_id':'%s/%s/%s' % (org, code, run), 'org':org, 'code':code, 'run':run, 'sequentials':[]}
+        for chapter in range(chapters):
+            chapter_id = self.hex_id()
+            for sequential in range(sequentials):
+                sequential_id = self.hex_id()
+                course['sequentials'].append({'url':'%s/courses/%s/courseware/%s/%s/' % (HOST, course['course_id'], chapter_id, sequential_id),
+                                              'id':'i4x://%s/%s/sequential/%s' % (org, code, sequential_id),
+                                              'name':'Chapter %d, sequence %d' % (chapter + 1, sequential + 1),
+                                              'problems':['i4x-%s-%s-problem-%s' % (org, code, self.hex_id()) for i in range(problems)],
+                                              'videos':['i4x-%s-%s-video-%s' % (org, code, self.hex_id()) for i in range(videos)]})
+        return course
+
+    def make_user(self, number):
+        return {'username':'user%06d' % number,
+                'agent':self.rng.choice(AGENTS),
+                'ip':'%d.%d.%d.%d' % (self.rng.randint(1, 223), self.rng.randint(0, 255), self.rng.randint(0, 255), self.rng.randint(1, 254)),
+                'session':self.hex_id(),
+                'course':self.rng.randrange(len(self.courses)),
+                'position':None}
+
+    def next_uuid(self):
+        return '%08x-%04x-%04x-%04x-%012x' % (self.rng.getrandbits(32), self.rng.getrandbits(16), self.rng.getrandbits(16),
+                                              self.rng.getrandbits(16), self.rng.getrandbits(48))
+
+    def events(self, n):
+        ''' Yields n events, ordered by time '''
+        for i in range(n):
+            self.time += datetime.timedelta(milliseconds=self.rng.expovariate(1.0 / self.mean_gap_ms))
+            user = self.rng.choice(self.users)
+            course = self.courses[user['course']]
+
+            # Users mostly stay where they are, and sometimes move on
+            if user['position'] is None or self.rng.random() < 0.2:
+                user['position'] = self.rng.randrange(len(course['sequentials']))
+            sequential = course['sequentials'][user['position']]
+
+            kind = self.rng.choice(self.kinds)
+            event = getattr(self, 'make_' + kind)(user, course, sequential)
+            yield event
+
+    def base(self, user, course, sequential, event_type, event_source, event, page=None):
+        self.serial += 1
+        return {'username':user['username'],
+                'host':'courses.edx.org',
+                'session':user['session'],
+                'event_source':event_source,
+                'event_type':event_type,
+                'time':self.time.isoformat() + ('' if self.time.microsecond else '.000000') + '+00:00',
+                'ip':user['ip'],
+                'agent':user['agent'],
+                'page':page if page is not None else sequential['url'],
+                'context':{'course_id':course['course_id'], 'org_id':course['org'], 'user_id':self.serial % 100000},
+                'event':event}
+
+    def make_navigation(self, user, course, sequential):
+        choice = self.rng.random()
+        if choice < 0.4:
+            old = self.rng.randint(1, 6)
+            new = self.rng.randint(1, 6)
+            event_type = self.rng.choice(['seq_goto', 'seq_next', 'seq_prev'])
+            event = self.base(user, course, sequential, event_type, 'browser',
+                              json.dumps({'old':old, 'new':new, 'id':sequential['id']}))
+            event['rows'] = [{'sequence_id':sequential['id'], 'goto_from':str(old), 'goto_dest':str(new)}]
+        elif choice < 0.9:
+            # Page view of the courseware, as logged by the server
+            path = sequential['url'][len(HOST):]
+            event = self.base(user, course, sequential, path, 'server', json.dumps({'POST':{}, 'GET':{}}))
+            event['page'] = None
+            event['rows'] = [{}]
+        else:
+            event = self.base(user, course, sequential, 'page_close', 'browser', '')
+            event['rows'] = [{}]
+        return event
+
+    def make_video(self, user, course, sequential):
+        video_id = self.rng.choice(sequential['videos'])
+        code = video_id[-11:]
+        current = round(self.rng.uniform(0, 600), 3)
+        event_type = self.rng.choice(['play_video', 'play_video', 'pause_video', 'seek_video', 'speed_change_video', 'show_transcript'])
+        payload = {'id':video_id, 'code':code, 'currentTime':current}
+        row = {'video_id':video_id, 'video_code':code, 'video_current_time':str(current)}
+        if event_type == 'seek_video':
+            new = round(self.rng.uniform(0, 600), 3)
+            payload = {'id':video_id, 'code':code, 'old_time':current, 'new_time':new, 'type':'onSlideSeek'}
+            row = {'video_id':video_id, 'video_code':code, 'video_old_time':str(current), 'video_new_time':str(new), 'video_seek_type':'onSlideSeek'}
+        elif event_type == 'speed_change_video':
+            payload.update({'old_speed':'1.0', 'new_speed':'1.50'})
+            row.update({'video_old_speed':'1.0', 'video_new_speed':'1.50'})
+        event = self.base(user, course, sequential, event_type, 'browser', json.dumps(payload))
+        event['rows'] = [row]
+        return event
+
+    def make_problem(self, user, course, sequential):
+        problem_id = self.rng.choice(sequential['problems'])
+        inputs = ['input_%s_%d_1' % (problem_id, i + 2) for i in range(self.rng.randint(1, 3))]
+        answers = dict([(name, 'choice_%d' % self.rng.randint(0, 3)) for name in inputs])
+
+        if self.rng.random() < 0.5:
+            # Answers as posted by the browser
+            event = self.base(user, course, sequential, 'problem_check', 'browser',
+                              '&'.join(['%s=%s' % item for item in sorted(answers.items())]))
+            event['rows'] = [{'problem_id':problem_id}]
+            return event
+
+        # Graded answers, as logged by the server
+        correct_map = {}
+        rows = []
+        attempts = self.rng.randint(1, 3)
+        for name in inputs:
+            correctness = self.rng.choice(['correct', 'incorrect'])
+            correct_map[name[len('input_'):]] = {'hint':'', 'hintmode':None, 'correctness':correctness, 'msg':'', 'npoints':None, 'queuestate':None}
+            rows.append({'problem_id':problem_id, 'attempts':str(attempts), 'answer_fk':self.next_uuid(), 'correctMap_fk':self.next_uuid(),
+                         'answer':answers[name], 'answer_identifier':name[len('input_'):], 'correctness':correctness})
+        success = 'correct' if all([c['correctness'] == 'correct' for c in correct_map.values()]) else 'incorrect'
+        for row in rows:
+            row['success'] = success
+        event = self.base(user, course, sequential, 'problem_check', 'server',
+                          {'success':success, 'correct_map':correct_map, 'answers':answers, 'attempts':attempts,
+                           'grade':sum([c['correctness'] == 'correct' for c in correct_map.values()]), 'max_grade':len(inputs),
+                           'problem_id':problem_id.replace('i4x-', 'i4x://').replace('-', '/'), 'state':{}})
+        event['rows'] = rows
+        return event
+
+    def make_forum(self, user, course, sequential):
+        event_type = self.rng.choice(['edx.forum.thread.created', 'edx.forum.response.created', 'edx.forum.comment.created', 'edx.forum.searched'])
+        if event_type == 'edx.forum.searched':
+            payload = {'query':'week %d' % self.rng.randint(1, 10), 'page':1, 'total_results':self.rng.randint(0, 50)}
+        else:
+            payload = {'id':self.hex_id()[:24], 'commentable_id':self.hex_id(), 'body':'Synthetic forum post %d' % self.serial,
+                       'user_course_roles':[], 'user_forums_roles':['Student']}
+        event = self.base(user, course, sequential, event_type, 'server', payload,
+                          page='%s/courses/%s/discussion/forum' % (HOST, course['course_id']))
+        event['rows'] = [{}]
+        return event
+
+    def make_ora(self, user, course, sequential):
+        event_type = self.rng.choice(['openassessmentblock.create_submission', 'openassessmentblock.peer_assess', 'openassessmentblock.self_assess'])
+        if event_type == 'openassessmentblock.create_submission':
+            payload = {'submission_uuid':self.next_uuid(), 'attempt_number':1,
+                       'answer':{'text':'Synthetic essay %d' % self.serial}, 'created_at':self.time.isoformat()}
+        else:
+            payload = {'submission_uuid':self.next_uuid(), 'scorer_id':self.hex_id(), 'score_type':event_type.split('.')[1][:2].upper(),
+                       'parts':[{'option':{'name':'Good', 'points':3}, 'criterion':{'name':'Ideas', 'points_possible':5}}]}
+        event = self.base(user, course, sequential, event_type, 'server', payload)
+        event['rows'] = [{}]
+        return event
+
+    def to_json(self, event):
+        ''' The tracking log line of an event '''
+        line = dict(event)
+        del line['rows']
+        return json.dumps(line)
+
+    def to_rows(self, event):
+        ''' The EdxTrackEvent rows of an event, as exported for qpipe '''
+        rows = []
+        for values in event['rows']:
+            row = dict.fromkeys(EDX_TRACK_EVENT_FIELDNAMES, '')
+            row.update({'_id':self.next_uuid(), 'event_id':self.next_uuid(), 'agent':event['agent'], 'event_source':event['event_source'],
+                        'event_type':event['event_type'], 'ip':event['ip'], 'page':event['page'] or '', 'session':event['session'],
+                        'time':event['time'][:26], 'anon_screen_name':hashlib.sha1(event['username']).hexdigest(),
+                        'course_display_name':event['context']['course_id']})
+            row.update(values)
+            rows.append(row)
+        return rows
+
+
+def open_output(path):
+    return gzip.open(path, 'wb') if path.endswith('.gz') else open(path, 'wb')
+
+def write_json_log(path, n, **kwargs):
+    ''' Writes a tracking log of n events. Returns the number of lines '''
+    generator = TrackLogGenerator(**kwargs)
+    with open_output(path) as f:
+        for event in generator.events(n):
+            f.write(generator.to_json(event) + '\n')
+    return n
+
+def write_csv_tables(prefix, n, **kwargs):
+    '''
+    Writes the EdxTrackEvent, Answer and CorrectMap tables of n events,
+    in the layout of qpipe's CSVExtractor. Returns their paths and the
+    number of EdxTrackEvent rows.
+    '''
+    generator = TrackLogGenerator(**kwargs)
+    paths = [prefix + suffix for suffix in ['_EdxTrackEventTable.csv', '_AnswerTable.csv', '_CorrectMapTable.csv']]
+    files = [open(path, 'wb') for path in paths]
+    events, answers, correct_maps = [csv.writer(f, delimiter=',', quotechar="'", escapechar='\\', quoting=csv.QUOTE_ALL, doublequote=False)
+                                     for f in files]
+    count = 0
+    for event in generator.events(n):
+        for row in generator.to_rows(event):
+            if row.get('answer_fk'):
+                answers.writerow([row['answer_fk'], row['problem_id'], row.pop('answer'), event['context']['course_id']])
+                correct_maps.writerow([row['correctMap_fk'], row.pop('answer_identifier'), row.pop('correctness'), '', '', '', '', ''])
+            events.writerow([row[name] for name in EDX_TRACK_EVENT_FIELDNAMES])
+            count += 1
+    for f in files:
+        f.close()
+    return paths, count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='tracklog_generator.py')
+    parser.add_argument('-n', '--events', type=int, default=10000, help='number of events. Default: 10000')
+    parser.add_argument('-u', '--users', type=int, default=1000, help='number of users. Default: 1000')
+    parser.add_argument('-c', '--courses', type=int, default=2, help='number of courses. Default: 2')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed. Default: 0')
+    parser.add_argument('--csv', dest='csvPrefix', help='also write the CSV tables read by qpipe, prefixed with CSVPREFIX')
+    parser.add_argument('logFile', nargs='?', help='JSON tracking log to write (gzipped if ending with .gz). Default: stdout')
+    args = parser.parse_args()
+
+    kwargs = {'seed':args.seed, 'users':args.users, 'courses':args.courses}
+    if args.logFile:
+        write_json_log(args.logFile, args.events, **kwargs)
+    else:
+        generator = TrackLogGenerator(**kwargs)
+        for event in generator.events(args.events):
+            sys.stdout.write(generator.to_json(event) + '\n')
+    if args.csvPrefix:
+        write_csv_tables(args.csvPrefix, args.events, **kwargs)
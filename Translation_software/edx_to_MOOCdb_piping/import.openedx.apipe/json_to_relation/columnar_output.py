@@ -0,0 +1,501 @@
+'''
+Created on Oct 18, 2026
+
+Columnar output of JSONToRelation. Rather than INSERT statements or
+CSV lines, each table is collected as one array per column, typed by
+the ColumnSpec of the table's schema, and written in row groups of
+a fixed number of rows into a directory:
+
+    - npz format (needs numpy): one <table>.<group>.npz file per row
+      group, holding one .npy array per column, plus manifest.json,
+      which lists the tables, their columns, and their row groups.
+    - parquet format (needs pyarrow): one <table>.parquet file per
+      table, plus manifest.json.
+
+Both are read back with ColumnarReader. Other SQL the parser emits,
+such as the CREATE TABLE statements, goes to statements.sql in the
+same directory.
+'''
+from collections import OrderedDict
+import json
+import os
+import shutil
+
+import numpy
+
+from col_data_type import ColDataType
+from output_disposition import OutputDisposition
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Number of rows in each row group:
+ROW_GROUP_SIZE = 65536
+
+# A text column of an npz row group is dictionary encoded if
+# it has at most this share of distinct values:
+DICTIONARY_MAX_DISTINCT_SHARE = 0.5
+
+MANIFEST_FILE_NAME = 'manifest.json'
+STATEMENTS_FILE_NAME = 'statements.sql'
+
+INT_COL_TYPES = frozenset([ColDataType.TINYINT, ColDataType.SMALLINT, ColDataType.MEDIUMINT,
+                           ColDataType.INT, ColDataType.BIGINT, ColDataType.BOOL])
+FLOAT_COL_TYPES = frozenset([ColDataType.FLOAT, ColDataType.DOUBLE])
+
+# Smallest first; npz row groups store integers and dictionary
+# codes in the first of these that holds their range:
+INT_DTYPES = [numpy.int8, numpy.int16, numpy.int32, numpy.int64]
+INT64_INFO = numpy.iinfo(numpy.int64)
+
+def columnKind(colDataType):
+    '''
+    Returns 'int', 'float', or 'text' for a column of the given
+    type. Dates and times are text, as in the CSV output.
+
+    :param colDataType: type of the column, or None if unknown
+    :type colDataType: {ColDataType | None}
+    :rtype: String
+    '''
+    if colDataType in INT_COL_TYPES:
+        return 'int'
+    if colDataType in FLOAT_COL_TYPES:
+        return 'float'
+    return 'text'
+
+def intValue(val):
+    '''
+    Converts one value of an integer column, or returns None for
+    null. As in the CSV output, None and 'null' are null. So are
+    values that are no integers, such as '', which MySQL would load
+    as 0.
+    '''
+    if val is None or val == 'null':
+        return None
+    try:
+        val = int(val)
+    except (TypeError, ValueError):
+        return None
+    if val < INT64_INFO.min or val > INT64_INFO.max:
+        return None
+    return val
+
+def floatValue(val):
+    '''
+    Converts one value of a float column, or returns None for null.
+    '''
+    if val is None or val == 'null':
+        return None
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+def textValue(val):
+    '''
+    Converts one value of a text column to a UTF-8 string, or returns
+    None for null. The \\' with which the parser escapes single quotes
+    for MySQL becomes a plain quote again.
+    '''
+    if val is None or val == 'null':
+        return None
+    if isinstance(val, unicode):
+        val = val.encode('utf-8')
+    elif not isinstance(val, str):
+        return str(val)
+    return val.replace("\\'", "'")
+
+VALUE_CONVERTERS = {'int' : intValue, 'float' : floatValue, 'text' : textValue}
+
+def smallestIntDtype(minVal, maxVal):
+    for dtype in INT_DTYPES:
+        info = numpy.iinfo(dtype)
+        if info.min <= minVal and maxVal <= info.max:
+            return dtype
+    return numpy.int64
+
+def packStrings(strings):
+    '''
+    Packs a list of strings into the offsets at which each starts,
+    followed by their total length, and the concatenation of their bytes.
+
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    '''
+    offsets = numpy.zeros(len(strings) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum(numpy.array([len(oneStr) for oneStr in strings], dtype=numpy.int64))
+    data = ''.join(strings)
+    return (offsets, numpy.frombuffer(data, dtype=numpy.uint8) if len(data) > 0 else numpy.zeros(0, dtype=numpy.uint8))
+
+def unpackStrings(offsets, data):
+    '''
+    Inverse of packStrings(): returns an object array of the strings.
+    '''
+    data = data.tostring()
+    strings = numpy.empty(len(offsets) - 1, dtype=object)
+    strings[:] = [data[offsets[i]:offsets[i+1]] for i in xrange(len(offsets) - 1)]
+    return strings
+
+class ColumnarTable(object):
+    '''
+    The row group of one table that OutputColumnar is collecting,
+    and the row groups already written.
+    '''
+    def __init__(self, tableName, colNames, colDataTypes):
+        self.tableName = tableName
+        self.colNames = colNames
+        self.colKinds = [columnKind(colDataType) for colDataType in colDataTypes]
+        self.sqlTypes = [ColDataType().toString(colDataType).upper() if colDataType is not None else None for colDataType in colDataTypes]
+        self.columns = [[] for colName in colNames] # @UnusedVariable
+        self.numBufferedRows = 0
+        self.numRows = 0
+        self.rowGroups = []
+        self.parquetWriter = None
+        # insertSig --> position in colNames of each of its columns,
+        # or None if those are exactly colNames:
+        self.colPositions = {}
+
+    def getColPositions(self, insertSig):
+        '''
+        Returns the position among this table's columns of each
+        column of the given insert signature, or None if the signature
+        lists exactly the table's columns.
+
+        @raise ValueError: if the signature has a column the table lacks
+        '''
+        try:
+            return self.colPositions[insertSig]
+        except KeyError:
+            pass
+        if insertSig is None:
+            positions = None
+        else:
+            sigColNames = insertSig.split(',')
+            if sigColNames == self.colNames:
+                positions = None
+            else:
+                try:
+                    positions = [self.colNames.index(colName) for colName in sigColNames]
+                except ValueError:
+                    raise ValueError("Table %s has no columns %s" % (self.tableName,
+                                                                     [colName for colName in sigColNames if colName not in self.colNames]))
+        self.colPositions[insertSig] = positions
+        return positions
+
+    def append(self, valsArray, insertSig):
+        positions = self.getColPositions(insertSig)
+        if positions is None:
+            if len(valsArray) > len(self.columns):
+                raise ValueError("Row of table %s has %d values, but the table has %d columns" % 
+                                 (self.tableName, len(valsArray), len(self.columns)))
+            for (column, val) in zip(self.columns, valsArray):
+                column.append(val)
+            # Rows shorter than the table are null at the end:
+            for column in self.columns[len(valsArray):]:
+                column.append(None)
+        else:
+            row = [None] * len(self.columns)
+            for (pos, val) in zip(positions, valsArray):
+                row[pos] = val
+            for (column, val) in zip(self.columns, row):
+                column.append(val)
+        self.numBufferedRows += 1
+
+    def takeRowGroup(self):
+        '''
+        Returns the buffered columns as lists of converted values
+        (see intValue(), floatValue(), textValue()), and starts a
+        new row group.
+        '''
+        rowGroup = [map(VALUE_CONVERTERS[colKind], column) for (colKind, column) in zip(self.colKinds, self.columns)]
+        self.numRows += self.numBufferedRows
+        self.columns = [[] for colName in self.colNames] # @UnusedVariable
+        self.numBufferedRows = 0
+        return rowGroup
+
+class OutputColumnar(OutputDisposition):
+    '''
+    Destination that writes each table as typed columns in row groups
+    (see module comment). Like the CSV outputs, it takes the rows of
+    INSERT-generating parsers directly via writeValuesRow(); no INSERT
+    statements are built.
+    '''
+
+    def __init__(self, dirName, fileFormat=None, rowGroupSize=ROW_GROUP_SIZE):
+        '''
+        :param dirName: directory for the output files. Created if needed.
+        :type dirName: String
+        :param fileFormat: 'npz', or 'parquet'. Default: 'parquet' if pyarrow is installed, else 'npz'
+        :type fileFormat: {String | None}
+        :param rowGroupSize: number of rows of each row group
+        :type rowGroupSize: int
+        @raise ValueError: if the format is unknown, or parquet without pyarrow.
+        '''
+        super(OutputColumnar, self).__init__(OutputDisposition.OutputFormat.COLUMNAR)
+        if fileFormat is None:
+            fileFormat = 'parquet' if pyarrow is not None else 'npz'
+        if fileFormat not in ['npz', 'parquet']:
+            raise ValueError("Columnar output format must be 'npz' or 'parquet'; is %s" % fileFormat)
+        if fileFormat == 'parquet' and pyarrow is None:
+            raise ValueError("Columnar output to parquet needs pyarrow, which is not installed.")
+        self.name = dirName
+        self.fileFormat = fileFormat
+        self.rowGroupSize = rowGroupSize
+        if not os.path.isdir(dirName):
+            os.makedirs(dirName)
+        self.fileHandle = open(os.path.join(dirName, STATEMENTS_FILE_NAME), 'wb')
+        self.tables = OrderedDict()
+
+    def __str__(self):
+        return "<OutputColumnar:%s>" % self.name
+
+    def acceptsValueRows(self):
+        return True
+
+    def startNewTable(self, tableName, schemaHintsNewTable):
+        '''
+        Adds the table's schema. Tables that get no rows are
+        still listed in the manifest, with their columns.
+        '''
+        self.addSchemaHints(tableName, schemaHintsNewTable)
+        if tableName not in self.tables:
+            self.addTable(tableName, None)
+
+    def writeValuesRow(self, tableName, valsArray, insertSig=None):
+        '''
+        Adds one row to the row group of its table, and writes the
+        row group once it is full. The table's columns are those of its
+        schema (see startNewTable()), or, for tables without a schema,
+        those of the row's insert signature.
+
+        :param tableName: table to which the row is destined
+        :type tableName: String
+        :param valsArray: the row's values
+        :type valsArray: [<any>]
+        :param insertSig: comma-separated names of the row's columns. Default:
+               the columns of the table's schema
+        :type insertSig: {String | None}
+        @raise ValueError: if the row has a column its table lacks
+        '''
+        table = self.tables.get(tableName, None)
+        if table is None:
+            table = self.addTable(tableName, insertSig)
+        table.append(valsArray, insertSig)
+        if table.numBufferedRows >= self.rowGroupSize:
+            self.writeRowGroup(table)
+
+    def writerow(self, colElementArray, tableName=None, csvRowsWritten=False):
+        '''
+        Takes the value arrays of parsers that do not generate INSERT
+        statements. Their columns are those of the schema of the given
+        table, the main table if None. INSERT statements are ignored;
+        their rows arrived via writeValuesRow().
+        '''
+        if isinstance(colElementArray, list):
+            self.writeValuesRow(tableName, colElementArray)
+
+    def addTable(self, tableName, insertSig):
+        try:
+            schema = self.schemas[tableName]
+        except KeyError:
+            schema = None
+        if schema:
+            colNames = schema.keys()
+            colDataTypes = [colSpec.colDataType for colSpec in schema.values()]
+        elif insertSig is not None:
+            colNames = insertSig.split(',')
+            colDataTypes = [None] * len(colNames)
+        else:
+            raise ValueError("No schema for table %s" % tableName)
+        table = ColumnarTable(tableName, colNames, colDataTypes)
+        self.tables[tableName] = table
+        return table
+
+    def writeRowGroup(self, table):
+        if table.numBufferedRows == 0:
+            return
+        numRows = table.numBufferedRows
+        rowGroup = table.takeRowGroup()
+        if self.fileFormat == 'npz':
+            self.writeNpzRowGroup(table, rowGroup, numRows)
+        else:
+            self.writeParquetRowGroup(table, rowGroup, numRows)
+
+    def writeNpzRowGroup(self, table, rowGroup, numRows):
+        '''
+        Writes one row group to an .npz file with these arrays for each
+        column col:
+            - int and float columns: col, the values, with 0 for nulls;
+              col.nulls, True for null values, only if there are any.
+            - text columns: col.offsets and col.data, see packStrings(),
+              and col.nulls as above; or, if dictionary encoded, col.codes,
+              the position of each value in the dictionary, -1 for nulls,
+              and col.dict.offsets and col.dict.data for the dictionary.
+        '''
+        arrays = {}
+        dictionaryColumns = []
+        for (colName, colKind, values) in zip(table.colNames, table.colKinds, rowGroup):
+            nulls = [val is None for val in values]
+            hasNulls = any(nulls)
+            if colKind == 'text':
+                distinctVals = set(values)
+                distinctVals.discard(None)
+                if len(distinctVals) <= DICTIONARY_MAX_DISTINCT_SHARE * numRows:
+                    dictionary = sorted(distinctVals)
+                    codeOfVal = dict([(val, code) for (code, val) in enumerate(dictionary)])
+                    codeOfVal[None] = -1
+                    arrays[colName + '.codes'] = numpy.array([codeOfVal[val] for val in values],
+                                                             dtype=smallestIntDtype(-1, len(dictionary)))
+                    (arrays[colName + '.dict.offsets'], arrays[colName + '.dict.data']) = packStrings(dictionary)
+                    dictionaryColumns.append(colName)
+                    continue
+                (arrays[colName + '.offsets'], arrays[colName + '.data']) = packStrings([val if val is not None else '' for val in values])
+            else:
+                zero = 0 if colKind == 'int' else 0.0
+                values = [val if val is not None else zero for val in values]
+                if colKind == 'int':
+                    arrays[colName] = numpy.array(values, dtype=smallestIntDtype(min(values), max(values)))
+                else:
+                    arrays[colName] = numpy.array(values, dtype=numpy.float64)
+            if hasNulls:
+                arrays[colName + '.nulls'] = numpy.array(nulls, dtype=bool)
+        fileName = '%s.%05d.npz' % (table.tableName, len(table.rowGroups))
+        numpy.savez(os.path.join(self.name, fileName), **arrays)
+        table.rowGroups.append({'file' : fileName, 'numRows' : numRows, 'dictionaryColumns' : dictionaryColumns})
+
+    def writeParquetRowGroup(self, table, rowGroup, numRows):
+        '''
+        Appends one row group to the table's parquet file. The parquet
+        writer dictionary encodes each column chunk, and falls back to plain
+        encoding for chunks whose dictionary grows too large.
+        '''
+        arrowTypes = {'int' : pyarrow.int64(), 'float' : pyarrow.float64(), 'text' : pyarrow.string()}
+        arrays = [pyarrow.array(values, type=arrowTypes[colKind]) for (colKind, values) in zip(table.colKinds, rowGroup)]
+        arrowTable = pyarrow.Table.from_arrays(arrays, names=table.colNames)
+        if table.parquetWriter is None:
+            fileName = '%s.parquet' % table.tableName
+            table.parquetWriter = pyarrow.parquet.ParquetWriter(os.path.join(self.name, fileName), arrowTable.schema, use_dictionary=True)
+            table.rowGroups.append({'file' : fileName, 'numRows' : 0})
+        if numRows > 0:
+            table.parquetWriter.write_table(arrowTable, row_group_size=numRows)
+            table.rowGroups[0]['numRows'] += numRows
+
+    def flush(self):
+        self.fileHandle.flush()
+
+    def close(self):
+        '''
+        Writes the last row group of each table, and the manifest.
+        '''
+        for table in self.tables.values():
+            self.writeRowGroup(table)
+            if self.fileFormat == 'parquet' and len(table.rowGroups) == 0:
+                # A file without rows, but with the table's columns:
+                self.writeParquetRowGroup(table, [[] for colName in table.colNames], 0) # @UnusedVariable
+            if table.parquetWriter is not None:
+                table.parquetWriter.close()
+                table.parquetWriter = None
+        manifest = OrderedDict()
+        manifest['format'] = self.fileFormat
+        manifest['rowGroupSize'] = self.rowGroupSize
+        manifest['tables'] = OrderedDict()
+        for table in self.tables.values():
+            tableInfo = OrderedDict()
+            tableInfo['numRows'] = table.numRows
+            tableInfo['columns'] = [OrderedDict([('name', colName), ('kind', colKind), ('sqlType', sqlType)])
+                                    for (colName, colKind, sqlType) in zip(table.colNames, table.colKinds, table.sqlTypes)]
+            tableInfo['rowGroups'] = table.rowGroups
+            manifest['tables'][table.tableName] = tableInfo
+        with open(os.path.join(self.name, MANIFEST_FILE_NAME), 'wb') as fd:
+            json.dump(manifest, fd, indent=2)
+        self.fileHandle.close()
+
+    def remove(self):
+        shutil.rmtree(self.name, ignore_errors=True)
+
+    def write(self, whatToWrite):
+        '''
+        Writes other SQL of the parser, such as CREATE TABLE, to
+        statements.sql
+        '''
+        self.fileHandle.write(whatToWrite)
+
+    def getFileName(self, tableName=None):
+        return self.name
+
+class ColumnarReader(object):
+    '''
+    Reads the tables that OutputColumnar wrote to a directory.
+    '''
+    def __init__(self, dirName):
+        self.dirName = dirName
+        with open(os.path.join(dirName, MANIFEST_FILE_NAME), 'rb') as fd:
+            self.manifest = json.load(fd, object_pairs_hook=OrderedDict)
+
+    def getTableNames(self):
+        return self.manifest['tables'].keys()
+
+    def getColNames(self, tableName):
+        return [colInfo['name'] for colInfo in self.manifest['tables'][tableName]['columns']]
+
+    def readTable(self, tableName, colNames=None):
+        '''
+        Reads the given columns of a table, all if colNames is None.
+        npz output is returned as an OrderedDict, column name --> numpy
+        array: int64 and float64 arrays for numeric columns, masked
+        where null, and object arrays of UTF-8 strings, or None for
+        null, for text columns. Parquet output is returned as a
+        pyarrow.Table.
+
+        :param tableName: name of the table
+        :type tableName: String
+        :param colNames: columns to read. Default: all
+        :type colNames: {[String] | None}
+        :rtype: {OrderedDict<String,numpy.ndarray> | pyarrow.Table}
+        '''
+        tableInfo = self.manifest['tables'][tableName]
+        if colNames is None:
+            colNames = self.getColNames(tableName)
+        if self.manifest['format'] == 'parquet':
+            if pyarrow is None:
+                raise ValueError("Reading parquet needs pyarrow, which is not installed.")
+            return pyarrow.parquet.read_table(os.path.join(self.dirName, tableInfo['rowGroups'][0]['file']), columns=colNames)
+        colKinds = dict([(colInfo['name'], colInfo['kind']) for colInfo in tableInfo['columns']])
+        groupColumns = OrderedDict([(colName, []) for colName in colNames])
+        for rowGroupInfo in tableInfo['rowGroups']:
+            rowGroup = numpy.load(os.path.join(self.dirName, rowGroupInfo['file']))
+            try:
+                for colName in colNames:
+                    groupColumns[colName].append(self.readColumn(rowGroup, colName, colKinds[colName],
+                                                                 colName in rowGroupInfo['dictionaryColumns']))
+            finally:
+                rowGroup.close()
+        columns = OrderedDict()
+        for (colName, groups) in groupColumns.items():
+            if colKinds[colName] == 'text':
+                columns[colName] = numpy.concatenate(groups) if len(groups) > 0 else numpy.empty(0, dtype=object)
+            else:
+                dtype = numpy.int64 if colKinds[colName] == 'int' else numpy.float64
+                columns[colName] = numpy.ma.concatenate(groups).astype(dtype) if len(groups) > 0 else numpy.ma.empty(0, dtype=dtype)
+        return columns
+
+    def readColumn(self, rowGroup, colName, colKind, isDictionary):
+        '''
+        Returns one column of an npz row group; see OutputColumnar.writeNpzRowGroup().
+        '''
+        if colKind == 'text':
+            if isDictionary:
+                # The extra None at the end is where code -1 points:
+                dictionary = numpy.append(unpackStrings(rowGroup[colName + '.dict.offsets'], rowGroup[colName + '.dict.data']), None)
+                return dictionary[rowGroup[colName + '.codes']]
+            values = unpackStrings(rowGroup[colName + '.offsets'], rowGroup[colName + '.data'])
+            if colName + '.nulls' in rowGroup.files:
+                values[rowGroup[colName + '.nulls']] = None
+            return values
+        values = rowGroup[colName]
+        if colName + '.nulls' in rowGroup.files:
+            return numpy.ma.masked_array(values, mask=rowGroup[colName + '.nulls'])
+        return numpy.ma.masked_array(values, mask=numpy.ma.nomask)
@@ -0,0 +1,107 @@
+'''
+Created on Oct 17, 2026
+
+Finds which of many course short names is embedded in a string,
+in a single pass over that string.
+'''
+
+class CourseNameMatcher(object):
+    '''
+    Aho-Corasick automaton over a list of course short names.
+    The names are given in order of preference: longestMatch()
+    returns the first name of that list that occurs anywhere in
+    the searched string, as a scan of the list with string.find()
+    would, but without a pass over the string for each name.
+
+    Each state of the automaton records the most preferred name
+    that ends at that state, including the names reached through
+    its failure links. A scan of the string therefore only keeps
+    the best name seen so far, and stops early once it is the
+    first name of the list.
+    '''
+
+    def __init__(self, courseNames):
+        '''
+        Builds the automaton.
+
+        :param courseNames: course short names, in order of preference,
+               most preferred first. EdXTrackLogJSONParser passes them
+               sorted by decreasing length.
+        :type courseNames: [String]
+        '''
+        self.courseNames = list(courseNames)
+        # Transitions of each state: {char : state}:
+        self.goto = [{}]
+        # Failure link of each state:
+        self.fail = [0]
+        # Index into self.courseNames of the most preferred name
+        # ending at each state; len(self.courseNames) for none:
+        noMatch = len(self.courseNames)
+        self.bestName = [noMatch]
+
+        for (rank, courseName) in enumerate(self.courseNames):
+            # An empty name ends at the root, and so is embedded in any string:
+            state = 0
+            for char in courseName:
+                nextState = self.goto[state].get(char, None)
+                if nextState is None:
+                    nextState = len(self.goto)
+                    self.goto[state][char] = nextState
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.bestName.append(noMatch)
+                state = nextState
+            self.bestName[state] = min(self.bestName[state], rank)
+
+        # Breadth-first computation of the failure links. The
+        # failure state of a state is shallower, so its bestName
+        # is final by the time it is merged in:
+        queue = self.goto[0].values()
+        for state in queue:
+            self.bestName[state] = min(self.bestName[state], self.bestName[0])
+        for state in queue:
+            for (char, nextState) in self.goto[state].iteritems():
+                failState = self.fail[state]
+                while failState and char not in self.goto[failState]:
+                    failState = self.fail[failState]
+                self.fail[nextState] = self.goto[failState].get(char, 0)
+                self.bestName[nextState] = min(self.bestName[nextState], self.bestName[self.fail[nextState]])
+                queue.append(nextState)
+
+        # Characters that occur in no name send the automaton
+        # back to its root:
+        self.alphabet = frozenset().union(*self.goto)
+
+    def __len__(self):
+        return len(self.courseNames)
+
+    def longestMatch(self, trackLogStr):
+        '''
+        Returns the most preferred course name embedded in trackLogStr,
+        which for names sorted by decreasing length is the longest one.
+
+        :param trackLogStr: string that hopefully contains a course short name
+        :type trackLogStr: String
+        :return: one of the course names, or None if none of them occurs in trackLogStr
+        :rtype: {String | None}
+        '''
+        goto = self.goto
+        fail = self.fail
+        bestName = self.bestName
+        alphabet = self.alphabet
+        best = bestName[0]
+        state = 0
+        for char in trackLogStr:
+            if char not in alphabet:
+                state = 0
+                continue
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if bestName[state] < best:
+                best = bestName[state]
+                if best == 0:
+                    break
+        if best == len(self.courseNames):
+            return None
+        return self.courseNames[best]
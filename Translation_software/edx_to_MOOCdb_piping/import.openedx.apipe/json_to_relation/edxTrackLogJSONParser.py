@@ -22,9 +22,10 @@ Modifications:
 '''
 
 from collections import OrderedDict
+import cPickle
 import datetime
 import hashlib
-import json
+import logging
 import os
 import re
 import string
@@ -37,10 +38,59 @@ from generic_json_parser import GenericJSONParser
 from locationManager import LocationManager
 from modulestoreImporter import ModulestoreImporter
 from output_disposition import ColumnSpec
-from ipToCountry import IpCountryDict
+from ipToCountry import IpCountryDict, MMDBCountryDict
+from jsonDecoder import JSONDecoder
 
 EDX_HEARTBEAT_PERIOD = 360 # seconds
 
+# Event handler registry, filled by the handlesEventTypes decorator:
+# maps event types to (handlerMethodName, returnsRow, withEventType)
+EVENT_HANDLERS = {}
+# List of (eventTypePrefix, handler) for event types not in EVENT_HANDLERS,
+# tried in order of registration:
+EVENT_HANDLER_PREFIXES = []
+# Names of the handler methods that do not look at the
+# nested event field, which is then not decoded for them:
+HANDLERS_WITHOUT_EVENT = set()
+# Bound on the number of distinct event types whose handler
+# resolution is memoized (path-styled event types are unbounded):
+MAX_RESOLVED_EVENT_TYPES = 10000
+# Bound on the number of screen names whose hash is memoized
+# by makeHash(); about 170 bytes per screen name:
+MAX_HASHED_SCREEN_NAMES = 200000
+
+def handlesEventTypes(*eventTypes, **options):
+    '''
+    Decorator registering an EdXTrackLogJSONParser method as the
+    handler of the given event types. Handlers are called with
+    (record, row, event), plus eventType if withEventType is True.
+
+    :param eventTypes: event types handled by the decorated method
+    :type eventTypes: String
+    :param prefixes: event type prefixes handled by the decorated method,
+           for event types that have no handler of their own
+    :type prefixes: [String]
+    :param returnsRow: if True, the handler's return value replaces the row
+           to push to the main table. Else the row passed in is pushed.
+           Default: True
+    :type returnsRow: Bool
+    :param withEventType: if True, the event type is passed to the handler. Default: False
+    :type withEventType: Bool
+    :param decodesEvent: if False, the handler ignores the event argument, and 
+           the nested event JSON string is passed to it undecoded. Default: True
+    :type decodesEvent: Bool
+    '''
+    def register(method):
+        handler = (method.__name__, options.get('returnsRow', True), options.get('withEventType', False))
+        if not options.get('decodesEvent', True):
+            HANDLERS_WITHOUT_EVENT.add(method.__name__)
+        for eventType in eventTypes:
+            EVENT_HANDLERS[eventType] = handler
+        for prefix in options.get('prefixes', []):
+            EVENT_HANDLER_PREFIXES.append((prefix, handler))
+        return method
+    return register
+
 class EdXTrackLogJSONParser(GenericJSONParser):
     '''
     Parser specialized for EdX track logs.
@@ -130,6 +180,21 @@ class EdXTrackLogJSONParser(GenericJSONParser):
     #   input_i4x-Medicine-HRP258-problem-98ca37dbf24849debcc29eb36811cb68_3_1_choice_3'
     findHashPattern = re.compile(r'([a-f0-9]{32})')
     
+    # Memo of getEventHandler(), shared by all instances:
+    resolvedEventTypes = {}
+    
+    # Memo of makeHash(), shared by all instances: screen name --> hash,
+    # with its hit and miss counts since the last resetHashCache():
+    screenNameHashes = {}
+    hashCacheHits = 0
+    hashCacheMisses = 0
+    # In a worker process of JSONToRelation.convertInBatches():
+    # the hashes makeHash() computed in the current batch:
+    newScreenNameHashes = None
+    
+    supportsBatchConvert = True
+    acceptsDicts = True
+    
     def __init__(self, 
                  jsonToRelationConverter, 
                  mainTableName, 
@@ -137,7 +202,10 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                  progressEvery=1000, 
                  replaceTables=False, 
                  dbName='test', 
-                 useDisplayNameCache=False):
+                 useDisplayNameCache=False,
+                 screenNameHashDir=None,
+                 ipCountryBackend='index',
+                 jsonDecoder=None):
         '''
         Constructor
 
@@ -161,6 +229,20 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                     that contains the needed information from modulestore. See
                     modulestoreImporter.py for details. 
         :type useDisplayNameCache: Bool      
+        :param screenNameHashDir: if not None, directory of a side file that keeps
+                    the screen name hashes of makeHash() across runs. The hashes
+                    are loaded here, and saved again by finish(). The side file maps
+                    screen names to their hashes, and must be kept as private as the
+                    screen names themselves. See saveHashCache().
+        :type screenNameHashDir: {String | None}
+        :param ipCountryBackend: 'index' to look up the countries of IP addresses in
+                    the compiled range table of IpCountryDict, or 'mmdb' to look them
+                    up directly in the GeoLite2 database with MMDBCountryDict.
+        :type ipCountryBackend: String
+        :param jsonDecoder: name of the module that decodes the JSON of the log
+                    lines: 'ujson', 'json', or 'simplejson'. Default: the fastest
+                    one installed. See JSONDecoder.
+        :type jsonDecoder: {String | None}
         '''
         super(EdXTrackLogJSONParser, self).__init__(jsonToRelationConverter, 
                                                     logfileID=logfileID, 
@@ -169,6 +251,15 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         
         self.mainTableName = mainTableName
         self.dbName = dbName
+        self.jsonDecoder = JSONDecoder(jsonDecoder)
+        
+        # Keys from getUniqueID() are random, unless
+        # setUniqueIDSeed() is called:
+        self.setUniqueIDSeed(None)
+        
+        self.screenNameHashDir = screenNameHashDir
+        if screenNameHashDir is not None:
+            EdXTrackLogJSONParser.loadHashCache(screenNameHashDir)
         
         self.setupMySqlDumpControlInstructions()
                 
@@ -193,7 +284,10 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.countryChecker = LocationManager()
         
         # An ip-country lookup facility:
-        self.ipCountryDict = IpCountryDict()
+        if ipCountryBackend == 'mmdb':
+            self.ipCountryDict = MMDBCountryDict()
+        else:
+            self.ipCountryDict = IpCountryDict()
     
         # Lookup table from OpenEdx 32-bit hash values to
         # corresponding problem, course, or video display_names.
@@ -203,12 +297,13 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.hashMapper = ModulestoreImporter(os.path.join(os.path.dirname(__file__),'data/modulestore_latest.json'), 
                                               useCache=useDisplayNameCache, 
                                               parent=self)
-        # Make a list of all short course names 
-        # sorted by length in decreasing order. 
-        # This list is used by extractCanonicalCourseName()
+        # Automaton over all short course names, longest
+        # first. It is used by extractCanonicalCourseName()
         # to pull the most likely course name from a nasty
-        # string that has a course name embedded:
-        self.courseNamesSorted = sorted(self.hashMapper.keys(), key=len, reverse=True)
+        # string that has a course name embedded. The
+        # hashMapper only rebuilds it when its course names change:
+        self.courseNameMatcher = self.hashMapper.getCourseNameMatcher()
+        self.courseNamesSorted = self.courseNameMatcher.courseNames
                 
         self.schemaHintsMainTable = OrderedDict()
 
@@ -451,6 +546,10 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         # activity timestamp (heartbeat or any other event).
         # Used to detect server downtimes: 
         self.downtimes = {}
+        # In a worker process of JSONToRelation.convertInBatches():
+        # (ip, eventDateTime, event_id, isHeartbeat) of the first event of
+        # each IP in the current batch. See mergeBatch():
+        self.firstSignsOfLife = None
                 
         # Place to keep history for some rows, for which we want
         # to computer some on-the-fly aggregations:
@@ -534,11 +633,11 @@ class EdXTrackLogJSONParser(GenericJSONParser):
     def processOneJSONObject(self, jsonStr, row):
         '''
         This method is the main dispatch for track log event_types.
-        It's a long method, and should be partitioned. First, bookkeeping
-        fields are filled in that are common to all events, such as the 
-        user agent, and the reference into the LoadInfo table that shows
-        on which date this row was loaded. Then a long 'case' statement
-        calls handler methods depending on the incoming track log's event_type.  
+        First, bookkeeping fields are filled in that are common to all 
+        events, such as the user agent, and the reference into the LoadInfo table that shows
+        on which date this row was loaded. Then the handler method
+        registered for the incoming track log's event_type is called
+        (see handlesEventTypes() and getEventHandler()).
         
         Given one line from the EdX Track log, produce one row
         of relational output. Return is an array of values, the 
@@ -596,8 +695,9 @@ class EdXTrackLogJSONParser(GenericJSONParser):
              "page": "https://class.stanford.edu/courses/Medicine/HRP258/Statistics_in_Medicine/courseware/495757ee7b25401599b1ef0495b068e4/6fd116e15ab9436fa70b8c22474b3c17/"
              }
                 
-        :param jsonStr: string of a single, self contained JSON object
-        :type jsonStr: String
+        :param jsonStr: string of a single, self contained JSON object, or
+               the object already decoded into a dict
+        :type jsonStr: {String | Dict<String,<any>>}
         :param row: partially filled array of values. Passed by reference
         :type row: List<<any>>
         :return: the filled-in row
@@ -608,20 +708,27 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.errorOccurred = False
         self.jsonToRelationConverter.bumpLineCounter()
         try:
-            # Turn top level JSON object to dict:
-            try:
-                record = json.loads(str(jsonStr))
-            except ValueError as e:
-                # Try it again after cleaning up the JSON
-                # We don't do the cleanup routinely to save
-                # time.
+            # Turn top level JSON object to dict, unless
+            # the input source already did:
+            if isinstance(jsonStr, dict):
+                record = jsonStr
+            else:
                 try:
-                    cleanJsonStr = self.makeJSONSafe(jsonStr)
-                    record = json.loads(cleanJsonStr)
+                    record = self.jsonDecoder.loads(str(jsonStr))
                 except ValueError as e:
-                    # Pull out what we can, and place in 'badly_formatted' column
-                    self.rescueBadJSON(jsonStr, row=row)                
-                    raise ValueError('Ill formed JSON: %s' % `e`)
+                    # Try it again after cleaning up the JSON
+                    # We don't do the cleanup routinely to save
+                    # time. The cleanup only touches backslashes,
+                    # so without any it cannot help:
+                    try:
+                        if isinstance(jsonStr, str) and jsonStr.find('\\') == -1:
+                            raise e
+                        cleanJsonStr = self.makeJSONSafe(jsonStr)
+                        record = self.jsonDecoder.loads(cleanJsonStr)
+                    except ValueError as e:
+                        # Pull out what we can, and place in 'badly_formatted' column
+                        self.rescueBadJSON(jsonStr, row=row)                
+                        raise ValueError('Ill formed JSON: %s' % `e`)
     
             # Apply formatting specific to MIT logs
             mitLogsAdapter.format_timestamp(record)
@@ -675,24 +782,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             except ValueError:
                 raise ValueError("Bad event time format: '%s'" % eventTimeStr)
             
-            try:
-                doRecordHeartbeat = False
-                recentSignOfLife = self.downtimes[ip]
-                # Get a timedelta obj w/ duration of time
-                # during which nothing was heard from server:
-                serverQuietTime = eventDateTime - recentSignOfLife
-                if serverQuietTime.seconds > EDX_HEARTBEAT_PERIOD:
-                    self.setValInRow(row, 'downtime_for', str(serverQuietTime))
-                    doRecordHeartbeat = True
-                # New recently-heard from this IP:
-                self.downtimes[ip] = eventDateTime
-            except KeyError:
-                # First sign of life for this IP:
-                self.downtimes[ip] = eventDateTime
-                # Record a time of 0 in downtime detection column:
-                self.setValInRow(row, 'downtime_for', str(datetime.timedelta()))
-                doRecordHeartbeat = True
-                
+            doRecordHeartbeat = self.checkDowntime(ip, eventDateTime, row, eventType == '/heartbeat')
             
             if eventType == '/heartbeat':
                 # Handled heartbeat above, we don't transfer the heartbeats
@@ -716,244 +806,33 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             # at the event field, which is an embedded JSON *string*
             # Turn that string into a (nested) Python dict. Though
             # *sometimes* the event *is* a dict, not a string, as in
-            # problem_check_fail:
+            # problem_check_fail. Only handlers that look at the
+            # event get it decoded:
             try:
                 eventJSONStrOrDict = record['event']
             except KeyError:
                 raise ValueError("Event of type %s has no event field" % eventType)
             
-            try:
-                event = json.loads(eventJSONStrOrDict)
-            except TypeError:
-                # Was already a dict
-                event = eventJSONStrOrDict
-            except Exception as e:
-                # Try it again after cleaning up the JSON
-                # We don't do the cleanup routinely to save
-                # time.
-                try:
-                    cleanJSONStr = self.makeJSONSafe(eventJSONStrOrDict)
-                    event = json.loads(cleanJSONStr)
-                except ValueError:
-                    # Last ditch: event types like goto_seq, need backslashes removed:
-                    event = json.loads(re.sub(r'\\','',eventJSONStrOrDict))
-                except Exception as e1:                
-                    row = self.rescueBadJSON(str(record), row=row)
-                    raise ValueError('Bad JSON; saved in col badlyFormatted: event_type %s (%s)' % (eventType, `e1`))
-                    return
-
-            if eventType == 'seq_goto' or\
-               eventType == 'seq_next' or\
-               eventType == 'seq_prev':
-            
-                row = self.handleSeqNav(record, row, event, eventType)
-                return
-            
-            elif eventType == '/accounts/login':
-                # Already recorded everything needed in common-fields
-                return
-            
-            elif eventType == '/login_ajax':
-                row = self.handleAjaxLogin(record, row, event, eventType)
-                return
-            
-            elif eventType == 'problem_check' or\
-                 eventType == 'save_problem_check':
-                # Note: some problem_check cases are also handled in handleAjaxLogin()
-                row = self.handleProblemCheck(record, row, event)
-                return
-             
-            elif eventType == 'problem_reset':
-                row = self.handleProblemReset(record, row, event)
-                return
-            
-            elif eventType == 'problem_show':
-                row = self.handleProblemShow(record, row, event)
-                return
-            
-            elif eventType == 'problem_save':
-                row = self.handleProblemSave(record, row, event)
-                return
-            
-            elif eventType == 'oe_hide_question' or\
-                 eventType == 'oe_hide_problem' or\
-                 eventType == 'peer_grading_hide_question' or\
-                 eventType == 'peer_grading_hide_problem' or\
-                 eventType == 'staff_grading_hide_question' or\
-                 eventType == 'staff_grading_hide_problem' or\
-                 eventType == 'oe_show_question' or\
-                 eventType == 'oe_show_problem' or\
-                 eventType == 'peer_grading_show_question' or\
-                 eventType == 'peer_grading_show_problem' or\
-                 eventType == 'staff_grading_show_question' or\
-                 eventType == 'staff_grading_show_problem':
-                 
-                row = self.handleQuestionProblemHidingShowing(record, row, event)
-                return
-    
-            elif eventType == 'rubric_select':
-                row = self.handleRubricSelect(record, row, event)
-                return
-            
-            elif eventType == 'oe_show_full_feedback' or\
-                 eventType == 'oe_show_respond_to_feedback':
-                row = self.handleOEShowFeedback(record, row, event)
-                return
-                
-            elif eventType == 'oe_feedback_response_selected':
-                row = self.handleOEFeedbackResponseSelected(record, row, event)
-                return
-            
-            elif eventType == 'show_transcript' or eventType == 'hide_transcript':
-                row = self.handleShowHideTranscript(record, row, event)
-                return
-            
-            elif eventType == 'play_video' or\
-                 eventType == 'pause_video' or\
-                 eventType == 'stop_video' or\
-                 eventType == 'video_player_ready' or\
-                 eventType == 'load_video':
-                row = self.handleVideoPlayPause(record, row, event)
-                return
-
-            elif eventType == 'seek_video':
-                row = self.handleVideoSeek(record, row, event)
-                return
-                
-            elif eventType == 'speed_change_video':
-                row = self.handleVideoSpeedChange(record, row, event)
-                return
-                
-            elif eventType == 'fullscreen':
-                row = self.handleFullscreen(record, row, event)
-                return
-                
-            elif eventType == 'not_fullscreen':
-                row = self.handleNotFullscreen(record, row, event)
-                return
-                
-            elif eventType == '/dashboard':
-                # Nothing additional to grab:
-                return
-                
-            elif eventType == 'book':
-                row = self.handleBook(record, row, event)
-                return
-    
-            elif eventType == 'showanswer' or eventType == 'show_answer':
-                row = self.handleShowAnswer(record, row, event)
-                return
-    
-            elif eventType == 'problem_check_fail' or\
-                 eventType == 'save_problem_check_fail':
-                self.handleProblemCheckFail(record, row, event)
-                return
-            
-            elif eventType == 'problem_rescore_fail':
-                row = self.handleProblemRescoreFail(record, row, event)
-                return
-            
-            elif eventType == 'problem_rescore':
-                row = self.handleProblemRescore(record, row, event)
-                return
-            
-            elif eventType == 'save_problem_fail' or\
-                 eventType == 'save_problem_success' or\
-                 eventType == 'reset_problem_fail':
-                row = self.handleSaveProblemFailSuccessCheckOrReset(record, row, event)
-                return
-                # Removed the case eventType == 'save_problem_check' 
-                # save_problem_check should be treated as
-                # problem_check in early log versions.
-                
-            elif eventType == 'reset_problem':
-                row = self.handleResetProblem(record, row, event)
-                return
-            
-            # Instructor events:
-            elif eventType in ['list-students',  'dump-grades',  'dump-grades-raw',  'dump-grades-csv',
-                               'dump-grades-csv-raw', 'dump-answer-dist-csv', 'dump-graded-assignments-config',
-                               'list-staff',  'list-instructors',  'list-beta-testers'
-                               ]:
-                # These events have no additional info. The event_type says it all,
-                # and that's already been stuck into the table:
-                return
-              
-            elif eventType == 'rescore-all-submissions' or eventType == 'reset-all-attempts':
-                self.handleRescoreReset(record, row, event)
-                return
-                
-            elif eventType == 'delete-student-module-state' or eventType == 'rescore-student-submission':
-                self.handleDeleteStateRescoreSubmission(record, row, event)
-                return
-                
-            elif eventType == 'reset-student-attempts':
-                self.handleResetStudentAttempts(record, row, event)
-                return
-                
-            elif eventType == 'get-student-progress-page':
-                self.handleGetStudentProgressPage(record, row, event)
-                return
-    
-            elif eventType == 'add-instructor' or eventType == 'remove-instructor':        
-                self.handleAddRemoveInstructor(record, row, event)
-                return
-            
-            elif eventType in ['list-forum-admins', 'list-forum-mods', 'list-forum-community-TAs']:
-                self.handleListForumMatters(record, row, event)
-                return
-    
-            elif eventType in ['remove-forum-admin', 'add-forum-admin', 'remove-forum-mod',
-                               'add-forum-mod', 'remove-forum-community-TA',  'add-forum-community-TA']:
-                self.handleForumManipulations(record, row, event)
-                return
-    
-            elif eventType == 'psychometrics-histogram-generation':
-                self.handlePsychometricsHistogramGen(record, row, event)
-                return
-            
-            elif eventType == 'add-or-remove-user-group':
-                self.handleAddRemoveUserGroup(record, row, event)
-                return
-            
-            elif eventType == '/create_account':
-                self.handleCreateAccount(record, row, event)
-                return
-            
-            elif eventType == 'problem_graded':
-                # Need to look at return, b/c this
-                # method handles all its own pushing:
-                row = self.handleProblemGraded(record, row, event)
-                return
-
-            elif eventType == 'change-email-settings':
-                self.handleReceiveEmail(record, row, event)
-                return
-                
-            # A/B Test Events:
-            elif eventType == 'assigned_user_to_partition' or eventType == 'child_render':
-                self.handleABExperimentEvent(record, row, event)
-                return
-            
-            elif eventType == 'edx.course.enrollment.activated' or eventType == 'edx.course.enrollment.deactivated':
-                self.handleCourseEnrollActivatedDeactivated(record, row, event) 
-                return
-            
-            # Forum events:
-            elif eventType == 'edx.forum.searched':
-                self.handleForumEvent(record, row, event)
-                return
-            
-            # Event type values that start with slash:
-            elif eventType[0] == '/':
-                row = self.handlePathStyledEventTypes(record, row, event)
-                return
-            
-            else:
+            handler = self.getEventHandler(eventType)
+            if handler is None:
                 # Filter events
                 # if eventType not in ['harvardx.video_embedded_problems']:
                 self.logWarn("Unknown event type '%s' in tracklog row %s" % (eventType, self.jsonToRelationConverter.makeFileCitation()))
                 return
+
+            (handlerName, returnsRow, withEventType) = handler
+            if handlerName in HANDLERS_WITHOUT_EVENT:
+                event = eventJSONStrOrDict
+            else:
+                event = self.decodeEvent(eventJSONStrOrDict, record, row, eventType)
+
+            if withEventType:
+                result = getattr(self, handlerName)(record, row, event, eventType)
+            else:
+                result = getattr(self, handlerName)(record, row, event)
+            if returnsRow:
+                row = result
+            return
         except Exception as e:
             # Note whether any error occurred, so that
             # the finally clause can act accordingly:
@@ -971,6 +850,47 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             # call to this method:
             self.getReadyForNextRow()
         
+    @classmethod
+    def getEventHandler(cls, eventType):
+        '''
+        Returns the handler registered for an event type through the
+        handlesEventTypes decorator, as a (handlerMethodName, returnsRow, withEventType)
+        triplet. Event types without a handler of their own are matched
+        against the registered prefixes once, and the result is memoized.
+
+        :param eventType: event type of a tracking log event
+        :type eventType: String
+        :return: handler triplet, or None if the event type is unknown
+        :rtype: {(String, Bool, Bool) | None}
+        '''
+        try:
+            return cls.resolvedEventTypes[eventType]
+        except KeyError:
+            pass
+        handler = EVENT_HANDLERS.get(eventType, None)
+        if handler is None:
+            for (prefix, prefixHandler) in EVENT_HANDLER_PREFIXES:
+                if eventType.startswith(prefix):
+                    handler = prefixHandler
+                    break
+        if len(cls.resolvedEventTypes) >= MAX_RESOLVED_EVENT_TYPES:
+            cls.resolvedEventTypes.clear()
+        cls.resolvedEventTypes[eventType] = handler
+        return handler
+
+    @handlesEventTypes('/accounts/login', '/dashboard',
+                       # Instructor events:
+                       'list-students',  'dump-grades',  'dump-grades-raw',  'dump-grades-csv',
+                       'dump-grades-csv-raw', 'dump-answer-dist-csv', 'dump-graded-assignments-config',
+                       'list-staff',  'list-instructors',  'list-beta-testers',
+                       returnsRow=False, decodesEvent=False)
+    def handleNoAdditionalInfo(self, record, row, event):
+        '''
+        Events with no additional info. The event_type says it all,
+        and that's already been stuck into the table with the common fields.
+        '''
+        pass
+
     def resultTriplet(self, row, targetTableName, colNamesToSet=None):
         '''
         Given an array of column names, and an array of column values,
@@ -1373,6 +1293,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'load_info_fk', self.currLoadInfoFK)
         return row
 
+    @handlesEventTypes('seq_goto', 'seq_next', 'seq_prev', withEventType=True)
     def handleSeqNav(self, record, row, event, eventType):
         '''
         Video navigation. Events look like this::
@@ -1424,6 +1345,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setResourceDisplayName(row, seqID)
         return row
         
+    @handlesEventTypes('problem_check', 'save_problem_check')
     def handleProblemCheck(self, record, row, event):
         '''
         The problem_check event comes in two flavors (assertained by observation):
@@ -1998,6 +1920,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.jsonToRelationConverter.pushToTable(self.resultTriplet(loadDict.values(), 'LoadInfo', self.schemaLoadInfoTbl.keys()))
         return loadDict['load_info_id']
     
+    @handlesEventTypes('problem_reset')
     def handleProblemReset(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2058,6 +1981,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         
         return row
 
+    @handlesEventTypes('problem_show')
     def handleProblemShow(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2102,6 +2026,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setResourceDisplayName(row, problemID)
         return row
 
+    @handlesEventTypes('problem_save')
     def handleProblemSave(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2173,6 +2098,9 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return []
 
 
+    @handlesEventTypes('oe_hide_question', 'oe_hide_problem', 'peer_grading_hide_question', 'peer_grading_hide_problem',
+                       'staff_grading_hide_question', 'staff_grading_hide_problem', 'oe_show_question', 'oe_show_problem',
+                       'peer_grading_show_question', 'peer_grading_show_problem', 'staff_grading_show_question', 'staff_grading_show_problem')
     def handleQuestionProblemHidingShowing(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2209,6 +2137,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return row
         
         
+    @handlesEventTypes('rubric_select')
     def handleRubricSelect(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2243,6 +2172,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'rubric_category', category)
         return row
 
+    @handlesEventTypes('oe_show_full_feedback', 'oe_show_respond_to_feedback')
     def handleOEShowFeedback(self, record, row, event):
         '''
         All examples seen as of this writing had this field empty: "{}"
@@ -2250,6 +2180,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         # Just stringify the dict and make it the field content:
         self.setValInRow(row, 'feedback', str(event))
         
+    @handlesEventTypes('oe_feedback_response_selected')
     def handleOEFeedbackResponseSelected(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2281,6 +2212,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             return row
         self.setValInRow(row, 'feedback_response_selected', value)
 
+    @handlesEventTypes('play_video', 'pause_video', 'stop_video', 'video_player_ready', 'load_video')
     def handleVideoPlayPause(self, record, row, event):
         '''
         For play_video, event looks like this::
@@ -2319,6 +2251,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'video_speed', str(videoSpeed))
         return row
 
+    @handlesEventTypes('seek_video')
     def handleVideoSeek(self, record, row, event):
         '''
         For play_video, event looks like this::
@@ -2355,6 +2288,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'video_seek_type', videoSeekType)
         return row
 
+    @handlesEventTypes('speed_change_video')
     def handleVideoSpeedChange(self, record, row, event):
         '''
         Events look like this::
@@ -2393,6 +2327,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return row
 
 
+    @handlesEventTypes('fullscreen')
     def handleFullscreen(self, record, row, event):
         '''
         Events look like this::
@@ -2427,6 +2362,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'video_current_time', videoCurrentTime)
         return row
         
+    @handlesEventTypes('not_fullscreen')
     def handleNotFullscreen(self, record, row, event):
         '''
         Events look like this::
@@ -2461,6 +2397,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'video_current_time', videoCurrentTime)
         return row
     
+    @handlesEventTypes('book')
     def handleBook(self, record, row, event):
         '''
         No example of book available
@@ -2488,6 +2425,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             self.setValInRow(row, 'goto_dest', bookNew)
         return row
         
+    @handlesEventTypes('showanswer', 'show_answer')
     def handleShowAnswer(self, record, row, event):
         '''
         Gets a event string like this::
@@ -2520,6 +2458,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
 
         return row
 
+    @handlesEventTypes('show_transcript', 'hide_transcript')
     def handleShowHideTranscript(self, record, row, event):
         '''
         Events look like this::
@@ -2555,6 +2494,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return row
         
 
+    @handlesEventTypes('problem_check_fail', 'save_problem_check_fail', returnsRow=False)
     def handleProblemCheckFail(self, record, row, event):
         '''
         Gets events like this::
@@ -2677,6 +2617,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             indexToFKeys += 1
         return row
 
+    @handlesEventTypes('problem_rescore_fail')
     def handleProblemRescoreFail(self, record, row, event):
         '''
         No example available. Records reportedly include:
@@ -2719,6 +2660,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             self.setValInRow(row, '_id', self.getUniqueID())
         return []
 
+    @handlesEventTypes('problem_rescore')
     def handleProblemRescore(self, record, row, event):
         '''
         No example available
@@ -2783,6 +2725,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             self.setValInRow(row, '_id', self.getUniqueID())
         return []
          
+    @handlesEventTypes('save_problem_fail', 'save_problem_success', 'reset_problem_fail')
     def handleSaveProblemFailSuccessCheckOrReset(self, record, row, event):
         '''
         Do have examples. event has fields state, problem_id, failure, and answers.
@@ -2877,6 +2820,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             indexToFKeys += 1
         return []
         
+    @handlesEventTypes('reset_problem')
     def handleResetProblem(self, record, row, event):
         '''
         Events look like this::
@@ -2936,6 +2880,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             self.setValInRow(row, '_id', self.getUniqueID())
         return []
 
+    @handlesEventTypes('rescore-all-submissions', 'reset-all-attempts', returnsRow=False)
     def handleRescoreReset(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in rescore-all-submissions or reset-all-attempts." %\
@@ -2967,6 +2912,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return row
                 
                 
+    @handlesEventTypes('delete-student-module-state', 'rescore-student-submission', returnsRow=False)
     def handleDeleteStateRescoreSubmission(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in delete-student-module-state or rescore-student-submission." %\
@@ -3002,6 +2948,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'student_id', studentID)
         return row        
         
+    @handlesEventTypes('reset-student-attempts', returnsRow=False)
     def handleResetStudentAttempts(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in reset-student-attempts." %\
@@ -3041,6 +2988,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'attempts', attempts)
         return row
         
+    @handlesEventTypes('get-student-progress-page', returnsRow=False)
     def handleGetStudentProgressPage(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in get-student-progress-page." %\
@@ -3067,6 +3015,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'instructor_id', instructorID)
         return row        
 
+    @handlesEventTypes('add-instructor', 'remove-instructor', returnsRow=False)
     def handleAddRemoveInstructor(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in add-instructor or remove-instructor." %\
@@ -3087,6 +3036,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'instructor_id', instructorID)
         return row
         
+    @handlesEventTypes('list-forum-admins', 'list-forum-mods', 'list-forum-community-TAs', returnsRow=False)
     def handleListForumMatters(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in list-forum-admins, list-forum-mods, or list-forum-community-TAs." %\
@@ -3101,6 +3051,8 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         
         return row
         
+    @handlesEventTypes('remove-forum-admin', 'add-forum-admin', 'remove-forum-mod',
+                       'add-forum-mod', 'remove-forum-community-TA',  'add-forum-community-TA', returnsRow=False)
     def handleForumManipulations(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in one of remove-forum-admin, add-forum-admin, " +\
@@ -3124,6 +3076,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'screen_name', self.hashGeneral(screen_name))        
         return row        
 
+    @handlesEventTypes('psychometrics-histogram-generation', returnsRow=False)
     def handlePsychometricsHistogramGen(self, record, row, event):
         if event is None:
             self.logWarn("Track log line %s: missing event info in psychometrics-histogram-generation." %\
@@ -3149,6 +3102,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                 
         return row
     
+    @handlesEventTypes('add-or-remove-user-group', returnsRow=False)
     def handleAddRemoveUserGroup(self, record, row, event):
         '''
         This event looks like this::
@@ -3198,6 +3152,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.setValInRow(row, 'group_action', event)
         return row        
     
+    @handlesEventTypes('/create_account', returnsRow=False)
     def handleCreateAccount(self, record, row, event):
         '''
         Get event structure like this (fictitious values)::
@@ -3320,6 +3275,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                 
         return row
 
+    @handlesEventTypes('edx.course.enrollment.activated', 'edx.course.enrollment.deactivated', returnsRow=False)
     def handleCourseEnrollActivatedDeactivated(self, record, row, event):
         '''
         Handles events edx_course_enrollment_activated, and edx_course_enrollment_deactivated.
@@ -3366,6 +3322,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
             self.setValInRow(row, 'mode', pathToUiButton)
         return row
 
+    @handlesEventTypes('problem_graded')
     def handleProblemGraded(self, record, row, event):
         '''
         Events look like this::
@@ -3436,6 +3393,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         # Return empty row, b/c we already pushed all necessary rows:
         return []
 
+    @handlesEventTypes('change-email-settings', returnsRow=False)
     def handleReceiveEmail(self, record, row, event):
         '''
         Event is something like this::
@@ -3498,6 +3456,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         return row
         
         
+    @handlesEventTypes('assigned_user_to_partition', 'child_render', returnsRow=False)
     def handleABExperimentEvent(self, record, row, event):
         
         if event is None:
@@ -3534,6 +3493,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         self.pushABExperimentInfo(abExpDict)
         return row
 
+    @handlesEventTypes(prefixes=['/'])
     def handlePathStyledEventTypes(self, record, row, event):
         '''
         Called when an event type is a long path-like string.
@@ -3616,6 +3576,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         else:
             return row
         
+    @handlesEventTypes('edx.forum.searched', returnsRow=False)
     def handleForumEvent(self, record, row, event):
 
         eventDict = self.ensureDict(event) 
@@ -3835,6 +3796,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                 self.setValInRow(row, '_id', self.getUniqueID())
         return []
 
+    @handlesEventTypes('/login_ajax', withEventType=True)
     def handleAjaxLogin(self, record, row, event, eventType):
         '''
         Events look like this::
@@ -3912,6 +3874,11 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         
         # Restore various defaults:
         self.jsonToRelationConverter.pushString(self.dumpPostscript2)
+        
+        hashCacheStats = EdXTrackLogJSONParser.getHashCacheStats()
+        self.logInfo("Screen name hashes: %d memoized, hit rate %.3f" % (hashCacheStats['size'], hashCacheStats['hitRate']))
+        if self.screenNameHashDir is not None:
+            EdXTrackLogJSONParser.saveHashCache(self.screenNameHashDir)
 
     def createCSVTableLoadCommands(self, outputDisposition):
         '''
@@ -4036,7 +4003,7 @@ class EdXTrackLogJSONParser(GenericJSONParser):
                 return('','','')
             if eventType == u'/accounts/login':
                 try:
-                    post = json.loads(str(event.get('event', None)))
+                    post = self.jsonDecoder.loads(str(event.get('event', None)))
                 except:
                     return('','','')
                 if post is not None:
@@ -4265,12 +4232,237 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         except:
             return None
         
+    def decodeEvent(self, eventJSONStrOrDict, record, row, eventType):
+        '''
+        Turns the nested event field of a record into a Python 
+        structure. Ill formed JSON is cleaned up and decoded 
+        again, but only if it has backslashes, which is all that
+        the cleanup changes. What is still ill formed is rescued
+        into the badly_formatted column of the row.
+
+        :param eventJSONStrOrDict: the event field of the record
+        :type eventJSONStrOrDict: {String | Dict}
+        :param record: the whole tracking log record
+        :type record: Dict
+        :param row: main table row of the event
+        :type row: [<any>]
+        :param eventType: event type of the record
+        :type eventType: String
+        :return: the decoded event, or the field itself if it is not a string
+        :rtype: <any>
+        @raise ValueError: if the event field is ill formed JSON
+        '''
+        if not isinstance(eventJSONStrOrDict, basestring):
+            # Was already a dict
+            return eventJSONStrOrDict
+        try:
+            return self.jsonDecoder.loads(eventJSONStrOrDict)
+        except Exception as e:
+            if eventJSONStrOrDict.find('\\') == -1:
+                # Neither fix below changes the string:
+                raise
+            # Try it again after cleaning up the JSON
+            # We don't do the cleanup routinely to save
+            # time.
+            try:
+                cleanJSONStr = self.makeJSONSafe(eventJSONStrOrDict)
+                return self.jsonDecoder.loads(cleanJSONStr)
+            except ValueError:
+                # Last ditch: event types like goto_seq, need backslashes removed:
+                return self.jsonDecoder.loads(eventJSONStrOrDict.replace('\\', ''))
+            except Exception as e1:                
+                self.rescueBadJSON(str(record), row=row)
+                raise ValueError('Bad JSON; saved in col badlyFormatted: event_type %s (%s)' % (eventType, `e1`))
+
+    def checkDowntime(self, ip, eventDateTime, row, isHeartbeat):
+        '''
+        Records the time of an event from the given server IP, and fills
+        the downtime_for column of the row if nothing was heard from that 
+        server for longer than EDX_HEARTBEAT_PERIOD.
+
+        :param ip: server IP of the event
+        :type ip: String
+        :param eventDateTime: time of the event
+        :type eventDateTime: datetime.datetime
+        :param row: main table row of the event
+        :type row: [<any>]
+        :param isHeartbeat: whether the event is a heartbeat
+        :type isHeartbeat: Boolean
+        :return: whether a heartbeat event is to be recorded: True if it
+                 reveals a downtime, or is the first sign of life of the server.
+        :rtype: Boolean
+        '''
+        try:
+            recentSignOfLife = self.downtimes[ip]
+        except KeyError:
+            # First sign of life for this IP:
+            self.downtimes[ip] = eventDateTime
+            # Record a time of 0 in downtime detection column:
+            self.setValInRow(row, 'downtime_for', str(datetime.timedelta()))
+            if self.firstSignsOfLife is not None:
+                # Maybe only the first in this batch; mergeBatch() settles it:
+                eventID = row[self.jsonToRelationConverter.getSchemaHint('event_id', self.mainTableName).colPos]
+                self.firstSignsOfLife.append((ip, eventDateTime, eventID, isHeartbeat))
+            return True
+        # New recently-heard from this IP:
+        self.downtimes[ip] = eventDateTime
+        downtimeFor = self.getDowntimeStr(recentSignOfLife, eventDateTime)
+        if downtimeFor is None:
+            return False
+        self.setValInRow(row, 'downtime_for', downtimeFor)
+        return True
+
+    @staticmethod
+    def getDowntimeStr(recentSignOfLife, eventDateTime):
+        '''
+        Returns the time during which nothing was heard from a server 
+        as a downtime_for value, or None if it was no downtime.
+
+        :param recentSignOfLife: time of the previous event from the server
+        :type recentSignOfLife: datetime.datetime
+        :param eventDateTime: time of the current event from the server
+        :type eventDateTime: datetime.datetime
+        :rtype: {String | None}
+        '''
+        # Get a timedelta obj w/ duration of time
+        # during which nothing was heard from server:
+        serverQuietTime = eventDateTime - recentSignOfLife
+        if serverQuietTime.seconds > EDX_HEARTBEAT_PERIOD:
+            return str(serverQuietTime)
+        return None
+
+    def prepareBatchWorker(self):
+        '''
+        Called once in each worker process of JSONToRelation.convertInBatches().
+        SQLite connections may not cross processes, so the worker opens its
+        own modulestore index. Unless setUniqueIDSeed() was called, keys are
+        derived from the name of the JSON source, the same in all workers.
+        Such keys are uuid5 values of the source name and line number, while
+        a serial conversion without a seed draws random uuid4 keys: the two
+        conversions agree on keys only if both are given the same seed.
+        '''
+        if self.uniqueIDNamespace is None:
+            self.setUniqueIDSeed(self.jsonToRelationConverter.loadFile)
+        parentMapper = self.hashMapper
+        self.hashMapper = ModulestoreImporter(parentMapper.jsonFileName, 
+                                              useCache=parentMapper.useCache, 
+                                              pickleCachePath=parentMapper.pickleCachePath,
+                                              parent=self,
+                                              indexPath=getattr(parentMapper, 'indexPath', None))
+        self.courseNameMatcher = self.hashMapper.getCourseNameMatcher()
+        self.courseNamesSorted = self.courseNameMatcher.courseNames
+
+    def startBatch(self, linesBefore):
+        '''
+        Readies the worker's parser for a batch that starts after linesBefore JSON objects.
+        '''
+        # Line counts as in a serial conversion, in which the line
+        # counter moves twice per JSON object: in processOneJSONObject(),
+        # and in JSONToRelation.convertOneLine():
+        self.jsonToRelationConverter.lineCounter = 2 * linesBefore - 1
+        self.totalLinesDoneSoFar = linesBefore
+        self.linesSinceLastProgReport = linesBefore % self.progressEvery
+        # Server downtimes are detected from the start of
+        # the batch on; mergeBatch() checks the rest:
+        self.downtimes = {}
+        self.firstSignsOfLife = []
+        EdXTrackLogJSONParser.newScreenNameHashes = {}
+        self.batchStartHashCounts = (EdXTrackLogJSONParser.hashCacheHits, EdXTrackLogJSONParser.hashCacheMisses)
+
+    def endBatch(self):
+        '''
+        Returns the state of the batch for mergeBatch(): the first sign of
+        life of each server IP in the batch, the most recent ones, and the
+        new screen name hashes.
+        '''
+        batchState = {'firstSignsOfLife' : self.firstSignsOfLife,
+                      'downtimes' : self.downtimes,
+                      'screenNameHashes' : EdXTrackLogJSONParser.newScreenNameHashes,
+                      'hashCacheHits' : EdXTrackLogJSONParser.hashCacheHits - self.batchStartHashCounts[0],
+                      'hashCacheMisses' : EdXTrackLogJSONParser.hashCacheMisses - self.batchStartHashCounts[1]
+                      }
+        self.firstSignsOfLife = None
+        EdXTrackLogJSONParser.newScreenNameHashes = None
+        return batchState
+
+    def mergeBatch(self, rows, batchState):
+        '''
+        In the parent process: the workers took the first event of each
+        server IP in a batch for the first sign of life of that server.
+        Against the IPs' most recent events in earlier batches, their 
+        downtime_for values are corrected here, and heartbeats that reveal
+        no downtime are dropped. The new screen name hashes of the batch
+        go into the makeHash() memo, for saveHashCache().
+        '''
+        downtimes = {}
+        for (ip, eventDateTime, eventID, isHeartbeat) in batchState['firstSignsOfLife']:
+            try:
+                recentSignOfLife = self.downtimes[ip]
+            except KeyError:
+                # Indeed the first sign of life:
+                continue
+            downtimes[eventID] = (self.getDowntimeStr(recentSignOfLife, eventDateTime), isHeartbeat)
+        self.downtimes.update(batchState['downtimes'])
+        
+        newHashes = batchState['screenNameHashes']
+        if len(EdXTrackLogJSONParser.screenNameHashes) + len(newHashes) > MAX_HASHED_SCREEN_NAMES:
+            EdXTrackLogJSONParser.screenNameHashes.clear()
+        EdXTrackLogJSONParser.screenNameHashes.update(newHashes)
+        EdXTrackLogJSONParser.hashCacheHits += batchState['hashCacheHits']
+        EdXTrackLogJSONParser.hashCacheMisses += batchState['hashCacheMisses']
+        
+        if len(downtimes) == 0:
+            return rows
+        # All main table rows of an event share its event_id:
+        idPos = self.jsonToRelationConverter.getSchemaHint('event_id', self.mainTableName).colPos
+        downtimeColSpec = self.jsonToRelationConverter.getSchemaHint('downtime_for', self.mainTableName)
+        mergedRows = []
+        for row in rows:
+            if isinstance(row, tuple) and row[0] == self.mainTableName:
+                eventID = row[2][idPos]
+                if eventID in downtimes:
+                    (downtimeFor, isHeartbeat) = downtimes[eventID]
+                    if downtimeFor is None:
+                        if isHeartbeat:
+                            # A heartbeat that reveals no downtime:
+                            continue
+                        downtimeFor = downtimeColSpec.getDefaultValue()
+                    row[2][downtimeColSpec.colPos] = downtimeFor
+            mergedRows.append(row)
+        return mergedRows
+
+    def setUniqueIDSeed(self, seed):
+        '''
+        Makes getUniqueID() derive keys from the given seed and the
+        current line of the JSON source, rather than draw them at random.
+        Conversions of a source with the same seed then produce the same
+        keys, however many processes share the work. 
+
+        :param seed: any string, or None for random keys
+        :type seed: {String | None}
+        '''
+        if seed is None:
+            self.uniqueIDNamespace = None
+        else:
+            if isinstance(seed, unicode):
+                seed = seed.encode('utf-8')
+            self.uniqueIDNamespace = uuid.uuid5(uuid.NAMESPACE_URL, seed)
+        self.uniqueIDLine = None
+        self.uniqueIDsInLine = 0
+
     def getUniqueID(self):
         '''
         Generate a universally unique key with
         all characters being legal in MySQL identifiers. 
         '''
-        return str(uuid.uuid4()).replace('-','_')
+        if self.uniqueIDNamespace is None:
+            return str(uuid.uuid4()).replace('-','_')
+        lineCounter = self.jsonToRelationConverter.lineCounter
+        if lineCounter != self.uniqueIDLine:
+            self.uniqueIDLine = lineCounter
+            self.uniqueIDsInLine = 0
+        self.uniqueIDsInLine += 1
+        return str(uuid.uuid5(self.uniqueIDNamespace, '%d.%d' % (lineCounter, self.uniqueIDsInLine))).replace('-','_')
 
     def getZipAndCountryFromMailAddr(self, mailAddr, accountDict):
         
@@ -4369,12 +4561,69 @@ class EdXTrackLogJSONParser(GenericJSONParser):
     @classmethod
     def makeHash(cls, username):
         '''
-        Returns a ripemd160 40 char hash of the given name. 
+        Returns a ripemd160 40 char hash of the given name. The
+        same few thousand screen names recur throughout a tracking
+        log, so hashes are memoized in cls.screenNameHashes.
 
         :param username: name to be hashed
         :type username: String
         :return: hashed equivalent. Calling this function multiple times returns the same string
 
+        :rtype: String
+        '''
+        try:
+            hashVal = cls.screenNameHashes[username]
+            cls.hashCacheHits += 1
+            return hashVal
+        except KeyError:
+            pass
+        cls.hashCacheMisses += 1
+        hashVal = cls.computeHash(username)
+        if len(cls.screenNameHashes) >= MAX_HASHED_SCREEN_NAMES:
+            cls.screenNameHashes.clear()
+        cls.screenNameHashes[username] = hashVal
+        if cls.newScreenNameHashes is not None:
+            cls.newScreenNameHashes[username] = hashVal
+        return hashVal
+    
+    @classmethod
+    def makeHashes(cls, usernames):
+        '''
+        Bulk version of makeHash(): returns the list of hashes
+        of the given names, in order.
+
+        :param usernames: names to be hashed
+        :type usernames: [String]
+        :return: hashed equivalents
+        :rtype: [String]
+        '''
+        screenNameHashes = cls.screenNameHashes
+        computeHash = cls.computeHash
+        hashVals = []
+        misses = 0
+        for username in usernames:
+            hashVal = screenNameHashes.get(username, None)
+            if hashVal is None:
+                misses += 1
+                hashVal = computeHash(username)
+                if len(screenNameHashes) >= MAX_HASHED_SCREEN_NAMES:
+                    screenNameHashes.clear()
+                screenNameHashes[username] = hashVal
+                if cls.newScreenNameHashes is not None:
+                    cls.newScreenNameHashes[username] = hashVal
+            hashVals.append(hashVal)
+        cls.hashCacheMisses += misses
+        cls.hashCacheHits += len(hashVals) - misses
+        return hashVals
+    
+    @staticmethod
+    def computeHash(username):
+        '''
+        The hash function behind makeHash(), without memoization.
+
+        :param username: name to be hashed
+        :type username: String
+        :return: ripemd160 40 char hash of the name
         :rtype: String
         '''
         #return hashlib.sha224(username).hexdigest()
@@ -4382,6 +4631,91 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         oneHash.update(username)
         return oneHash.hexdigest()
     
+    @classmethod
+    def hashFingerprint(cls):
+        '''
+        Identifies the hash function of computeHash(), including any
+        salt it may use, by its hash of a fixed probe string. Hash cache
+        side files of another hash function are thereby never used.
+
+        :return: 16 hex digits
+        :rtype: String
+        '''
+        return cls.computeHash('anon_screen_name fingerprint')[:16]
+    
+    @classmethod
+    def hashCacheFileName(cls, cacheDir):
+        return os.path.join(cacheDir, 'screenNameHashes_%s.pkl' % cls.hashFingerprint())
+    
+    @classmethod
+    def loadHashCache(cls, cacheDir):
+        '''
+        Adds the screen name hashes saved by saveHashCache() in the
+        given directory to the makeHash() memo, so that reruns over
+        new daily logs only hash new screen names. A missing or
+        unreadable side file is ignored.
+
+        :param cacheDir: directory of the side file
+        :type cacheDir: String
+        :return: number of hashes loaded
+        :rtype: int
+        '''
+        try:
+            with open(cls.hashCacheFileName(cacheDir), 'rb') as fd:
+                savedHashes = cPickle.load(fd)
+        except (IOError, EOFError, cPickle.UnpicklingError):
+            return 0
+        if len(cls.screenNameHashes) + len(savedHashes) > MAX_HASHED_SCREEN_NAMES:
+            logging.getLogger('jsonToRel').warn('Screen name hash cache %s not loaded: its %d hashes and the %d in memory exceed the limit of %d.' %
+                                                (cls.hashCacheFileName(cacheDir), len(savedHashes), len(cls.screenNameHashes), MAX_HASHED_SCREEN_NAMES))
+            return 0
+        cls.screenNameHashes.update(savedHashes)
+        return len(savedHashes)
+    
+    @classmethod
+    def saveHashCache(cls, cacheDir):
+        '''
+        Saves the makeHash() memo to a side file in the given directory,
+        named after the hashFingerprint(). The file is replaced
+        atomically, so that concurrent transforms never see a partial file.
+
+        The file holds each screen name in plain text next to its hash,
+        and thus undoes the anonymization of anon_screen_name for anyone
+        who can read it. It is created readable by its owner only (0600).
+
+        :param cacheDir: directory of the side file
+        :type cacheDir: String
+        '''
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        cacheFileName = cls.hashCacheFileName(cacheDir)
+        tmpFileName = '%s.%d.tmp' % (cacheFileName, os.getpid())
+        # Owner-only permissions from the start, rather than
+        # set after the screen names were written:
+        with os.fdopen(os.open(tmpFileName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600), 'wb') as fd:
+            cPickle.dump(cls.screenNameHashes, fd, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmpFileName, cacheFileName)
+    
+    @classmethod
+    def getHashCacheStats(cls):
+        '''
+        Returns the hit statistics of the makeHash() memo.
+
+        :return: dict with keys 'hits', 'misses', 'hitRate', and 'size', the number of memoized screen names
+        :rtype: {String : Number}
+        '''
+        lookups = cls.hashCacheHits + cls.hashCacheMisses
+        return {'hits' : cls.hashCacheHits,
+                'misses' : cls.hashCacheMisses,
+                'hitRate' : float(cls.hashCacheHits) / lookups if lookups > 0 else 0.0,
+                'size' : len(cls.screenNameHashes)}
+    
+    @classmethod
+    def resetHashCache(cls):
+        cls.screenNameHashes.clear()
+        cls.hashCacheHits = 0
+        cls.hashCacheMisses = 0
+    
     def extractOpenEdxHash(self, idStr):
         '''
         Given a string, such as::
@@ -4455,17 +4789,17 @@ class EdXTrackLogJSONParser(GenericJSONParser):
         # hashes that could match short course names:
         trackLogStr = self.hexGE32Digits.sub('', trackLogStr)
         
-        # We go through all course short names, starting
-        # with the longest, in decreasing length. We
-        # select the first course short name that is
-        # embedded in the given trackLogStr. Proceeding
-        # by decreasing length is needed to avoid prematurely
-        # choosing a course short name like 'db', which easily
-        # matches a hash string.
-        for shortCourseName in self.courseNamesSorted:
-            if string.find(trackLogStr, shortCourseName) > -1:
-                return self.hashMapper[shortCourseName]
-        return None
+        # Find the longest course short name that is
+        # embedded in the given trackLogStr, in one pass
+        # over the string. Preferring longer names is needed
+        # to avoid prematurely choosing a course short name
+        # like 'db', which easily matches a hash string.
+        # Among names of equal length, the one that comes
+        # first in self.courseNamesSorted wins:
+        shortCourseName = self.courseNameMatcher.longestMatch(trackLogStr)
+        if shortCourseName is None:
+            return None
+        return self.hashMapper[shortCourseName]
 
     def getThreeLetterCountryCode(self, ipAddr):
         '''
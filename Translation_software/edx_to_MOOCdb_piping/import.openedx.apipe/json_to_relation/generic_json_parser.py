@@ -20,6 +20,16 @@ class GenericJSONParser(object):
     # groups: 'item' and 'name'.
     REMOVE_ITEM_FROM_STRING_PATTERN = re.compile(r'(item)\.([^.]*$)')
 
+    # Whether JSONToRelation.convert() may spread the JSON objects
+    # over several processes. Parsers that can, override the no-op
+    # prepareBatchWorker(), startBatch(), endBatch(), and mergeBatch()
+    # where their state spans JSON objects:
+    supportsBatchConvert = False
+
+    # Whether processOneJSONObject() also takes JSON objects
+    # already decoded into dicts, as from InMongoDB(yieldDicts=True):
+    acceptsDicts = False
+
     def __init__(self, jsonToRelationConverter, logfileID='', progressEvery=1000):
         '''
 
@@ -293,6 +303,48 @@ class GenericJSONParser(object):
         res = label[:match.start(1)] + match.group(2)
         return res
 
+    def prepareBatchWorker(self):
+        '''
+        Called once in each worker process of JSONToRelation.convertInBatches(),
+        in which this parser is a copy of the parent's. 
+        '''
+        pass
+
+    def startBatch(self, linesBefore):
+        '''
+        Called in a worker process before the JSON objects of one 
+        batch are processed.
+
+        :param linesBefore: number of JSON objects in the source before this batch
+        :type linesBefore: int
+        '''
+        pass
+
+    def endBatch(self):
+        '''
+        Called in a worker process after the JSON objects of one
+        batch were processed.
+
+        :return: picklable state of the batch that mergeBatch() needs. Default: None
+        :rtype: <any>
+        '''
+        return None
+
+    def mergeBatch(self, rows, batchState):
+        '''
+        Called in the parent process with the rows of each batch, in the
+        order of the source. Returns the rows to write, adjusted where they
+        depend on the JSON objects of earlier batches.
+
+        :param rows: rows that the parser pushed while processing the batch
+        :type rows: [<any>]
+        :param batchState: what endBatch() returned for the batch
+        :type batchState: <any>
+        :return: rows to write. Default: the rows as they are
+        :rtype: [<any>]
+        '''
+        return rows
+
     def reportProgressIfNeeded(self):
         self.linesSinceLastProgReport += 1
         self.totalLinesDoneSoFar += 1
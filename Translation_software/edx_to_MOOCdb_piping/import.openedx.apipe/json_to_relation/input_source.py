@@ -7,15 +7,24 @@ JSON strings, and MongoDB collections.
 
 @author: paepcke
 '''
+import Queue
 import StringIO
 import bz2
+import datetime
 import gzip
+import json
 import os
 import sys
+import threading
 from urllib import FancyURLopener
 import urllib2
 from urlparse import urlparse
+import zlib
 
+# Size of the blocks in which StreamingLineReader reads
+# its input, and how many decompressed blocks it reads ahead:
+READ_BLOCK_SIZE = 1024 * 1024
+READ_AHEAD_BLOCKS = 8
 
 class COMPRESSION_TYPE:
     NO_COMPRESSION = 0;
@@ -29,6 +38,10 @@ class InputSource(object):
     JSON strings, and MongoDB collections.
     '''
 
+    # Whether the source hands over its JSON objects as dicts,
+    # rather than as lines of JSON (see InMongoDB):
+    yieldDicts = False
+
     def __init__(self, inputSource):
         self.inputSource = inputSource
 
@@ -57,12 +70,36 @@ class InputSource(object):
     
 
 class InURI(InputSource):
-    def __init__(self, inFilePathOrURL):
+    def __init__(self, inFilePathOrURL, streaming=True, blockSize=READ_BLOCK_SIZE, readAheadBlocks=READ_AHEAD_BLOCKS):
+        '''
+        :param inFilePathOrURL: file path or URL of the JSON source
+        :type inFilePathOrURL: String
+        :param streaming: if True, the source is read and decompressed in 
+               a background thread by a StreamingLineReader. Remote sources
+               are then processed while they download. Else gzip and bz2 
+               are read through gzip.open() and bz2.BZ2File(), and remote 
+               compressed sources are downloaded to a temp file first.
+        :type streaming: Bool
+        :param blockSize: bytes per read of a StreamingLineReader
+        :type blockSize: int
+        :param readAheadBlocks: number of decompressed blocks a StreamingLineReader reads ahead
+        :type readAheadBlocks: int
+        '''
         if len(urlparse(inFilePathOrURL)[0]) == 0:
             inFilePathOrURL = 'file://' + inFilePathOrURL 
         self.inFilePathOrURL = inFilePathOrURL
         self.compression = self.determineCompression(self.inFilePathOrURL)
 
+        if streaming:
+            self.localFilePath = inFilePathOrURL
+            self.deleteTempFile = False
+            # Throws IOError if URL does not exist:
+            self.fileHandle = StreamingLineReader(urllib2.urlopen(inFilePathOrURL), 
+                                                  self.compression, 
+                                                  blockSize=blockSize, 
+                                                  readAheadBlocks=readAheadBlocks)
+            return
+
         # If file is compressed and remote, pull it into a temp file
         # so we can decompress locally. Sets self.localPathFile
         # so that urlopen() or gzip.open(), or bz2.BZ2File() will work.
@@ -96,6 +133,9 @@ class InURI(InputSource):
         return line
         
     def close(self):
+        if isinstance(self.fileHandle, StreamingLineReader):
+            self.fileHandle.close()
+            return
         # closing is different in case of file vs. URL:
         try:
             (scheme,netloc,path,query,fragment) = self.fileHandle.urlsplit()  # @UnusedVariable
@@ -150,6 +190,159 @@ class InURI(InputSource):
         self.localFilePath = opener.retrieve(inFilePathOrURL)[0]
         self.deleteTempFile = True
     
+class StreamingLineReader(object):
+    '''
+    Iterates over the lines of a possibly compressed byte stream,
+    such as an open file or URL. A background thread reads the stream
+    in large blocks, decompresses them, and hands them over through a 
+    bounded queue. Decompression and downloads thus overlap with the 
+    processing of the lines, and read ahead by at most readAheadBlocks
+    blocks. Lines are split out of the blocks, rather than read one by
+    one. As in iterations over files, they end with '\\n', but the last
+    line need not.
+    '''
+    
+    # Queued by the reader thread after the last block:
+    END_OF_STREAM = None
+
+    def __init__(self, rawStream, compression, blockSize=READ_BLOCK_SIZE, readAheadBlocks=READ_AHEAD_BLOCKS):
+        '''
+        Starts the reader thread.
+
+        :param rawStream: stream with a read(numBytes) method
+        :type rawStream: {file | urllib.addinfourl}
+        :param compression: compression of the stream
+        :type compression: COMPRESSION_TYPE
+        :param blockSize: bytes per read from rawStream
+        :type blockSize: int
+        :param readAheadBlocks: maximum number of decompressed blocks that wait to be split into lines
+        :type readAheadBlocks: int
+        '''
+        self.rawStream = rawStream
+        self.compression = compression
+        self.blockSize = blockSize
+        self.blocks = Queue.Queue(readAheadBlocks)
+        self.closed = False
+        self.readerThread = threading.Thread(target=self.readBlocks, name='StreamingLineReader')
+        self.readerThread.daemon = True
+        self.readerThread.start()
+
+    def __iter__(self):
+        rest = ''
+        while True:
+            block = self.blocks.get()
+            if block is StreamingLineReader.END_OF_STREAM:
+                break
+            if isinstance(block, tuple):
+                # The reader thread failed; raise its exception here:
+                (errType, errValue, errTraceback) = block
+                raise errType, errValue, errTraceback
+            lines = block.split('\n')
+            if len(lines) == 1:
+                rest += block
+                continue
+            lines[0] = rest + lines[0]
+            rest = lines.pop()
+            for line in lines:
+                yield line + '\n'
+        if len(rest) > 0:
+            yield rest
+
+    def close(self):
+        '''
+        Stops the reader thread, and closes the stream.
+        '''
+        self.closed = True
+        # Unblock the reader thread if it waits for room in the queue:
+        while self.readerThread.is_alive():
+            try:
+                while True:
+                    self.blocks.get_nowait()
+            except Queue.Empty:
+                pass
+            self.readerThread.join(0.01)
+        self.rawStream.close()
+
+    def readBlocks(self):
+        '''
+        Body of the reader thread. Queues the decompressed blocks of
+        the stream, and then END_OF_STREAM. Concatenated gzip members
+        and bz2 streams are all decompressed, as gzip.open() and 
+        bz2.BZ2File() do. A stream that ends within a gzip member or
+        bz2 stream raises IOError, as those do. An exception is queued 
+        as its (type, value, traceback).
+        '''
+        try:
+            decompressor = self.makeDecompressor()
+            decompressed = False
+            while not self.closed:
+                data = self.rawStream.read(self.blockSize)
+                if len(data) == 0:
+                    break
+                if decompressor is None:
+                    self.queueBlock(data)
+                    continue
+                decompressed = True
+                while len(data) > 0:
+                    try:
+                        block = decompressor.decompress(data)
+                    except EOFError:
+                        # A bz2 stream ended with the previous data:
+                        decompressor = self.makeDecompressor()
+                        continue
+                    self.queueBlock(block)
+                    # Data after the end of a gzip member or bz2 stream
+                    # begins the next one, unless it is zero padding: 
+                    data = decompressor.unused_data
+                    if len(data) > 0:
+                        if data.strip('\0') == '':
+                            break
+                        decompressor = self.makeDecompressor()
+            if decompressed and not self.closed and not self.isFinished(decompressor):
+                raise IOError('Compressed input ended within a %s stream; it is truncated.' % 
+                              ('gzip' if self.compression == COMPRESSION_TYPE.GZIP else 'bz2'))
+            if self.compression == COMPRESSION_TYPE.GZIP:
+                self.queueBlock(decompressor.flush())
+            self.queueBlock(StreamingLineReader.END_OF_STREAM)
+        except:
+            self.queueBlock(sys.exc_info())
+
+    def isFinished(self, decompressor):
+        '''
+        Returns True if decompressor reached the end of its gzip member
+        or bz2 stream. A finished gzip decompressor hands back further
+        data as unused_data; a finished bz2 decompressor refuses it.
+        '''
+        if self.compression == COMPRESSION_TYPE.GZIP:
+            try:
+                decompressor.decompress('\0')
+            except zlib.error:
+                return False
+            return decompressor.unused_data.endswith('\0')
+        try:
+            decompressor.decompress('')
+        except EOFError:
+            return True
+        return False
+
+    def makeDecompressor(self):
+        if self.compression == COMPRESSION_TYPE.GZIP:
+            # Window size with 16 added: expect a gzip header:
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.compression == COMPRESSION_TYPE.BZIP2:
+            return bz2.BZ2Decompressor()
+        return None
+
+    def queueBlock(self, block):
+        '''
+        Queues one block for the line iteration, waiting while
+        the queue is full. Once close() is called, nothing more
+        is queued.
+        '''
+        if self.closed or (block is not StreamingLineReader.END_OF_STREAM and len(block) == 0):
+            return
+        self.blocks.put(block)
+
 class InString(InputSource):
     def __init__(self, inputStr):
         self.fileHandle = StringIO.StringIO(inputStr)
@@ -178,11 +371,88 @@ class InString(InputSource):
         pass
     
 class InMongoDB(InputSource):
-    def __init__(self, server, pwd, dbName, collName):
+    '''
+    Documents of a MongoDB collection, in the order of their _id.
+    They are fetched in batches of batchSize documents per round trip,
+    and handed over either as JSON lines, or, for parsers that accept
+    them (see GenericJSONParser.acceptsDicts), as the dicts that pymongo 
+    decoded, so that the parser need not decode them again. 
+    
+    A source can be confined to a range of _ids, such that several
+    readers can share a collection (see partitionIdRanges()). The _id
+    of the most recently handed over document is kept in lastId. If
+    the cursor dies, reading resumes after that _id, and a new source
+    created with resumeAfterId=lastId continues where an earlier one
+    stopped.
+    '''
+    
+    # Times a dead cursor is reopened after the last _id read:
+    MAX_CURSOR_RESUMPTIONS = 3
+    
+    def __init__(self, 
+                 server, 
+                 pwd, 
+                 dbName, 
+                 collName, 
+                 user=None,
+                 port=27017,
+                 query=None,
+                 projection=None,
+                 batchSize=1000,
+                 idRange=None,
+                 resumeAfterId=None,
+                 yieldDicts=False,
+                 includeId=False,
+                 collection=None):
+        '''
+        :param server: host of the MongoDB server
+        :type server: String
+        :param pwd: password of user on the MongoDB server
+        :type pwd: String
+        :param dbName: name of the database
+        :type dbName: String
+        :param collName: name of the collection
+        :type collName: String
+        :param user: user on the MongoDB server, or None for no authentication
+        :type user: {String | None}
+        :param port: port of the MongoDB server
+        :type port: int
+        :param query: MongoDB query that selects the documents. Default: all
+        :type query: {Dict<String,<any>> | None}
+        :param projection: fields of the documents to read, as a list of field
+               names, or a MongoDB projection dict. Default: all fields
+        :type projection: {[String] | Dict<String,int> | None}
+        :param batchSize: number of documents per round trip to the server
+        :type batchSize: int
+        :param idRange: (lowId, highId): only read documents with lowId <= _id < highId.
+               Either may be None for no bound. See partitionIdRanges(). Default: no range
+        :type idRange: {(<any>, <any>) | None}
+        :param resumeAfterId: only read documents whose _id is greater than this one
+        :type resumeAfterId: <any>
+        :param yieldDicts: if True, hand over the documents as dicts, else as JSON lines
+        :type yieldDicts: Bool
+        :param includeId: if True, the documents handed over keep their _id field
+        :type includeId: Bool
+        :param collection: collection object with pymongo's find() to read, rather than
+               connecting to server, e.g. a mongomock collection in tests
+        :type collection: {pymongo.collection.Collection | None}
+        '''
         self.server = server
         self.pwd = pwd
         self.dbName = dbName
         self.collName = collName
+        self.user = user
+        self.port = port
+        self.query = query if query is not None else {}
+        self.projection = InMongoDB.makeProjection(projection)
+        self.batchSize = batchSize
+        self.idRange = idRange
+        self.lastId = resumeAfterId
+        self.yieldDicts = yieldDicts
+        self.includeId = includeId
+        self.mongoDB = None
+        self.cursor = None
+        self.collection = collection
         self.fileHandle = self.connect()
 
     def getSourceName(self):
@@ -196,15 +466,153 @@ class InMongoDB(InputSource):
         '''
         return "%s:%s" % (self.dbName, self.collName)
 
-
     def connect(self):
-        raise NotImplementedError("MangoDB connector not yet implemented")
+        '''
+        Connects to the server, unless a collection was passed to __init__(),
+        and returns the generator of the documents.
+        '''
+        if self.collection is None:
+            # Only Mongo sources need pymongo:
+            from mongodb import MongoDB
+            self.mongoDB = MongoDB(host=self.server, dbName=self.dbName, collection=self.collName, 
+                                   port=self.port, user=self.user, pwd=self.pwd)
+            self.collection = self.mongoDB.get_collection()
+        return self.documents()
+    
+    def documents(self):
+        '''
+        Generator of the documents, as dicts or JSON lines. 
+        '''
+        try:
+            from pymongo.errors import AutoReconnect, CursorNotFound
+            cursorErrors = (AutoReconnect, CursorNotFound)
+        except ImportError:
+            # Collection passed in, such as mongomock's, without pymongo:
+            cursorErrors = ()
+        resumptions = 0
+        while True:
+            self.cursor = self.openCursor()
+            try:
+                for doc in self.cursor:
+                    self.lastId = doc['_id']
+                    if not self.includeId:
+                        del doc['_id']
+                    if self.yieldDicts:
+                        yield doc
+                    else:
+                        yield json.dumps(doc, default=InMongoDB.jsonValue) + '\n'
+                return
+            except cursorErrors:
+                resumptions += 1
+                if resumptions > InMongoDB.MAX_CURSOR_RESUMPTIONS:
+                    raise
+
+    def openCursor(self):
+        '''
+        Returns a cursor over the documents of the query in the idRange
+        with an _id greater than lastId, sorted by _id.
+        '''
+        idBounds = {}
+        if self.idRange is not None:
+            (lowId, highId) = self.idRange
+            if lowId is not None:
+                idBounds['$gte'] = lowId
+            if highId is not None:
+                idBounds['$lt'] = highId
+        if self.lastId is not None:
+            idBounds.pop('$gte', None)
+            idBounds['$gt'] = self.lastId
+        query = self.query
+        if len(idBounds) > 0:
+            if '_id' in query:
+                query = {'$and' : [query, {'_id' : idBounds}]}
+            else:
+                query = dict(query)
+                query['_id'] = idBounds
+        if self.projection is None:
+            cursor = self.collection.find(query)
+        else:
+            cursor = self.collection.find(query, self.projection)
+        return cursor.sort('_id', 1).batch_size(self.batchSize)
+
+    @staticmethod
+    def makeProjection(projection):
+        '''
+        Turns a list of field names into a MongoDB projection dict.
+        The _id is always read, because reading resumes after it.
+        '''
+        if projection is None:
+            return None
+        if not isinstance(projection, dict):
+            projection = dict([(fieldName, 1) for fieldName in projection])
+        else:
+            projection = dict(projection)
+        projection.pop('_id', None)
+        return projection if len(projection) > 0 else None
+
+    @staticmethod
+    def jsonValue(val):
+        '''
+        Default for json.dumps() of BSON values that JSON lacks:
+        ObjectIds as their hex string, dates in ISO format, as 
+        mitLogsAdapter.format_timestamp() formats the time of dicts.
+        '''
+        if isinstance(val, datetime.datetime):
+            return val.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        if isinstance(val, datetime.date):
+            return val.isoformat()
+        return str(val)
+
+    @staticmethod
+    def partitionIdRanges(collection, numPartitions, query=None):
+        '''
+        Splits the documents of a collection into numPartitions ranges 
+        of _ids with about the same number of documents each, for the 
+        idRange of as many InMongoDB readers. The first range has no lower
+        bound, the last no upper one.
+
+        :param collection: collection object with pymongo's find()
+        :type collection: pymongo.collection.Collection
+        :param numPartitions: number of ranges wanted
+        :type numPartitions: int
+        :param query: MongoDB query that selects the documents. Default: all
+        :type query: {Dict<String,<any>> | None}
+        :return: list of (lowId, highId); fewer than numPartitions if there 
+                 are fewer documents.
+        :rtype: [(<any>, <any>)]
+        '''
+        if query is None:
+            query = {}
+        if hasattr(collection, 'count_documents'):
+            numDocs = collection.count_documents(query)
+        else:
+            numDocs = collection.find(query).count()
+        numPartitions = max(1, min(numPartitions, numDocs))
+        boundaries = [None]
+        for partition in range(1, numPartitions):
+            boundaryDoc = list(collection.find(query, {'_id' : 1}).sort('_id', 1).skip(partition * numDocs // numPartitions).limit(1))
+            boundaries.append(boundaryDoc[0]['_id'])
+        boundaries.append(None)
+        return [(boundaries[i], boundaries[i+1]) for i in range(numPartitions)]
     
     def decompress(self, line):
-        raise NotImplementedError("MangoDB connector not yet implemented")
+        '''
+        No decompression for MongoDB documents
+
+        :param line:
+        :type line:
+        '''
+        return line
     
     def close(self):
-        raise NotImplementedError("MangoDB connector not yet implemented")
+        self.fileHandle.close()
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except:
+                pass
+        if self.mongoDB is not None:
+            self.mongoDB.close()
 
 class InPipe(InputSource):
     def __init__(self):
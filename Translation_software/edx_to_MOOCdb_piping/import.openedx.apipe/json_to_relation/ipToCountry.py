@@ -12,14 +12,50 @@ does no harm.
 
 The out-facing method is lookupIP(ipString)
 
-The underlying IP->Country information comes from http://software77.net/geo-ip/
+Two lookup engines are provided:
+   - IpCountryDict: sorted IP ranges in packed arrays, searched with
+     bisect. The ranges are compiled from the IP->Country table of
+     http://software77.net/geo-ip/, or, when that table is absent, from
+     the bundled MaxMind GeoLite2-Country database. The compiled table
+     is cached in a binary file next to its source.
+   - MMDBCountryDict: a pure-Python reader of MaxMind DB files that
+     answers each lookup by walking the database's search tree.
 
 @author: paepcke
 '''
+import array
+import bisect
+import gzip
+import mmap
 import os
+import shutil
+import struct
 import unittest
 
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SOFTWARE77_TABLE_PATH = os.path.join(DATA_DIR, 'ipToCountrySoftware77DotNet.csv')
+GEOLITE_COUNTRY_PATH = os.path.join(DATA_DIR, 'GeoLite2-Country.mmdb.gz')
+COUNTRY_CODES_PATH = os.path.join(DATA_DIR, 'countryCodes.txt')
+
+# Returned for IPs in none of the tables' ranges:
+UNKNOWN_COUNTRY = ('ZZ','ZZZ','unknown')
+
+def loadThreeLetterCodes(countryCodesPath=COUNTRY_CODES_PATH):
+    '''
+    Returns dict mapping ISO 3166 two-letter country
+    codes to three-letter codes.
+    '''
+    threeLetterCodes = {}
+    with open(countryCodesPath, 'r') as fd:
+        for line in fd:
+            if line[0] == '#':
+                continue
+            (twoLetterCountry, threeLetterCountry) = line.strip().split(',')
+            threeLetterCodes[twoLetterCountry] = threeLetterCountry
+    return threeLetterCodes
+
+
 class IpCountryDict(unittest.TestCase):
     '''
     Implements lookup mapping IP to country.
@@ -30,50 +66,50 @@ class IpCountryDict(unittest.TestCase):
     THREE_LETTER_POS = 3
     COUNTRY_POS = 4
 
+    # Layout of the compiled table file: magic, number of ranges,
+    # number of countries, and length of the countries' text. Followed
+    # by the countries' text, then the range starts and range ends
+    # (uint32), and the range countries (uint16, index into the countries):
+    INDEX_HEADER = struct.Struct('<8sIII')
+    INDEX_MAGIC = 'IPIDX001'
+
     def __init__(self, ipTablePath=None):
         '''
-        Create an in-memory dict for quickly looking up IP addresses.
+        Create an in-memory table for quickly looking up IP addresses.
         The underlying IP->Country information comes from http://software77.net/geo-ip/
-        If an unzipped table from their Web site is not passed in, then 
+        If an unzipped table from their Web site is not passed in, then
         the table is expected to reside in subdirectory 'data' of this script's directory
         under the name ipToCountrySoftware77DotNet.csv. Their table contains
         columns for (decimal)startRange, endRange, assigning agency, assignment
         date, two-letter-country code, three-letter-country code, and country.
-        
-        The lookup table we construct uses the first four digits of the 
-        starting ranges as key. Values are an array of tuples:
-            (startIpRange,endIPRange,2-letterCode,3-letterCode,Country)
-        All IPs in one key's values thus start with the key's digits.
-        The arrays are just a few tuples long, so the scan through them
-        is fast. The arrays are ordered by rising start and (therefore)
-        end IP.
-        
+        If that table is missing, the bundled data/GeoLite2-Country.mmdb.gz is
+        used instead. ipTablePath may also name a MaxMind DB (.mmdb or .mmdb.gz) file.
+
+        The lookup table we construct holds the start and end IPs of all
+        ranges in two arrays, ordered by rising start IP, and the index of
+        each range's (2-letterCode,3-letterCode,Country) tuple in a third.
+        A lookup is a binary search of the start IPs.
+
+        The table is compiled once, and saved to <ipTablePath>.idx. Later
+        instances load that file, unless ipTablePath is newer.
+
         We also construct a simpler dict that maps a country's three-letter
         code to a tuple: (two-letter code, three-letter code, full country name).
         '''
-        currKey = 0
-        self.ipToCountryDict = {currKey : []}
-        self.threeLetterKeyedDict = {}
         if ipTablePath is None:
-            tableSubPath = os.path.join('data/', 'ipToCountrySoftware77DotNet.csv')
-            ipTablePath = os.path.join(os.path.dirname(__file__), tableSubPath)
-        with open(ipTablePath, 'r') as fd:
-            for line in fd:
-                if line[0] == '#':
-                    continue
-                (startIPStr,endIPStr,auth,assigned,twoLetterCountry,threeLetterCountry,country) = line.strip().split(',')  # @UnusedVariable
-                # Use first four digits of start ip as hash key:
-                hashKey = startIPStr.strip('"').zfill(10)[0:4]
-                if hashKey != currKey:
-                    self.ipToCountryDict[hashKey] = []
-                    currKey = hashKey
-                self.ipToCountryDict[hashKey].append((int(startIPStr.strip('"')), 
-                                                       int(endIPStr.strip('"')), 
-                                                       twoLetterCountry.strip('"'), 
-                                                       threeLetterCountry.strip('"'), 
-                                                       country.strip('"'))
-                                                    )
-                self.threeLetterKeyedDict[threeLetterCountry.strip('"')] = (twoLetterCountry.strip('"'), threeLetterCountry.strip('"'), country.strip('"'))
+            ipTablePath = SOFTWARE77_TABLE_PATH if os.path.exists(SOFTWARE77_TABLE_PATH) else GEOLITE_COUNTRY_PATH
+        self.ipTablePath = ipTablePath
+        self.indexPath = ipTablePath + '.idx'
+        if not self.loadIndex():
+            if ipTablePath.endswith('.mmdb') or ipTablePath.endswith('.mmdb.gz'):
+                ranges = MMDBCountryDict(ipTablePath).ipv4Ranges()
+            else:
+                ranges = self.readSoftware77Table(ipTablePath)
+            self.buildIndex(ranges)
+            self.saveIndex()
+        self.threeLetterKeyedDict = {}
+        for countryInfo in self.countries:
+            self.threeLetterKeyedDict[countryInfo[1]] = countryInfo
 
     def get(self, ipStr, default=None):
         '''
@@ -81,7 +117,7 @@ class IpCountryDict(unittest.TestCase):
         IP not found, rather than throwing a KeyError.
         This method is analogous to the get() method
         on dictionaries.
-        :param ipStr: string of an IP address 
+        :param ipStr: string of an IP address
         :type ipStr: String
         :param default: return value in case IP address country is not found.
         :type default: <any>
@@ -106,51 +142,402 @@ class IpCountryDict(unittest.TestCase):
         :return: 2-letter country code, 3-letter country code, and country string
         :rtype: (str,str,str)
         :raise ValueError: when given IP address is None
-        :raise KeyError: when the country for the given IP is not found. 
+        :raise KeyError: when the country for the given IP is not found.
         '''
-        (ipNum, lookupKey) = self.ipStrToIntAndKey(ipStr)
-        if ipNum is None or lookupKey is None:
+        ipNum = self.ipStrToInt(ipStr)
+        if ipNum is None:
             raise ValueError('IP string is not a valid IP address: %s' % str(ipStr))
-        while lookupKey > 0:
-            try:
-                ipRangeChain = self.ipToCountryDict[lookupKey]
-                break
-            except KeyError:
-                lookupKey = str(int(lookupKey) - 1).zfill(4)[0:4]
-                continue
-        if ipRangeChain is None:
-            raise KeyError('IP string is not a valid IP address: %s' % str(ipStr))
-        for ipInfo in ipRangeChain:
-            # Have (rangeStart,rangeEnd,country2Let,country3Let,county)
-            # Sorted by rangeStart:
-            if ipNum > ipInfo[IpCountryDict.END_IP_POS]:
-                continue
-            return(ipInfo[IpCountryDict.TWO_LETTER_POS], 
-                   ipInfo[IpCountryDict.THREE_LETTER_POS],
-                   ipInfo[IpCountryDict.COUNTRY_POS])
-        # If we get here, the IP is in a range in which
-        # the IP-->Country table has a hole:
-        return('ZZ','ZZZ','unknown')
-        
-        
-            
+        # Last range that starts at or before the IP:
+        rangeIndex = bisect.bisect_right(self.rangeStarts, ipNum) - 1
+        if rangeIndex < 0 or ipNum > self.rangeEnds[rangeIndex]:
+            # The IP is in a range in which
+            # the IP-->Country table has a hole:
+            return UNKNOWN_COUNTRY
+        return self.countries[self.rangeCountries[rangeIndex]]
+
+    def ipStrToInt(self, ipStr):
+        '''
+        Given an IP string like '171.64.65.66', return the IP
+        as an int, or None if the string is not a four-octet IP.
+        '''
+        try:
+            (oct0,oct1,oct2,oct3) = ipStr.split('.')
+        except (ValueError, AttributeError):
+            # Given ip str does not contain four octets:
+            return None
+        return (int(oct0) << 24) + (int(oct1) << 16) + (int(oct2) << 8) + int(oct3)
+
     def ipStrToIntAndKey(self, ipStr):
         '''
         Given an IP string, return two-tuple: the numeric
-        int, and a lookup key into self.ipToCountryDict. 
+        int, and its first four decimal digits. The latter
+        were the lookup key of earlier versions of this class.
         :param ipStr: ip string like '171.64.65.66'
         :type ipStr: string
         :return: two-tuple of ip int and the first four digits, i.e. a lookup key. Like (16793600, 1679). Returns (None,None) if IP was not a four-octed str.
         :rtype: (int,int)
         '''
-        try:
-            (oct0,oct1,oct2,oct3) = ipStr.split('.')
-        except ValueError:
-            # Given ip str does not contain four octets:
+        ipNum = self.ipStrToInt(ipStr)
+        if ipNum is None:
             return (None,None)
-        ipNum = int(oct3) + (int(oct2) * 256) + (int(oct1) * 256 * 256) + (int(oct0) * 256 * 256 * 256)
         return (ipNum, str(ipNum).zfill(10)[0:4])
 
+    # ------------- Compiling the Table -------------------
+
+    def readSoftware77Table(self, ipTablePath):
+        '''
+        Returns list of (startIP, endIP, (2-letterCode,3-letterCode,Country))
+        from the software77.net CSV file.
+        '''
+        ranges = []
+        with open(ipTablePath, 'r') as fd:
+            for line in fd:
+                if line[0] == '#':
+                    continue
+                (startIPStr,endIPStr,auth,assigned,twoLetterCountry,threeLetterCountry,country) = line.strip().split(',')  # @UnusedVariable
+                ranges.append((int(startIPStr.strip('"')),
+                               int(endIPStr.strip('"')),
+                               (twoLetterCountry.strip('"'), threeLetterCountry.strip('"'), country.strip('"'))))
+        return ranges
+
+    def buildIndex(self, ranges):
+        '''
+        Fills the range arrays and countries list from
+        (startIP, endIP, (2-letterCode,3-letterCode,Country)) tuples.
+        '''
+        self.rangeStarts = array.array('I')
+        self.rangeEnds = array.array('I')
+        self.rangeCountries = array.array('H')
+        self.countries = []
+        countryIndexes = {}
+        for (startIP, endIP, countryInfo) in sorted(ranges):
+            countryIndex = countryIndexes.get(countryInfo, None)
+            if countryIndex is None:
+                countryIndex = countryIndexes[countryInfo] = len(self.countries)
+                self.countries.append(countryInfo)
+            self.rangeStarts.append(startIP)
+            self.rangeEnds.append(endIP)
+            self.rangeCountries.append(countryIndex)
+
+    def loadIndex(self):
+        '''
+        Loads the table compiled by an earlier instance, if it
+        is not older than the table it was compiled from.
+        Returns True if the compiled table was loaded.
+        '''
+        try:
+            if os.path.getmtime(self.indexPath) < os.path.getmtime(self.ipTablePath):
+                return False
+            with open(self.indexPath, 'rb') as fd:
+                (magic, numRanges, numCountries, countriesLen) = IpCountryDict.INDEX_HEADER.unpack(fd.read(IpCountryDict.INDEX_HEADER.size))
+                if magic != IpCountryDict.INDEX_MAGIC:
+                    return False
+                countriesText = fd.read(countriesLen)
+                self.countries = [tuple(countryInfo.split(',', 2)) for countryInfo in countriesText.split('\n')] if numCountries > 0 else []
+                self.rangeStarts = array.array('I')
+                self.rangeStarts.fromfile(fd, numRanges)
+                self.rangeEnds = array.array('I')
+                self.rangeEnds.fromfile(fd, numRanges)
+                self.rangeCountries = array.array('H')
+                self.rangeCountries.fromfile(fd, numRanges)
+        except (OSError, IOError, EOFError, struct.error):
+            return False
+        return len(self.countries) == numCountries
+
+    def saveIndex(self):
+        '''
+        Saves the compiled table next to its source. The file is
+        replaced atomically; failure to write it is not an error.
+        '''
+        countriesText = '\n'.join([','.join(countryInfo) for countryInfo in self.countries])
+        tmpIndexPath = '%s.%d.tmp' % (self.indexPath, os.getpid())
+        try:
+            with open(tmpIndexPath, 'wb') as fd:
+                fd.write(IpCountryDict.INDEX_HEADER.pack(IpCountryDict.INDEX_MAGIC, len(self.rangeStarts), len(self.countries), len(countriesText)))
+                fd.write(countriesText)
+                self.rangeStarts.tofile(fd)
+                self.rangeEnds.tofile(fd)
+                self.rangeCountries.tofile(fd)
+            os.rename(tmpIndexPath, self.indexPath)
+        except (OSError, IOError):
+            try:
+                os.remove(tmpIndexPath)
+            except OSError:
+                pass
+
+
+class MMDBCountryDict(object):
+    '''
+    Implements lookup mapping IP to country from a MaxMind DB
+    file, such as GeoLite2-Country, without the maxminddb package.
+    See http://maxmind.github.io/MaxMind-DB/ for the format.
+    Only IPv4 lookups are supported, as by IpCountryDict.
+
+    A gzipped database is unzipped once, next to the .gz file.
+    The database is then mapped into memory.
+    '''
+    METADATA_MARKER = '\xab\xcd\xefMaxMind.com'
+
+    # Data section field types:
+    POINTER = 1
+    UTF8_STRING = 2
+    DOUBLE = 3
+    BYTES = 4
+    UINT16 = 5
+    UINT32 = 6
+    MAP = 7
+    INT32 = 8
+    UINT64 = 9
+    UINT128 = 10
+    ARRAY = 11
+    BOOLEAN = 14
+    FLOAT = 15
+
+    def __init__(self, mmdbPath=GEOLITE_COUNTRY_PATH, countryCodesPath=COUNTRY_CODES_PATH):
+        '''
+        Maps the database into memory, and reads its metadata.
+
+        :param mmdbPath: MaxMind DB file, optionally gzipped
+        :type mmdbPath: String
+        :param countryCodesPath: file of two-letter,three-letter ISO country code lines
+        :type countryCodesPath: String
+        :raise ValueError: when the file is not a MaxMind DB
+        '''
+        if mmdbPath.endswith('.gz'):
+            self.db = self.gunzip(mmdbPath)
+        else:
+            with open(mmdbPath, 'rb') as fd:
+                self.db = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self.threeLetterCodes = loadThreeLetterCodes(countryCodesPath)
+
+        metadataStart = self.db.rfind(MMDBCountryDict.METADATA_MARKER)
+        if metadataStart < 0:
+            raise ValueError('Not a MaxMind DB file: %s' % mmdbPath)
+        metadataStart += len(MMDBCountryDict.METADATA_MARKER)
+        (self.metadata, offset) = self.decode(metadataStart, metadataStart)  # @UnusedVariable
+        self.nodeCount = self.metadata['node_count']
+        self.recordSize = self.metadata['record_size']
+        if self.recordSize not in (24, 28, 32):
+            raise ValueError('Unsupported MaxMind DB record size %d in %s' % (self.recordSize, mmdbPath))
+        self.nodeBytes = self.recordSize / 4
+        self.treeSize = self.nodeCount * self.nodeBytes
+        # The data section follows the search tree, and 16 zero bytes:
+        self.dataSectionStart = self.treeSize + 16
+
+        # IPv4 addresses are the ::a.b.c.d addresses of IPv6 databases:
+        self.ipv4StartNode = 0
+        if self.metadata['ip_version'] == 6:
+            for depth in range(96):  # @UnusedVariable
+                if self.ipv4StartNode >= self.nodeCount:
+                    break
+                self.ipv4StartNode = self.readRecord(self.ipv4StartNode, 0)
+
+        # Country tuple of each data record, by record offset:
+        self.recordCountries = {}
+        self.threeLetterKeyedDict = None
+
+    def get(self, ipStr, default=None):
+        '''
+        Same as lookupIP, but returns default if IP not found,
+        rather than throwing a KeyError. See IpCountryDict.get().
+        '''
+        try:
+            return self.lookupIP(ipStr)
+        except KeyError:
+            return None
+
+    def getBy3LetterCode(self, threeLetterCode):
+        if self.threeLetterKeyedDict is None:
+            self.threeLetterKeyedDict = {}
+            for (startIP, endIP, countryInfo) in self.ipv4Ranges():  # @UnusedVariable
+                self.threeLetterKeyedDict[countryInfo[1]] = countryInfo
+        return self.threeLetterKeyedDict[threeLetterCode]
+
+    def lookupIP(self, ipStr):
+        '''
+        Top level lookup: pass an IP string, get a triplet: two-letter
+        country code, three-letter country code, and full country.
+        See IpCountryDict.lookupIP().
+        '''
+        try:
+            (oct0,oct1,oct2,oct3) = ipStr.split('.')
+        except (ValueError, AttributeError):
+            raise ValueError('IP string is not a valid IP address: %s' % str(ipStr))
+        ipNum = (int(oct0) << 24) + (int(oct1) << 16) + (int(oct2) << 8) + int(oct3)
+        node = self.ipv4StartNode
+        for bit in range(31, -1, -1):
+            if node >= self.nodeCount:
+                break
+            node = self.readRecord(node, (ipNum >> bit) & 1)
+        if node <= self.nodeCount:
+            # No data for this IP:
+            return UNKNOWN_COUNTRY
+        return self.getRecordCountry(node)
+
+    def ipv4Ranges(self):
+        '''
+        Returns list of (startIP, endIP, (2-letterCode,3-letterCode,Country))
+        for all IPv4 ranges with a known country, ordered by start IP.
+        Adjacent ranges of the same country are merged.
+        '''
+        ranges = []
+        if self.ipv4StartNode >= self.nodeCount:
+            return ranges
+        # Depth-first walk of the tree, lower half first:
+        # (node, IP prefix, prefix length)
+        stack = [(self.ipv4StartNode, 0, 0)]
+        while stack:
+            (node, prefix, depth) = stack.pop()
+            for bit in (1, 0):
+                childPrefix = (prefix << 1) | bit
+                child = self.readRecord(node, bit)
+                if child < self.nodeCount:
+                    stack.append((child, childPrefix, depth + 1))
+                    continue
+                if child == self.nodeCount:
+                    continue
+                countryInfo = self.getRecordCountry(child)
+                if countryInfo is UNKNOWN_COUNTRY:
+                    continue
+                hostBits = 31 - depth
+                startIP = childPrefix << hostBits
+                endIP = startIP + (1 << hostBits) - 1
+                if ranges and ranges[-1][2] == countryInfo and ranges[-1][1] + 1 == startIP:
+                    ranges[-1] = (ranges[-1][0], endIP, countryInfo)
+                else:
+                    ranges.append((startIP, endIP, countryInfo))
+        # The bit loop visits the upper half first; fix up the order
+        # in which leaves of the same node were appended:
+        ranges.sort()
+        return ranges
+
+    # ------------- Support Methods -------------------
+
+    def gunzip(self, gzPath):
+        '''
+        Unzips gzPath next to itself, unless done before, and
+        maps the result into memory. Without write permission
+        there, the unzipped database is kept in memory instead.
+        '''
+        mmdbPath = gzPath[:-len('.gz')]
+        if not os.path.exists(mmdbPath) or os.path.getmtime(mmdbPath) < os.path.getmtime(gzPath):
+            tmpPath = '%s.%d.tmp' % (mmdbPath, os.getpid())
+            try:
+                with gzip.open(gzPath, 'rb') as gzFd:
+                    with open(tmpPath, 'wb') as fd:
+                        shutil.copyfileobj(gzFd, fd)
+                os.rename(tmpPath, mmdbPath)
+            except (OSError, IOError):
+                try:
+                    os.remove(tmpPath)
+                except OSError:
+                    pass
+                with gzip.open(gzPath, 'rb') as gzFd:
+                    return gzFd.read()
+        with open(mmdbPath, 'rb') as fd:
+            return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def readRecord(self, node, bit):
+        '''
+        Returns the left (bit 0) or right (bit 1) record of a search tree node.
+        '''
+        db = self.db
+        offset = node * self.nodeBytes
+        if self.recordSize == 24:
+            offset += bit * 3
+            return (ord(db[offset]) << 16) | (ord(db[offset + 1]) << 8) | ord(db[offset + 2])
+        elif self.recordSize == 28:
+            if bit == 0:
+                return ((ord(db[offset + 3]) & 0xF0) << 20) | (ord(db[offset]) << 16) | (ord(db[offset + 1]) << 8) | ord(db[offset + 2])
+            return ((ord(db[offset + 3]) & 0x0F) << 24) | (ord(db[offset + 4]) << 16) | (ord(db[offset + 5]) << 8) | ord(db[offset + 6])
+        else:
+            return struct.unpack('>I', db[offset + bit * 4:offset + bit * 4 + 4])[0]
+
+    def getRecordCountry(self, record):
+        '''
+        Returns the (2-letterCode,3-letterCode,Country) of the data
+        record a search tree record points to.
+        '''
+        countryInfo = self.recordCountries.get(record, None)
+        if countryInfo is not None:
+            return countryInfo
+        (data, offset) = self.decode(self.treeSize + record - self.nodeCount, self.dataSectionStart)  # @UnusedVariable
+        country = data.get('country', None) or data.get('registered_country', None)
+        countryInfo = UNKNOWN_COUNTRY
+        if country is not None:
+            twoLetterCountry = country.get('iso_code', None)
+            threeLetterCountry = self.threeLetterCodes.get(twoLetterCountry, None)
+            if threeLetterCountry is not None:
+                countryInfo = (twoLetterCountry, threeLetterCountry, country.get('names', {}).get('en', twoLetterCountry))
+        self.recordCountries[record] = countryInfo
+        return countryInfo
+
+    def decode(self, offset, sectionStart):
+        '''
+        Decodes the data field at offset. Pointers are
+        relative to sectionStart. Strings are returned
+        as UTF-8 encoded str.
+
+        :return: the field value, and the offset following the field
+        :rtype: (<any>, int)
+        '''
+        db = self.db
+        ctrl = ord(db[offset])
+        offset += 1
+        fieldType = ctrl >> 5
+        if fieldType == MMDBCountryDict.POINTER:
+            pointerSize = (ctrl >> 3) & 0x3
+            pointer = ctrl & 0x7 if pointerSize < 3 else 0
+            for i in range(pointerSize + 1):  # @UnusedVariable
+                pointer = (pointer << 8) | ord(db[offset])
+                offset += 1
+            pointer += (0, 2048, 526336, 0)[pointerSize]
+            (value, nextOffset) = self.decode(sectionStart + pointer, sectionStart)  # @UnusedVariable
+            return (value, offset)
+        if fieldType == 0:
+            fieldType = 7 + ord(db[offset])
+            offset += 1
+        size = ctrl & 0x1f
+        if size >= 29:
+            sizeBytes = size - 28
+            size = (29, 285, 65821)[sizeBytes - 1]
+            extra = 0
+            for i in range(sizeBytes):  # @UnusedVariable
+                extra = (extra << 8) | ord(db[offset])
+                offset += 1
+            size += extra
+
+        if fieldType == MMDBCountryDict.MAP:
+            value = {}
+            for i in range(size):  # @UnusedVariable
+                (key, offset) = self.decode(offset, sectionStart)
+                (value[key], offset) = self.decode(offset, sectionStart)
+            return (value, offset)
+        if fieldType == MMDBCountryDict.ARRAY:
+            value = []
+            for i in range(size):  # @UnusedVariable
+                (item, offset) = self.decode(offset, sectionStart)
+                value.append(item)
+            return (value, offset)
+        if fieldType == MMDBCountryDict.BOOLEAN:
+            return (size != 0, offset)
+        fieldBytes = db[offset:offset + size]
+        offset += size
+        if fieldType in (MMDBCountryDict.UTF8_STRING, MMDBCountryDict.BYTES):
+            return (fieldBytes, offset)
+        if fieldType == MMDBCountryDict.DOUBLE:
+            return (struct.unpack('>d', fieldBytes)[0], offset)
+        if fieldType == MMDBCountryDict.FLOAT:
+            return (struct.unpack('>f', fieldBytes)[0], offset)
+        if fieldType in (MMDBCountryDict.UINT16, MMDBCountryDict.UINT32, MMDBCountryDict.UINT64, MMDBCountryDict.UINT128, MMDBCountryDict.INT32):
+            value = 0
+            for char in fieldBytes:
+                value = (value << 8) | ord(char)
+            if fieldType == MMDBCountryDict.INT32 and size == 4 and value >= 1 << 31:
+                value -= 1 << 32
+            return (value, offset)
+        raise ValueError('Unsupported MaxMind DB field type %d at offset %d' % (fieldType, offset))
+
 
 if __name__ == '__main__':
     #lookup = IpCountryDict('ipToCountrySoftware77DotNet.csv')
@@ -160,10 +547,10 @@ if __name__ == '__main__':
     #*****lookup.assertEqual((twoLetter,threeLetter,country),('US','USA','United States'))
     print('%s, %s, %s' % (twoLetter,threeLetter,country))
     (twoLetter,threeLetter,country) = lookup.lookupIP('5.96.4.5')
-    print('%s, %s, %s' % (twoLetter,threeLetter,country)) 
+    print('%s, %s, %s' % (twoLetter,threeLetter,country))
     (twoLetter,threeLetter,country) = lookup.lookupIP('91.96.4.5')
-    print('%s, %s, %s' % (twoLetter,threeLetter,country)) 
+    print('%s, %s, %s' % (twoLetter,threeLetter,country))
     (twoLetter,threeLetter,country) = lookup.lookupIP('105.48.87.6')
-    print('%s, %s, %s' % (twoLetter,threeLetter,country)) 
-    
-    
\ No newline at end of file
+    print('%s, %s, %s' % (twoLetter,threeLetter,country))
+
+
@@ -0,0 +1,65 @@
+'''
+Created on Oct 18, 2026
+
+Decodes the JSON of tracking log lines with the fastest
+decoder module that is installed.
+'''
+import json
+import json.scanner
+
+
+# Decoder modules in order of preference, fastest first.
+# ujson and simplejson are optional:
+DECODER_PREFERENCE = ['ujson', 'json', 'simplejson']
+
+class JSONDecoder(object):
+    '''
+    Wraps the loads() of one JSON decoder module. All decoders
+    raise ValueError for ill formed JSON, and TypeError when
+    given something other than a string, as json.loads() does.
+    '''
+
+    def __init__(self, moduleName=None):
+        '''
+        :param moduleName: one of DECODER_PREFERENCE. Default: the
+               first of those that is installed. The stdlib json
+               only comes before simplejson if it has its C scanner.
+        :type moduleName: {String | None}
+        @raise ValueError: if the named decoder module is not installed
+        '''
+        if moduleName is None:
+            available = JSONDecoder.availableDecoders()
+            if 'json' in available and json.scanner.c_make_scanner is None and 'simplejson' in available:
+                available.remove('json')
+            moduleName = available[0]
+        elif moduleName not in JSONDecoder.availableDecoders():
+            raise ValueError("JSON decoder '%s' is not installed; available: %s" % (moduleName, JSONDecoder.availableDecoders()))
+        self.name = moduleName
+        module = __import__(moduleName)
+        if moduleName == 'ujson':
+            # ujson's default float parsing may round
+            # differently from json's; precise_float does not:
+            try:
+                module.loads('0.1', precise_float=True)
+                self.loads = lambda jsonStr: module.loads(jsonStr, precise_float=True)
+            except TypeError:
+                self.loads = module.loads
+        else:
+            self.loads = module.loads
+
+    @staticmethod
+    def availableDecoders():
+        '''
+        Returns the names of the decoder modules that are installed,
+        in order of preference.
+
+        :rtype: [String]
+        '''
+        available = []
+        for moduleName in DECODER_PREFERENCE:
+            try:
+                __import__(moduleName)
+            except ImportError:
+                continue
+            available.append(moduleName)
+        return available
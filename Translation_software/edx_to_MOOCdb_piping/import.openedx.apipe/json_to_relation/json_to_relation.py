@@ -27,11 +27,10 @@ Modifications:
                   is ISO compliant.
 '''
 
-from cStringIO import StringIO
-from collections import OrderedDict
-import copy
+from collections import OrderedDict, deque
 import logging
 import math
+import multiprocessing
 import os
 import re
 import shutil
@@ -76,10 +75,17 @@ class JSONToRelation(object):
     # down like this:
     MAX_ALLOWED_PACKET_SIZE = 1000000; 
     
+    # Precedes each tuple of the VALUES part of INSERT statements,
+    # but the first, which gets it without the comma:
+    VALUE_TUPLE_SEPARATOR = ',\n    '
 
     # Remember whether logging has been initialized (class var!):
     loggingInitialized = False
     logger = None
+
+    # In the worker processes of convertInBatches(): list to which
+    # pushToTable() appends rows, rather than writing them out:
+    collectedRows = None
         
     def __init__(self, 
                  jsonSource, 
@@ -122,7 +128,7 @@ class JSONToRelation(object):
         they wish.
         
         :param jsonSource: subclass of InputSource that wraps containing JSON structures, or a URL to such a source
-        :type jsonSource: {InPipe | InString | InURI | InMongoDB} (InMongoDB not implemented)
+        :type jsonSource: {InPipe | InString | InURI | InMongoDB}
         :param destination: instruction to were resulting rows are to be directed
         :type destination: {OutputPipe | OutputFile }
         :param schemaHints: Dict mapping col names to data types (optional). Affects the default (main) table.
@@ -175,16 +181,21 @@ class JSONToRelation(object):
         # Current table for which insert values are being collected:
         self.currOutTable = None
         
-        # Insert values so far (array of value arrays):
-        self.currValsArray = []
+        # Insert values so far, each row already formatted
+        # as a VALUES tuple. Ex.: ["('foo',10)", "('bar',20)"]:
+        self.currValueTuples = []
         
         # Column names for which INSERT values are being collected.
         # Ex.: 'col1,col2':
         self.currInsertSig = None
         
-        # Current approximate len of INSERT statement 
-        # for cached values:
+        # Current len of the VALUES part of the INSERT
+        # statement for cached values:
         self.valsCacheSize = 0;
+        
+        # Per-column value formatters for each (tableName, insertSig);
+        # see formatValueTuple():
+        self.valueTupleFormatters = {}
 
         # Count JSON objects (i.e. JSON file lines) as they are passed
         # to us for parsing. Used for logging malformed entries:
@@ -340,7 +351,7 @@ class JSONToRelation(object):
             colDataType = userDefinedHintType
         self.destination.ensureColExistence(colName, colDataType, self, tableName)
 
-    def convert(self, prependColHeader=False):
+    def convert(self, prependColHeader=False, processes=None, batchSize=1000):
         '''
         Main user-facing API method. Read from the JSON source establish
         in the __init__() call. Create a MySQL schema as the JSON is read.
@@ -353,9 +364,26 @@ class JSONToRelation(object):
                 completed column name header row to the final destination that was specified
                 by the client. 
         :type prependColHeader: Boolean
-        '''
+        :param processes: if not None, number of worker processes among which batches of
+                JSON objects are spread. See convertInBatches(). The parser must support
+                this (see GenericJSONParser.supportsBatchConvert). Generated keys match
+                those of a serial conversion only if the parser derives them from a seed
+                (see EdXTrackLogJSONParser.setUniqueIDSeed). Default: convert in
+                this process only.
+        :type processes: {int | None}
+        :param batchSize: number of JSON objects per batch when processes is given.
+        :type batchSize: int
+        @raise ValueError: if processes is given, and the parser does not support batches,
+                or if the source hands over dicts, which the parser does not accept.
+        '''
+        if processes is not None and not self.jsonParserInstance.supportsBatchConvert:
+            raise ValueError("Parser %s cannot convert in several processes." % type(self.jsonParserInstance).__name__)
+        if self.jsonSource.yieldDicts and not self.jsonParserInstance.acceptsDicts:
+            raise ValueError("Parser %s cannot take the dicts of source %s; have the source yield JSON lines." % 
+                             (type(self.jsonParserInstance).__name__, self.jsonSource.getSourceName()))
         savedFinalOutDest = None
-        if self.destination.getOutputFormat() != self.destination.OutputFormat.SQL_INSERT_STATEMENTS: 
+        if self.destination.getOutputFormat() == self.destination.OutputFormat.CSV or\
+           self.destination.getOutputFormat() == self.destination.OutputFormat.SQL_INSERTS_AND_CSV: 
             if prependColHeader:
                 savedFinalOutDest = self.destination
                 tmpFd  = tempfile.NamedTemporaryFile(suffix='.csv',prefix='jsonToRelationTmp')
@@ -367,26 +395,11 @@ class JSONToRelation(object):
                 savedFinalOutDest.copySchemas(self.destination)
 
         with self.destination as outFd, self.jsonSource as inFd:
-            for jsonStr in inFd:
-                # Skip empty rows:
-                if jsonStr == '\n' or len(jsonStr) == 0:
-                    continue
-                newRow = []
-                try:
-                    # processOneJSONObject will call pushtToTable() for all 
-                    # tables necessary for each event type. The method will
-                    # direct the top level event information to the table
-                    # called self.mainTableName.
-                    self.jsonParserInstance.processOneJSONObject(jsonStr, newRow)
-                except (ValueError, KeyError) as e:
-                    JSONToRelation.logger.warn('Line %s: bad JSON object: %s' % (self.makeFileCitation(), `e`))
-                    #***************
-                    # Uncomment to get stacktrace for the above caught errors:
-                    #import sys
-                    #import traceback
-                    #traceback.print_tb(sys.exc_info()[2])
-                    #***************
-                self.bumpLineCounter()
+            if processes is None:
+                for jsonStr in inFd:
+                    self.convertOneLine(jsonStr)
+            else:
+                self.convertInBatches(inFd, outFd, processes, batchSize)
 
             # Since we hold back SQL insertion values to include them
             # all into one INSERT statement, need to flush after last
@@ -425,6 +438,106 @@ class JSONToRelation(object):
                     pass
                 
 
+    def convertOneLine(self, jsonStr):
+        '''
+        Converts one line of the JSON source. Bad JSON objects
+        are logged, and skipped.
+
+        :param jsonStr: one line of the JSON source
+        :type jsonStr: String
+        '''
+        # Skip empty rows:
+        if jsonStr == '\n' or len(jsonStr) == 0:
+            return
+        newRow = []
+        try:
+            # processOneJSONObject will call pushtToTable() for all 
+            # tables necessary for each event type. The method will
+            # direct the top level event information to the table
+            # called self.mainTableName.
+            self.jsonParserInstance.processOneJSONObject(jsonStr, newRow)
+        except (ValueError, KeyError) as e:
+            JSONToRelation.logger.warn('Line %s: bad JSON object: %s' % (self.makeFileCitation(), `e`))
+            #***************
+            # Uncomment to get stacktrace for the above caught errors:
+            #import sys
+            #import traceback
+            #traceback.print_tb(sys.exc_info()[2])
+            #***************
+        self.bumpLineCounter()
+
+    def convertInBatches(self, inFd, outFd, processes, batchSize):
+        '''
+        The conversion loop of convert() when work is spread over several
+        processes. This process reads the JSON source, and hands batches
+        of batchSize lines to a pool of worker processes. Each worker starts 
+        out with a copy of this converter and its parser, and converts
+        the lines of a batch with convertOneLine(). The rows come back here,
+        where the parser's mergeBatch() settles what depends on earlier
+        batches. They are then written to outFd in the order of the source,
+        as a serial conversion would.
+
+        :param inFd: the open JSON source
+        :type inFd: InputSource
+        :param outFd: the open destination
+        :type outFd: OutputDisposition
+        :param processes: number of worker processes
+        :type processes: int
+        :param batchSize: number of JSON objects per batch
+        :type batchSize: int
+        '''
+        outFd.flush()
+        pool = multiprocessing.Pool(processes, initializer=initBatchWorker, initargs=(self,))
+        try:
+            batchesInFlight = deque()
+            for batch in self.readBatches(inFd, batchSize):
+                batchesInFlight.append(pool.apply_async(convertBatch, (batch,)))
+                # Bound the number of batches in flight, so that a large
+                # source is never held in memory all at once:
+                if len(batchesInFlight) >= 2 * processes:
+                    self.writeBatchRows(batchesInFlight.popleft().get(), outFd)
+            while len(batchesInFlight) > 0:
+                self.writeBatchRows(batchesInFlight.popleft().get(), outFd)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def readBatches(self, inFd, batchSize):
+        '''
+        Generator of the batches of convertInBatches(): pairs of the
+        number of JSON objects before the batch, and the list of the
+        batch's lines. Empty lines are left out.
+        '''
+        linesBefore = 0
+        lines = []
+        for jsonStr in inFd:
+            if jsonStr == '\n' or len(jsonStr) == 0:
+                continue
+            lines.append(jsonStr)
+            if len(lines) >= batchSize:
+                yield (linesBefore, lines)
+                linesBefore += len(lines)
+                lines = []
+        if len(lines) > 0:
+            yield (linesBefore, lines)
+
+    def writeBatchRows(self, batchResult, outFd):
+        '''
+        Writes the rows of one batch converted by convertBatch().
+
+        :param batchResult: rows, parser state, and line counter at the end of the batch
+        :type batchResult: ([<any>], <any>, int)
+        :param outFd: the open destination
+        :type outFd: OutputDisposition
+        '''
+        (rows, batchState, lineCounter) = batchResult
+        for row in self.jsonParserInstance.mergeBatch(rows, batchState):
+            self.processFinishedRow(row, outFd)
+        self.lineCounter = lineCounter
+
     def pushString(self, whatToWrite):
         '''
         Pushes the given string straight to the output (pipe or file).
@@ -452,6 +565,12 @@ class JSONToRelation(object):
         #if row.count('eventID') > 1:
         #    raise ValueError("Found it!: %s" % self.tmpJSONStr)
         #****************************        
+        if self.collectedRows is not None:
+            # In a worker process of convertInBatches(): the rows go back
+            # to the parent. Value arrays are copied, as prepareMySQLRow()
+            # does when it holds them back:
+            self.collectedRows.append((row[0], row[1], list(row[2])) if isinstance(row, tuple) else list(row))
+            return
         if outFd is None:
             outFd = self.destination
         self.processFinishedRow(row, outFd)
@@ -481,12 +600,29 @@ class JSONToRelation(object):
         # information than CSV destined parsers. MySQL dumps provide
         # a list ('tableName', 'insertSig', [valsArray]), while the
         # others produce just an array of values:
+        csvRowsWritten = False
         if isinstance(filledNewRow, tuple) or filledNewRow == "FLUSH":
-            # Calling parser created INSERT statements:
+            # Calling parser created INSERT statements. If the destination
+            # takes CSV rows, hand them over directly, rather than having 
+            # the destination take apart the INSERT statements built below:
+            if outFd.acceptsValueRows():
+                csvRowsWritten = True
+                if isinstance(filledNewRow, tuple):
+                    try:
+                        outFd.writeValuesRow(filledNewRow[0], filledNewRow[2], filledNewRow[1])
+                    except Exception as e:
+                        JSONToRelation.logger.warn('Error during writeValuesRow() call in json_to_relation.processFinishRow(): %s' % `e`)
+                    if outFd.getOutputFormat() == OutputDisposition.OutputFormat.CSV or\
+                       outFd.getOutputFormat() == OutputDisposition.OutputFormat.COLUMNAR:
+                        # No INSERT statements wanted:
+                        return
             filledNewRow = self.prepareMySQLRow(filledNewRow)
         if filledNewRow is not None:
             try:
-                outFd.writerow(filledNewRow)
+                if csvRowsWritten:
+                    outFd.writerow(filledNewRow, csvRowsWritten=True)
+                else:
+                    outFd.writerow(filledNewRow)
             except Exception as e:
                 JSONToRelation.logger.warn('Error during writerow() call in json_to_relation.processFinishRow(): %s' % `e`)
 
@@ -516,64 +652,48 @@ class JSONToRelation(object):
             else:
                 raise ValueError('Bad argument to prepareMySQLRow: %s' % str(insertInfo))
 
-        # Compute approximate new size of hold-back buffer with these new values:
-        newCacheSize = self.valsCacheSize + self.calculateHeldBackDataSize(valsArray)
+        # Format the values right away, rather than copying the
+        # array: valsArray is passed by reference, and subsequent
+        # changes would overwrite the cache:
+        valueTuple = self.formatValueTuple(tableName, insertSig, valsArray)
+        # Bytes the values add to the VALUES part, separator included.
+        # Non-ASCII characters of unicode values take several UTF-8 bytes:
+        if isinstance(valueTuple, unicode):
+            valueTupleSize = len(valueTuple.encode('utf-8')) + len(JSONToRelation.VALUE_TUPLE_SEPARATOR)
+        else:
+            valueTupleSize = len(valueTuple) + len(JSONToRelation.VALUE_TUPLE_SEPARATOR)
         
         # Have we started accumulating values in an earlier call?
-        if self.currInsertSig is not None: 
-            if tableName == self.currOutTable and insertSig == self.currInsertSig:
-                if newCacheSize > JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
-                    # New vals could be held back, but buffer is full:
-                    # Construct INSERT statement from the cached values:
-                    insertStatement = self.finalizeInsertStatement()
-                    # Start accumulating values for this new INSERT request:
-                    self.currOutTable = tableName
-                    self.currInsertSig = insertSig
-                    self.currValsArray.append(copy.copy(valsArray))
-                    return insertStatement
-                else:
-                    # Can hold back the new values:
-                    self.valsCacheSize = newCacheSize
-                    self.currValsArray.append(copy.copy(valsArray))
-                    return None
-            else:
-                # Were accumulating vals, but this call is for a different
-                # table or set of columns:
-                insertStatement = self.finalizeInsertStatement()
-                # Start accumulating values for this new INSERT request:
-                self.currOutTable = tableName
-                self.currInsertSig = insertSig
-                # Copy the array into the cache buffer: valsArray
-                # is passed by reference, and subsequent changes
-                # would overwrite the cache. Shallow copy suffices,
-                # because all row values are base types:
-                self.currValsArray = [copy.copy(valsArray)]
-                return insertStatement
-            
-        # We have not yet started to accumulate values:
-        else:
-            # If even the first INSERT values are too big for
+        if self.currInsertSig is not None:
+            if tableName == self.currOutTable and insertSig == self.currInsertSig and \
+               self.valsCacheSize + valueTupleSize <= JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
+                # Can hold back the new values:
+                self.valsCacheSize += valueTupleSize
+                self.currValueTuples.append(valueTuple)
+                return None
+            # Were accumulating vals, but this call is for a different
+            # table or set of columns, or the buffer is full: construct 
+            # INSERT statement from the cached values:
+            insertStatement = self.finalizeInsertStatement()
+        elif valueTupleSize > JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
+            # Even the first INSERT values are too big for
             # the empty hold-back buffer: just send the INSERT
             # right away:
-            if newCacheSize > JSONToRelation.MAX_ALLOWED_PACKET_SIZE:
-                valuesPartFileStr = self.constructValuesStr(valsArray)
-                insertStatement = "INSERT INTO %s (%s) VALUES %s;" % (tableName, insertSig, valuesPartFileStr.getvalue())
-                return insertStatement
-            # Hold back the new values:
-            self.valsCacheSize = newCacheSize
-            self.currOutTable = tableName
-            self.currInsertSig = insertSig
-            # Copy the array into the cache buffer: valsArray
-            # is passed by reference, and subsequent changes
-            # would overwrite the cache. Shallow copy suffices,
-            # because all row values are base types:
-            self.currValsArray = [copy.copy(valsArray)]
-            return None
+            return "INSERT INTO %s (%s) VALUES %s;" % (tableName, insertSig, JSONToRelation.VALUE_TUPLE_SEPARATOR[1:] + valueTuple)
+        else:
+            insertStatement = None
+        
+        # Start accumulating values for this new INSERT request:
+        self.currOutTable = tableName
+        self.currInsertSig = insertSig
+        self.currValueTuples.append(valueTuple)
+        self.valsCacheSize = valueTupleSize
+        return insertStatement
          
     def finalizeInsertStatement(self):
         '''
         Create a possibly multivalued INSERT statement from what is
-        stored in self.currOutTable, self.currInsertSig, and self.currValsArray.
+        stored in self.currOutTable, self.currInsertSig, and self.currValueTuples.
         Example return::
         
            INSERT INTO myTable (col2, col2) VALUES
@@ -585,68 +705,55 @@ class JSONToRelation(object):
         '''
         
         try:
-            if len(self.currValsArray) == 0:
+            if len(self.currValueTuples) == 0:
                 # Nothing to INSERT:
                 res = None
                 return res
             
-            valsFileStr = self.constructValuesStr(self.currValsArray)
-            
-            res = "INSERT INTO %s (%s) VALUES %s;" % (self.currOutTable, self.currInsertSig, valsFileStr.getvalue())
+            res = "INSERT INTO %s (%s) VALUES %s%s;" % (self.currOutTable, 
+                                                       self.currInsertSig, 
+                                                       JSONToRelation.VALUE_TUPLE_SEPARATOR[1:],
+                                                       JSONToRelation.VALUE_TUPLE_SEPARATOR.join(self.currValueTuples))
         finally:
             # We are no longer accumulating INSERT values right now:
             self.currOutTable = None
             self.currInsertSig = None
-            self.currValsArray = []
-            self.insertValCacheSize = 0
+            self.currValueTuples = []
+            self.valsCacheSize = 0
             return res
 
-    def constructValuesStr(self, valsArrays):
-        '''
-        Takes an array of arrays that hold the values to use in 
-        an INSERT statement. Ex: [['foo',10],['bar',20]]. Returns
-        a StringIO string file containing a legal INSERT statement's
-        VALUES part: ('foo',10),('bar',20)
-
-        :param valsArrays: array of values arrays
-        :type valsArrays: [[<any>]]
-        :return: IOString string file with legal VALUES section of INSERT statement
-
-        :rtype: IOString
-        '''
-        # Build the values part:
-        valsFileStr = StringIO()
-        # Avoid putting anything into the 
-        # file string in the nested loop below, so
-        # that noting needs to be stripped
-        # out afterwards; avoids a string copy.
-        # Not sure whether this optimization is
-        # needed, but there it is:
-        isFirstValTuple = True
-        isFirstVal = True
-        for insertVals in valsArrays:
-            if isFirstValTuple:
-                valsFileStr.write('\n    (')
-                isFirstValTuple = False
-            else:
-                valsFileStr.write(',\n    (')
-            for insertVal in insertVals:
-                if isFirstVal:
-                    isFirstVal = False
-                else:
-                    valsFileStr.write(str(','))
-                # Ensure that strings get a quote char arround them, except
-                # for 'null', which needs to be written without quotes:
-                if insertVal == 'null':
-                    valsFileStr.write(insertVal)
-                # Turn 'None' entries from JSON-converted empty JSON flds to null: 
-                elif insertVal == None:
-                    valsFileStr.write('null')
-                else:
-                    valsFileStr.write("'" + insertVal + "'" if isinstance(insertVal,basestring) else str(insertVal))
-            valsFileStr.write(')')
-            isFirstVal = True
-        return valsFileStr
+    def formatValueTuple(self, tableName, insertSig, valsArray):
+        '''
+        Turns one array of values to INSERT into the tuple of 
+        an INSERT statement's VALUES part. Ex: ['foo',10] returns
+        "('foo',10)". Each value is formatted as OutputDisposition.valueStr()
+        does, by a formatter picked once per column from the column's
+        ColumnSpec (see OutputDisposition.valueFormatter()). 
+
+        :param tableName: name of the table the values go into
+        :type tableName: String
+        :param insertSig: comma separated names of the columns of the values
+        :type insertSig: String
+        :param valsArray: values to INSERT
+        :type valsArray: [<any>]
+        :return: the VALUES tuple
+        :rtype: String
+        '''
+        try:
+            formatters = self.valueTupleFormatters[(tableName, insertSig)]
+        except KeyError:
+            formatters = []
+            for colName in insertSig.split(','):
+                try:
+                    colDataType = self.getSchemaHint(colName.strip(), tableName).colDataType
+                except KeyError:
+                    colDataType = None
+                formatters.append(OutputDisposition.valueFormatter(colDataType))
+            self.valueTupleFormatters[(tableName, insertSig)] = formatters
+        if len(formatters) != len(valsArray):
+            valueStr = OutputDisposition.valueStr
+            return '(' + ','.join([valueStr(insertVal) for insertVal in valsArray]) + ')'
+        return '(' + ','.join([formatter(insertVal) for (formatter, insertVal) in zip(formatters, valsArray)]) + ')'
 
     def getSchema(self, tableName=None):
         '''
@@ -692,25 +799,6 @@ class JSONToRelation(object):
     def bumpNextNewColPos(self):
         self.nextNewColPos += 1
 
-    def calculateHeldBackDataSize(self, valueArray):
-        '''
-        Computes number of ASCII bytes needed for the
-        values in the given array. Used to estimate 
-        when held-back INSERT data needs to be flushed
-        to server. Ex: ['foo', 10] returns 7.
-        
-        :param valueArray: array of mixed-type values to be INSERTed into MySQL at some point
-        :type valueArray: [<any>]
-        '''
-        arrSize = 0
-        for val in valueArray:
-            arrSize += len(str(val))
-        # Add bytes for commas, spaces after the commas, and
-        # a pair of quotes around strings (assume worst case of
-        # every value being a string:
-        arrSize += 4*len(valueArray)
-        return arrSize
-    
     def ensureLegalIdentifierChars(self, proposedMySQLName):
         '''
         Given a proposed MySQL identifier, such as a column name,
@@ -751,6 +839,39 @@ class JSONToRelation(object):
     def bumpLineCounter(self):
         self.lineCounter += 1
         
+# The converter of a worker process of JSONToRelation.convertInBatches():
+batchConverter = None
+
+def initBatchWorker(converter):
+    '''
+    Initializer of the worker processes of JSONToRelation.convertInBatches().
+    Worker processes are forked, so the converter is this process' copy of
+    the parent's.
+    '''
+    global batchConverter
+    batchConverter = converter
+    converter.jsonParserInstance.prepareBatchWorker()
+
+def convertBatch(batch):
+    '''
+    Converts one batch of JSONToRelation.readBatches() in a worker process.
+
+    :return: the rows of the batch, the parser's state at its end (see
+             GenericJSONParser.endBatch()), and the converter's line counter.
+    :rtype: ([<any>], <any>, int)
+    '''
+    (linesBefore, lines) = batch
+    converter = batchConverter
+    parser = converter.jsonParserInstance
+    converter.collectedRows = []
+    try:
+        parser.startBatch(linesBefore)
+        for jsonStr in lines:
+            converter.convertOneLine(jsonStr)
+        return (converter.collectedRows, parser.endBatch(), converter.lineCounter)
+    finally:
+        converter.collectedRows = None
+
 if __name__ == "__main__":
     # Just have this main to test the imports
     print("I ran.")
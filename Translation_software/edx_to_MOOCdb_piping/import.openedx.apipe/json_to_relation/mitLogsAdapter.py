@@ -10,6 +10,9 @@ def format_timestamp(jsonobject):
             time_obj = datetime.datetime.fromtimestamp(timestamp)
             time_formatted = time_obj.strftime('%Y-%m-%dT%H:%M:%S.%f') 
             jsonobject['time'] = time_formatted
+        elif isinstance(time, datetime.datetime):
+            # BSON date of a document read from MongoDB:
+            jsonobject['time'] = time.strftime('%Y-%m-%dT%H:%M:%S.%f')
     
 
 
@@ -13,8 +13,12 @@ import json
 import os
 import cPickle
 import re
+import sqlite3
 import subprocess
 
+from courseNameMatcher import CourseNameMatcher
+from modulestoreIndex import ModulestoreIndex
+
 class ModulestoreImporter(DictMixin):
     '''
     Imports the result of a query to the modulestore (descriptions of OpenEdx courses).
@@ -51,14 +55,27 @@ class ModulestoreImporter(DictMixin):
     '''
 
     hashLookupCache = None
+    
+    # CourseNameMatcher over the short course names, shared
+    # by all instances with the same course name lookup:
+    courseNameMatcherCache = None
+    
+    # ModulestoreIndex instances shared by all instances, by index path
+    # and process id (SQLite connections must not cross a fork):
+    modulestoreIndexCache = {}
 
-    def __init__(self, jsonFileName, useCache=True, pickleCachePath=None, parent=None):
+    def __init__(self, jsonFileName, useCache=True, pickleCachePath=None, parent=None, indexPath=None):
         '''
         Prepares instance for subsequent calls to getDisplayName() or
         export(). Preparations include looking for either the given file
         name, if useCache is False, or the cache file, which is a pickled
         Python dict containing OpenEdx hash codes to display_name mappings
         is missing, then the modulestore is refreshed from S3.
+        
+        Whenever the JSON file exists, its parsed content is taken from
+        an SQLite index next to it (see ModulestoreIndex). The index is
+        only rebuilt when the content of the JSON file changes, so that
+        instantiation normally takes milliseconds.
 
         :param jsonFileName: file path to JSON file that contains an excerpt
                     of modulestore, the OpenEdx course db. This file is
@@ -81,6 +98,8 @@ class ModulestoreImporter(DictMixin):
                methods logInfo(), logWarn(), logDebug(), and logError(). If this
                argument is left at None, no logging is done.
         :type parent: GenericJSONParser
+        :param indexPath: SQLite index of the JSON file. Default: jsonFileName + '.sqlite'
+        :type indexPath: String
         @raise OSError: when there is a problem calling the cronRefreshModuleStore.sh script.
         @raise ValueError: when modulestore JSON could not be parsed.
         '''
@@ -126,6 +145,11 @@ class ModulestoreImporter(DictMixin):
         # that start with '#':
         self.legalJSONStartPattern = re.compile('^([\s]*[#][^\n]*\n)*[\s]*[{]')
         
+        if os.path.exists(str(jsonFileName)):
+            self.indexPath = indexPath if indexPath is not None else jsonFileName + '.sqlite'
+            self.loadModstoreIndex()
+            return
+        
         cacheAccessSucceeded = True
         # Get dict {"all" : [{...}, {...},...]}
         if useCache:
@@ -172,6 +196,29 @@ class ModulestoreImporter(DictMixin):
             return None
         return infoDict['display_name']
     
+    def getCourseNameMatcher(self):
+        '''
+        Returns a CourseNameMatcher over all short course names,
+        longest names first. The matcher is built once, and only
+        rebuilt when the short-to-canonical course name lookup
+        changes, such as after a reload of the modulestore.
+
+        :return: a matcher whose longestMatch() finds the longest short course name in a string
+        :rtype: CourseNameMatcher
+        '''
+        if self.courseNameMatcher is not None:
+            return self.courseNameMatcher
+        cachedMatcher = ModulestoreImporter.courseNameMatcherCache
+        if cachedMatcher is not None and cachedMatcher[0] == self.courseNameLookup:
+            self.courseNameMatcher = cachedMatcher[1]
+            return self.courseNameMatcher
+        # Sort by decreasing length, so that short names like 'db',
+        # which easily match within hash strings, only win if no
+        # longer name is found:
+        self.courseNameMatcher = CourseNameMatcher(sorted(self.keys(), key=len, reverse=True))
+        ModulestoreImporter.courseNameMatcherCache = (dict(self.courseNameLookup), self.courseNameMatcher)
+        return self.courseNameMatcher
+
     def getOrg(self, hashStr):
         '''
         Given a 32-bit OpenEdx hash string, return
@@ -319,15 +366,44 @@ class ModulestoreImporter(DictMixin):
     
     def __setitem__(self, course_short_name, canonName):
         self.courseNameLookup[course_short_name] = canonName
+        self.courseNameMatcher = None
     
     def __delitem__(self, course_short_name):
         del self.courseNameLookup[course_short_name]
+        self.courseNameMatcher = None
     
     def keys(self):
         return self.courseNameLookup.keys()
     
     # ------------- Support Methods -------------------
  
+    def loadModstoreIndex(self):
+        '''
+        Points self.hashLookup at the ModulestoreIndex of the JSON
+        file, and loads self.courseNameLookup from it. If the index
+        is missing or stale, the JSON file is parsed, and the index
+        rebuilt. The pickle cache is then refreshed as well.
+        '''
+        cacheKey = (self.indexPath, os.getpid())
+        modstoreIndex = ModulestoreImporter.modulestoreIndexCache.get(cacheKey, None)
+        if modstoreIndex is None and os.path.exists(self.indexPath):
+            try:
+                modstoreIndex = ModulestoreIndex(self.indexPath)
+            except sqlite3.Error as e:
+                self.logInfo("Ignoring unreadable modulestore index %s: %s" % (self.indexPath, `e`))
+        if modstoreIndex is None or not modstoreIndex.isCurrent(self.jsonFileName):
+            self.logInfo("Building modulestore index %s from %s" % (self.indexPath, self.jsonFileName))
+            self.loadModstoreFromJSON()
+            with open(self.pickleCachePath, 'w') as pickleFd:
+                cPickle.dump(self.hashLookup, pickleFd)
+            ModulestoreImporter.hashLookupCache = self.hashLookup
+            modstoreIndex = ModulestoreIndex.build(self.indexPath, self.jsonFileName, self.hashLookup, self.courseNameLookup)
+        ModulestoreImporter.modulestoreIndexCache[cacheKey] = modstoreIndex
+        self.hashLookup = modstoreIndex
+        self.courseNameLookup = modstoreIndex.getCourseNameLookup()
+        # Built on demand by getCourseNameMatcher():
+        self.courseNameMatcher = None
+ 
     def importModstore(self, jsonFileName):
         '''
         Connects to S3 modulestore MongoDB and loads an
@@ -448,6 +524,8 @@ class ModulestoreImporter(DictMixin):
         entry.
         '''
         self.courseNameLookup = {}
+        # Built on demand by getCourseNameMatcher():
+        self.courseNameMatcher = None
         for infoDictID in self.hashLookup.keys():
             infoDict = self.hashLookup[infoDictID]
             if infoDict.get('category', None) != 'course':
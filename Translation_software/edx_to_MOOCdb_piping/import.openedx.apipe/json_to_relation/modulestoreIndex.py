@@ -0,0 +1,163 @@
+'''
+Created on Oct 17, 2026
+
+Persistent index of a modulestore excerpt, as parsed by
+ModulestoreImporter, in an SQLite file next to the excerpt.
+'''
+from UserDict import DictMixin
+import hashlib
+import os
+import sqlite3
+
+
+class ModulestoreIndex(DictMixin):
+    '''
+    Read-only view of the OpenEdx hash --> info dict and of the
+    short course name --> canonical course name dict that
+    ModulestoreImporter builds from a modulestore JSON excerpt.
+
+    The index is keyed by the MD5 of the JSON file's content, and
+    is only rebuilt when that content changes. To keep checks cheap,
+    the file's size and modification time are recorded as well: the
+    content is only hashed again when they differ. A rebuild writes
+    a new file, and renames it over the old one, so that concurrent
+    processes keep reading a consistent index.
+
+    Instances act like the hash --> info dict. Entries are fetched
+    on demand, and kept in memory once fetched.
+    '''
+
+    # Bumped whenever the tables below change:
+    FORMAT_VERSION = '1'
+
+    INFO_FIELDS = ['org', 'course_short_name', 'category', 'revision', 'name', 'display_name']
+
+    def __init__(self, indexPath):
+        '''
+        Opens an existing index.
+
+        :param indexPath: SQLite file written by build()
+        :type indexPath: String
+        :raise sqlite3.Error: when the file is not an index
+        '''
+        self.indexPath = indexPath
+        self.conn = sqlite3.connect(indexPath, check_same_thread=False)
+        self.meta = dict(self.conn.execute('SELECT key, value FROM Meta').fetchall())
+        self.infoDicts = {}
+        self.allKeys = None
+
+    @classmethod
+    def contentHash(cls, jsonFileName):
+        md5 = hashlib.md5()
+        with open(jsonFileName, 'rb') as fd:
+            for chunk in iter(lambda: fd.read(1024 * 1024), ''):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    @classmethod
+    def fileStamp(cls, jsonFileName):
+        fileStat = os.stat(jsonFileName)
+        return '%d:%r' % (fileStat.st_size, fileStat.st_mtime)
+
+    def isCurrent(self, jsonFileName):
+        '''
+        Returns True if this index was built from the current
+        content of jsonFileName.
+        '''
+        if self.meta.get('format_version', None) != ModulestoreIndex.FORMAT_VERSION:
+            return False
+        fileStamp = ModulestoreIndex.fileStamp(jsonFileName)
+        if self.meta.get('file_stamp', None) == fileStamp:
+            return True
+        if self.meta.get('content_hash', None) != ModulestoreIndex.contentHash(jsonFileName):
+            return False
+        # Same content, newer file: remember the new stamp, if we may:
+        try:
+            with self.conn:
+                self.conn.execute("UPDATE Meta SET value = ? WHERE key = 'file_stamp'", (fileStamp,))
+            self.meta['file_stamp'] = fileStamp
+        except sqlite3.Error:
+            pass
+        return True
+
+    @classmethod
+    def build(cls, indexPath, jsonFileName, hashLookup, courseNameLookup):
+        '''
+        Writes the given dicts, as built by ModulestoreImporter from
+        jsonFileName, to a new index file at indexPath.
+
+        :return: the new index
+        :rtype: ModulestoreIndex
+        '''
+        contentHash = ModulestoreIndex.contentHash(jsonFileName)
+        fileStamp = ModulestoreIndex.fileStamp(jsonFileName)
+        tmpIndexPath = '%s.%d.tmp' % (indexPath, os.getpid())
+        if os.path.exists(tmpIndexPath):
+            os.remove(tmpIndexPath)
+        conn = sqlite3.connect(tmpIndexPath)
+        try:
+            conn.execute('CREATE TABLE Meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE HashInfo (id TEXT PRIMARY KEY, %s)' % ', '.join([field + ' TEXT' for field in ModulestoreIndex.INFO_FIELDS]))
+            conn.execute('CREATE TABLE CourseName (course_short_name TEXT PRIMARY KEY, course_name TEXT)')
+            conn.executemany('INSERT INTO Meta VALUES (?,?)', [('format_version', ModulestoreIndex.FORMAT_VERSION),
+                                                               ('content_hash', contentHash),
+                                                               ('file_stamp', fileStamp)])
+            conn.executemany('INSERT INTO HashInfo VALUES (?%s)' % (',?' * len(ModulestoreIndex.INFO_FIELDS)),
+                             ([key] + [infoDict[field] for field in ModulestoreIndex.INFO_FIELDS]
+                              for (key, infoDict) in hashLookup.iteritems()))
+            conn.executemany('INSERT INTO CourseName VALUES (?,?)', courseNameLookup.iteritems())
+            conn.commit()
+        finally:
+            conn.close()
+        os.rename(tmpIndexPath, indexPath)
+        return ModulestoreIndex(indexPath)
+
+    def getCourseNameLookup(self):
+        '''
+        Returns dict short course name --> canonical course name.
+        '''
+        return dict(self.conn.execute('SELECT course_short_name, course_name FROM CourseName').fetchall())
+
+    # ------------- Dict Methods -------------------
+
+    def __getitem__(self, key):
+        try:
+            infoDict = self.infoDicts[key]
+        except KeyError:
+            row = self.conn.execute('SELECT %s FROM HashInfo WHERE id = ?' % ', '.join(ModulestoreIndex.INFO_FIELDS), (key,)).fetchone()
+            # Unknown keys are remembered too, as None:
+            infoDict = self.infoDicts[key] = dict(zip(ModulestoreIndex.INFO_FIELDS, row)) if row is not None else None
+        if infoDict is None:
+            raise KeyError(key)
+        return infoDict
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def has_key(self, key):
+        return key in self
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        if self.allKeys is None:
+            # In the order of the dict the index was built from:
+            self.allKeys = [row[0] for row in self.conn.execute('SELECT id FROM HashInfo ORDER BY rowid')]
+        return list(self.allKeys)
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM HashInfo').fetchone()[0]
+
+    def __setitem__(self, key, infoDict):
+        raise TypeError('ModulestoreIndex is read-only')
+
+    def __delitem__(self, key):
+        raise TypeError('ModulestoreIndex is read-only')
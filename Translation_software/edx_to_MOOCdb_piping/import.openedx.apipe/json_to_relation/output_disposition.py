@@ -18,6 +18,29 @@ import tempfile
 from col_data_type import ColDataType
 
 
+# Columns whose values are mostly numbers; see OutputDisposition.valueFormatter():
+NUMERIC_COL_TYPES = frozenset([ColDataType.TINYINT, ColDataType.SMALLINT, ColDataType.MEDIUMINT,
+                               ColDataType.INT, ColDataType.BIGINT, ColDataType.FLOAT,
+                               ColDataType.DOUBLE, ColDataType.BOOL])
+
+def numericValueStr(val):
+    '''
+    OutputDisposition.valueStr(), for values of numeric columns
+    '''
+    valType = type(val)
+    if valType is int or valType is float or valType is long or valType is bool:
+        return str(val)
+    return OutputDisposition.valueStr(val)
+
+def stringValueStr(val):
+    '''
+    OutputDisposition.valueStr(), for values of text and other non-numeric columns
+    '''
+    valType = type(val)
+    if (valType is str or valType is unicode) and val != 'null':
+        return "'" + val + "'"
+    return OutputDisposition.valueStr(val)
+
 class OutputDisposition(object):
     '''
     Specifications for where completed relation rows
@@ -78,6 +101,50 @@ class OutputDisposition(object):
     def getOutputFormat(self):
         return self.outputFormat
 
+    def acceptsValueRows(self):
+        '''
+        Returns True if this destination takes the rows of
+        INSERT-generating parsers directly, as value arrays
+        via writeValuesRow(). Otherwise rows only arrive here
+        as INSERT statements via writerow().
+
+        :rtype: Boolean
+        '''
+        return False
+
+    @staticmethod
+    def valueStr(val):
+        '''
+        Returns one row value as it appears both in the VALUES part
+        of INSERT statements and in CSV rows: strings in single quotes,
+        other types via str(), None and 'null' as null.
+
+        :param val: one value of a row
+        :type val: <any>
+        :rtype: String
+        '''
+        if val == 'null' or val is None:
+            return 'null'
+        return "'" + val + "'" if isinstance(val, basestring) else str(val)
+
+    @staticmethod
+    def valueFormatter(colDataType):
+        '''
+        Returns a function that formats the values of a column
+        of the given type exactly as valueStr() does. It first tries
+        the value type that the column type makes likely: numbers
+        for numeric columns, strings for all others.
+
+        :param colDataType: type of the column, or None if unknown
+        :type colDataType: {ColDataType | None}
+        :rtype: function
+        '''
+        if colDataType in NUMERIC_COL_TYPES:
+            return numericValueStr
+        elif colDataType is None:
+            return OutputDisposition.valueStr
+        return stringValueStr
+
     def addSchemaHints(self, tableName, schemaHints):
         '''
         Provide a schema hint dict for the table of the given name.
@@ -185,6 +252,8 @@ class OutputDisposition(object):
         CSV = 0
         SQL_INSERT_STATEMENTS = 1
         SQL_INSERTS_AND_CSV = 2
+        # Typed column arrays per table; see columnar_output.OutputColumnar:
+        COLUMNAR = 3
             
 #--------------------- Available Output Destination Options:  
         
@@ -208,7 +277,7 @@ class OutputPipe(OutputDisposition):
     def __str__(self):
         return "<OutputPipe:<stdout>"
 
-    def writerow(self, colElementArray, tableName=None):
+    def writerow(self, colElementArray, tableName=None, csvRowsWritten=False):
         # For CSV: make sure everything is a string:
         if self.outputFormat == OutputDisposition.OutputFormat.CSV:
             row = map(str,colElementArray)
@@ -336,7 +405,7 @@ class OutputFile(OutputDisposition):
                 return None
             return fd.name
 
-    def writerow(self, colElementArray, tableName=None):
+    def writerow(self, colElementArray, tableName=None, csvRowsWritten=False):
         '''
         How I wish Python had parameter type based polymorphism. Life
         would be so much cleaner.
@@ -357,6 +426,9 @@ class OutputFile(OutputDisposition):
                   info on the destination table. INSERT statements do contain the destination table
                   name.
         :type tableName: String
+        :param csvRowsWritten: if True, the rows of a given INSERT statement already went
+                  to their CSV files via writeValuesRow(), and are not extracted again.
+        :type csvRowsWritten: Boolean
         '''
         if isinstance(colElementArray, list):
             # Simple CSV array of values; 
@@ -380,11 +452,35 @@ class OutputFile(OutputDisposition):
 
             # If we are outputting either CSV or INSERTs and CSV, do the CSV
             # part now:
-            if self.outputFormat != OutputDisposition.OutputFormat.SQL_INSERT_STATEMENTS:
+            if self.outputFormat != OutputDisposition.OutputFormat.SQL_INSERT_STATEMENTS and not csvRowsWritten:
                 # Strip the CSV parts out from the INSERT statement, which may
                 # contain multiple VALUE statements:
                 self.writeCSVRowsFromInsertStatement(colElementArray) 
         
+    def acceptsValueRows(self):
+        return self.outputFormat != OutputDisposition.OutputFormat.SQL_INSERT_STATEMENTS
+
+    def writeValuesRow(self, tableName, valsArray, insertSig=None):
+        '''
+        Writes one row of an INSERT-generating parser straight to the
+        CSV file of its table. The line is the same as the one that
+        writeCSVRowsFromInsertStatement() extracts from the VALUES
+        part of the corresponding INSERT statement.
+
+        :param tableName: table to which the row is destined
+        :type tableName: String
+        :param valsArray: the row's values
+        :type valsArray: [<any>]
+        :param insertSig: comma-separated names of the row's columns. Not 
+               needed for CSV, whose columns are in the order of the values.
+        :type insertSig: {String | None}
+        '''
+        theOutFd = self.csvTableFiles.get(tableName, None)
+        if theOutFd is None:
+            self.ensureOpenCSVOutFileFromTableName(tableName)
+            theOutFd = self.csvTableFiles[tableName]
+        theOutFd.write(','.join([OutputDisposition.valueStr(val) for val in valsArray]) + '\n')
+
     def write(self, whatToWrite):
         '''
         Write given string straight to the output. No assumption made about the format
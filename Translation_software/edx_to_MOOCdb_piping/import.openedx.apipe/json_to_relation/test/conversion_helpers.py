@@ -0,0 +1,79 @@
+'''
+Event files, and conversion helpers shared by the tests that compare
+the output of several conversions of the same events.
+'''
+import glob
+import os
+import re
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Events of many kinds, one or more per file:
+EVENT_FILES = ['aboutTest.json', 'createAccountUS.json', 'seekVideo.json', 'problemSaveTest.json',
+               'processSeq_Goto.json', 'problem_checkSimpleCase.json', 'addRemoveUserGroup.json', 'edxTrackLogSample.json']
+
+# Parts of the output that differ from one conversion to the next,
+# random keys, and the load date of LoadInfo:
+UUID_PATTERN = re.compile(r'[a-f0-9]{8}_[a-f0-9]{4}_[a-f0-9]{4}_[a-f0-9]{4}_[a-f0-9]{12}')
+LOAD_DATE_PATTERN = re.compile(r"'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9:.]+','file://")
+
+def readEvents():
+    '''
+    Returns the content of each of EVENT_FILES, without
+    leading and trailing whitespace.
+    '''
+    events = []
+    for eventFile in EVENT_FILES:
+        with open(os.path.join(DATA_DIR, eventFile)) as fd:
+            events.append(fd.read().strip())
+    return events
+
+def blankLoadDate(content):
+    return LOAD_DATE_PATTERN.sub("'<loadDate>','file://", content)
+
+def makeConverter(jsonFile, dest, uniqueIDSeed=None, **parserArgs):
+    '''
+    Returns a JSONToRelation from jsonFile to dest, and its
+    EdXTrackLogJSONParser, made with the given extra arguments.
+
+    :param uniqueIDSeed: if not None, seed of the parser's keys
+    :type uniqueIDSeed: {String | None}
+    '''
+    fileConverter = JSONToRelation(InURI(jsonFile), dest, mainTableName='EdxTrackEvent')
+    edxParser = EdXTrackLogJSONParser(fileConverter, 'EdxTrackEvent', replaceTables=True, dbName='Edx',
+                                      useDisplayNameCache=True, **parserArgs)
+    if uniqueIDSeed is not None:
+        edxParser.setUniqueIDSeed(uniqueIDSeed)
+    fileConverter.setParser(edxParser)
+    return (fileConverter, edxParser)
+
+def convertToFiles(jsonFile, outFileName, outputFileClass=OutputFile, outputFormat=OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV,
+                   uniqueIDSeed=None, blankUUIDs=False, convertArgs={}, **parserArgs):
+    '''
+    Converts jsonFile to outFileName and the files next to it, and
+    returns dict: output file suffix --> content. The output file name
+    is replaced by '<outFile>', and the load date by '<loadDate>'.
+
+    :param blankUUIDs: whether random keys are replaced by '<uuid>'
+    :type blankUUIDs: bool
+    :param convertArgs: keyword arguments of JSONToRelation.convert()
+    :type convertArgs: dict
+    '''
+    dest = outputFileClass(outFileName, outputFormat)
+    (fileConverter, edxParser) = makeConverter(jsonFile, dest, uniqueIDSeed, **parserArgs) # @UnusedVariable
+    fileConverter.convert(**convertArgs)
+    dest.close()
+    output = {}
+    for fileName in glob.glob(outFileName + '*'):
+        with open(fileName) as fd:
+            content = fd.read().replace(outFileName, '<outFile>')
+        if blankUUIDs:
+            content = UUID_PATTERN.sub('<uuid>', content)
+        output[fileName[len(outFileName):]] = blankLoadDate(content)
+    return output
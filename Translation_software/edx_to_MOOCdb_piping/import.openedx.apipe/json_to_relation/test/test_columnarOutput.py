@@ -0,0 +1,126 @@
+'''
+Checks that OutputColumnar holds the same tables as the CSV output
+of the same conversion, in row groups, with dictionary encoded
+text columns where they have few distinct values.
+'''
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from json_to_relation.columnar_output import OutputColumnar, ColumnarReader, \
+    packStrings, unpackStrings, pyarrow
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+from json_to_relation.test.conversion_helpers import readEvents, makeConverter
+
+
+class TestColumnarOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.eventsFile = os.path.join(self.tmpDir, 'events.json')
+        # Each event four times, so that row groups have
+        # few distinct event types:
+        with open(self.eventsFile, 'w') as outFd:
+            for events in readEvents():
+                for line in events.split('\n'):
+                    if len(line.strip()) > 0:
+                        outFd.write((line.strip() + '\n') * 4)
+
+    def tearDown(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        shutil.rmtree(self.tmpDir)
+
+    def convert(self, dest):
+        (fileConverter, edxParser) = makeConverter(self.eventsFile, dest, 'events') # @UnusedVariable
+        EdXTrackLogJSONParser.resetHashCache()
+        fileConverter.convert()
+        dest.close()
+
+    def readCSVTables(self):
+        '''
+        Converts the events to CSV, and returns dict: table name --> rows
+        '''
+        outFileName = os.path.join(self.tmpDir, 'events.sql')
+        dest = OutputFile(outFileName, OutputDisposition.OutputFormat.CSV, options='wb')
+        self.convert(dest)
+        tables = {}
+        for (tableName, csvFd) in dest.csvTableFiles.items():
+            with open(csvFd.name) as fd:
+                tables[tableName] = list(csv.reader(fd, quotechar="'", escapechar='\\', doublequote=False))
+        return tables
+
+    def assertSameValue(self, csvVal, colKind, val, where):
+        if colKind == 'text':
+            self.assertEqual(None if csvVal == 'null' else csvVal, val, where)
+        elif val is numpy.ma.masked or val is None:
+            self.assertTrue(csvVal in ['null', ''], where)
+        elif colKind == 'int':
+            self.assertEqual(int(csvVal), val, where)
+        else:
+            self.assertEqual(float(csvVal), val, where)
+
+    def assertSameTables(self, csvTables, reader):
+        self.assertEqual(sorted(csvTables.keys()), sorted(reader.getTableNames()))
+        for (tableName, csvRows) in csvTables.items():
+            columns = reader.readTable(tableName)
+            if not isinstance(columns, dict):
+                # pyarrow.Table:
+                columns = dict([(colName, columns.column(colName).to_pylist()) for colName in columns.column_names])
+            colKinds = dict([(colInfo['name'], colInfo['kind']) for colInfo in reader.manifest['tables'][tableName]['columns']])
+            colNames = reader.getColNames(tableName)
+            self.assertEqual(len(csvRows), reader.manifest['tables'][tableName]['numRows'])
+            for (rowNum, csvRow) in enumerate(csvRows):
+                for (colName, csvVal) in zip(colNames, csvRow):
+                    if colName == 'load_date_time':
+                        # Differs with each conversion
+                        continue
+                    self.assertSameValue(csvVal, colKinds[colName], columns[colName][rowNum],
+                                         '%s row %d, %s' % (tableName, rowNum, colName))
+
+    def testSameAsCSV(self):
+        csvTables = self.readCSVTables()
+        self.assertGreater(len(csvTables['EdxTrackEvent']), 20)
+        fileFormats = ['npz'] if pyarrow is None else ['npz', 'parquet']
+        for fileFormat in fileFormats:
+            dirName = os.path.join(self.tmpDir, fileFormat)
+            self.convert(OutputColumnar(dirName, fileFormat=fileFormat, rowGroupSize=8))
+            reader = ColumnarReader(dirName)
+            self.assertEqual(fileFormat, reader.manifest['format'])
+            self.assertSameTables(csvTables, reader)
+            with open(os.path.join(dirName, 'statements.sql')) as fd:
+                self.assertIn('CREATE TABLE IF NOT EXISTS EdxTrackEvent', fd.read())
+
+    def testRowGroups(self):
+        dirName = os.path.join(self.tmpDir, 'npz')
+        self.convert(OutputColumnar(dirName, fileFormat='npz', rowGroupSize=8))
+        reader = ColumnarReader(dirName)
+        tableInfo = reader.manifest['tables']['EdxTrackEvent']
+        rowGroups = tableInfo['rowGroups']
+        self.assertEqual((tableInfo['numRows'] + 7) // 8, len(rowGroups))
+        self.assertEqual([8] * (len(rowGroups) - 1), [rowGroup['numRows'] for rowGroup in rowGroups[:-1]])
+        # Few event types and courses per row group, but a new _id in each row:
+        self.assertTrue(all(['event_type' in rowGroup['dictionaryColumns'] for rowGroup in rowGroups]))
+        self.assertTrue(all(['course_display_name' in rowGroup['dictionaryColumns'] for rowGroup in rowGroups]))
+        self.assertFalse(any(['_id' in rowGroup['dictionaryColumns'] for rowGroup in rowGroups]))
+        rowGroup = numpy.load(os.path.join(dirName, rowGroups[0]['file']))
+        self.assertEqual(numpy.int8, rowGroup['event_type.codes'].dtype)
+        self.assertEqual(numpy.int8, rowGroup['attempts'].dtype)
+        rowGroup.close()
+        columns = reader.readTable('EdxTrackEvent', ['event_type', 'attempts'])
+        self.assertEqual(['event_type', 'attempts'], columns.keys())
+        self.assertEqual(numpy.int64, columns['attempts'].dtype)
+
+    def testPackStrings(self):
+        strings = ['seq_goto', '', 'play_video', 'caf\xc3\xa9']
+        (offsets, data) = packStrings(strings)
+        self.assertEqual([0, 8, 8, 18, 23], list(offsets))
+        self.assertEqual(strings, list(unpackStrings(offsets, data)))
+        self.assertEqual([], list(unpackStrings(*packStrings([]))))
+
+if __name__ == "__main__":
+    unittest.main()
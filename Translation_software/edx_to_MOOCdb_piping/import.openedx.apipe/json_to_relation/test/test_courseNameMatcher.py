@@ -0,0 +1,86 @@
+'''
+Checks that CourseNameMatcher finds the same course short name
+as the former scan of extractCanonicalCourseName() over all names,
+longest first, with string.find().
+'''
+import json
+import os
+import random
+import shutil
+import string
+import tempfile
+import unittest
+
+from json_to_relation.courseNameMatcher import CourseNameMatcher
+from json_to_relation.modulestoreImporter import ModulestoreImporter
+
+
+def scanForCourseName(courseNamesSorted, trackLogStr):
+    for shortCourseName in courseNamesSorted:
+        if string.find(trackLogStr, shortCourseName) > -1:
+            return shortCourseName
+    return None
+
+class TestCourseNameMatcher(unittest.TestCase):
+
+    def testTrackLogStrings(self):
+        courseNamesSorted = sorted(['HRP258', 'EDUC115N', 'db', 'CS144', 'Stat', 'Genome', 'EE'], key=len, reverse=True)
+        matcher = CourseNameMatcher(courseNamesSorted)
+        self.assertEqual('HRP258', matcher.longestMatch('Medicine/HRP258/Statistics_in_Medicine'))
+        self.assertEqual('EDUC115N', matcher.longestMatch('/courses/Education/EDUC115N/How_to_Learn_Math/modx/i4x://Education/EDUC115N/sequential//goto_position'))
+        self.assertEqual('db', matcher.longestMatch('/courses/Engineering/db/Winter2014/info'))
+        self.assertEqual('Genome', matcher.longestMatch('Stat/Genome'))
+        self.assertIsNone(matcher.longestMatch('/courses/Medicine/HRP259/Fall2013/'))
+        self.assertIsNone(matcher.longestMatch(''))
+        self.assertIsNone(CourseNameMatcher([]).longestMatch('Medicine/HRP258/Statistics_in_Medicine'))
+
+    def testTieBreak(self):
+        # Equal lengths: the first name in the given order wins,
+        # wherever the names are in the string:
+        self.assertEqual('CS144', CourseNameMatcher(['CS144', 'EE364']).longestMatch('EE364/CS144'))
+        self.assertEqual('EE364', CourseNameMatcher(['EE364', 'CS144']).longestMatch('EE364/CS144'))
+        # Names that are suffixes or infixes of each other:
+        self.assertEqual('abcd', CourseNameMatcher(['abcd', 'bcd', 'bc', 'c']).longestMatch('xabcdx'))
+        self.assertEqual('bc', CourseNameMatcher(['bcx', 'bc', 'c']).longestMatch('abcd'))
+        self.assertEqual('', CourseNameMatcher(['zz', '']).longestMatch('abcd'))
+
+    def testRandomNames(self):
+        rand = random.Random(4)
+        alphabet = 'abcAB12_/'
+        for trial in range(50):
+            courseNames = set()
+            for i in range(rand.randint(1, 40)):
+                courseNames.add(''.join(rand.choice(alphabet) for j in range(rand.randint(1, 6))))
+            courseNamesSorted = sorted(courseNames, key=len, reverse=True)
+            matcher = CourseNameMatcher(courseNamesSorted)
+            for i in range(50):
+                trackLogStr = ''.join(rand.choice(alphabet + 'xyz') for j in range(rand.randint(0, 40)))
+                self.assertEqual(scanForCourseName(courseNamesSorted, trackLogStr), matcher.longestMatch(trackLogStr),
+                                 "Different match for '%s'" % trackLogStr)
+
+    def testModulestoreImporterRebuildsOnChange(self):
+        tmpDir = tempfile.mkdtemp()
+        try:
+            modstoreFile = os.path.join(tmpDir, 'modulestore_latest.json')
+            with open(modstoreFile, 'w') as fd:
+                json.dump([{'_id':{'tag':'i4x', 'org':org, 'course':course, 'category':'course', 'name':name, 'revision':None},
+                            'metadata':{'display_name':name}}
+                           for (org, course, name) in [('Medicine', 'HRP258', 'Statistics_in_Medicine'), ('Engineering', 'db', 'Winter2014')]],
+                          fd)
+            importer = ModulestoreImporter(modstoreFile,
+                                           useCache=False,
+                                           pickleCachePath=os.path.join(tmpDir, 'hashLookup.pkl'))
+            matcher = importer.getCourseNameMatcher()
+            self.assertIs(matcher, importer.getCourseNameMatcher())
+            self.assertEqual(sorted(importer.keys(), key=len, reverse=True), matcher.courseNames)
+            self.assertEqual('HRP258', matcher.longestMatch('/courses/Medicine/HRP258/Statistics_in_Medicine/about'))
+            importer['HRP258_Spring'] = 'Medicine/HRP258_Spring/Statistics_in_Medicine'
+            matcher = importer.getCourseNameMatcher()
+            self.assertEqual('HRP258_Spring', matcher.longestMatch('/courses/Medicine/HRP258_Spring/Statistics_in_Medicine/about'))
+            del importer['HRP258_Spring']
+            self.assertEqual('HRP258', importer.getCourseNameMatcher().longestMatch('/courses/Medicine/HRP258_Spring/'))
+        finally:
+            shutil.rmtree(tmpDir)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+'''
+Checks that the CSV files JSONToRelation writes through the direct
+row sink, OutputFile.writeValuesRow(), are byte for byte the ones
+extracted from INSERT statements by writeCSVRowsFromInsertStatement().
+'''
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+from json_to_relation.test.conversion_helpers import DATA_DIR, UUID_PATTERN, \
+    readEvents, convertToFiles
+
+
+# load_info_fk, the last column of EdxTrackEvent rows, hashes
+# the load file and load time:
+LOAD_INFO_FK_PATTERN = re.compile(r"'[a-f0-9]{40}'$", re.MULTILINE)
+
+class InsertRoundTripOutputFile(OutputFile):
+    '''
+    OutputFile that takes CSV rows only as INSERT statements,
+    as all OutputFiles did before writeValuesRow().
+    '''
+    def acceptsValueRows(self):
+        return False
+
+class TestCSVRowSink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.eventsFile = os.path.join(self.tmpDir, 'events.json')
+        with open(self.eventsFile, 'w') as outFd:
+            for event in readEvents():
+                outFd.write(event + '\n')
+        self.maxPacketSize = JSONToRelation.MAX_ALLOWED_PACKET_SIZE
+
+    def tearDown(self):
+        JSONToRelation.MAX_ALLOWED_PACKET_SIZE = self.maxPacketSize
+        shutil.rmtree(self.tmpDir)
+
+    def convert(self, jsonFile, outputFileClass, outputFormat, runName):
+        '''
+        Converts jsonFile, and returns dict: output file suffix --> content,
+        with the parts that vary between conversions blanked out.
+        '''
+        return convertToFiles(jsonFile, os.path.join(self.tmpDir, runName + '.sql'), outputFileClass, outputFormat, blankUUIDs=True)
+
+    def assertSameOutput(self, jsonFile, outputFormat):
+        direct = self.convert(jsonFile, OutputFile, outputFormat, 'direct')
+        roundTrip = self.convert(jsonFile, InsertRoundTripOutputFile, outputFormat, 'roundTrip')
+        self.assertEqual(sorted(roundTrip.keys()), sorted(direct.keys()))
+        self.assertTrue(len(direct['_EdxTrackEventTable.csv']) > 0)
+        for suffix in roundTrip.keys():
+            self.assertEqual(roundTrip[suffix], direct[suffix], 'Output %s differs' % suffix)
+        return direct
+
+    def testCSVMatchesTruth(self):
+        direct = self.assertSameOutput(os.path.join(DATA_DIR, 'csvSimpleProblemCheck.json'), OutputDisposition.OutputFormat.CSV)
+        for (suffix, truthFile) in [('_EdxTrackEventTable.csv', 'csvSimpleProblemCheckEdxTrackEventTableTruth.csv'),
+                                    ('_AnswerTable.csv', 'csvSimpleProblemCheckAnswerTableTruth.csv')]:
+            with open(os.path.join(DATA_DIR, truthFile)) as fd:
+                truth = UUID_PATTERN.sub('<uuid>', fd.read())
+            self.assertEqual(LOAD_INFO_FK_PATTERN.sub("'<loadInfo>'", truth), LOAD_INFO_FK_PATTERN.sub("'<loadInfo>'", direct[suffix]))
+
+    def testCSVMatchesRoundTrip(self):
+        self.assertSameOutput(self.eventsFile, OutputDisposition.OutputFormat.CSV)
+
+    def testInsertsAndCSVMatchRoundTrip(self):
+        self.assertSameOutput(self.eventsFile, OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV)
+
+    def testRowsLargerThanPacket(self):
+        expected = self.convert(self.eventsFile, OutputFile, OutputDisposition.OutputFormat.CSV, 'expected')
+        # Every row now goes out in an INSERT of its own:
+        JSONToRelation.MAX_ALLOWED_PACKET_SIZE = 10
+        for output in [self.convert(self.eventsFile, OutputFile, OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV, 'direct'),
+                       self.convert(self.eventsFile, InsertRoundTripOutputFile, OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV, 'roundTrip')]:
+            for suffix in expected.keys():
+                if suffix.endswith('.csv'):
+                    self.assertEqual(expected[suffix], output[suffix], 'Output %s differs' % suffix)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+'''
+Checks that EdXTrackLogJSONParser.getEventHandler() dispatches
+every event type to the handler the former if/elif chain of
+processOneJSONObject() called.
+'''
+import glob
+import json
+import os
+import unittest
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser, \
+    MAX_RESOLVED_EVENT_TYPES
+
+
+# The former dispatch chain of processOneJSONObject(), in order:
+# (event types, handler method name, whether the handler's return replaced the row).
+# None as handler name: no handler, the row was pushed as is.
+LEGACY_DISPATCH = [
+    (['seq_goto', 'seq_next', 'seq_prev'], 'handleSeqNav', True),
+    (['/accounts/login'], None, False),
+    (['/login_ajax'], 'handleAjaxLogin', True),
+    (['problem_check', 'save_problem_check'], 'handleProblemCheck', True),
+    (['problem_reset'], 'handleProblemReset', True),
+    (['problem_show'], 'handleProblemShow', True),
+    (['problem_save'], 'handleProblemSave', True),
+    (['oe_hide_question', 'oe_hide_problem', 'peer_grading_hide_question', 'peer_grading_hide_problem',
+      'staff_grading_hide_question', 'staff_grading_hide_problem', 'oe_show_question', 'oe_show_problem',
+      'peer_grading_show_question', 'peer_grading_show_problem', 'staff_grading_show_question',
+      'staff_grading_show_problem'], 'handleQuestionProblemHidingShowing', True),
+    (['rubric_select'], 'handleRubricSelect', True),
+    (['oe_show_full_feedback', 'oe_show_respond_to_feedback'], 'handleOEShowFeedback', True),
+    (['oe_feedback_response_selected'], 'handleOEFeedbackResponseSelected', True),
+    (['show_transcript', 'hide_transcript'], 'handleShowHideTranscript', True),
+    (['play_video', 'pause_video', 'stop_video', 'video_player_ready', 'load_video'], 'handleVideoPlayPause', True),
+    (['seek_video'], 'handleVideoSeek', True),
+    (['speed_change_video'], 'handleVideoSpeedChange', True),
+    (['fullscreen'], 'handleFullscreen', True),
+    (['not_fullscreen'], 'handleNotFullscreen', True),
+    (['/dashboard'], None, False),
+    (['book'], 'handleBook', True),
+    (['showanswer', 'show_answer'], 'handleShowAnswer', True),
+    (['problem_check_fail', 'save_problem_check_fail'], 'handleProblemCheckFail', False),
+    (['problem_rescore_fail'], 'handleProblemRescoreFail', True),
+    (['problem_rescore'], 'handleProblemRescore', True),
+    (['save_problem_fail', 'save_problem_success', 'reset_problem_fail'], 'handleSaveProblemFailSuccessCheckOrReset', True),
+    (['reset_problem'], 'handleResetProblem', True),
+    (['list-students', 'dump-grades', 'dump-grades-raw', 'dump-grades-csv',
+      'dump-grades-csv-raw', 'dump-answer-dist-csv', 'dump-graded-assignments-config',
+      'list-staff', 'list-instructors', 'list-beta-testers'], None, False),
+    (['rescore-all-submissions', 'reset-all-attempts'], 'handleRescoreReset', False),
+    (['delete-student-module-state', 'rescore-student-submission'], 'handleDeleteStateRescoreSubmission', False),
+    (['reset-student-attempts'], 'handleResetStudentAttempts', False),
+    (['get-student-progress-page'], 'handleGetStudentProgressPage', False),
+    (['add-instructor', 'remove-instructor'], 'handleAddRemoveInstructor', False),
+    (['list-forum-admins', 'list-forum-mods', 'list-forum-community-TAs'], 'handleListForumMatters', False),
+    (['remove-forum-admin', 'add-forum-admin', 'remove-forum-mod',
+      'add-forum-mod', 'remove-forum-community-TA', 'add-forum-community-TA'], 'handleForumManipulations', False),
+    (['psychometrics-histogram-generation'], 'handlePsychometricsHistogramGen', False),
+    (['add-or-remove-user-group'], 'handleAddRemoveUserGroup', False),
+    (['/create_account'], 'handleCreateAccount', False),
+    (['problem_graded'], 'handleProblemGraded', True),
+    (['change-email-settings'], 'handleReceiveEmail', False),
+    (['assigned_user_to_partition', 'child_render'], 'handleABExperimentEvent', False),
+    (['edx.course.enrollment.activated', 'edx.course.enrollment.deactivated'], 'handleCourseEnrollActivatedDeactivated', False),
+    (['edx.forum.searched'], 'handleForumEvent', False),
+    ]
+
+# Handled in processOneJSONObject() before dispatch:
+PRE_DISPATCH_EVENT_TYPES = ['/heartbeat', '/', 'page_close']
+
+def legacyDispatch(eventType):
+    '''
+    Returns (handler method name, returnsRow) as the former chain
+    dispatched the event type, or None for unknown event types
+    '''
+    for (eventTypes, handlerName, returnsRow) in LEGACY_DISPATCH:
+        if eventType in eventTypes:
+            return (handlerName, returnsRow)
+    if eventType[0] == '/':
+        return ('handlePathStyledEventTypes', True)
+    return None
+
+def truthFileEventTypes():
+    '''
+    Event types of all JSON records in the test data directory
+    '''
+    eventTypes = set()
+    for fileName in glob.glob(os.path.join(os.path.dirname(__file__), 'data', '*.json')):
+        with open(fileName) as fd:
+            for line in fd:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                eventType = record.get('event_type', None)
+                if eventType is None and isinstance(record.get('event', None), dict):
+                    eventType = record['event'].get('name', None)
+                if eventType:
+                    eventTypes.add(eventType)
+    return eventTypes
+
+def dispatch(eventType):
+    handler = EdXTrackLogJSONParser.getEventHandler(eventType)
+    if handler is None:
+        return None
+    (handlerName, returnsRow, withEventType) = handler  # @UnusedVariable
+    if handlerName == 'handleNoAdditionalInfo':
+        return (None, False)
+    return (handlerName, returnsRow)
+
+
+class TestEventDispatch(unittest.TestCase):
+
+    def testTruthFileEventTypes(self):
+        eventTypes = truthFileEventTypes() - set(PRE_DISPATCH_EVENT_TYPES)
+        self.assertGreater(len(eventTypes), 30)
+        for eventType in eventTypes:
+            self.assertEqual(legacyDispatch(eventType), dispatch(eventType), "Dispatch changed for event type '%s'" % eventType)
+
+    def testAllLegacyEventTypes(self):
+        for (eventTypes, handlerName, returnsRow) in LEGACY_DISPATCH:
+            for eventType in eventTypes:
+                self.assertEqual((handlerName, returnsRow), dispatch(eventType), "Dispatch changed for event type '%s'" % eventType)
+
+    def testHandlersExist(self):
+        for eventType in truthFileEventTypes() - set(PRE_DISPATCH_EVENT_TYPES):
+            handler = EdXTrackLogJSONParser.getEventHandler(eventType)
+            if handler is not None:
+                self.assertTrue(hasattr(EdXTrackLogJSONParser, handler[0]))
+        self.assertEqual((True, True), EdXTrackLogJSONParser.getEventHandler('seq_goto')[1:])
+        self.assertEqual((True, True), EdXTrackLogJSONParser.getEventHandler('/login_ajax')[1:])
+
+    def testUnknownEventTypes(self):
+        self.assertIsNone(EdXTrackLogJSONParser.getEventHandler('harvardx.video_embedded_problems'))
+        self.assertIsNone(EdXTrackLogJSONParser.getEventHandler(''))
+
+    def testMemoIsBounded(self):
+        for i in range(MAX_RESOLVED_EVENT_TYPES + 10):
+            EdXTrackLogJSONParser.getEventHandler('/courses/Org/C/Run/courseware/%d/' % i)
+        self.assertLessEqual(len(EdXTrackLogJSONParser.resolvedEventTypes), MAX_RESOLVED_EVENT_TYPES)
+        self.assertEqual('handlePathStyledEventTypes', EdXTrackLogJSONParser.getEventHandler('/courses/Org/C/Run/courseware/0/')[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+'''
+Checks that InMongoDB reads the documents of a collection in _id
+order, as JSON lines or as dicts, within _id ranges, and after a
+given _id. The collection is a small local fake of pymongo's, and,
+where it is installed, a mongomock collection.
+'''
+import datetime
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.generic_json_parser import GenericJSONParser
+from json_to_relation.input_source import InMongoDB
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+try:
+    from pymongo.errors import CursorNotFound
+except ImportError:
+    CursorNotFound = None
+
+# The load date of LoadInfo:
+LOAD_DATE_PATTERN = re.compile(r"'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9:.]+'")
+
+class FakeCursor(object):
+    '''
+    The parts of a pymongo cursor that InMongoDB uses. If dieAfter
+    is set, the cursor raises CursorNotFound after that many documents.
+    '''
+    def __init__(self, docs, dieAfter=None):
+        self.docs = docs
+        self.batchSize = None
+        self.dieAfter = dieAfter
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key], reverse=(direction < 0))
+        return self
+
+    def batch_size(self, batchSize):
+        self.batchSize = batchSize
+        return self
+
+    def skip(self, numDocs):
+        self.docs = self.docs[numDocs:]
+        return self
+
+    def limit(self, numDocs):
+        self.docs = self.docs[:numDocs]
+        return self
+
+    def count(self):
+        return len(self.docs)
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        for (i, doc) in enumerate(self.docs):
+            if self.dieAfter is not None and i >= self.dieAfter:
+                raise CursorNotFound('cursor id not found')
+            yield doc
+
+class FakeCollection(object):
+    '''
+    Collection whose find() knows equality, and the $gt, $gte and $lt
+    of _id, which InMongoDB adds to its queries.
+    '''
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursors = []
+        self.dieAfter = None
+
+    def find(self, query=None, projection=None):
+        docs = [doc for doc in self.docs if self.matches(doc, query or {})]
+        if projection is not None:
+            docs = [dict([(key, val) for (key, val) in doc.items() if key == '_id' or projection.get(key)]) for doc in docs]
+        else:
+            docs = [dict(doc) for doc in docs]
+        cursor = FakeCursor(docs, self.dieAfter)
+        self.dieAfter = None
+        self.cursors.append(cursor)
+        return cursor
+
+    def matches(self, doc, query):
+        for (key, val) in query.items():
+            if key == '$and':
+                if not all([self.matches(doc, subQuery) for subQuery in val]):
+                    return False
+            elif isinstance(val, dict):
+                for (op, bound) in val.items():
+                    if (op == '$gt' and not doc[key] > bound) or \
+                       (op == '$gte' and not doc[key] >= bound) or \
+                       (op == '$lt' and not doc[key] < bound):
+                        return False
+            elif doc.get(key) != val:
+                return False
+        return True
+
+class TestInMongoDB(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.docs = [{'_id' : i, 'event_type' : 'seq_goto', 'username' : 'user%d' % (i % 3), 'n' : i} for i in range(10, 0, -1)]
+        self.docs[0]['time'] = datetime.datetime(2013, 7, 18, 8, 0, 0, 123000)
+        self.collections = [FakeCollection(self.docs)]
+        if mongomock is not None:
+            mongoColl = mongomock.MongoClient().db.events
+            mongoColl.insert_many([dict(doc) for doc in self.docs])
+            self.collections.append(mongoColl)
+
+    def tearDown(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        shutil.rmtree(self.tmpDir)
+
+    def inMongoDB(self, collection, **kwargs):
+        return InMongoDB('localhost', '', 'Edx', 'events', collection=collection, **kwargs)
+
+    def read(self, source):
+        with source as docs:
+            return list(docs)
+
+    def testJSONLines(self):
+        for collection in self.collections:
+            lines = self.read(self.inMongoDB(collection, batchSize=4))
+            self.assertTrue(all([line.endswith('\n') for line in lines]))
+            docs = [json.loads(line) for line in lines]
+            self.assertEqual(range(1, 11), [doc['n'] for doc in docs])
+            self.assertNotIn('_id', docs[0])
+            self.assertEqual('2013-07-18T08:00:00.123000', docs[-1]['time'])
+        self.assertEqual(4, self.collections[0].cursors[0].batchSize)
+
+    def testDictsAndProjection(self):
+        for collection in self.collections:
+            docs = self.read(self.inMongoDB(collection, yieldDicts=True, projection=['n'], includeId=True))
+            self.assertEqual([{'_id' : i, 'n' : i} for i in range(1, 11)], docs)
+            docs = self.read(self.inMongoDB(collection, yieldDicts=True, query={'username' : 'user1'}))
+            self.assertEqual([1, 4, 7, 10], [doc['n'] for doc in docs])
+
+    def testPartitions(self):
+        for collection in self.collections:
+            for numPartitions in [1, 3, 4, 20]:
+                idRanges = InMongoDB.partitionIdRanges(collection, numPartitions)
+                self.assertEqual(min(numPartitions, 10), len(idRanges))
+                self.assertIsNone(idRanges[0][0])
+                self.assertIsNone(idRanges[-1][1])
+                partitions = [[doc['n'] for doc in self.read(self.inMongoDB(collection, yieldDicts=True, idRange=idRange))]
+                              for idRange in idRanges]
+                self.assertEqual(range(1, 11), sum(partitions, []))
+                self.assertTrue(all([len(partition) >= 10 // len(idRanges) for partition in partitions]))
+            idRanges = InMongoDB.partitionIdRanges(collection, 2, query={'username' : 'user1'})
+            self.assertEqual([(None, 7), (7, None)], idRanges)
+
+    def testResume(self):
+        for collection in self.collections:
+            source = self.inMongoDB(collection, yieldDicts=True, idRange=(3, 9))
+            docs = source.fileHandle
+            self.assertEqual([3, 4], [docs.next()['n'], docs.next()['n']])
+            source.close()
+            self.assertEqual(4, source.lastId)
+            docs = self.read(self.inMongoDB(collection, yieldDicts=True, idRange=(3, 9), resumeAfterId=source.lastId))
+            self.assertEqual([5, 6, 7, 8], [doc['n'] for doc in docs])
+
+    @unittest.skipIf(CursorNotFound is None, 'needs pymongo')
+    def testDeadCursor(self):
+        collection = self.collections[0]
+        collection.dieAfter = 3
+        docs = self.read(self.inMongoDB(collection, yieldDicts=True))
+        self.assertEqual(range(1, 11), [doc['n'] for doc in docs])
+        self.assertEqual(2, len(collection.cursors))
+
+    def convert(self, source, runName):
+        '''
+        Converts the documents of source, and returns dict: output
+        file suffix --> content.
+        '''
+        outFileName = os.path.join(self.tmpDir, runName + '.sql')
+        dest = OutputFile(outFileName, OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV)
+        fileConverter = JSONToRelation(source, dest, mainTableName='EdxTrackEvent')
+        edxParser = EdXTrackLogJSONParser(fileConverter, 'EdxTrackEvent', replaceTables=True, dbName='Edx', useDisplayNameCache=True)
+        edxParser.setUniqueIDSeed('events')
+        fileConverter.setParser(edxParser)
+        EdXTrackLogJSONParser.resetHashCache()
+        fileConverter.convert()
+        dest.close()
+        output = {}
+        for fileName in glob.glob(outFileName + '*'):
+            with open(fileName) as fd:
+                content = fd.read().replace(outFileName, '<outFile>')
+            output[fileName[len(outFileName):]] = LOAD_DATE_PATTERN.sub("'<loadDate>'", content)
+        return output
+
+    def testConvertDicts(self):
+        with open(os.path.join(os.path.dirname(__file__), 'data', 'edxTrackLogSample.json')) as fd:
+            events = [json.loads(line) for line in fd if len(line.strip()) > 0]
+        for (i, event) in enumerate(events):
+            event['_id'] = i
+        collection = FakeCollection(events)
+        fromLines = self.convert(self.inMongoDB(collection), 'lines')
+        fromDicts = self.convert(self.inMongoDB(collection, yieldDicts=True), 'dicts')
+        self.assertEqual(fromLines, fromDicts)
+        self.assertIn('INSERT INTO EdxTrackEvent', fromDicts[''])
+
+        dest = OutputFile(os.path.join(self.tmpDir, 'generic.sql'), OutputDisposition.OutputFormat.SQL_INSERT_STATEMENTS)
+        fileConverter = JSONToRelation(self.inMongoDB(collection, yieldDicts=True), dest, mainTableName='EdxTrackEvent')
+        fileConverter.setParser(GenericJSONParser(fileConverter))
+        self.assertRaises(ValueError, fileConverter.convert)
+        dest.close()
+
+if __name__ == "__main__":
+    unittest.main()
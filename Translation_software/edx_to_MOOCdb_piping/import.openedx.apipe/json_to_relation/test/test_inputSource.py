@@ -0,0 +1,135 @@
+'''
+Checks that the StreamingLineReader of InURI delivers the same lines
+as the stdlib readers, for plain, gzip and bz2 sources, and that the
+lines of a remote source arrive while it is still being downloaded.
+'''
+import BaseHTTPServer
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+
+from json_to_relation.input_source import InURI, StreamingLineReader
+
+
+class SlowHTTPHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''
+    Serves the server's content, but holds back its second half
+    until the server's secondHalfWanted event is set.
+    '''
+    def do_GET(self):
+        content = self.server.content
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content[:len(content) / 2])
+        self.wfile.flush()
+        self.server.secondHalfWanted.wait(10)
+        self.wfile.write(content[len(content) / 2:])
+
+    def log_message(self, *args):
+        pass
+
+class TestInputSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.lines = ['{"event_type": "seq_goto", "n": %d, "pad": "%s"}\n' % (i, 'x' * (i % 997)) for i in range(2000)]
+        # An empty line, and a last line without newline:
+        self.lines.extend(['\n', '{"event_type": "page_close"}'])
+        self.content = ''.join(self.lines)
+        self.plainFile = os.path.join(self.tmpDir, 'tracking.log')
+        with open(self.plainFile, 'wb') as fd:
+            fd.write(self.content)
+        # Two gzip members, as appending to a .gz file makes them, and zero padding:
+        self.gzipFile = self.plainFile + '.gz'
+        for (mode, part) in [('wb', self.content[:30000]), ('ab', self.content[30000:])]:
+            fd = gzip.open(self.gzipFile, mode)
+            fd.write(part)
+            fd.close()
+        with open(self.gzipFile, 'ab') as fd:
+            fd.write('\0' * 64)
+        self.bz2File = self.plainFile + '.bz2'
+        fd = bz2.BZ2File(self.bz2File, 'wb')
+        fd.write(self.content)
+        fd.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def readLines(self, inURI):
+        with inURI as fd:
+            return list(fd)
+
+    def testSameLinesAsStdlibReaders(self):
+        for path in [self.plainFile, self.gzipFile, self.bz2File]:
+            for blockSize in [100, 4096, 1024 * 1024]:
+                self.assertEqual(self.lines, self.readLines(InURI(path, blockSize=blockSize, readAheadBlocks=2)),
+                                 '%s, blockSize %d' % (os.path.basename(path), blockSize))
+        self.assertEqual(self.lines, self.readLines(InURI(self.plainFile, streaming=False)))
+        self.assertEqual(self.lines, self.readLines(InURI(self.bz2File, streaming=False)))
+        # The stdlib gzip reader also reads all members:
+        self.assertEqual(self.lines, self.readLines(InURI(self.gzipFile, streaming=False)))
+
+    def testCloseBeforeEnd(self):
+        source = InURI(self.gzipFile, blockSize=100, readAheadBlocks=1)
+        lineIter = iter(source.fileHandle)
+        self.assertEqual(self.lines[0], lineIter.next())
+        source.close()
+        self.assertFalse(source.fileHandle.readerThread.is_alive())
+
+    def testCorruptInput(self):
+        with open(self.gzipFile, 'rb') as fd:
+            compressed = fd.read()
+        badFile = os.path.join(self.tmpDir, 'bad.log.gz')
+        with open(badFile, 'wb') as fd:
+            fd.write(compressed[:100] + 'not gzip' * 100 + compressed[100:])
+        self.assertRaises(zlib.error, self.readLines, InURI(badFile, blockSize=100))
+
+    def testTruncatedInput(self):
+        for path in [self.gzipFile, self.bz2File]:
+            with open(path, 'rb') as fd:
+                compressed = fd.read()
+            # Within the first gzip member, and within the last one:
+            for cut in [len(compressed) / 4, len(compressed) / 2 + len(compressed) / 4]:
+                truncatedFile = os.path.join(self.tmpDir, 'truncated' + os.path.splitext(path)[1])
+                with open(truncatedFile, 'wb') as fd:
+                    fd.write(compressed[:cut])
+                for blockSize in [100, 1024 * 1024]:
+                    self.assertRaises(IOError, self.readLines, InURI(truncatedFile, blockSize=blockSize))
+        # Empty compressed files have no lines, as with the stdlib readers:
+        emptyFile = os.path.join(self.tmpDir, 'empty.log.gz')
+        open(emptyFile, 'wb').close()
+        self.assertEqual([], self.readLines(InURI(emptyFile)))
+
+    def testLinesArriveDuringDownload(self):
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), SlowHTTPHandler)
+        server.secondHalfWanted = threading.Event()
+        with open(self.gzipFile, 'rb') as fd:
+            server.content = fd.read()
+        serverThread = threading.Thread(target=server.handle_request)
+        serverThread.daemon = True
+        serverThread.start()
+        try:
+            source = InURI('http://127.0.0.1:%d/tracking.log.gz' % server.server_address[1], blockSize=1024)
+            self.assertIsInstance(source.fileHandle, StreamingLineReader)
+            with source as fd:
+                lines = []
+                for line in fd:
+                    if len(lines) == 0:
+                        # The second half of the file has not been sent yet:
+                        self.assertFalse(server.secondHalfWanted.is_set())
+                        server.secondHalfWanted.set()
+                    lines.append(line)
+            self.assertEqual(self.lines, lines)
+        finally:
+            server.secondHalfWanted.set()
+            serverThread.join(10)
+            server.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+'''
+Cross-checks the IP to country lookup engines of ipToCountry:
+the compiled range table of IpCountryDict, from a software77.net
+style CSV file or from the bundled GeoLite2 database, against
+a scan of the CSV rows, and against MMDBCountryDict.
+'''
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.ipToCountry import IpCountryDict, MMDBCountryDict, UNKNOWN_COUNTRY, GEOLITE_COUNTRY_PATH
+
+
+def ipIntToStr(ipNum):
+    return '%d.%d.%d.%d' % (ipNum >> 24, (ipNum >> 16) & 0xff, (ipNum >> 8) & 0xff, ipNum & 0xff)
+
+class TestIpToCountry(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mmdbLookup = MMDBCountryDict()
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.rand = random.Random(7)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def writeSoftware77Table(self, ranges):
+        csvPath = os.path.join(self.tmpDir, 'ipToCountrySoftware77DotNet.csv')
+        with open(csvPath, 'w') as fd:
+            fd.write('# IP FROM,IP TO,REGISTRY,ASSIGNED,CTRY,CNTRY,COUNTRY\n')
+            for (startIP, endIP, (twoLetter, threeLetter, country)) in ranges:
+                fd.write('"%d","%d","arin","1","%s","%s","%s"\n' % (startIP, endIP, twoLetter, threeLetter, country))
+        return csvPath
+
+    def testSoftware77Table(self):
+        countries = [('US','USA','United States'), ('IT','ITA','Italy'), ('DE','DEU','Germany')]
+        ranges = []
+        ipNum = 1 << 24
+        while ipNum < 1 << 32:
+            endIP = min(ipNum + self.rand.randint(0, 1 << 22), (1 << 32) - 1)
+            ranges.append((ipNum, endIP, self.rand.choice(countries)))
+            # Leave holes between some ranges:
+            ipNum = endIP + 1 + self.rand.choice([0, 0, 0, 1000])
+        # Rows need not be in order:
+        self.rand.shuffle(ranges)
+        csvPath = self.writeSoftware77Table(ranges)
+
+        for lookup in [IpCountryDict(csvPath), IpCountryDict(csvPath)]:
+            for i in range(2000):
+                ipNum = self.rand.randint(0, (1 << 32) - 1)
+                expected = UNKNOWN_COUNTRY
+                for (startIP, endIP, countryInfo) in ranges:
+                    if startIP <= ipNum <= endIP:
+                        expected = countryInfo
+                self.assertEqual(expected, lookup.lookupIP(ipIntToStr(ipNum)))
+            self.assertEqual(('IT','ITA','Italy'), lookup.getBy3LetterCode('ITA'))
+            self.assertTrue(os.path.exists(csvPath + '.idx'))
+
+    def testStaleIndexIsRebuilt(self):
+        csvPath = self.writeSoftware77Table([(1 << 24, (2 << 24) - 1, ('US','USA','United States'))])
+        self.assertEqual(('US','USA','United States'), IpCountryDict(csvPath).lookupIP('1.2.3.4'))
+        self.writeSoftware77Table([(1 << 24, (2 << 24) - 1, ('IT','ITA','Italy'))])
+        indexTime = os.path.getmtime(csvPath + '.idx')
+        os.utime(csvPath, (indexTime + 10, indexTime + 10))
+        self.assertEqual(('IT','ITA','Italy'), IpCountryDict(csvPath).lookupIP('1.2.3.4'))
+
+    def testMalformedIps(self):
+        csvPath = self.writeSoftware77Table([(1 << 24, (2 << 24) - 1, ('US','USA','United States'))])
+        lookup = IpCountryDict(csvPath)
+        self.assertEqual(UNKNOWN_COUNTRY, lookup.lookupIP('0.0.0.1'))
+        self.assertEqual(UNKNOWN_COUNTRY, lookup.lookupIP('255.255.255.255'))
+        self.assertRaises(ValueError, lookup.lookupIP, '1.2.3')
+        self.assertRaises(ValueError, self.mmdbLookup.lookupIP, '::1')
+        self.assertEqual((16909060, '0016'), lookup.ipStrToIntAndKey('1.2.3.4'))
+
+    def testGeoLiteIndexAgainstMMDBReader(self):
+        # Compile the GeoLite2 ranges into a fresh table:
+        gzPath = os.path.join(self.tmpDir, os.path.basename(GEOLITE_COUNTRY_PATH))
+        shutil.copy(GEOLITE_COUNTRY_PATH, gzPath)
+        lookup = IpCountryDict(gzPath)
+        boundaries = []
+        for rangeIndex in range(0, len(lookup.rangeStarts), 97):
+            boundaries.extend([lookup.rangeStarts[rangeIndex] - 1, lookup.rangeStarts[rangeIndex], lookup.rangeEnds[rangeIndex], lookup.rangeEnds[rangeIndex] + 1])
+        randomIps = [self.rand.randint(0, (1 << 32) - 1) for i in range(20000)]
+        for ipNum in boundaries + randomIps:
+            if 0 <= ipNum < 1 << 32:
+                ipStr = ipIntToStr(ipNum)
+                self.assertEqual(self.mmdbLookup.lookupIP(ipStr), lookup.lookupIP(ipStr), 'Lookups differ for %s' % ipStr)
+
+    def testKnownCountries(self):
+        for lookup in [IpCountryDict(GEOLITE_COUNTRY_PATH), self.mmdbLookup]:
+            self.assertEqual(('US','USA','United States'), lookup.lookupIP('171.64.75.96'))
+            self.assertEqual(('IT','ITA','Italy'), lookup.lookupIP('5.96.4.5'))
+            self.assertEqual(('DE','DEU','Germany'), lookup.lookupIP('91.96.4.5'))
+            self.assertEqual(UNKNOWN_COUNTRY, lookup.lookupIP('127.0.0.1'))
+            self.assertEqual(('DE','DEU','Germany'), lookup.getBy3LetterCode('DEU'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+'''
+Checks that every installed JSON decoder turns the events of the
+truth files into the same relations as the stdlib json, and that
+ill formed JSON still ends up in the badly_formatted column.
+'''
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser, \
+    HANDLERS_WITHOUT_EVENT
+from json_to_relation.jsonDecoder import JSONDecoder
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+from json_to_relation.test.conversion_helpers import DATA_DIR, makeConverter, convertToFiles
+
+
+def truthFileSources():
+    '''
+    JSON files in the test data directory that have a truth file
+    '''
+    sources = []
+    for truthFile in sorted(glob.glob(os.path.join(DATA_DIR, '*Truth.sql'))):
+        jsonFile = truthFile[:-len('Truth.sql')] + '.json'
+        if os.path.exists(jsonFile):
+            sources.append(jsonFile)
+    return sources
+
+class TestJSONDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        EdXTrackLogJSONParser.resetHashCache()
+
+    def tearDown(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        shutil.rmtree(self.tmpDir)
+
+    def convert(self, jsonFile, decoderName):
+        '''
+        Converts jsonFile with the named decoder, and returns
+        dict: output file suffix --> content.
+        '''
+        outFileName = os.path.join(self.tmpDir, '%s_%s.sql' % (os.path.basename(jsonFile), decoderName))
+        return convertToFiles(jsonFile, outFileName, uniqueIDSeed=os.path.basename(jsonFile), jsonDecoder=decoderName)
+
+    def testDefaultDecoder(self):
+        available = JSONDecoder.availableDecoders()
+        self.assertIn('json', available)
+        self.assertEqual(available[0], JSONDecoder().name)
+        self.assertRaises(ValueError, JSONDecoder, 'noSuchDecoder')
+
+    def testDecodersAgree(self):
+        sources = truthFileSources()
+        self.assertGreater(len(sources), 20)
+        for decoderName in JSONDecoder.availableDecoders():
+            if decoderName == 'json':
+                continue
+            for jsonFile in sources:
+                EdXTrackLogJSONParser.resetHashCache()
+                expected = self.convert(jsonFile, 'json')
+                EdXTrackLogJSONParser.resetHashCache()
+                output = self.convert(jsonFile, decoderName)
+                self.assertEqual(sorted(expected.keys()), sorted(output.keys()))
+                for suffix in expected.keys():
+                    self.assertEqual(expected[suffix], output[suffix],
+                                     '%s: output %s differs with %s' % (os.path.basename(jsonFile), suffix, decoderName))
+
+    def testDecodeEvent(self):
+        jsonFile = os.path.join(DATA_DIR, 'dummyInput.json')
+        for decoderName in JSONDecoder.availableDecoders():
+            dest = OutputFile(os.path.join(self.tmpDir, 'out.sql'), OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV)
+            (fileConverter, edxParser) = makeConverter(jsonFile, dest, os.path.basename(jsonFile), jsonDecoder=decoderName) # @UnusedVariable
+            self.assertEqual({u'id' : u'i4x-Org-C-video-1', u'currentTime' : 4.5},
+                             edxParser.decodeEvent('{"id":"i4x-Org-C-video-1","currentTime":4.5}', {}, [], 'play_video'))
+            # Already a dict, or no string at all:
+            self.assertEqual({'code' : 'html5'}, edxParser.decodeEvent({'code' : 'html5'}, {}, [], 'play_video'))
+            self.assertIsNone(edxParser.decodeEvent(None, {}, [], 'play_video'))
+            # Bad backslashes are removed:
+            self.assertEqual({u'position' : 2}, edxParser.decodeEvent('{\\"position\\":2}', {}, [], 'seq_goto'))
+            # Ill formed, without backslashes that the cleanup could fix:
+            self.assertRaises(ValueError, edxParser.decodeEvent, '{"position":', {}, [], 'seq_goto')
+
+    def testEventOnlyDecodedWhenNeeded(self):
+        self.assertIn('handleNoAdditionalInfo', HANDLERS_WITHOUT_EVENT)
+        self.assertNotIn('handleSeqNav', HANDLERS_WITHOUT_EVENT)
+
+if __name__ == "__main__":
+    unittest.main()
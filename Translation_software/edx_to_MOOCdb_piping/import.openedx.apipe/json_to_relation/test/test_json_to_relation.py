@@ -227,76 +227,89 @@ class TestJSONToRelation(unittest.TestCase):
         # No value array in hold-back buffer:
         self.fileConverter.currInsertSig = 'col1, col2'
         self.fileConverter.currOutTable = 'TestTable'
-        self.fileConverter.currValsArray = []
+        self.fileConverter.currValueTuples = []
         self.assertIsNone(self.fileConverter.finalizeInsertStatement())
 
         # One value array in hold-back buffer:
-        self.fileConverter.currInsertSig = 'col1, col2'
-        self.fileConverter.currOutTable = 'MyTable'
-        self.fileConverter.currValsArray = [['foo', 10]]
+        self.assertIsNone(self.fileConverter.prepareMySQLRow(('MyTable', 'col1, col2', ['foo', 10])))
         res = self.fileConverter.finalizeInsertStatement()
         #print res
         self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('foo',10);", res)
         
-        self.fileConverter.currInsertSig = 'col1, col2'
-        self.fileConverter.currOutTable = 'MyTable'
-        self.fileConverter.currValsArray = [['foo', 10], ['bar', 20]]
+        self.assertIsNone(self.fileConverter.prepareMySQLRow(('MyTable', 'col1, col2', ['foo', 10])))
+        self.assertIsNone(self.fileConverter.prepareMySQLRow(('MyTable', 'col1, col2', ['bar', 20])))
         res = self.fileConverter.finalizeInsertStatement()
         #print res
         self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('foo',10),\n    ('bar',20);", res)
+        self.assertEqual(0, self.fileConverter.valsCacheSize)
         
     @unittest.skipIf(not TEST_ALL, "Temporarily disabled")
     def testPrepareMySQLRow(self):
         
         # Pretend to be the edx parser, sending one insert's worth of
         # info. This will fit into the hold-back buffer, and return None:
-        insertInfo = ('MyTable', 'col1, col2', [['foo', 10],['bar',20]])
+        insertInfo = ('MyTable', 'col1, col2', ['foo', 10])
         #print(res)
         self.assertEqual('LoadInfo', self.fileConverter.currOutTable)
         self.assertEqual('load_info_id,load_date_time,load_file', self.fileConverter.currInsertSig)
-        currValsArr = self.fileConverter.currValsArray
-        self.assertEqual('d4e622ff221b1eec00405f1b69893ff544ac5d75', currValsArr[0][0])
-        self.assertEqual('file:///home/paepcke/EclipseWorkspaces/json_to_relation/json_to_relation/test/data/twoJSONRecords.json', currValsArr[0][2])
-        
-        # Lower the allowed MySQL packet size to force immediate creation of INSERT statement:
-        self.fileConverter.__class__.MAX_ALLOWED_PACKET_SIZE = 3
-        self.fileConverter.currInsertSig = None
-        self.fileConverter.currOutTable = None
-        self.fileConverter.currValsArray = []
-        res = self.fileConverter.prepareMySQLRow(insertInfo)
-        self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('foo',10),\n    ('bar',20);", res)
-
-        # Set the allowed MySQL packet size to allow a first INSERT statement to be 
-        # held back, but a second call must trigger sending of the held back
-        # values, holding back the newly submitted values: 
+        currValueTuple = self.fileConverter.currValueTuples[0]
+        # The LoadInfo key hashes the load time and file, so only its form is known:
+        self.assertRegexpMatches(currValueTuple, r"^\('[0-9a-f]{40}',")
+        loadFile = 'file://' + os.path.join(os.path.dirname(__file__), "data/twoJSONRecords.json")
+        self.assertTrue(currValueTuple.endswith(",'%s')" % loadFile), currValueTuple)
         
-        # First call:
-        self.fileConverter.__class__.MAX_ALLOWED_PACKET_SIZE = 211
-        self.fileConverter.currInsertSig = None
-        self.fileConverter.currOutTable = None
-        self.fileConverter.currValsArray = []
-        res = self.fileConverter.prepareMySQLRow(insertInfo)
-        self.assertIsNone(res)
-        self.assertEqual('MyTable', self.fileConverter.currOutTable)
-        self.assertEqual('col1, col2', self.fileConverter.currInsertSig)
-        self.assertEqual([[['foo', 10], ['bar', 20]]], self.fileConverter.currValsArray)
+        maxPacketSize = JSONToRelation.MAX_ALLOWED_PACKET_SIZE
+        try:
+            # Lower the allowed MySQL packet size to force immediate creation of INSERT statement:
+            JSONToRelation.MAX_ALLOWED_PACKET_SIZE = 3
+            self.fileConverter.finalizeInsertStatement()
+            res = self.fileConverter.prepareMySQLRow(insertInfo)
+            self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('foo',10);", res)
+            self.assertEqual([], self.fileConverter.currValueTuples)
+    
+            # Set the allowed MySQL packet size to allow a first INSERT statement to be 
+            # held back, but a second call must trigger sending of the held back
+            # values, holding back the newly submitted values. Each tuple counts
+            # with its separator: len("('foo',10)") + len(',\n    ') == 16: 
+            
+            # First call:
+            JSONToRelation.MAX_ALLOWED_PACKET_SIZE = 20
+            res = self.fileConverter.prepareMySQLRow(insertInfo)
+            self.assertIsNone(res)
+            self.assertEqual('MyTable', self.fileConverter.currOutTable)
+            self.assertEqual('col1, col2', self.fileConverter.currInsertSig)
+            self.assertEqual(["('foo',10)"], self.fileConverter.currValueTuples)
+            self.assertEqual(16, self.fileConverter.valsCacheSize)
+            # The values were formatted when they came in; the caller
+            # may reuse its array:
+            insertInfo[2][0] = 'bar'
+            self.assertEqual(["('foo',10)"], self.fileConverter.currValueTuples)
+    
+            # Second call:
+            insertMoreInfo = ('MyTable', 'col1, col2', ['blue', 30.1])
+            res = self.fileConverter.prepareMySQLRow(insertMoreInfo)
+            # Should have insert statement for the prior submission...
+            self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('foo',10);", res)
+            # ... and the hold-back buffer should have the new submission:
+            self.assertEqual('MyTable', self.fileConverter.currOutTable)
+            self.assertEqual('col1, col2', self.fileConverter.currInsertSig)
+            self.assertEqual(["('blue',30.1)"], self.fileConverter.currValueTuples)
+            self.assertEqual(19, self.fileConverter.valsCacheSize)
+             
+            # Call FLUSH to get the held-back values:
+            res = self.fileConverter.prepareMySQLRow('FLUSH')
+            self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    ('blue',30.1);", res)
+            self.assertIsNone(self.fileConverter.currOutTable)
+            self.assertIsNone(self.fileConverter.currInsertSig)
+            self.assertEqual([], self.fileConverter.currValueTuples)
+            self.assertEqual(0, self.fileConverter.valsCacheSize)
 
-        # Second call:
-        insertMoreInfo = ('MyTable', 'col1, col2', [['blue', 30.1],['green',40.99]])
-        res = self.fileConverter.prepareMySQLRow(insertMoreInfo)
-        # Should have insert statement for the prior submission...
-        self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    (['foo', 10],['bar', 20]);", res)
-        # ... and the hold-back buffer should have the new submission:
-        self.assertEqual('MyTable', self.fileConverter.currOutTable)
-        self.assertEqual('col1, col2', self.fileConverter.currInsertSig)
-        self.assertEqual([[['blue', 30.1], ['green', 40.99]]], self.fileConverter.currValsArray)
-         
-        # Call FLUSH to get the held-back values:
-        res = self.fileConverter.prepareMySQLRow('FLUSH')
-        self.assertEqual("INSERT INTO MyTable (col1, col2) VALUES \n    (['blue', 30.1],['green', 40.99]);", res)
-        self.assertIsNone(self.fileConverter.currOutTable)
-        self.assertIsNone(self.fileConverter.currInsertSig)
-        self.assertEqual([], self.fileConverter.currValsArray)
+            # Values count with their UTF-8 bytes, as sent to MySQL:
+            res = self.fileConverter.prepareMySQLRow(('MyTable', 'col1, col2', [u'caf\xe9', 10]))
+            self.assertIsNone(res)
+            self.assertEqual(18, self.fileConverter.valsCacheSize)
+        finally:
+            JSONToRelation.MAX_ALLOWED_PACKET_SIZE = maxPacketSize
         
 #--------------------------------------------------------------------------------------------------    
     def assertFileContentEquals(self, expected, filePath):
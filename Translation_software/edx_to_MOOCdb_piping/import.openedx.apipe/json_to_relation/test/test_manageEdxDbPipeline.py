@@ -0,0 +1,203 @@
+'''
+Runs TrackLogPuller.pullTransformLoadPipelined() against a local
+directory in place of the S3 bucket, loading into SQLite in place
+of MySQL.
+'''
+import csv
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from json_to_relation.test.conversion_helpers import readEvents
+import scripts.manageEdxDb
+from scripts.manageEdxDb import TrackLogPuller
+
+
+LOAD_DATA_PATTERN = re.compile(r"LOAD DATA LOCAL INFILE '([^']*)' IGNORE INTO TABLE ([^\s]*) ")
+
+class LocalKey(object):
+    '''
+    The part of boto's S3 Key that TrackLogPuller uses.
+    '''
+    def __init__(self, rootDir, name):
+        self.path = os.path.join(rootDir, name)
+        self.name = name
+        self.size = os.path.getsize(self.path)
+
+    def get_contents_to_filename(self, fileName):
+        shutil.copyfile(self.path, fileName)
+
+class LocalBucket(object):
+    '''
+    The part of boto's S3 Bucket that TrackLogPuller uses,
+    over the files in a local directory tree.
+    '''
+    def __init__(self, rootDir):
+        self.rootDir = rootDir
+
+    def list(self):
+        keys = []
+        for (dirPath, dirNames, fileNames) in os.walk(self.rootDir):  # @UnusedVariable
+            for fileName in sorted(fileNames):
+                keys.append(LocalKey(self.rootDir, os.path.relpath(os.path.join(dirPath, fileName), self.rootDir)))
+        return keys
+
+    def get_key(self, name):
+        if not os.path.exists(os.path.join(self.rootDir, name)):
+            return None
+        return LocalKey(self.rootDir, name)
+
+class SQLiteLoader(object):
+    '''
+    Loads the .csv files named in LOAD DATA statements of .sql
+    files into SQLite tables, one JSON encoded row per record.
+    '''
+    def __init__(self, dbPath, loadDelay=0):
+        self.dbPath = dbPath
+        self.loadDelay = loadDelay
+        self.lock = threading.Lock()
+
+    def __call__(self, sqlFilePath):
+        time.sleep(self.loadDelay)
+        with open(sqlFilePath) as fd:
+            loads = LOAD_DATA_PATTERN.findall(fd.read())
+        with self.lock:
+            conn = sqlite3.connect(self.dbPath)
+            try:
+                for (csvFilePath, tableName) in loads:
+                    with open(csvFilePath) as csvFd:
+                        rows = list(csv.reader(csvFd, quotechar="'"))
+                    conn.execute('CREATE TABLE IF NOT EXISTS %s (row TEXT)' % tableName)
+                    conn.executemany('INSERT INTO %s VALUES (?)' % tableName, [(json.dumps(row),) for row in rows])
+                conn.commit()
+            finally:
+                conn.close()
+
+    def count(self, tableName):
+        conn = sqlite3.connect(self.dbPath)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM %s' % tableName).fetchone()[0]
+        finally:
+            conn.close()
+
+class TestManageEdxDbPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.bucketDir = os.path.join(self.tmpDir, 'bucket')
+        self.logStoreRoot = os.path.join(self.tmpDir, 'EdX')
+        self.csvDestDir = os.path.join(self.logStoreRoot, 'tracking', 'CSV')
+        self.oldLogStoreRoot = TrackLogPuller.LOCAL_LOG_STORE_ROOT
+        TrackLogPuller.LOCAL_LOG_STORE_ROOT = self.logStoreRoot
+        self.puller = TrackLogPuller(logFile=os.path.join(self.tmpDir, 'manageEdxDb.log'))
+        self.buckets = []
+        self.useBucket(LocalBucket)
+        self.writeLogs()
+        self.loader = SQLiteLoader(os.path.join(self.tmpDir, 'Edx.sqlite'))
+
+    def tearDown(self):
+        TrackLogPuller.LOCAL_LOG_STORE_ROOT = self.oldLogStoreRoot
+        shutil.rmtree(self.tmpDir)
+
+    def useBucket(self, bucketClass):
+        '''
+        Has the puller open a bucketClass instance wherever it
+        would connect to S3.
+        '''
+        def openS3Bucket():
+            bucket = bucketClass(self.bucketDir)
+            self.buckets.append(bucket)
+            return bucket
+        self.puller.openS3Bucket = openS3Bucket
+
+    def writeLogs(self):
+        events = readEvents()
+        for app in ['app10', 'app11']:
+            logDir = os.path.join(self.bucketDir, 'tracking', app)
+            os.makedirs(logDir)
+            for day in range(1, 4):
+                logFile = gzip.open(os.path.join(logDir, 'tracking.log-201306%02d.gz' % day), 'wb')
+                logFile.write('\n'.join(events * day) + '\n')
+                logFile.close()
+            # Not a tracking log:
+            with open(os.path.join(logDir, 'tracking.log-20130601-errors'), 'w') as fd:
+                fd.write('error\n')
+
+    def transformedEvents(self):
+        numEvents = 0
+        for fileName in os.listdir(self.csvDestDir):
+            if fileName.endswith('EdxTrackEventTable.csv'):
+                with open(os.path.join(self.csvDestDir, fileName)) as fd:
+                    numEvents += len(list(csv.reader(fd, quotechar="'")))
+        return numEvents
+
+    def testPipeline(self):
+        report = self.puller.pullTransformLoadPipelined(loader=self.loader, pullThreads=2, transformProcesses=2, queueDepth=1)
+        print('First load after %.2f seconds, all loaded after %.2f seconds.' % (report['firstLoadSeconds'], report['seconds']))
+        self.assertEqual([], report['failed'])
+        self.assertEqual(6, len(report['pulled']))
+        self.assertEqual(sorted(report['transformed']), sorted(report['loaded']))
+        self.assertTrue(0 < report['firstLoadSeconds'] < report['seconds'])
+        self.assertFalse(report['aborted'])
+        # One bucket to list the files, and one per download thread:
+        self.assertEqual(3, len(self.buckets))
+        self.assertEqual(6, self.loader.count('LoadInfo'))
+        self.assertTrue(self.transformedEvents() > 0)
+        self.assertEqual(self.transformedEvents(), self.loader.count('EdxTrackEvent'))
+        # Files are transformed and loaded once, and all were:
+        self.assertEqual([], self.puller.identifyNewLogFiles(self.logStoreRoot))
+        self.assertEqual([], self.puller.identifyNotTransformedLogFiles(csvDestDir=self.csvDestDir))
+        report = self.puller.pullTransformLoadPipelined(loader=self.loader)
+        self.assertEqual([], report['pulled'])
+        self.assertIsNone(report['firstLoadSeconds'])
+
+    def testSlowLoadHoldsBackTransforms(self):
+        self.loader.loadDelay = 1
+        filesAhead = []
+        def loader(sqlFilePath):
+            # Transformed files not yet taken up by a load:
+            numSqlFiles = len([fileName for fileName in os.listdir(self.csvDestDir) if fileName.endswith('.sql')])
+            filesAhead.append(numSqlFiles - len(filesAhead) - 1)
+            self.loader(sqlFilePath)
+        report = self.puller.pullTransformLoadPipelined(loader=loader, transformProcesses=1, queueDepth=1)
+        self.assertEqual(6, len(report['loaded']))
+        self.assertTrue(self.transformedEvents() > 0)
+        self.assertEqual(self.transformedEvents(), self.loader.count('EdxTrackEvent'))
+        # At most one file waits in the load queue, and one
+        # more waits for room in it:
+        self.assertTrue(max(filesAhead) <= 2, filesAhead)
+
+    def testFailedPull(self):
+        class BrokenBucket(LocalBucket):
+            def get_key(self, name):
+                if name.endswith('20130602.gz'):
+                    return None
+                return LocalBucket.get_key(self, name)
+        self.useBucket(BrokenBucket)
+        report = self.puller.pullTransformLoadPipelined(loader=self.loader)
+        self.assertEqual(['tracking/app10/tracking.log-20130602.gz', 'tracking/app11/tracking.log-20130602.gz'], sorted(report['failed']))
+        self.assertEqual(4, len(report['loaded']))
+
+    def testDeadTransformStopsPipeline(self):
+        def transformLogFile(*args):
+            raise RuntimeError('transform died')
+        oldTransformLogFile = scripts.manageEdxDb.transformLogFile
+        scripts.manageEdxDb.transformLogFile = transformLogFile
+        try:
+            # The downloads fill the queue to the dead transform:
+            report = self.puller.pullTransformLoadPipelined(loader=self.loader, transformProcesses=1, queueDepth=1)
+        finally:
+            scripts.manageEdxDb.transformLogFile = oldTransformLogFile
+        self.assertTrue(report['aborted'])
+        self.assertEqual([], report['loaded'])
+        self.assertTrue(len(report['pulled']) < 6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+'''
+Checks that TrackLogPuller.transform() in a pool of processes produces
+the same .sql and .csv files as a serial transform, and that it keeps
+identifyNotTransformedLogFiles() correct.
+'''
+import glob
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.test.conversion_helpers import UUID_PATTERN, readEvents, blankLoadDate
+from scripts.manageEdxDb import TrackLogPuller
+
+
+# The json2sql.py file stamp, which differs from one transform to the next:
+STAMP_PATTERN = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}_[0-9]{2}_[0-9]{2}\.[0-9]+_[0-9]+')
+
+class TestManageEdxDbTransform(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.oldLogStoreRoot = TrackLogPuller.LOCAL_LOG_STORE_ROOT
+        TrackLogPuller.LOCAL_LOG_STORE_ROOT = self.tmpDir
+        self.puller = TrackLogPuller(logFile=os.path.join(self.tmpDir, 'manageEdxDb.log'))
+        self.logFilePaths = self.writeLogs()
+
+    def tearDown(self):
+        TrackLogPuller.LOCAL_LOG_STORE_ROOT = self.oldLogStoreRoot
+        shutil.rmtree(self.tmpDir)
+
+    def writeLogs(self):
+        events = readEvents()
+        logFilePaths = []
+        for (app, day) in [('app10', 1), ('app10', 2), ('app10', 3), ('app11', 1), ('app11', 4)]:
+            logDir = os.path.join(self.tmpDir, 'tracking', app)
+            if not os.path.isdir(logDir):
+                os.makedirs(logDir)
+            logFilePath = os.path.join(logDir, 'tracking.log-201306%02d.gz' % day)
+            # Logs of different sizes:
+            logFile = gzip.open(logFilePath, 'wb')
+            logFile.write('\n'.join(events[:day + 3] * day) + '\n')
+            logFile.close()
+            logFilePaths.append(logFilePath)
+        return logFilePaths
+
+    def transformOutput(self, csvDestDir):
+        '''
+        Returns dict: output file name --> content, with the
+        parts that vary between transforms blanked out.
+        '''
+        output = {}
+        for fileName in os.listdir(csvDestDir):
+            with open(os.path.join(csvDestDir, fileName)) as fd:
+                content = fd.read()
+            content = content.replace(csvDestDir, '<csvDestDir>')
+            content = blankLoadDate(UUID_PATTERN.sub('<uuid>', STAMP_PATTERN.sub('<stamp>', content)))
+            output[STAMP_PATTERN.sub('<stamp>', fileName)] = content
+        return output
+
+    def testParallelLikeSerial(self):
+        serialDir = os.path.join(self.tmpDir, 'tracking', 'CSV')
+        parallelDir = os.path.join(self.tmpDir, 'tracking', 'CSVParallel')
+        os.makedirs(parallelDir)
+        serialReport = self.puller.transform(self.logFilePaths, serialDir, processes=1)
+        parallelReport = self.puller.transform(self.logFilePaths + self.logFilePaths[:2], parallelDir, processes=3)
+
+        for report in [serialReport, parallelReport]:
+            self.assertEqual(sorted(self.logFilePaths), sorted([logFilePath for (logFilePath, seconds, sqlFilePath, error) in report]))
+            self.assertEqual([None] * len(self.logFilePaths), [error for (logFilePath, seconds, sqlFilePath, error) in report])
+        # Largest file first:
+        self.assertEqual(self.logFilePaths[-1], serialReport[0][0])
+
+        serialOutput = self.transformOutput(serialDir)
+        self.assertEqual(len(self.logFilePaths), len([fileName for fileName in serialOutput.keys() if fileName.endswith('.sql')]))
+        self.assertTrue(all([len(content) > 0 for (fileName, content) in serialOutput.items() if fileName.endswith('EdxTrackEventTable.csv')]))
+        self.assertEqual(serialOutput, self.transformOutput(parallelDir))
+        # Nothing left of the staging directories:
+        self.assertEqual([], glob.glob(os.path.join(parallelDir, '.transform*')))
+
+        self.assertEqual([], self.puller.identifyNotTransformedLogFiles(csvDestDir=parallelDir))
+
+    def testNotTransformedFiles(self):
+        csvDestDir = os.path.join(self.tmpDir, 'tracking', 'CSV')
+        self.puller.transform(self.logFilePaths[:2], csvDestDir, processes=2)
+        # Leftovers of a crashed transform: .csv files, but no .sql file:
+        with open(os.path.join(csvDestDir, 'tracking.app11.tracking.log-20130604.gz.2013-12-05T00_33_29.900465_5064.sql_EdxTrackEventTable.csv'), 'w') as fd:
+            fd.write('')
+        self.assertEqual(sorted(self.logFilePaths[2:]), sorted(self.puller.identifyNotTransformedLogFiles(csvDestDir=csvDestDir)))
+        self.puller.transform(csvDestDir=csvDestDir, processes=2)
+        self.assertEqual([], self.puller.identifyNotTransformedLogFiles(csvDestDir=csvDestDir))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+'''
+Checks that ModulestoreImporter serves the same lookups from its
+SQLite ModulestoreIndex as from a parse of the modulestore JSON file,
+and that the index is rebuilt only when the JSON content changes.
+'''
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from json_to_relation.modulestoreImporter import ModulestoreImporter
+from json_to_relation.modulestoreIndex import ModulestoreIndex
+
+
+def modstoreEntries(courses=('HRP258', 'EDUC115N'), hashesPerCourse=20):
+    entries = []
+    for (courseIndex, course) in enumerate(courses):
+        entries.append({'_id':{'tag':'i4x', 'org':'Medicine', 'course':course, 'category':'course', 'name':'Course_%d' % courseIndex, 'revision':None},
+                        'metadata':{'display_name':'Course %d' % courseIndex}})
+        entries.append({'_id':{'tag':'i4x', 'org':'Medicine', 'course':course, 'category':'about', 'name':'effort', 'revision':None}})
+        for i in range(hashesPerCourse):
+            entries.append({'_id':{'tag':'i4x', 'org':'Medicine', 'course':course, 'category':'video', 'name':'%032x' % (courseIndex * 1000 + i), 'revision':'draft' if i % 2 else None},
+                            'metadata':{'display_name':u'Video %d é' % i}})
+    return entries
+
+class TestModulestoreIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.jsonFileName = os.path.join(self.tmpDir, 'modulestore_latest.json')
+        self.pickleCachePath = os.path.join(self.tmpDir, 'hashLookup.pkl')
+        self.writeModstore(modstoreEntries())
+
+    def tearDown(self):
+        ModulestoreImporter.modulestoreIndexCache.clear()
+        shutil.rmtree(self.tmpDir)
+
+    def writeModstore(self, entries):
+        with open(self.jsonFileName, 'w') as fd:
+            json.dump(entries, fd)
+
+    def makeImporter(self):
+        return ModulestoreImporter(self.jsonFileName, useCache=False, pickleCachePath=self.pickleCachePath)
+
+    def indexInode(self):
+        return os.stat(self.jsonFileName + '.sqlite').st_ino
+
+    def testLookupsMatchJSON(self):
+        importer = self.makeImporter()
+        self.assertIsInstance(importer.hashLookup, ModulestoreIndex)
+        # Parse the JSON as before the index:
+        parsed = self.makeImporter()
+        parsed.loadModstoreFromJSON()
+        self.assertEqual(parsed.hashLookup.keys(), importer.hashLookup.keys())
+        self.assertEqual(len(parsed.hashLookup), len(importer.hashLookup))
+        for key in parsed.hashLookup.keys():
+            self.assertEqual(parsed.hashLookup[key], importer.hashLookup[key])
+        self.assertEqual(parsed.courseNameLookup, importer.courseNameLookup)
+        self.assertEqual('Medicine/HRP258/Course_0', importer['HRP258'])
+        self.assertEqual(u'Video 3 é', importer.getDisplayName('%032x' % 3))
+        self.assertEqual('draft', importer.getRevision('%032x' % 1001))
+        self.assertIsNone(importer.getRevision('%032x' % 1000))
+        self.assertIsNone(importer.getDisplayName('%032x' % 999))
+        self.assertIsNone(importer.getDisplayName('%032x' % 999))
+
+    def testIndexReuse(self):
+        self.makeImporter()
+        indexInode = self.indexInode()
+        ModulestoreImporter.modulestoreIndexCache.clear()
+        # New file time, same content: no rebuild, which would
+        # rename a new index file into place:
+        os.utime(self.jsonFileName, (time.time() + 10, time.time() + 10))
+        importer = self.makeImporter()
+        self.assertEqual(indexInode, self.indexInode())
+        self.assertEqual('Medicine/EDUC115N/Course_1', importer['EDUC115N'])
+
+    def testIndexRebuiltOnChange(self):
+        self.makeImporter()
+        self.writeModstore(modstoreEntries(courses=('HRP258', 'CS144')))
+        os.utime(self.jsonFileName, (time.time() + 10, time.time() + 10))
+        importer = self.makeImporter()
+        self.assertEqual('Medicine/CS144/Course_1', importer['CS144'])
+        self.assertNotIn('EDUC115N', importer.keys())
+        self.assertEqual(['HRP258', 'CS144'], importer.getCourseNameMatcher().courseNames)
+
+    def testUnreadableIndex(self):
+        with open(self.jsonFileName + '.sqlite', 'w') as fd:
+            fd.write('not an index')
+        self.assertEqual('Medicine/HRP258/Course_0', self.makeImporter()['HRP258'])
+
+if __name__ == "__main__":
+    unittest.main()
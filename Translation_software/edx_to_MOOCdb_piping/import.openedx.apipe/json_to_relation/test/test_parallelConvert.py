@@ -0,0 +1,100 @@
+'''
+Checks that JSONToRelation.convert() with several processes writes
+the same output as a serial conversion, including the server downtimes
+and heartbeats that span batches.
+'''
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+from json_to_relation.generic_json_parser import GenericJSONParser
+from json_to_relation.input_source import InURI
+from json_to_relation.json_to_relation import JSONToRelation
+from json_to_relation.output_disposition import OutputDisposition, OutputFile
+from json_to_relation.test.conversion_helpers import DATA_DIR, readEvents, \
+    makeConverter, convertToFiles
+
+
+class TestParallelConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        events = readEvents()
+        with open(os.path.join(DATA_DIR, 'edxHeartbeatEvent.json')) as fd:
+            heartbeat = json.loads(fd.readline())
+        # Heartbeats of two servers, with and without downtimes
+        # between them, mixed with other events:
+        lines = []
+        startTime = datetime.datetime(2013, 7, 18, 8, 0, 0)
+        for (i, secondsLater) in enumerate([0, 60, 120, 1000, 1010, 1020, 1030, 3000, 3001, 3002, 3003, 3004]):
+            for ip in ['10.0.0.1', '10.0.0.2']:
+                heartbeat['ip'] = ip
+                heartbeat['time'] = (startTime + datetime.timedelta(seconds=secondsLater + len(ip))).isoformat() + '.000000+00:00'
+                lines.append(json.dumps(heartbeat))
+            lines.append(events[i % len(events)])
+            if i % 3 == 0:
+                lines.append('')
+        lines.extend(events * 2)
+        self.eventsFile = os.path.join(self.tmpDir, 'events.json')
+        with open(self.eventsFile, 'w') as fd:
+            fd.write('\n'.join(lines) + '\n')
+        EdXTrackLogJSONParser.resetHashCache()
+
+    def tearDown(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        shutil.rmtree(self.tmpDir)
+
+    def convert(self, jsonFile, runName, **convertArgs):
+        '''
+        Converts jsonFile, and returns dict: output file suffix --> content.
+        '''
+        return convertToFiles(jsonFile, os.path.join(self.tmpDir, runName + '.sql'), uniqueIDSeed='events', convertArgs=convertArgs)
+
+    def assertSameOutput(self, expected, output):
+        self.assertEqual(sorted(expected.keys()), sorted(output.keys()))
+        for suffix in expected.keys():
+            self.assertEqual(expected[suffix], output[suffix], 'Output %s differs' % suffix)
+
+    def testParallelLikeSerial(self):
+        serial = self.convert(self.eventsFile, 'serial')
+        # Downtimes of both servers are recorded, and heartbeats without one are not:
+        self.assertEqual(2, serial['_EdxTrackEventTable.csv'].count("'0:14:40'"))
+        self.assertEqual(2, serial['_EdxTrackEventTable.csv'].count("'0:32:50'"))
+        self.assertEqual(9, serial['_EdxTrackEventTable.csv'].count("'/heartbeat'"))
+        serialHashes = dict(EdXTrackLogJSONParser.screenNameHashes)
+        self.assertTrue(len(serialHashes) > 0)
+        for (processes, batchSize) in [(2, 1), (2, 4), (3, 7), (4, 1000)]:
+            EdXTrackLogJSONParser.resetHashCache()
+            self.assertSameOutput(serial, self.convert(self.eventsFile, 'parallel%d_%d' % (processes, batchSize), processes=processes, batchSize=batchSize))
+            # The parent learned the workers' screen name hashes:
+            self.assertEqual(serialHashes, EdXTrackLogJSONParser.screenNameHashes)
+
+    def testCompressedSource(self):
+        gzFile = self.eventsFile + '.gz'
+        with open(self.eventsFile) as inFd:
+            outFd = gzip.open(gzFile, 'wb')
+            outFd.write(inFd.read())
+            outFd.close()
+        self.assertSameOutput(self.convert(gzFile, 'serial'), self.convert(gzFile, 'parallel', processes=2, batchSize=5))
+
+    def testRandomIDsWithoutSeed(self):
+        (fileConverter, edxParser) = makeConverter(self.eventsFile, OutputFile(os.path.join(self.tmpDir, 'out.sql'), OutputDisposition.OutputFormat.CSV)) # @UnusedVariable
+        self.assertNotEqual(edxParser.getUniqueID(), edxParser.getUniqueID())
+        edxParser.setUniqueIDSeed('events')
+        firstID = edxParser.getUniqueID()
+        self.assertNotEqual(firstID, edxParser.getUniqueID())
+        edxParser.setUniqueIDSeed('events')
+        self.assertEqual(firstID, edxParser.getUniqueID())
+
+    def testParserWithoutBatches(self):
+        fileConverter = JSONToRelation(InURI(self.eventsFile), OutputFile(os.path.join(self.tmpDir, 'out.sql'), OutputDisposition.OutputFormat.CSV))
+        fileConverter.setParser(GenericJSONParser(fileConverter))
+        self.assertRaises(ValueError, fileConverter.convert, processes=2)
+
+if __name__ == "__main__":
+    unittest.main()
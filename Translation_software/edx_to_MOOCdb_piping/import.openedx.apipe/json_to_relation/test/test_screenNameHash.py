@@ -0,0 +1,103 @@
+'''
+Checks the memoized makeHash() of EdXTrackLogJSONParser, its bulk
+version makeHashes(), and the side file that keeps hashes across runs.
+'''
+import hashlib
+import logging
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+
+from json_to_relation import edxTrackLogJSONParser
+from json_to_relation.edxTrackLogJSONParser import EdXTrackLogJSONParser
+
+
+try:
+    hashlib.new('ripemd160')
+    RIPEMD160_AVAILABLE = True
+except ValueError:
+    # OpenSSL builds without the legacy algorithms:
+    RIPEMD160_AVAILABLE = False
+
+def ripemd160(username):
+    oneHash = hashlib.new('ripemd160')
+    oneHash.update(username)
+    return oneHash.hexdigest()
+
+@unittest.skipIf(not RIPEMD160_AVAILABLE, "ripemd160 not supported by this Python's hashlib")
+class TestScreenNameHash(unittest.TestCase):
+
+    def setUp(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        EdXTrackLogJSONParser.resetHashCache()
+        shutil.rmtree(self.tmpDir)
+
+    def testMakeHash(self):
+        self.assertEqual(ripemd160('smith'), EdXTrackLogJSONParser.makeHash('smith'))
+        self.assertEqual(ripemd160('smith'), EdXTrackLogJSONParser.makeHash('smith'))
+        self.assertEqual(ripemd160('jones'), EdXTrackLogJSONParser.makeHash('jones'))
+        self.assertEqual({'hits':1, 'misses':2, 'hitRate':1/3., 'size':2}, EdXTrackLogJSONParser.getHashCacheStats())
+
+    def testMakeHashes(self):
+        screenNames = ['smith', 'jones', 'smith', '', 'smith']
+        self.assertEqual([ripemd160(screenName) for screenName in screenNames], EdXTrackLogJSONParser.makeHashes(screenNames))
+        stats = EdXTrackLogJSONParser.getHashCacheStats()
+        self.assertEqual((2, 3, 3), (stats['hits'], stats['misses'], stats['size']))
+        self.assertEqual([], EdXTrackLogJSONParser.makeHashes([]))
+
+    def testMemoIsBounded(self):
+        for i in range(edxTrackLogJSONParser.MAX_HASHED_SCREEN_NAMES + 10):
+            EdXTrackLogJSONParser.makeHash('user%d' % i)
+        self.assertLessEqual(EdXTrackLogJSONParser.getHashCacheStats()['size'], edxTrackLogJSONParser.MAX_HASHED_SCREEN_NAMES)
+        self.assertEqual(ripemd160('user0'), EdXTrackLogJSONParser.makeHash('user0'))
+
+    def testSideFile(self):
+        self.assertEqual(0, EdXTrackLogJSONParser.loadHashCache(self.tmpDir))
+        EdXTrackLogJSONParser.makeHashes(['smith', 'jones'])
+        EdXTrackLogJSONParser.saveHashCache(self.tmpDir)
+        self.assertEqual([os.path.basename(EdXTrackLogJSONParser.hashCacheFileName(self.tmpDir))], os.listdir(self.tmpDir))
+        # Screen names in plain text, for the owner's eyes only:
+        self.assertEqual(0600, stat.S_IMODE(os.stat(EdXTrackLogJSONParser.hashCacheFileName(self.tmpDir)).st_mode))
+
+        EdXTrackLogJSONParser.resetHashCache()
+        self.assertEqual(2, EdXTrackLogJSONParser.loadHashCache(self.tmpDir))
+        self.assertEqual(ripemd160('smith'), EdXTrackLogJSONParser.makeHash('smith'))
+        self.assertEqual({'hits':1, 'misses':0, 'hitRate':1.0, 'size':2}, EdXTrackLogJSONParser.getHashCacheStats())
+
+    def testSideFileOverLimit(self):
+        EdXTrackLogJSONParser.makeHashes(['smith', 'jones'])
+        EdXTrackLogJSONParser.saveHashCache(self.tmpDir)
+        EdXTrackLogJSONParser.resetHashCache()
+        EdXTrackLogJSONParser.makeHashes(['lee', 'kim'])
+        warnings = []
+        handler = logging.Handler()
+        handler.emit = lambda record: warnings.append(record.getMessage())
+        logger = logging.getLogger('jsonToRel')
+        logger.addHandler(handler)
+        maxHashes = edxTrackLogJSONParser.MAX_HASHED_SCREEN_NAMES
+        edxTrackLogJSONParser.MAX_HASHED_SCREEN_NAMES = 3
+        try:
+            self.assertEqual(0, EdXTrackLogJSONParser.loadHashCache(self.tmpDir))
+        finally:
+            edxTrackLogJSONParser.MAX_HASHED_SCREEN_NAMES = maxHashes
+            logger.removeHandler(handler)
+        self.assertEqual(1, len(warnings))
+        self.assertIn('not loaded', warnings[0])
+
+    def testSideFileOfOtherHashFunction(self):
+        EdXTrackLogJSONParser.makeHash('smith')
+        EdXTrackLogJSONParser.saveHashCache(self.tmpDir)
+        os.rename(EdXTrackLogJSONParser.hashCacheFileName(self.tmpDir), os.path.join(self.tmpDir, 'screenNameHashes_0123456789abcdef.pkl'))
+        EdXTrackLogJSONParser.resetHashCache()
+        self.assertEqual(0, EdXTrackLogJSONParser.loadHashCache(self.tmpDir))
+
+    def testFingerprint(self):
+        self.assertEqual(ripemd160('anon_screen_name fingerprint')[:16], EdXTrackLogJSONParser.hashFingerprint())
+
+if __name__ == "__main__":
+    unittest.main()
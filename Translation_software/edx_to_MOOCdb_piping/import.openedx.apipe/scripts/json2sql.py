@@ -35,7 +35,7 @@ from output_disposition import OutputDisposition, OutputFile
 
 hostname = socket.gethostname()
 LOCAL_LOG_STORE_ROOT = '/home/quentin/EdxLogs/debug'
-def buildOutputFileName(inFilePath, destDir, fileStamp):
+def buildOutputFileName(inFilePath, destDir, fileStamp, logStoreRoot=None):
     '''
     Given the full path to a .json tracking log file, a destination
     directory where results of a transform to relational tables will
@@ -56,13 +56,17 @@ def buildOutputFileName(inFilePath, destDir, fileStamp):
     @type destDir: String
     @param fileStamp: timestamp
     @type fileStamp: String
+    @param logStoreRoot: root to remove from inFilePath. Default: LOCAL_LOG_STORE_ROOT
+    @type logStoreRoot: String
     @return: a full filename with a .sql extension, derived from the input file name
     @rtype: String
     '''
-    rootEnd = inFilePath.find(LOCAL_LOG_STORE_ROOT)
+    if logStoreRoot is None:
+        logStoreRoot = LOCAL_LOG_STORE_ROOT
+    rootEnd = inFilePath.find(logStoreRoot)
     if rootEnd < 0:
         return os.path.join(destDir, os.path.basename(inFilePath)) + '.' + fileStamp + '.sql'
-    subTreePath = inFilePath[rootEnd+len(LOCAL_LOG_STORE_ROOT):]
+    subTreePath = inFilePath[rootEnd+len(logStoreRoot):]
     subTreePath = re.sub('/', '.', subTreePath)
     if subTreePath[0] == '.':
         subTreePath = subTreePath[1:]
@@ -87,10 +91,27 @@ if __name__ == "__main__":
                         dest='verbose',
                         action='store_true');
     parser.add_argument('-t', '--targetFormat', 
-                        help='Output one CSV file per table, a dump file as would be created my mysqldump, or both. Default: sql_dump', 
+                        help='Output one CSV file per table, a dump file as would be created my mysqldump, both, or a directory of typed column arrays per table (needs numpy). Default: sql_dump', 
                         dest='targetFormat',
                         default='sql_dump',
-                        choices = ['csv', 'sql_dump', 'sql_dump_and_csv']);
+                        choices = ['csv', 'sql_dump', 'sql_dump_and_csv', 'columnar']);
+    parser.add_argument('-c', '--hashCacheDir', 
+                        help='directory of a side file that keeps anon_screen_name hashes across runs. The file maps screen names to their hashes; keep it private. Default: no side file.', 
+                        dest='hashCacheDir',
+                        default=None);
+    parser.add_argument('-l', '--logDir', 
+                        help='directory for the transform log file. Default: <destDir>/../TransformLogs', 
+                        dest='logDir',
+                        default=None);
+    parser.add_argument('-r', '--logStoreRoot', 
+                        help='root of the tracking log tree, which is left out of the output file names. Default: %s' % LOCAL_LOG_STORE_ROOT, 
+                        dest='logStoreRoot',
+                        default=None);
+    parser.add_argument('-j', '--processes', 
+                        help='number of processes among which batches of the input file are converted. Default: convert in one process.', 
+                        dest='processes',
+                        type=int,
+                        default=None);
     parser.add_argument('destDir',
                         help='file path for the destination .sql/csv file(s)')                        
     parser.add_argument('inFilePath',
@@ -106,7 +127,7 @@ if __name__ == "__main__":
     dt = datetime.datetime.fromtimestamp(time.time())
     fileStamp = dt.isoformat().replace(':','_') + '_' + str(os.getpid())
 
-    outFullPath = buildOutputFileName(args.inFilePath, args.destDir, fileStamp) 
+    outFullPath = buildOutputFileName(args.inFilePath, args.destDir, fileStamp, args.logStoreRoot) 
 
     #********************
     #print('In: %s' % args.inFilePath)
@@ -114,8 +135,11 @@ if __name__ == "__main__":
     #sys.exit()
     #********************
 
-    # Log file will go to <destDir>/../TransformLogs, the file being named j2s_<inputFileName>.log:
-    logDir = os.path.join(args.destDir, '..') + '/TransformLogs'
+    # Log file will go to <destDir>/../TransformLogs, unless given,
+    # the file being named j2s_<inputFileName>.log:
+    logDir = args.logDir
+    if logDir is None:
+        logDir = os.path.join(args.destDir, '..') + '/TransformLogs'
     if not os.access(logDir, os.W_OK):
         try:
             os.makedirs(logDir)
@@ -140,10 +164,18 @@ if __name__ == "__main__":
         outputFormat = OutputDisposition.OutputFormat.CSV
     elif args.targetFormat == 'sql_dump':
         outputFormat = OutputDisposition.OutputFormat.SQL_INSERT_STATEMENTS
+    elif args.targetFormat == 'columnar':
+        outputFormat = OutputDisposition.OutputFormat.COLUMNAR
     else:
         outputFormat = OutputDisposition.OutputFormat.SQL_INSERTS_AND_CSV
 
-    outSQLFile = OutputFile(outFullPath, outputFormat, options='wb')  # overwrite any sql file that's there
+    if outputFormat == OutputDisposition.OutputFormat.COLUMNAR:
+        # Only columnar output needs numpy:
+        from columnar_output import OutputColumnar
+        # Directory next to where the .sql file would go:
+        outSQLFile = OutputColumnar(os.path.splitext(outFullPath)[0] + '.columnar')
+    else:
+        outSQLFile = OutputFile(outFullPath, outputFormat, options='wb')  # overwrite any sql file that's there
     jsonConverter = JSONToRelation(InURI(args.inFilePath),
                                    outSQLFile,
                                    mainTableName='EdxTrackEvent',
@@ -153,7 +185,8 @@ if __name__ == "__main__":
         jsonConverter.setParser(EdXTrackLogJSONParser(jsonConverter, 
         						  'EdxTrackEvent', 
         						  replaceTables=args.dropTables, 
-        						  dbName='Edx'
+        						  dbName='Edx',
+        						  screenNameHashDir=args.hashCacheDir
         						  ))
     except Exception as e:
         with open(logFile, 'w') as fd:
@@ -167,5 +200,5 @@ if __name__ == "__main__":
             pass
         sys.exit(1)
         
-    jsonConverter.convert()
+    jsonConverter.convert(processes=args.processes)
 
@@ -16,16 +16,24 @@ source_dir = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "../json_
 source_dir.extend(sys.path)
 sys.path = source_dir
 
+import itertools
+
 from edxTrackLogJSONParser import EdXTrackLogJSONParser
 
+# Number of stdin lines hashed with each call to makeHashes():
+BATCH_SIZE = 10000
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: makeAnonScreenName {str1 str2 ... | -} # Use dash to read input strings from stdin, e.g. from a pipe")
         sys.exit(1)
     if sys.argv[1] == '-':
-        for screenName in sys.stdin:
-            print(EdXTrackLogJSONParser.makeHash(screenName))
+        while True:
+            screenNames = list(itertools.islice(sys.stdin, BATCH_SIZE))
+            if len(screenNames) == 0:
+                break
+            sys.stdout.write('\n'.join(EdXTrackLogJSONParser.makeHashes(screenNames)) + '\n')
     else:
-        for screenName in sys.argv[1:]:
-            print(EdXTrackLogJSONParser.makeHash(screenName))
+        for hashVal in EdXTrackLogJSONParser.makeHashes(sys.argv[1:]):
+            print(hashVal)
     
\ No newline at end of file
@@ -20,7 +20,7 @@ than Stanford's. See below.
 
 usage: manageEdxDb.py [-h] [-l ERRLOGFILE] [-d] [-v] [--logsDest LOGSDEST]
                       [--logsSrc LOGSSRC] [--sqlDest SQLDEST]
-                      [--sqlSrc SQLSRC] [-u USER] [-p]
+                      [--sqlSrc SQLSRC] [-j PROCESSES] [--pipeline] [-u USER] [-p]
                       toDo
 
 positional arguments:
@@ -48,6 +48,11 @@ optional arguments:
                             default LOCAL_LOG_STORE_ROOT/tracking/CSV.
   --pullLimit PULLLIMIT
                         For load: maximum number of new OpenEdx tracking log files to pull from AmazonS3
+  -j PROCESSES, --processes PROCESSES
+                        For transform: number of log files to transform in parallel;
+                            default: transform via transformGivenLogfiles.sh.
+  --pipeline            For pullTransformLoad: load each file as soon as it is transformed, and
+                            transform each as soon as it is pulled, with --processes transforms at a time.
   -u USER, --user USER  For load: user ID whose HOME/.ssh/mysql_root contains the localhost MySQL root password.
   -p, --password        For load: request to be asked for pwd for operating MySQL;
                             default: content of /home/paepcke/.ssh/mysql_root if --user is unspecified,
@@ -79,13 +84,19 @@ import datetime
 import getpass
 import glob
 import logging
+import multiprocessing
 import os
+import Queue
 import re
 import sets
+import shutil
 import socket
 import string
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 
 import boto
 #import boto.connection 
@@ -103,6 +114,58 @@ from pymysql_utils.pymysql_utils import MySQLDB
 # to None to make Eclipse happy:
 sys.last_value = None
 
+def transformLogFile(logFilePath, csvDestDir, logDir, logStoreRoot):
+    '''
+    Transforms one tracking log file with json2sql.py. The .csv and
+    .sql files are first written to a private staging directory within
+    csvDestDir, and only then renamed into csvDestDir; the .sql file
+    last. So csvDestDir never holds a partial .sql file, and a .sql file
+    in csvDestDir means that its log file was completely transformed.
+    Module level, so that multiprocessing pools can call it.
+    @param logFilePath: full path of the tracking log file
+    @type logFilePath: String
+    @param csvDestDir: directory for the .sql and .csv files
+    @type csvDestDir: String
+    @param logDir: directory for the json2sql.py log file
+    @type logDir: String
+    @param logStoreRoot: root of the tracking log tree, as in TrackLogPuller.LOCAL_LOG_STORE_ROOT
+    @type logStoreRoot: String
+    @return: logFilePath, the seconds the transform took, the full path of
+             the .sql file or None if the transform failed, and an error message or None
+    @rtype: (String, float, String, String)
+    '''
+    startTime = time.time()
+    stagingDir = None
+    try:
+        stagingDir = tempfile.mkdtemp(prefix='.transform.%s.' % os.path.basename(logFilePath), dir=csvDestDir)
+        json2sql = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json2sql.py')
+        retCode = subprocess.call([sys.executable, json2sql, '-t', 'csv', '-l', logDir, '-r', logStoreRoot, stagingDir, logFilePath])
+        sqlFiles = filter(TrackLogPuller.SQL_FILE_NAME_PATTERN.search, os.listdir(stagingDir))
+        if retCode != 0 or len(sqlFiles) != 1:
+            return (logFilePath, time.time() - startTime, None, 'json2sql.py exited with %d' % retCode)
+        sqlFileName = sqlFiles[0]
+        for fileName in os.listdir(stagingDir):
+            if fileName != sqlFileName:
+                os.rename(os.path.join(stagingDir, fileName), os.path.join(csvDestDir, fileName))
+        # The .sql file loads the .csv files from where they were
+        # written; point it to their final place:
+        with open(os.path.join(stagingDir, sqlFileName), 'rb') as fd:
+            sqlStatements = fd.read()
+        sqlFilePath = os.path.join(csvDestDir, sqlFileName)
+        tmpSqlFilePath = '%s.%d.tmp' % (sqlFilePath, os.getpid())
+        with open(tmpSqlFilePath, 'wb') as fd:
+            fd.write(sqlStatements.replace(os.path.join(stagingDir, ''), os.path.join(csvDestDir, '')))
+        os.rename(tmpSqlFilePath, sqlFilePath)
+        return (logFilePath, time.time() - startTime, sqlFilePath, None)
+    except Exception as e:
+        return (logFilePath, time.time() - startTime, None, `e`)
+    finally:
+        if stagingDir is not None:
+            shutil.rmtree(stagingDir, ignore_errors=True)
+
+def transformLogFileStar(args):
+    return transformLogFile(*args)
+
 class TrackLogPuller(object):
     '''
     Logs into S3 service, and pulls JSON formatted OpenEdX track log files that have not
@@ -145,6 +208,12 @@ class TrackLogPuller(object):
     TRACKING_LOG_FILE_NAME_PATTERN = re.compile(r'tracking.log-[0-9]{8}[-0-9]*.gz$')
     
     SQL_FILE_NAME_PATTERN = re.compile(r'.sql$')
+
+    # Tables whose non-primary indexes the .sql files of transforms
+    # disable, by database (Account and EventIp are moved to EdxPrivate).
+    # The .sql files do not re-enable them; see enableKeys():
+    KEYS_DISABLED_TABLES = [('Edx', ['EdxTrackEvent', 'State', 'InputState', 'Answer', 'CorrectMap', 'LoadInfo', 'ABExperiment']),
+                            ('EdxPrivate', ['Account', 'EventIp'])]
     FILE_DATE_PATTERN = re.compile(r'[^-]*-([0-9]*)[^.]*\.gz')
 
     
@@ -174,15 +243,25 @@ class TrackLogPuller(object):
         manageExDb.py to have a .boto subdirectory with the requisite
         authentication information.
         '''
+        self.tracking_log_bucket = self.openS3Bucket()
+        return self.tracking_log_bucket is not None
+
+    def openS3Bucket(self):
+        '''
+        Opens a new connection to Amazon S3, and returns the tracking log
+        bucket through that connection. boto connections are not thread-safe,
+        so each thread that downloads needs a bucket of its own.
+        @return: the bucket, or None if the connection could not be established.
+        @rtype: boto.s3.bucket.Bucket
+        '''
         try:
             conn = boto.connect_s3()
-            self.tracking_log_bucket = conn.get_bucket(TrackLogPuller.LOG_BUCKETNAME)
+            return conn.get_bucket(TrackLogPuller.LOG_BUCKETNAME)
         except boto.exception.NoAuthHandlerFound as e:
             # TODO: more error cases to watch here to be sure (bucket not found?)
             self.logErr("boto authentication error: %s\n%s" % 
                         (str(e), "   Suggestion: put your credentials in AWS_ACCESS_KEY and AWS_SECRET_KEY environment variables, or a ~/.boto file"))
-            return False
-        return True
+            return None
         
     def identifyNewLogFiles(self, localTrackingLogFileRoot=None, pullLimit=None):
         '''
@@ -537,42 +616,62 @@ class TrackLogPuller(object):
                 self.logDebug('No pullLimit specified; will pull all %d new tracking log files.' % len(rfileNamesToPull))
             
         for rfileNameToPull in rfileNamesToPull:
-            localDest = os.path.join(destDir, rfileNameToPull)
             if dryRun:
                 self.logInfo("Would download file %s from S3" % rfileNameToPull)
             else:
-                if self.tracking_log_bucket is None:
-                    self.logInfo("Establishing connection to Amazon S3")
-                    # No connection has been established yet to S3:
-                    if not self.openS3Connection():
-                        try:
-                            self.logErr("Could not connect to Amazon 3S: %s" % sys.last_value)
-                        except AttributeError:
-                            # The last_value wasn't initialized yet:
-                            sys.last_value = ""
-                        raise IOError("Could not connect to Amazon S3 to examine existing tracking log file list.")
-                
-                self.logInfo("Downloading file %s from S3 to %s..." % (rfileNameToPull, localDest))
-                fileKey = self.tracking_log_bucket.get_key(rfileNameToPull)
-                if fileKey is None:
-                    self.logErr("Remote OpenEdX log file %s was detected earlier, but cannot retrieve associated key object now." % rfileNameToPull)
-                    continue
-                # Ensure that the directory path to the local
-                # dest exists:
-                try:
-                    os.makedirs(os.path.dirname(localDest))
-                except OSError as e:
-                    #self.logErr('Error while trying to write track log file to local (%s): %s' % (localDest, `e`))
-                    # Dir already exists; fine
-                    pass
-                fileKey.get_contents_to_filename(localDest)
+                self.pullFile(rfileNameToPull, destDir)
         if dryRun:
             self.logInfo("Would have pulled OpenEdX tracking log files from S3 as per above listings.")
         else:
             self.logInfo("Pulled OpenEdX tracking log files from S3: %s" % str(rfileNamesToPull))
         return rfileNamesToPull
 
-    def transform(self, logFilePaths=None, csvDestDir=None, dryRun=False):
+    def pullFile(self, rfileNameToPull, destDir, bucket=None):
+        '''
+        Copies one track log file from S3 to destDir/rfileNameToPull.
+        @param rfileNameToPull: S3 key name, like 'tracking/app10/tracking.log-20130609.gz'
+        @type rfileNameToPull: String
+        @param destDir: directory from which subtree tracking/appNN/filename, etc. descend.
+        @type destDir: String
+        @param bucket: bucket to pull from. If None, the bucket of this puller's
+               connection, which is opened if needed. Threads that pull at the same
+               time must each pass their own bucket, from openS3Bucket().
+        @type bucket: boto.s3.bucket.Bucket
+        @return: full path of the downloaded file, or None if the key could not be retrieved.
+        @rtype: String
+        @raise: IOError if connection to S3 cannot be established.        
+        '''
+        localDest = os.path.join(destDir, rfileNameToPull)
+        if bucket is None and self.tracking_log_bucket is None:
+            self.logInfo("Establishing connection to Amazon S3")
+            # No connection has been established yet to S3:
+            if not self.openS3Connection():
+                try:
+                    self.logErr("Could not connect to Amazon 3S: %s" % sys.last_value)
+                except AttributeError:
+                    # The last_value wasn't initialized yet:
+                    sys.last_value = ""
+                raise IOError("Could not connect to Amazon S3 to examine existing tracking log file list.")
+        if bucket is None:
+            bucket = self.tracking_log_bucket
+        
+        self.logInfo("Downloading file %s from S3 to %s..." % (rfileNameToPull, localDest))
+        fileKey = bucket.get_key(rfileNameToPull)
+        if fileKey is None:
+            self.logErr("Remote OpenEdX log file %s was detected earlier, but cannot retrieve associated key object now." % rfileNameToPull)
+            return None
+        # Ensure that the directory path to the local
+        # dest exists:
+        try:
+            os.makedirs(os.path.dirname(localDest))
+        except OSError as e:
+            #self.logErr('Error while trying to write track log file to local (%s): %s' % (localDest, `e`))
+            # Dir already exists; fine
+            pass
+        fileKey.get_contents_to_filename(localDest)
+        return localDest
+
+    def transform(self, logFilePaths=None, csvDestDir=None, dryRun=False, processes=None):
         '''
         Given a list of full-path log files, initiate their transform.
         Uses gnu parallel to use multiple cores if available. One error log file
@@ -580,6 +679,11 @@ class TrackLogPuller(object):
         are written to directory TransformLogs that is a sibling of the given
         csvDestDir. Assumes that script transformGivenLogfiles.sh found by
         subprocess. Just have it in the same dir as this file.
+        
+        If processes is given, the files are instead transformed by a pool
+        of that many processes, largest files first, via transformLogFile().
+        Each file's .sql file only appears in csvDestDir once the file is
+        completely transformed. A timing report is logged, and returned.
         @param logFilePaths: list of full-path track log files that are to be transformed.
         @type logFilePaths: [String]
         @param csvDestDir: full path to dir where sql files will be deposited. If None,
@@ -587,6 +691,11 @@ class TrackLogPuller(object):
         @type csvDestDir: String
         @param dryRun: if True, only log what *would* be done. Cause no actual changes.
         @type dryRun: Bool
+        @param processes: number of transform processes. If None, transformGivenLogfiles.sh is used.
+        @type processes: int
+        @return: if processes is given: list of (logFilePath, seconds, sqlFilePath, error)
+                 in the order the transforms finished, with sqlFilePath None for failed ones.
+        @rtype: [(String, float, String, String)]
         '''
         
         self.logDebug("Method transform() called with logFilePaths='%s'; csvDestDir='%s'" % (logFilePaths,csvDestDir))
@@ -608,6 +717,9 @@ class TrackLogPuller(object):
             # If call failed, all dirs already exist:
             pass
         
+        if processes is not None:
+            return self.transformInPool(logFilePaths, csvDestDir, processes, dryRun)
+
         thisScriptsDir = os.path.dirname(__file__)
         shellCommand = [os.path.join(thisScriptsDir, 'transformGivenLogfiles.sh'), csvDestDir]
         # Add the logfiles as arguments; if that's a wildcard expression,
@@ -657,6 +769,50 @@ class TrackLogPuller(object):
             subprocess.call(shellCommand)
             self.logInfo('Done transforming %d newly downloaded tracklog file(s)...' % len(fileList))
 
+    def transformInPool(self, logFilePaths, csvDestDir, processes, dryRun=False):
+        '''
+        Transforms the given log files in a pool of processes. See transform().
+        '''
+        if isinstance(logFilePaths, basestring):
+            logFilePaths = glob.glob(logFilePaths)
+        # The same file twice would be transformed by two processes at once:
+        logFilePaths = sorted(sets.Set(logFilePaths))
+        # Longest transforms first, so that no large file starts
+        # last while the other processes sit idle:
+        logFilePaths.sort(key=os.path.getsize, reverse=True)
+        csvDestDir = os.path.abspath(csvDestDir)
+        logDir = os.path.join(csvDestDir, '..') + '/TransformLogs'
+        processes = max(1, min(processes, len(logFilePaths)))
+        if dryRun:
+            self.logInfo('Would transform %d tracklog files with %d processes, in this order: %s' %
+                         (len(logFilePaths), processes, ' '.join(logFilePaths)))
+            return []
+
+        self.logInfo('Starting to transform %d tracklog files with %d processes...' % (len(logFilePaths), processes))
+        startTime = time.time()
+        workItems = [(logFilePath, csvDestDir, logDir, TrackLogPuller.LOCAL_LOG_STORE_ROOT) for logFilePath in logFilePaths]
+        if processes == 1:
+            report = map(transformLogFileStar, workItems)
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                # chunksize 1 hands out the files in order of size:
+                report = list(pool.imap_unordered(transformLogFileStar, workItems, 1))
+            finally:
+                pool.close()
+                pool.join()
+        elapsed = time.time() - startTime
+
+        for (logFilePath, seconds, sqlFilePath, error) in report:
+            if error is None:
+                self.logInfo('Transformed %s (%d bytes) in %.1f seconds.' % (logFilePath, os.path.getsize(logFilePath), seconds))
+            else:
+                self.logErr('Failed to transform %s after %.1f seconds: %s' % (logFilePath, seconds, error))
+        self.logInfo('Done transforming %d tracklog file(s) in %.1f seconds (%.1f seconds of transforms); %d failed.' %
+                     (len(report), elapsed, sum([seconds for (logFilePath, seconds, sqlFilePath, error) in report]),
+                      len([error for (logFilePath, seconds, sqlFilePath, error) in report if error is not None])))
+        return report
+
     def load(self, mysqlPWD=None, sqlFilesToLoad=None, logDir=None, csvDir=None, dryRun=False):
         '''
         Given a directory that contains .sql files, or an array of full-path .sql
@@ -742,6 +898,265 @@ class TrackLogPuller(object):
         except Exception as e:
             self.logErr('Could not create table of all course_display_list: %s' % `e`)
         
+    def loadSQLFile(self, sqlFilePath, mysqlPWD=None):
+        '''
+        Loads one .sql file from a transform, and thereby its .csv
+        files, into MySQL as root. Unlike load(), does not drop and
+        rebuild the primary keys around the load, and leaves the
+        non-primary indexes disabled; call enableKeys() after the
+        last load.
+        @param sqlFilePath: full path of the .sql file
+        @type sqlFilePath: String
+        @param mysqlPWD: Root password for MySQL db.
+        @type mysqlPWD: String
+        @raise IOError: if the mysql client fails.
+        '''
+        env = dict(os.environ)
+        if mysqlPWD is not None:
+            # Rather than on the command line, where ps would show it:
+            env['MYSQL_PWD'] = mysqlPWD
+        with open(sqlFilePath, 'r') as sqlFd:
+            retCode = subprocess.call(['mysql', '-f', '-u', 'root', '--local_infile=1'], stdin=sqlFd, env=env)
+        if retCode != 0:
+            raise IOError('mysql exited with %d while loading %s' % (retCode, sqlFilePath))
+
+    def enableKeys(self, mysqlPWD=None):
+        '''
+        Re-enables the non-primary indexes that the .sql files of transforms
+        disable, and creates missing indexes with createIndexForTable.sh,
+        as executeCSVLoad.sh does after its loads. The .sql files leave
+        their ENABLE KEYS statements commented out, so that the indexes
+        are not rebuilt after each file.
+        @param mysqlPWD: Root password for MySQL db.
+        @type mysqlPWD: String
+        '''
+        statements = []
+        for (dbName, tableNames) in TrackLogPuller.KEYS_DISABLED_TABLES:
+            statements.extend(['ALTER TABLE `%s`.`%s` ENABLE KEYS;' % (dbName, tableName) for tableName in tableNames])
+        env = dict(os.environ)
+        if mysqlPWD is not None:
+            env['MYSQL_PWD'] = mysqlPWD
+        self.logInfo('Re-enabling non-primary key indexes...')
+        # With -f, tables that do not exist do not keep the others from being done:
+        retCode = subprocess.call(['mysql', '-f', '-u', 'root', '-e', ' '.join(statements)], env=env)
+        if retCode != 0:
+            self.logErr('mysql exited with %d while re-enabling non-primary key indexes' % retCode)
+        # createIndexForTable.sh takes the password only fused to -p:
+        shellCommand = [os.path.join(os.path.dirname(__file__), 'createIndexForTable.sh'), '-u', 'root']
+        if mysqlPWD is not None:
+            shellCommand.append('-p' + mysqlPWD)
+        self.logInfo('Creating missing indexes...')
+        try:
+            subprocess.call(shellCommand)
+        except Exception as e:
+            self.logErr('Could not create missing indexes: %s' % `e`)
+
+    def pullTransformLoadPipelined(self, localTrackingLogFileRoot=None, csvDestDir=None, pullLimit=None, 
+                                   mysqlPWD=None, loader=None, pullThreads=2, transformProcesses=2, 
+                                   loadThreads=1, queueDepth=2, dryRun=False):
+        '''
+        Pulls new track log files from S3, transforms them, and loads them,
+        like pullNewFiles(), transform(), and load() in turn. But rather than
+        finishing each phase for all files before the next phase starts, each
+        file moves on as soon as it is done: after its download to the transform,
+        and after its transform to the load. The stages hand files to each other
+        through queues of at most queueDepth files. When a queue is full, the
+        stage before it waits, so a slow load holds back the transforms, and
+        they hold back the downloads. If a thread of any stage dies, all
+        stages stop after the file they are working on, rather than wait
+        for a stage that no longer serves its queue. Each download thread
+        has a connection to S3 of its own.
+        
+        When loading into MySQL, the non-primary indexes are re-enabled
+        and created after the last load, as after load().
+        
+        @param localTrackingLogFileRoot: root of the local copy of the S3 subtree. If None,
+               TrackLogPuller.LOCAL_LOG_STORE_ROOT is used.
+        @type localTrackingLogFileRoot: String
+        @param csvDestDir: directory for the .sql and .csv files. If None,
+               LOCAL_LOG_STORE_ROOT/tracking/CSV is used.
+        @type csvDestDir: String
+        @param pullLimit: maximum number of new files to pull. None: all new files.
+        @type pullLimit: int
+        @param mysqlPWD: Root password for MySQL db, passed to loadSQLFile().
+        @type mysqlPWD: String
+        @param loader: function that takes the full path of a .sql file, and loads it.
+               If None, loadSQLFile() is used.
+        @type loader: function
+        @param pullThreads: number of concurrent downloads
+        @type pullThreads: int
+        @param transformProcesses: number of concurrent transforms
+        @type transformProcesses: int
+        @param loadThreads: number of concurrent loads
+        @type loadThreads: int
+        @param queueDepth: maximum number of files waiting between two stages
+        @type queueDepth: int
+        @param dryRun: if True, only log what *would* be done. Cause no actual changes.
+        @type dryRun: Bool
+        @return: dict with the files of each stage, under 'pulled', 'transformed' (.sql files),
+                 and 'loaded' (.sql files), in the order they were done, the
+                 failed files under 'failed', the seconds until the first file was loaded
+                 under 'firstLoadSeconds' (None if none was), the total seconds under 'seconds',
+                 and under 'aborted' whether a stage died, so that some files were not done.
+        @rtype: {String : [String] | float}
+        '''
+        if localTrackingLogFileRoot is None:
+            localTrackingLogFileRoot = TrackLogPuller.LOCAL_LOG_STORE_ROOT
+        if csvDestDir is None:
+            csvDestDir = os.path.join(TrackLogPuller.LOCAL_LOG_STORE_ROOT, 'tracking/CSV')
+        csvDestDir = os.path.abspath(csvDestDir)
+        loadIntoMySQL = loader is None
+        if loadIntoMySQL:
+            loader = lambda sqlFilePath: self.loadSQLFile(sqlFilePath, mysqlPWD)
+        if dryRun:
+            self.pullNewFiles(localTrackingLogFileRoot, localTrackingLogFileRoot, pullLimit, dryRun=True)
+            self.logInfo('Would transform each file with up to %d processes, and load each with up to %d threads as soon as it is transformed.' %
+                         (transformProcesses, loadThreads))
+            return None
+
+        startTime = time.time()
+        rfileNamesToPull = self.identifyNewLogFiles(localTrackingLogFileRoot, pullLimit=pullLimit)
+        if pullLimit is not None and pullLimit > -1:
+            rfileNamesToPull = rfileNamesToPull[0:pullLimit]
+        try:
+            os.makedirs(csvDestDir)
+        except OSError:
+            pass
+        logDir = os.path.join(csvDestDir, '..') + '/TransformLogs'
+        report = {'pulled' : [], 'transformed' : [], 'loaded' : [], 'failed' : [], 'firstLoadSeconds' : None, 'aborted' : False}
+        # Appending to lists is atomic, but the first load time must only be set once:
+        reportLock = threading.Lock()
+        # Set when a stage thread dies. Queue waits are then given up,
+        # since the dead thread's stage may never serve its queue again:
+        aborted = threading.Event()
+
+        pullQueue = Queue.Queue()
+        for rfileNameToPull in rfileNamesToPull:
+            pullQueue.put(rfileNameToPull)
+        transformQueue = Queue.Queue(queueDepth)
+        loadQueue = Queue.Queue(queueDepth)
+
+        def putUnlessAborted(queue, item):
+            while not aborted.is_set():
+                try:
+                    queue.put(item, timeout=1)
+                    return True
+                except Queue.Full:
+                    pass
+            return False
+
+        def getUnlessAborted(queue):
+            '''
+            Returns the next item of queue, or None, like the end of
+            the queue, if the pipeline is aborted.
+            '''
+            while not aborted.is_set():
+                try:
+                    return queue.get(timeout=1)
+                except Queue.Empty:
+                    pass
+            return None
+
+        def pullStage():
+            bucket = self.openS3Bucket()
+            if bucket is None:
+                raise IOError("Could not connect to Amazon S3 to pull tracking log files.")
+            while not aborted.is_set():
+                try:
+                    rfileNameToPull = pullQueue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    logFilePath = self.pullFile(rfileNameToPull, localTrackingLogFileRoot, bucket)
+                except Exception as e:
+                    self.logErr('Failed to pull %s: %s' % (rfileNameToPull, `e`))
+                    logFilePath = None
+                if logFilePath is None:
+                    report['failed'].append(rfileNameToPull)
+                    continue
+                report['pulled'].append(logFilePath)
+                if not putUnlessAborted(transformQueue, logFilePath):
+                    return
+
+        def transformStage():
+            while True:
+                logFilePath = getUnlessAborted(transformQueue)
+                if logFilePath is None:
+                    return
+                (logFilePath, seconds, sqlFilePath, error) = transformLogFile(logFilePath, csvDestDir, logDir, localTrackingLogFileRoot)
+                if error is not None:
+                    self.logErr('Failed to transform %s after %.1f seconds: %s' % (logFilePath, seconds, error))
+                    report['failed'].append(logFilePath)
+                    continue
+                self.logInfo('Transformed %s in %.1f seconds.' % (logFilePath, seconds))
+                report['transformed'].append(sqlFilePath)
+                if not putUnlessAborted(loadQueue, sqlFilePath):
+                    return
+
+        def loadStage():
+            while True:
+                sqlFilePath = getUnlessAborted(loadQueue)
+                if sqlFilePath is None:
+                    return
+                try:
+                    loader(sqlFilePath)
+                except Exception as e:
+                    self.logErr('Failed to load %s: %s' % (sqlFilePath, `e`))
+                    report['failed'].append(sqlFilePath)
+                    continue
+                with reportLock:
+                    if report['firstLoadSeconds'] is None:
+                        report['firstLoadSeconds'] = time.time() - startTime
+                report['loaded'].append(sqlFilePath)
+
+        def runStage(stage):
+            try:
+                stage()
+            except Exception as e:
+                self.logErr('%s died, stopping the pipeline: %s' % (threading.current_thread().name, `e`))
+                aborted.set()
+
+        def startThreads(stage, numThreads):
+            threads = [threading.Thread(target=runStage, args=(stage,), name=stage.__name__) for i in range(max(1, numThreads))]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            return threads
+
+        self.logInfo('Pipelining %d tracklog files through %d download(s), %d transform(s), and %d load(s) at a time...' %
+                     (len(rfileNamesToPull), pullThreads, transformProcesses, loadThreads))
+        pullers = startThreads(pullStage, pullThreads)
+        transformers = startThreads(transformStage, transformProcesses)
+        loaders = startThreads(loadStage, loadThreads)
+        # Drain the stages in order; one None ends one thread. After
+        # an abort, all threads end without them:
+        for (threads, nextThreads, nextQueue) in [(pullers, transformers, transformQueue), (transformers, loaders, loadQueue)]:
+            for thread in threads:
+                thread.join()
+            for thread in nextThreads:
+                putUnlessAborted(nextQueue, None)
+        for thread in loaders:
+            thread.join()
+        report['seconds'] = time.time() - startTime
+        report['aborted'] = aborted.is_set()
+        if report['aborted']:
+            self.logErr('Pipeline aborted; files not reported as pulled, transformed, loaded, or failed were left for a later run.')
+
+        if loadIntoMySQL and len(report['transformed']) > 0:
+            # Even after failed loads, which may have disabled them:
+            self.enableKeys(mysqlPWD)
+        if loadIntoMySQL and len(report['loaded']) > 0:
+            # As at the end of load():
+            try:
+                subprocess.call([os.path.join(os.path.dirname(__file__), 'makeCourseNameListTable.sh')])
+            except Exception as e:
+                self.logErr('Could not create table of all course_display_list: %s' % `e`)
+        if report['firstLoadSeconds'] is not None:
+            self.logInfo('First tracklog file loaded after %.1f seconds.' % report['firstLoadSeconds'])
+        self.logInfo('Pulled %d, transformed %d, and loaded %d tracklog file(s) in %.1f seconds; %d failed.' %
+                     (len(report['pulled']), len(report['transformed']), len(report['loaded']), report['seconds'], len(report['failed'])))
+        return report
+
     # ----------------------------------------  Private Methods ----------------------
 
     def getNumOfRemoteTrackingLogFiles(self):
@@ -933,6 +1348,17 @@ if __name__ == '__main__':
                         help='For load: maximum number of new OpenEdx tracking log files to pull from AmazonS3',
                         type=int
                         )
+    parser.add_argument('-j', '--processes',
+                        action='store',
+                        help='For transform: number of log files to transform in parallel;\n' +\
+                             '    default: transform via transformGivenLogfiles.sh.',
+                        type=int
+                        )
+    parser.add_argument('--pipeline',
+                        action='store_true',
+                        help='For pullTransformLoad: load each file as soon as it is transformed, and\n' +\
+                             '    transform each as soon as it is pulled, with --processes transforms at a time.'
+                        )
     parser.add_argument('-u', '--user',
                         action='store',
                         help='For load: User ID that is to log into MySQL. Default: the user who is invoking this script.')
@@ -1074,6 +1500,24 @@ if __name__ == '__main__':
     #sys.exit()
     #**********************
     
+    if args.toDo == 'pullTransformLoad' and args.pipeline:
+        if args.logsSrc is not None or args.sqlSrc is not None:
+            tblCreator.logErr("The --pipeline option transforms and loads the pulled files; it cannot be used with --logsSrc or --sqlSrc.")
+            sys.exit(1)
+        report = tblCreator.pullTransformLoadPipelined(localTrackingLogFileRoot=args.logsDest, csvDestDir=args.sqlDest, pullLimit=args.pullLimit,
+                                                       mysqlPWD=tblCreator.pwd, transformProcesses=args.processes or 2, dryRun=args.dryRun)
+        # Let callers such as cron jobs see failures in the exit status:
+        if report is None:
+            # Dry run
+            sys.exit(0)
+        for failedFile in report['failed']:
+            tblCreator.logErr('Failed to process %s.' % failedFile)
+        if report['aborted'] or len(report['failed']) > 0:
+            tblCreator.logErr('Processing %s %s.' % (args.toDo, 'aborted' if report['aborted'] else 'done, with failures'))
+            sys.exit(1)
+        tblCreator.logInfo('Processing %s done.' % args.toDo)
+        sys.exit(0)
+
     if args.toDo == 'pull' or args.toDo == 'pullTransform' or args.toDo == 'pullTransformLoad':
         # For pull cmd, 'logs' must be a writable directory (to which the track logs will be written). 
         # It will come in as a singleton array:
@@ -1125,7 +1569,7 @@ if __name__ == '__main__':
             (args.sqlDest is not None and not os.access(args.sqlDest, os.W_OK))):
             tblCreator.logErr("For transform command the 'sqlDest' parameter must be a single directory where result .sql files are written.")
             sys.exit(1)
-        tblCreator.transform(logFilePaths=allLogFiles, csvDestDir=args.sqlDest, dryRun=args.dryRun)
+        tblCreator.transform(logFilePaths=allLogFiles, csvDestDir=args.sqlDest, dryRun=args.dryRun, processes=args.processes)
     
     if args.toDo == 'load' or args.toDo == 'transformLoad' or args.toDo == 'pullTransformLoad':
         # For loading, args.sqlSrc must be None, or a readable directory, or a sequence of readable .sql files.
@@ -2,7 +2,7 @@
 import re
 
 ## Input source
-## Can be either 'csv', 'sql' or 'json'
+## Can be either 'csv', 'mysql' or 'json'
 INPUT_SOURCE = 'csv'
 QUOTECHAR = "'" 
 TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
@@ -20,9 +20,48 @@ EDX_TRACK_EVENT = ''.join([CSV_SOURCE_DIR, CSV_PREFIX, '_EdxTrackEventTable.csv'
 CORRECT_MAP = ''.join([CSV_SOURCE_DIR, CSV_PREFIX, '_CorrectMapTable.csv'])
 ANSWER = ''.join([CSV_SOURCE_DIR, CSV_PREFIX, '_AnswerTable.csv'])
 
+## Join of Answer and CorrectMap to EdxTrackEvent, one of :
+##  'dict' : tables loaded into dictionaries
+##  'merge' : sorted-merge join, all CSV files sorted by foreign key
+##  'mmap' : tables memory-mapped, with an on-disk index
+##  'pandas' : tables loaded into pandas DataFrames
+CSV_JOIN = 'dict'
+
+## MySQL input : EdxTrackEvent, Answer and CorrectMap tables 
+## of the Edx database, as loaded by json_to_relation
+MYSQL_HOST = 'localhost'
+MYSQL_PORT = 3306
+MYSQL_USER = 'root'
+MYSQL_PASSWD = ''
+MYSQL_DB = 'Edx'
+## Rows fetched from the server at a time
+MYSQL_FETCH_SIZE = 10000
+## Column of EdxTrackEvent sorting the events (e.g. 'time'), or '' 
+MYSQL_ORDER_BY = ''
+
+## Number of processes formatting events (1 for a serial run)
+WORKERS = 1
+
+## Staged observed events (requires time-sorted input)
+## Events of users idle for more than EVENT_IDLE_TIMEOUT seconds are 
+## moved to disk, under EVENT_SPILL_DIR. None keeps them all in memory.
+EVENT_IDLE_TIMEOUT = None
+EVENT_SPILL_DIR = ''
+## Peak memory expected for a run, in MB (reported at the end of the log)
+RSS_BUDGET_MB = 4096
+
 ## Output files
 DEST_DIR = '/Users/leducni/Documents/DATA/TEST-ULB/MOOCDB/'
 
+## MOOCdb output, one of :
+##  'csv' : one CSV file per table, under DEST_DIR
+##  'mysql' : tables loaded into MOOCDB_MYSQL_DB (on the MySQL server 
+##            above) with LOAD DATA, by segments of LOAD_SEGMENT_SIZE rows
+##  'sqlite' : dry run of 'mysql', into DEST_DIR/moocdb.sqlite
+MOOCDB_OUTPUT = 'csv'
+MOOCDB_MYSQL_DB = 'moocdb'
+LOAD_SEGMENT_SIZE = 50000
+
 ### Hierarchy pretty prints
 RESOURCE_HIERARCHY = DEST_DIR + 'resource_hierarchy.org'
 PROBLEM_HIERARCHY = DEST_DIR + 'problem_hierarchy.org' 
@@ -40,10 +79,20 @@ PROBLEM_TYPES = DEST_DIR + 'problem_types.csv'
 OS = DEST_DIR + 'os.csv'
 AGENT = DEST_DIR + 'agent.csv'
 
+### User agent parse cache, kept between runs (leave empty to disable),
+### e.g. DEST_DIR + 'agent_cache.pickle'
+AGENT_CACHE_SIZE = 10000
+AGENT_CACHE_FILE = ''
+
 ### Log file
-VERBOSE = True
+# Per-event diagnostics, costly on large logs
+VERBOSE = False
 LOG_FILE = DEST_DIR + 'log.org'
 
+### cProfile dump of the run, readable with pstats (leave empty to disable).
+### Stage timings are always summarized to DEST_DIR/profile.json
+PROFILE_FILE = ''
+
 ## Specific formatting variables
 # DOMAIN = 'https://www.edx.org'
 DOMAIN = 'https://www.edx.org'
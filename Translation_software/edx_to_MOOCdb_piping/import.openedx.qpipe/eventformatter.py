@@ -8,6 +8,7 @@ import updateloc
 import events
 
 import util
+from profiler import Profiler
 
 class EventFormatter(object):
 
@@ -38,19 +39,19 @@ class EventFormatter(object):
         self.agents = helperclasses.DictionaryTable(moocdb,'agent')
         self.os = helperclasses.DictionaryTable(moocdb,'os')
     
-        self.filter_rules = util.load_rules(self.FILTER_RLS)
+        self.filter_rules = util.load_compiled_rules(self.FILTER_RLS)
         self.general_formatting_functions = util.load_functions(self.GEN_FORMAT_FUNCTS, genformatting)
-        self.specific_formatting_rules = util.load_rules(self.SPEC_FORMAT_RLS, specformatting)
-        self.inherit_location_rules = util.load_rules(self.INHERIT_LOC_RLS, inheritloc)
-        self.update_location_rules = util.load_rules(self.UPDATE_LOC_RLS, updateloc)
-        self.instanciate_event_rules = util.load_rules(self.INST_EVENT_RLS, events)
+        self.specific_formatting_rules = util.load_compiled_rules(self.SPEC_FORMAT_RLS, specformatting)
+        self.inherit_location_rules = util.load_compiled_rules(self.INHERIT_LOC_RLS, inheritloc)
+        self.update_location_rules = util.load_compiled_rules(self.UPDATE_LOC_RLS, updateloc)
+        self.instanciate_event_rules = util.load_compiled_rules(self.INST_EVENT_RLS, events)
 
 
     def pass_filter(self,raw_event):
         """ Returns True if the event should be processed further,
         according to the filtering rules defined in FILTER_RULES """
 
-        return util.apply_rules(self.filter_rules, raw_event)
+        return self.filter_rules.apply(raw_event)
 
 
     def do_generic_formatting(self,raw_event):
@@ -67,7 +68,7 @@ class EventFormatter(object):
         according to the rules specified in SPEC_FORMAT_RLS
         and functions defined in specformatting.py"""
 
-        util.apply_rules(self.specific_formatting_rules, raw_event)
+        self.specific_formatting_rules.apply(raw_event)
 
     def inherit_location(self,raw_event):
         """Try to inherit location 
@@ -88,7 +89,7 @@ class EventFormatter(object):
 
             if time_gap < 3600:
                 raw_event['current_location'] = current_location
-                util.apply_rules(self.inherit_location_rules, raw_event)
+                self.inherit_location_rules.apply(raw_event)
 
             else:
                 #print '[eventformatter.inherit_location] Location obsolete'
@@ -100,7 +101,7 @@ class EventFormatter(object):
         according to the rules specified in UPDATE_LOC_RLS
         and functions defined in update_loc.py"""
 
-        new_location = util.apply_rules(self.update_location_rules, raw_event)
+        new_location = self.update_location_rules.apply(raw_event)
 
         if new_location: 
             self.engaged_users.update_location(raw_event['anon_screen_name'], new_location, raw_event['time'])
@@ -113,17 +114,29 @@ class EventFormatter(object):
         according to the rules specified in INST_EVT_RLS
         and classes defined in events.py"""
         
-        return util.apply_rules(self.instanciate_event_rules, raw_event)
+        return self.instanciate_event_rules.apply(raw_event)
 
 
-    def record_event_metadata(self,raw_event):
+    def get_event_metadata(self,raw_event):
+        """Returns the values to record in the urls, os 
+        and agent dictionary tables"""
+
+        return (str(raw_event['page']), raw_event['os'], raw_event['agent'])
+
+    def record_event_metadata(self,raw_event,metadata=None):
+
+        if not metadata:
+            metadata = self.get_event_metadata(raw_event)
+
+        raw_event['url_id'] = self.urls.insert(metadata[0])
+        raw_event['os'] = self.os.insert(metadata[1])
+        raw_event['agent'] = self.agents.insert(metadata[2])
+
+    def format(self,raw_event):
+        """Does all the work of polish, but recording the event metadata,
+        which is the only step depending on other users' events.
+        Returns the instanciated event and the metadata to record"""
 
-        raw_event['url_id'] = self.urls.insert(str(raw_event['page']))
-        raw_event['os'] = self.os.insert(raw_event['os'])
-        raw_event['agent'] = self.agents.insert(raw_event['agent'])
-        
-    def polish(self,raw_event):
-        
         #print '** Generic formatting'
         self.do_generic_formatting(raw_event)
         #print '** Specific formatting'        
@@ -132,10 +145,37 @@ class EventFormatter(object):
         self.inherit_location(raw_event)
         #print '** Update location'
         self.update_location(raw_event)
-        #print '** Record event metadata'
-        self.record_event_metadata(raw_event)
+        # Metadata is taken before instanciation, which may change the URL
+        metadata = self.get_event_metadata(raw_event)
         #print '** Instanciate event'
-        return self.instanciate_event(raw_event)
+        return (self.instanciate_event(raw_event), metadata)
+
+    def format_events(self,raw_events,profiler=None):
+        """Filters and formats a stream of raw events.
+        Yields (raw_event, event, metadata) tuples, 
+        event being None when the raw event is filtered out.
+        Both steps are timed by the profiler, if any"""
+
+        if profiler is None:
+            profiler = Profiler()
+
+        for raw_event in raw_events:
+            t = profiler.start()
+            passed = self.pass_filter(raw_event)
+            t = profiler.stop('EventFormatter.pass_filter', t)
+            if passed == False:
+                yield (raw_event, None, None)
+            else:
+                event, metadata = self.format(raw_event)
+                profiler.stop('EventFormatter.polish', t)
+                yield (raw_event, event, metadata)
+        
+    def polish(self,raw_event):
+        
+        event, metadata = self.format(raw_event)
+        #print '** Record event metadata'
+        self.record_event_metadata(raw_event, metadata)
+        return event
 
     def serialize(self):
         self.urls.serialize()
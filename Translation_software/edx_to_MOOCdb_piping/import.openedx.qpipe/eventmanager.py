@@ -1,3 +1,9 @@
+import os
+import shutil
+import shelve
+import datetime
+import tempfile
+import collections
 from helperclasses import *
 
 class EventManager():
@@ -17,11 +23,24 @@ class EventManager():
               'problem_reset',
               'save_problem_fail']
 
-    def __init__(self, moocdb=None):
+    def __init__(self, moocdb=None, idle_timeout=None, spill_dir=''):
         self.STAGED_EVENTS = {}
         if moocdb:
             self.observed_events = moocdb.observed_events
 
+        # Streaming mode, for time-sorted input :
+        # events of users idle for more than idle_timeout seconds
+        # are moved from memory to a shelf on disk, until the user
+        # comes back or the serialization happens.
+        self.streaming = idle_timeout is not None
+        self.evicted = 0
+        if self.streaming:
+            self.idle_timeout = datetime.timedelta(seconds=idle_timeout)
+            # Users ordered from least to most recently active
+            self.STAGED_EVENTS = collections.OrderedDict()
+            self.spill_dir = tempfile.mkdtemp(dir=spill_dir if spill_dir else None)
+            self.spilled = shelve.open(os.path.join(self.spill_dir, 'staged_events'), 'n', protocol=2)
+
     def stage_event(self,event):
         user = event['anon_screen_name']
         
@@ -31,32 +50,62 @@ class EventManager():
         if event.data.get('event_type',None) in self.IGNORE:
             return None
 
-        if user in self.STAGED_EVENTS.keys():
-            ending_event = self.STAGED_EVENTS[user]
+        ending_event = self.STAGED_EVENTS.get(user, None)
+
+        if self.streaming:
+            if ending_event:
+                # Move the user to the most recent end
+                del self.STAGED_EVENTS[user]
+            elif user in self.spilled:
+                ending_event = self.spilled.pop(user)
+
+        # Stage new event
+        self.STAGED_EVENTS[user] = event
+
+        if self.streaming:
+            self.evict_idle_users(event.data['time'])
+
+        if ending_event:
             end_time = event.data['time']
             
             # Compute event duration
             ending_event.set_duration(end_time)
 
-            # Stage new event
-            self.STAGED_EVENTS[user] = event
-
             # Return ending event, ready for insertion
             return ending_event
         else:
-            self.STAGED_EVENTS[user] = event
             return None
 
+    def evict_idle_users(self, now):
+        while self.STAGED_EVENTS:
+            user, event = next(self.STAGED_EVENTS.iteritems())
+            if now - event.data['time'] <= self.idle_timeout:
+                break
+            del self.STAGED_EVENTS[user]
+            self.spilled[user] = event
+            self.evicted += 1
+
     def store_event(self, event):
   
         event_to_store = self.stage_event(event)
 
         if event_to_store:
             self.observed_events.store(event_to_store.get_observed_event_row())
+
+    def get_stats(self):
+        stats = { 'staged':len(self.STAGED_EVENTS) }
+        if self.streaming:
+            stats['spilled'] = len(self.spilled)
+            stats['evicted'] = self.evicted
+        return stats
         
     def serialize(self):
 
         for e in self.STAGED_EVENTS.values():
             self.observed_events.store(e.get_observed_event_row())
-            
 
+        if self.streaming:
+            for user in self.spilled:
+                self.observed_events.store(self.spilled[user].get_observed_event_row())
+            self.spilled.close()
+            shutil.rmtree(self.spill_dir)
@@ -0,0 +1,146 @@
+import sys
+import zlib
+import Queue
+import cPickle as pickle
+import multiprocessing
+
+import genformatting
+from eventformatter import EventFormatter
+
+def format_shard(moocdb, CONFIG_PATH, tasks, results):
+    """ Worker process : filters and formats the events of its
+    users, with its own EventFormatter. Formatted events are pickled
+    one by one, since later events of the same user may modify
+    the objects they share (e.g. an inherited CourseURL).
+    Once done, sends back its copy of the user agent cache """
+
+    event_formatter = EventFormatter(moocdb, CONFIG_PATH)
+    # Counts only this worker's lookups
+    genformatting.agent_cache.reset_stats()
+
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            break
+
+        formatted = []
+        for raw_event in batch:
+            if event_formatter.pass_filter(raw_event) == False:
+                formatted.append(None)
+            else:
+                formatted.append(pickle.dumps(event_formatter.format(raw_event), pickle.HIGHEST_PROTOCOL))
+        results.put(formatted)
+
+    results.put(genformatting.agent_cache.get_state())
+    sys.stdout.flush()
+
+
+class EventSharder(object):
+    """ Parallel counterpart of EventFormatter.format_events.
+    The event stream is sharded by anon_screen_name across worker processes,
+    so that each user's events are formatted in order by a single worker.
+    The events are yielded back in their original order, so that
+    the shared dictionaries (URLs, resources, agents...) are filled
+    in the same order as in a serial run, by the calling process """
+
+    def __init__(self, moocdb, CONFIG_PATH, workers, chunk_size=1000, depth=4):
+        self.moocdb = moocdb
+        self.CONFIG_PATH = CONFIG_PATH
+        self.workers = workers
+        # Number of events sent to the workers at once
+        self.chunk_size = chunk_size
+        # Number of chunks being processed at a time
+        self.depth = depth
+
+    def get_shard(self, raw_event):
+        return zlib.crc32(raw_event['anon_screen_name']) % self.workers
+
+    def start(self):
+        # Buffered output would be written twice otherwise
+        sys.stdout.flush()
+
+        self.tasks = [multiprocessing.Queue() for i in range(self.workers)]
+        self.results = [multiprocessing.Queue() for i in range(self.workers)]
+        self.processes = [multiprocessing.Process(target=format_shard,
+                                                  args=(self.moocdb, self.CONFIG_PATH, self.tasks[i], self.results[i]))
+                          for i in range(self.workers)]
+        for process in self.processes:
+            process.daemon = True
+            process.start()
+
+    def stop(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        # User agents are parsed by the workers : their caches
+        # are merged into this process's, to be saved and reported
+        for shard in range(self.workers):
+            genformatting.agent_cache.merge(self.get_results(shard))
+        for process in self.processes:
+            process.join()
+
+    def dispatch(self, chunk):
+        """ Sends each worker its share of the chunk, possibly empty.
+        Returns the shard of each event. """
+
+        shards = [self.get_shard(raw_event) for raw_event in chunk]
+        batches = [[] for i in range(self.workers)]
+        for raw_event, shard in zip(chunk, shards):
+            batches[shard].append(raw_event)
+        for tasks, batch in zip(self.tasks, batches):
+            tasks.put(batch)
+        return shards
+
+    def get_results(self, shard):
+        while True:
+            try:
+                return self.results[shard].get(timeout=1)
+            except Queue.Empty:
+                if not self.processes[shard].is_alive():
+                    raise RuntimeError('[EventSharder] Worker %d exited with code %s' % (shard, self.processes[shard].exitcode))
+
+    def collect(self, chunk, shards):
+        """ Yields the formatted events of a chunk, in the original order """
+
+        formatted = [iter(self.get_results(shard)) for shard in range(self.workers)]
+        for raw_event, shard in zip(chunk, shards):
+            f = next(formatted[shard])
+            if f is None:
+                yield (raw_event, None, None)
+            else:
+                event, metadata = pickle.loads(f)
+                yield (raw_event, event, metadata)
+
+    def read_chunks(self, raw_events):
+        chunk = []
+        for raw_event in raw_events:
+            chunk.append(raw_event)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def format_events(self, raw_events):
+        """Filters and formats a stream of raw events.
+        Yields (raw_event, event, metadata) tuples, as
+        EventFormatter.format_events does"""
+
+        self.start()
+        try:
+            pending = []
+            for chunk in self.read_chunks(raw_events):
+                pending.append((chunk, self.dispatch(chunk)))
+                if len(pending) == self.depth:
+                    for formatted in self.collect(*pending.pop(0)):
+                        yield formatted
+
+            while pending:
+                for formatted in self.collect(*pending.pop(0)):
+                    yield formatted
+        except:
+            # Workers may be blocked on results that will never be read
+            for process in self.processes:
+                process.terminate()
+            raise
+
+        self.stop()
@@ -1,8 +1,12 @@
-#import MySQLdb
 import csv
 import os
+import datetime
+import mmap
+import heapq
+import struct
 import pickle
-import pandas as pd
+import hashlib
+import tempfile
 import config as cfg
 
 def get_events():
@@ -14,6 +18,182 @@ def get_events():
     elif src=='json':
         return JSONExtractor()
 
+def csv_reader(lines):
+    return csv.reader(lines, delimiter=',', quotechar=cfg.QUOTECHAR, escapechar='\\')
+
+class DataFrameTable(object):
+    """ Foreign table loaded into a pandas DataFrame """
+
+    def __init__(self, csv_file, fieldnames):
+        import pandas as pd
+        self.dataframe = pd.read_csv(csv_file, delimiter=',', quotechar=cfg.QUOTECHAR, escapechar='\\', na_filter=False, index_col=0, names=fieldnames, dtype='string')
+
+    def get_values(self, fkey, names):
+        frow = self.dataframe.loc[fkey]
+        return [frow.loc[name] for name in names]
+
+class DictTable(object):
+    """ Foreign table loaded once into a dictionary 
+    mapping the primary key to the rest of the row """
+
+    def __init__(self, csv_file, fieldnames):
+        self.positions = dict([(name, i - 1) for i, name in enumerate(fieldnames)])
+        self.rows = {}
+        with open(csv_file) as f:
+            for row in csv_reader(f):
+                # As for a primary key, the first occurrence is kept
+                if row:
+                    self.rows.setdefault(row[0], row[1:])
+
+    def get_values(self, fkey, names):
+        row = self.rows[fkey]
+        return [row[self.positions[name]] for name in names]
+
+class SortedMergeTable(object):
+    """ Foreign table read along with the events, without loading it.
+    Both the foreign table and the events must be sorted by
+    ascending foreign key : this performs a sorted-merge join """
+
+    def __init__(self, csv_file, fieldnames):
+        self.positions = dict([(name, i) for i, name in enumerate(fieldnames)])
+        self.reader = csv_reader(open(csv_file))
+        self.row = self.next_row()
+        self.last_fkey = ''
+
+    def next_row(self):
+        # Blank lines are read as empty rows
+        row = next(self.reader, None)
+        while row == []:
+            row = next(self.reader, None)
+        return row
+
+    def get_values(self, fkey, names):
+        if fkey < self.last_fkey:
+            raise ValueError('[SortedMergeTable] Events not sorted at foreign key : %s' % fkey)
+        self.last_fkey = fkey
+
+        # Advance until the foreign key is reached
+        while self.row is not None and self.row[0] < fkey:
+            previous_key = self.row[0]
+            self.row = self.next_row()
+            if self.row is not None and self.row[0] < previous_key:
+                raise ValueError('[SortedMergeTable] Foreign table not sorted at key : %s' % self.row[0])
+
+        if self.row is None or self.row[0] != fkey:
+            raise KeyError(fkey)
+
+        return [self.row[self.positions[name]] for name in names]
+
+class IndexedTable(object):
+    """ Foreign table too large to be loaded in memory. 
+    The CSV file is memory-mapped, along with an index file holding
+    (hash of primary key, offset of row) records sorted by hash, which 
+    is searched by bisection. The index is built next to the CSV file,
+    and rebuilt when the CSV file is newer. It is sorted by chunks
+    of CHUNK_RECORDS records, merged on disk """
+
+    RECORD = struct.Struct('<QQ')
+    # 16 MB of records sorted in memory at a time
+    CHUNK_RECORDS = 1 << 20
+
+    def __init__(self, csv_file, fieldnames):
+        self.positions = dict([(name, i) for i, name in enumerate(fieldnames)])
+
+        index_file = csv_file + '.idx'
+        if not os.path.exists(index_file) or os.path.getmtime(index_file) < os.path.getmtime(csv_file):
+            self.build_index(csv_file, index_file)
+
+        self.data = self.map_file(csv_file)
+        self.index = self.map_file(index_file)
+        self.size = len(self.index) / self.RECORD.size if self.index else 0
+
+    def map_file(self, path):
+        with open(path, 'rb') as f:
+            if not os.path.getsize(path):
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_hash(self, key):
+        return self.RECORD.unpack(hashlib.md5(key).digest())[0]
+
+    def read_row(self, data, offset):
+        data.seek(offset)
+        # Rows may span several lines : csv reads exactly 
+        # the lines of one row at a time
+        return next(csv_reader(iter(data.readline, '')), None)
+
+    def build_index(self, csv_file, index_file):
+        chunks = []
+        records = []
+        data = self.map_file(csv_file)
+        offset = 0
+        try:
+            while data:
+                row = self.read_row(data, offset)
+                if row is None:
+                    break
+                # Blank lines are read as empty rows
+                if row:
+                    records.append((self.get_hash(row[0]), offset))
+                offset = data.tell()
+                if len(records) == self.CHUNK_RECORDS:
+                    chunks.append(self.write_chunk(records, index_file))
+                    records = []
+            if records:
+                chunks.append(self.write_chunk(records, index_file))
+
+            # Rows with the same key remain ordered by offset.
+            # Write atomically, as other runs may use the index
+            with open(index_file + '.tmp', 'wb') as f:
+                for record in heapq.merge(*[self.read_chunk(chunk) for chunk in chunks]):
+                    f.write(self.RECORD.pack(*record))
+            os.rename(index_file + '.tmp', index_file)
+        finally:
+            for chunk in chunks:
+                chunk.close()
+
+    def write_chunk(self, records, index_file):
+        """ Writes the sorted records to a temporary file, 
+        deleted when closed """
+        records.sort()
+        chunk = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(index_file)))
+        for record in records:
+            chunk.write(self.RECORD.pack(*record))
+        chunk.seek(0)
+        return chunk
+
+    def read_chunk(self, chunk):
+        while True:
+            block = chunk.read(self.RECORD.size * 4096)
+            if not block:
+                return
+            for offset in range(0, len(block), self.RECORD.size):
+                yield self.RECORD.unpack_from(block, offset)
+
+    def get_values(self, fkey, names):
+        key_hash = self.get_hash(fkey)
+
+        # Leftmost record with the key's hash
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) / 2
+            if self.RECORD.unpack_from(self.index, middle * self.RECORD.size)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+
+        # Rule out hash collisions
+        while low < self.size:
+            record_hash, offset = self.RECORD.unpack_from(self.index, low * self.RECORD.size)
+            if record_hash != key_hash:
+                break
+            row = self.read_row(self.data, offset)
+            if row[0] == fkey:
+                return [row[self.positions[name]] for name in names]
+            low += 1
+
+        raise KeyError(fkey)
+
 class CSVExtractor(object):
     """ 
     Loads data from CSV export of Stanford datastage tables
@@ -24,7 +204,13 @@ class CSVExtractor(object):
     CORRECT_MAP_FIELDNAMES = ['correct_map_id','answer_identifier', 'correctness','npoints','msg','hint','hintmode','queustate']
     EDX_TRACK_EVENT_FIELDNAMES = ['_id','event_id','agent','event_source','event_type','ip','page','session','time','anon_screen_name','downtime_for','student_id','instructor_id','course_id','course_display_name','resource_display_name','organization','sequence_id','goto_from','goto_dest','problem_id','problem_choice','question_location','submission_id','attempts','long_answer','student_file','can_upload_file','feedback','feedback_response_selected','transcript_id','transcript_code','rubric_selection','rubric_category','video_id','video_code','video_current_time','video_speed','video_old_time','video_new_time','video_seek_type','video_new_speed','video_old_speed','book_interaction_type','success','answer_id','hint','hintmode','msg','npoints','queuestate','orig_score','new_score','orig_total','new_total','event_name','group_user','group_action','position','badly_formatted','correctMap_fk','answer_fk','state_fk','load_info_fk']
 
-    def __init__(self, edx_track_event=cfg.EDX_TRACK_EVENT, answer=cfg.ANSWER, correct_map=cfg.CORRECT_MAP):
+    # Strategies for joining Answer and CorrectMap to EdxTrackEvent
+    JOINS = {'pandas':DataFrameTable,
+             'dict':DictTable,
+             'merge':SortedMergeTable,
+             'mmap':IndexedTable}
+
+    def __init__(self, edx_track_event=cfg.EDX_TRACK_EVENT, answer=cfg.ANSWER, correct_map=cfg.CORRECT_MAP, join=cfg.CSV_JOIN):
         # Create a CSV reader for the EdxTrackEvent table
         try:
             events = open(edx_track_event)
@@ -37,13 +223,15 @@ class CSVExtractor(object):
             print 'Unable to open EdxTrackEvent file : %s'% cfg.EDX_TRACK_EVENT
             exit
 
-        # Load Answer and CorrectMap tables into pandas DataFrames,
-        # indexed by the table's primary key.
+        # Load Answer and CorrectMap tables, indexed by the table's primary key.
+        # The join strategy is one of 'pandas', 'dict', 'merge' or 'mmap'
+        # (see the ForeignTable classes below)
         try:
-            self.answer = pd.read_csv(answer, delimiter=',', quotechar=cfg.QUOTECHAR, escapechar='\\', na_filter=False, index_col=0, names=self.ANSWER_FIELDNAMES, dtype='string')
-            self.correct_map = pd.read_csv(correct_map, delimiter=',', quotechar=cfg.QUOTECHAR, escapechar='\\', na_filter=False, index_col=0, names=self.CORRECT_MAP_FIELDNAMES,dtype='string')
+            ForeignTableType = self.JOINS[join]
+            self.answer = ForeignTableType(answer, self.ANSWER_FIELDNAMES)
+            self.correct_map = ForeignTableType(correct_map, self.CORRECT_MAP_FIELDNAMES)
         except Exception as e:
-            print 'Pandas unable to load CSV :'
+            print 'Unable to load CSV :'
             print str(e)
             exit
     
@@ -64,7 +252,7 @@ class CSVExtractor(object):
             print '[CSVExtractor.new_reader] Could not open file : ' + input_file
             return
 
-    def get_foreign_values(self, event, fkey_name, fval_names, dataframe):
+    def get_foreign_values(self, event, fkey_name, fval_names, table):
         '''
         This method adds to the EdxTrackEvent row the relevant
         fields fetched from a foreign table.
@@ -74,18 +262,18 @@ class CSVExtractor(object):
         same name as local field), the local value is kept if non empty and
         overridden otherwise. 
         
-        foreign_key: value of the foreign key on which the join is performed
-        fk_dict: dictionary mapping foreign keys to foreign values
+        fkey_name: name of the foreign key on which the join is performed
+        table: ForeignTable holding the foreign rows
         '''
 
         fkey = event.get(fkey_name, None)
         
         if fkey:           
             try:
-                frow = dataframe.loc[fkey]
-                for name in fval_names:
-                    event[name] = frow.loc[name]
-            except Exception as e:
+                for name, value in zip(fval_names, table.get_values(fkey, fval_names)):
+                    event[name] = value
+            # Short rows of the foreign table are taken as missing
+            except (KeyError, IndexError) as e:
                 print 'Broken foreign key : %s'%fkey
                 print str(e)
                 exit
@@ -101,3 +289,84 @@ class CSVExtractor(object):
         
         
 
+class MySQLExtractor(object):
+    """
+    Streams EdxTrackEvent rows from the Edx database, joined with
+    Answer and CorrectMap by the server. Rows are fetched by batches 
+    of fetch_size through a server-side cursor, so that neither the 
+    result set nor the foreign tables are held in memory.
+    Any DB-API connection with the same schema may be given instead
+    (e.g. sqlite3, for tests).
+    """
+
+    # Foreign fields, as added by CSVExtractor.get_foreign_values.
+    # Fields of a missing foreign row are set to ''.
+    FOREIGN_FIELDS = [('a', 'answer'), ('c', 'answer_identifier'), ('c', 'correctness')]
+
+    # Columns of EdxTrackEvent named differently in the CSV fields
+    COLUMN_NAMES = {'ip':'ip_country', 'hintmode':'mode'}
+
+    def __init__(self, connection=None, fetch_size=cfg.MYSQL_FETCH_SIZE, order_by=cfg.MYSQL_ORDER_BY):
+        self.fieldnames = CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES + [name for table, name in self.FOREIGN_FIELDS]
+        self.fetch_size = fetch_size
+
+        if connection is None:
+            connection = self.connect()
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.cursor.execute(self.get_query(order_by))
+        self.rows = iter([])
+
+    def connect(self):
+        import MySQLdb
+        import MySQLdb.cursors
+        return MySQLdb.connect(host=cfg.MYSQL_HOST, port=cfg.MYSQL_PORT, user=cfg.MYSQL_USER,
+                               passwd=cfg.MYSQL_PASSWD, db=cfg.MYSQL_DB, charset='utf8', use_unicode=False,
+                               cursorclass=MySQLdb.cursors.SSCursor)
+
+    def get_query(self, order_by=''):
+        columns = [self.get_column(name) for name in CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES]
+        columns += ["COALESCE(%s.`%s`, '')" % (table, name) for table, name in self.FOREIGN_FIELDS]
+        query = ' '.join(['SELECT', ', '.join(columns),
+                          'FROM EdxTrackEvent e',
+                          'LEFT JOIN Answer a ON a.answer_id = e.answer_fk',
+                          'LEFT JOIN CorrectMap c ON c.correct_map_id = e.correctMap_fk'])
+        if order_by:
+            query += ' ORDER BY e.`%s`' % self.COLUMN_NAMES.get(order_by, order_by)
+        return query
+
+    def get_column(self, name):
+        """ Column of EdxTrackEvent selected as the CSV field name """
+        if name in self.COLUMN_NAMES:
+            return 'e.`%s` AS `%s`' % (self.COLUMN_NAMES[name], name)
+        return 'e.`%s`' % name
+
+    def to_string(self, value):
+        """ Values are given as they would be read from a CSV export """
+        if value is None:
+            return ''
+        elif isinstance(value, datetime.datetime):
+            return value.strftime(cfg.TIMESTAMP_FORMAT)
+        elif isinstance(value, unicode):
+            return value.encode('utf-8')
+        return str(value)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        row = next(self.rows, None)
+        if row is None:
+            rows = self.cursor.fetchmany(self.fetch_size)
+            if not rows:
+                self.close()
+                raise StopIteration
+            self.rows = iter(rows)
+            row = next(self.rows)
+        return dict(zip(self.fieldnames, [value if type(value) is str else self.to_string(value) for value in row]))
+
+    def close(self):
+        # An unread server-side result set would block the connection
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
@@ -23,10 +23,14 @@ def ip_to_integer(raw_event):
         print "Not a dotted IPv4 address: " + dotted_ip
 
 # Parsing HTTP Agent header
+# Few distinct agent strings are met, so parsing results are cached.
+# main.translate loads and saves cfg.AGENT_CACHE_FILE
+agent_cache = helperclasses.ParseCache(httpagentparser.simple_detect, cfg.AGENT_CACHE_SIZE)
+
 def set_agent_os(raw_event):
     """ Parses the HTTP Agent header taken from the 'agent' field 
     of raw event, and sets 'agent' and 'os' fields."""
-    os_and_agent = httpagentparser.simple_detect(raw_event['agent'])
+    os_and_agent = agent_cache.get(raw_event['agent'])
     raw_event['os'] = os_and_agent[0]
     raw_event['agent'] = os_and_agent[1]
 
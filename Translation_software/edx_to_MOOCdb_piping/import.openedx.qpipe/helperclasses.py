@@ -2,6 +2,7 @@ import re
 import csv
 import os
 import pickle
+import collections
 import config as cfg
 
 class CourseURL:
@@ -353,19 +354,27 @@ class ModuleURI(object):
 # Dictionary Table
 
 class DictionaryTable(object):
-    """ Basically a list, used to build the various dictionary tables in MOOCdb """
+    """ Basically a list, used to build the various dictionary tables in MOOCdb.
+    A value -> id hash map is kept next to the append-only list, so that
+    looking up an already known value does not scan the whole list """
 
     def __init__(self, moocdb, table_name):
         self.ITEM_LIST = []
+        self.ITEM_INDEX = {}
         self.table = getattr(moocdb,table_name)
         self.fieldnames = moocdb.TABLES[table_name]
 
     def insert(self,value):
-        if value in self.ITEM_LIST:
-            return self.ITEM_LIST.index(value)
-        else:
+        # Ids are the positions in ITEM_LIST, affected in order of first insertion
+        item_id = self.ITEM_INDEX.get(value, None)
+        if item_id is None:
+            item_id = len(self.ITEM_LIST)
             self.ITEM_LIST.append(value)
-            return len(self.ITEM_LIST) - 1
+            self.ITEM_INDEX[value] = item_id
+        return item_id
+
+    def __contains__(self,value):
+        return value in self.ITEM_INDEX
 
     def __len__(self):
         return len(self.ITEM_LIST)
@@ -511,6 +520,98 @@ class EngagedUsers(object):
 
         
         
+class ParseCache(object):
+    """ Bounded LRU cache in front of a parsing function, such as
+    httpagentparser.simple_detect. Hits, misses and evictions are counted.
+    If cache_file is given, the cache is loaded from it at start, 
+    and written back to it by serialize() """
+
+    def __init__(self, parse_function, max_size=10000, cache_file=''):
+        self.parse_function = parse_function
+        self.max_size = max_size
+        self.cache_file = cache_file
+        self.entries = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_file and os.path.exists(cache_file):
+            self.load(cache_file)
+
+    def get(self, key):
+        try:
+            value = self.entries.pop(key)
+            self.hits += 1
+        except KeyError:
+            value = self.parse_function(key)
+            self.misses += 1
+            if len(self.entries) >= self.max_size:
+                # Least recently used entries come first
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        self.entries[key] = value
+        return value
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_stats(self):
+        return { 'size':len(self),
+                 'hits':self.hits,
+                 'misses':self.misses,
+                 'evictions':self.evictions }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_state(self):
+        """ Entries and counters, to be merged into another cache """
+        return (self.entries, self.hits, self.misses, self.evictions)
+
+    def merge(self, state):
+        """ Adds the entries and counters of another cache, as given
+        by its get_state() (e.g. that of a worker process). 
+        Entries not yet cached count as most recently used """
+        entries, hits, misses, evictions = state
+        for key, value in entries.items():
+            if key in self.entries:
+                continue
+            if len(self.entries) >= self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.entries[key] = value
+
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def load(self, cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                entries = pickle.load(f)
+        except Exception:
+            print '[ParseCache.load] Unable to load cache file : ' + cache_file
+            return
+
+        # Keep the most recently used entries if the cache shrank
+        for key in list(entries.keys())[-self.max_size:]:
+            self.entries[key] = entries[key]
+
+    def serialize(self, cache_file=''):
+
+        if not cache_file:
+            cache_file = self.cache_file
+
+        if not cache_file:
+            return
+
+        with open(cache_file, 'wb') as f:
+            pickle.dump(self.entries, f, pickle.HIGHEST_PROTOCOL)
+
 
 # CSV Writers 
 
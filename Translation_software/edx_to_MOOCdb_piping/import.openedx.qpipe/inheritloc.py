@@ -1,3 +1,5 @@
+import config as cfg
+
 # These functions suppose that the user is engaged
 # and that the location is not obsolete
 
@@ -14,11 +16,13 @@ def no_url(raw_event):
     if current_location.get_sub_unit():
         raw_event['page'] = current_location
         raw_event['inherited'] = 'url'
-        print '[inheritloc.no_url] Inherited location : ' + str( current_location )
+        if cfg.VERBOSE:
+            print '[inheritloc.no_url] Inherited location : ' + str( current_location )
 
     else:
         raw_event['inherited'] = ''
-        print '[inheritloc.no_url] Location was not inherited because not at sub-unit level.'
+        if cfg.VERBOSE:
+            print '[inheritloc.no_url] Location was not inherited because not at sub-unit level.'
     
 
 def inherit_seqnum(raw_event):
@@ -45,11 +49,13 @@ def inherit_seqnum(raw_event):
             
         else:
 
-            print '[inheritloc.inherit_seqnum] Previous location ( ' + str(current_location) + ' ) has no seqnum.'
+            if cfg.VERBOSE:
+                print '[inheritloc.inherit_seqnum] Previous location ( ' + str(current_location) + ' ) has no seqnum.'
 
     else:
 
-        print '[inheritloc.inherit_seqnum] No inheritance : units did not coincide.'
+        if cfg.VERBOSE:
+            print '[inheritloc.inherit_seqnum] No inheritance : units did not coincide.'
 
 
 
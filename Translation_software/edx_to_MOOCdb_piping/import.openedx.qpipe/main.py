@@ -2,7 +2,8 @@
 
 import sys
 import os 
-import extractor
+import resource
+import genformatting
 import config as cfg
 
 from events import *
@@ -14,69 +15,124 @@ from submissions import *
 from util import * 
 from moocdb import MOOCdb
 
+from eventsharder import EventSharder
+from profiler import Profiler
+
 ROOT_DIR = os.getcwd()
 MOOCDB_DIR = cfg.DEST_DIR
 CONFIG_DIR = ROOT_DIR + '/config/'
 
 # Log file, best viewed with emacs org-mode
 LOG = cfg.LOG_FILE
-sys.stdout = open(LOG, 'w+')
 
 # File to pretty print resource hierarchy
 HIERARCHY = cfg.RESOURCE_HIERARCHY
 PB_HIERARCHY = cfg.PROBLEM_HIERARCHY
 
-# MOOCdb storage interface
-# TODO Apply branching to allow different options
-moocdb = MOOCdb(MOOCDB_DIR)
-
-# Instanciating the piping architecture
-event_formatter = EventFormatter(moocdb, CONFIG_DIR)
-resource_manager = ResourceManager(moocdb, HIERARCHY_ROOT='https://', CONFIG_PATH = CONFIG_DIR)
-event_manager = EventManager(moocdb)
-submission_manager = SubmissionManager(moocdb)
-curation_helper = CurationHelper(MOOCDB_DIR)
-
-print '**Processing events**' 
-
-for raw_event in extractor.get_events():
-        
-    print '* Processing event #' + raw_event['event_id'] + ' @ ' + raw_event['page']
-#    print '** Applying filter'
-
-    # Apply event filter
-    if event_formatter.pass_filter(raw_event) == False:
-        print 'Event filtered out'
-        continue
-            
-    # Format raw event and instanciate corresponding Event subclass
-    event = event_formatter.polish(raw_event)
-    # print '- Instanciated event :: ' + event['event_type'] + '->' + event.__class__.__name__
-    
-    # Inserts resource into the hierarchy
-#    print '** Inserting resource'
-    resource_id = resource_manager.create_resource(event)
-    event.set_data_attr('resource_id', resource_id)
-
-    # Store submission, assessment and problem
-    submission_manager.update_submission_tables(event)
-
-    # Record curation hints
-    curation_helper.record_curation_hints(event)
-
-    # Store observed event
-    event_manager.store_event(event)
-
-print '* All events processed'
-print '** Writing CSV output to : ' + MOOCDB_DIR
-
-event_formatter.serialize()
-event_manager.serialize()
-resource_manager.serialize(pretty_print_to=HIERARCHY)
-submission_manager.serialize(pretty_print_to=PB_HIERARCHY)
-curation_helper.serialize()
-
-print '* Writing resource hierarchy to : ' + HIERARCHY
-print '* Writing problem hierarchy to : ' + PB_HIERARCHY
-# Close all opened files
-moocdb.close()
+def translate(raw_events, moocdb_dir=MOOCDB_DIR, config_dir=CONFIG_DIR, hierarchy=HIERARCHY, pb_hierarchy=PB_HIERARCHY, workers=cfg.WORKERS, output=cfg.MOOCDB_OUTPUT, profile_file=cfg.PROFILE_FILE, agent_cache_file=cfg.AGENT_CACHE_FILE):
+
+    # Stage timers, summarized to profile.json in the output directory
+    profiler = Profiler(profile_file)
+    profiler.enable()
+
+    # User agents parsed in earlier runs
+    if agent_cache_file and os.path.exists(agent_cache_file):
+        genformatting.agent_cache.load(agent_cache_file)
+
+    # MOOCdb storage interface
+    moocdb = MOOCdb(moocdb_dir, output)
+
+    # Instanciating the piping architecture
+    event_formatter = EventFormatter(moocdb, config_dir)
+    resource_manager = ResourceManager(moocdb, HIERARCHY_ROOT='https://', CONFIG_PATH = config_dir)
+    event_manager = EventManager(moocdb, cfg.EVENT_IDLE_TIMEOUT, cfg.EVENT_SPILL_DIR)
+    submission_manager = SubmissionManager(moocdb)
+    curation_helper = CurationHelper(moocdb_dir)
+
+    raw_events = profiler.iterate('extractor', raw_events)
+
+    # Filtering and formatting are done per user, and can be 
+    # spread over several processes. The remaining steps 
+    # fill tables shared by all users, in event order.
+    if workers > 1:
+        # Timed as a whole, extraction included
+        formatted_events = profiler.iterate('EventSharder', EventSharder(moocdb, config_dir, workers).format_events(raw_events))
+    else:
+        formatted_events = event_formatter.format_events(raw_events, profiler)
+
+    print '**Processing events**' 
+
+    for raw_event, event, metadata in formatted_events:
+
+        profiler.count('events')
+
+        # Apply event filter
+        if not event:
+            profiler.count('filtered_events')
+            continue
+
+        # Record URL, OS and agent of the formatted event
+        t = profiler.start()
+        event_formatter.record_event_metadata(event.data, metadata)
+        t = profiler.stop('EventFormatter.record_event_metadata', t)
+
+        # Inserts resource into the hierarchy
+        resource_id = resource_manager.create_resource(event)
+        event.set_data_attr('resource_id', resource_id)
+        t = profiler.stop('ResourceManager', t)
+
+        # Store submission, assessment and problem
+        submission_manager.update_submission_tables(event)
+        t = profiler.stop('SubmissionManager', t)
+
+        # Record curation hints
+        curation_helper.record_curation_hints(event)
+        t = profiler.stop('CurationHelper', t)
+
+        # Store observed event
+        event_manager.store_event(event)
+        profiler.stop('EventManager', t)
+
+    print '* All events processed : ' + str(profiler.counters['events'])
+    print '* Staged events : ' + str(event_manager.get_stats())
+    print '** Writing CSV output to : ' + moocdb_dir
+
+    t = profiler.start()
+    event_formatter.serialize()
+    event_manager.serialize()
+    resource_manager.serialize(pretty_print_to=hierarchy)
+    submission_manager.serialize(pretty_print_to=pb_hierarchy)
+    curation_helper.serialize()
+
+    print '* Writing resource hierarchy to : ' + hierarchy
+    print '* Writing problem hierarchy to : ' + pb_hierarchy
+
+    # Close all opened files
+    moocdb.close()
+    genformatting.agent_cache.serialize(agent_cache_file)
+    print '* User agent cache : ' + str(genformatting.agent_cache.get_stats())
+    profiler.stop('serialize', t)
+
+    # ru_maxrss is given in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print '* Peak RSS : %d kB (budget : %d MB)' % (peak_rss, cfg.RSS_BUDGET_MB)
+    if peak_rss > cfg.RSS_BUDGET_MB * 1024:
+        print '(!) Peak RSS over budget'
+
+    if output != 'csv':
+        for table, stats in sorted(moocdb.get_load_stats().items()):
+            print '* Loaded %s : %d rows in %.2f s (%.0f rows/sec)' % ((table,) + stats)
+
+    profiler.disable()
+    profiler.count('peak_rss_kb', peak_rss)
+    profiler.serialize(moocdb_dir + 'profile.json')
+    print '* Profile summary written to : ' + moocdb_dir + 'profile.json'
+    return profiler.get_summary()
+
+if __name__ == '__main__':
+
+    import extractor
+
+    sys.stdout = open(LOG, 'w+')
+
+    translate(extractor.get_events())
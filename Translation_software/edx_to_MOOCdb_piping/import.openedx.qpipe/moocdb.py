@@ -1,5 +1,10 @@
 import os
 import csv
+import time
+import shutil
+import tempfile
+
+import config as cfg
 
 
 class MOOCdb(object):
@@ -77,18 +82,47 @@ class MOOCdb(object):
               'agent':['agent_id',
                        'agent_name']  }
 
-    def __init__(self,MOOCDB_DIR=''):
-        self.create_csv_writers(MOOCDB_DIR)
+    def __init__(self,MOOCDB_DIR='',output='csv',connection=None,segment_size=cfg.LOAD_SEGMENT_SIZE):
+        self.loader = None
+        if output == 'csv':
+            self.create_csv_writers(MOOCDB_DIR)
+        else:
+            self.create_load_writers(MOOCDB_DIR, output, connection, segment_size)
 
     def close(self):
         for table in self.TABLES:
             reader = getattr(self,table)
             reader.close()
+        if self.loader:
+            self.loader.close()
+            shutil.rmtree(self.segment_dir)
 
     def create_csv_writers(self,MOOCDB_DIR):
         for table in self.TABLES:
             setattr(self,table,CSVWriter(MOOCDB_DIR + table + '.csv', self.TABLES[table]))
-        
+
+    def create_load_writers(self,MOOCDB_DIR,output,connection,segment_size):
+        if output == 'mysql':
+            self.loader = MySQLLoader(connection)
+        elif output == 'sqlite':
+            self.loader = SQLiteLoader(connection or MOOCDB_DIR + 'moocdb.sqlite')
+        else:
+            raise ValueError('[MOOCdb] Unknown output : %s' % output)
+
+        self.segment_dir = tempfile.mkdtemp(prefix='moocdb_segments', dir=MOOCDB_DIR or None)
+        self.loader.open(self.TABLES)
+        for table in self.TABLES:
+            setattr(self,table,LoadDataWriter(table, self.TABLES[table], self.loader, self.segment_dir, segment_size))
+
+    def get_load_stats(self):
+        """ Returns (rows, seconds, rows/sec) per table loaded into the database """
+        stats = {}
+        for table in self.TABLES:
+            writer = getattr(self,table)
+            rate = writer.rows / writer.load_time if writer.load_time else 0
+            stats[table] = (writer.rows, writer.load_time, rate)
+        return stats
+
 
 class CSVWriter(object):
     
@@ -110,3 +144,140 @@ class CSVWriter(object):
         
 
 
+class LoadDataWriter(object):
+    """ Writes rows of a table to tab-separated segment files, 
+    in the column order of MOOCdb.TABLES, with MySQL's escaping.
+    Each segment is loaded into the database as soon as it holds
+    segment_size rows, then deleted """
+
+    ESCAPES = [('\\', '\\\\'), ('\0', '\\0'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')]
+
+    def __init__(self,table,fields,loader,segment_dir,segment_size):
+        self.table = table
+        self.fields = fields
+        self.loader = loader
+        self.segment_dir = segment_dir
+        self.segment_size = segment_size
+        self.segments = 0
+        self.rows = 0
+        self.load_time = 0
+        self.output = None
+
+    def escape(self,value):
+        # Missing values are loaded as NULL
+        if value is None:
+            return '\\N'
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+        else:
+            value = str(value)
+        for char, escaped in self.ESCAPES:
+            if char in value:
+                value = value.replace(char, escaped)
+        return value
+
+    def store(self,l):
+        if self.output is None:
+            self.segment = os.path.join(self.segment_dir, '%s_%d.tsv' % (self.table, self.segments))
+            self.output = open(self.segment, 'wb')
+            self.segment_rows = 0
+        self.output.write('\t'.join([self.escape(l.get(field)) for field in self.fields]) + '\n')
+        self.segment_rows += 1
+        if self.segment_rows == self.segment_size:
+            self.flush()
+
+    def flush(self):
+        """ Loads the current segment """
+        if self.output is None:
+            return
+        self.output.close()
+        self.output = None
+        start = time.time()
+        self.loader.load(self.table, self.fields, self.segment)
+        self.load_time += time.time() - start
+        self.rows += self.segment_rows
+        self.segments += 1
+        os.remove(self.segment)
+
+    def close(self):
+        self.flush()
+
+
+class MySQLLoader(object):
+    """ Loads segments with LOAD DATA LOCAL INFILE. Keys are disabled 
+    from open() to close(), and rebuilt at once at the end """
+
+    def __init__(self,connection=None):
+        if connection is None:
+            import MySQLdb
+            connection = MySQLdb.connect(host=cfg.MYSQL_HOST, port=cfg.MYSQL_PORT, user=cfg.MYSQL_USER,
+                                         passwd=cfg.MYSQL_PASSWD, db=cfg.MOOCDB_MYSQL_DB, charset='utf8',
+                                         local_infile=1)
+        self.connection = connection
+
+    def execute(self,statement):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def open(self,tables):
+        self.tables = tables
+        self.execute('SET unique_checks=0')
+        self.execute('SET foreign_key_checks=0')
+        for table in self.tables:
+            self.execute('ALTER TABLE `%s` DISABLE KEYS' % table)
+
+    def load(self,table,fields,segment):
+        self.execute("LOAD DATA LOCAL INFILE '%s' INTO TABLE `%s` "
+                     "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (%s)"
+                     % (segment, table, ', '.join(['`%s`' % field for field in fields])))
+        self.connection.commit()
+
+    def close(self):
+        for table in self.tables:
+            self.execute('ALTER TABLE `%s` ENABLE KEYS' % table)
+        self.execute('SET unique_checks=1')
+        self.execute('SET foreign_key_checks=1')
+        self.connection.commit()
+        self.connection.close()
+
+
+class SQLiteLoader(object):
+    """ Dry-run stand-in for MySQLLoader : segments are parsed back
+    and inserted into a sqlite database, in tables holding text columns 
+    (created if needed). Primary key indexes are built in close() """
+
+    UNESCAPES = {'\\':'\\', '0':'\0', 't':'\t', 'n':'\n', 'r':'\r'}
+
+    def __init__(self,connection):
+        if isinstance(connection, basestring):
+            import sqlite3
+            connection = sqlite3.connect(connection)
+            connection.text_factory = str
+        self.connection = connection
+
+    def open(self,tables):
+        self.tables = tables
+        for table, fields in tables.items():
+            self.connection.execute('CREATE TABLE IF NOT EXISTS `%s` (%s)' % (table, ', '.join(['`%s` TEXT' % field for field in fields])))
+
+    def unescape(self,value):
+        if value == '\\N':
+            return None
+        if '\\' not in value:
+            return value
+        chars = iter(value)
+        return ''.join([self.UNESCAPES.get(next(chars), '') if c == '\\' else c for c in chars])
+
+    def load(self,table,fields,segment):
+        with open(segment, 'rb') as f:
+            rows = ([self.unescape(value) for value in line[:-1].split('\t')] for line in f)
+            self.connection.executemany('INSERT INTO `%s` (%s) VALUES (%s)' % (table, ', '.join(['`%s`' % field for field in fields]), ', '.join(['?'] * len(fields))), rows)
+        self.connection.commit()
+
+    def close(self):
+        for table, fields in self.tables.items():
+            self.connection.execute('CREATE INDEX IF NOT EXISTS `%s_key` ON `%s` (`%s`)' % (table, table, fields[0]))
+        self.connection.commit()
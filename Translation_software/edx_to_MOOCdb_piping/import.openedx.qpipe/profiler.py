@@ -0,0 +1,77 @@
+import json
+import timeit
+import cProfile
+import collections
+
+class Profiler(object):
+    """ Aggregated timers and counters for the stages of the translation.
+    Nothing is logged per event : each stage accumulates its calls and
+    elapsed time, summarized once at the end of the run.
+
+    Timers are chained, so that a single clock reading
+    ends a stage and starts the next one :
+
+        t = profiler.start()
+        ...
+        t = profiler.stop('stage', t)
+    """
+
+    def __init__(self, profile_file=''):
+        self.timer = timeit.default_timer
+        self.times = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.counters = collections.defaultdict(int)
+
+        # Optional cProfile dump, readable with pstats
+        self.profile_file = profile_file
+        self.profile = cProfile.Profile() if profile_file else None
+        self.created = self.timer()
+
+    def start(self):
+        return self.timer()
+
+    def stop(self, stage, start):
+        now = self.timer()
+        self.times[stage] += now - start
+        self.calls[stage] += 1
+        return now
+
+    def count(self, counter, n=1):
+        self.counters[counter] += n
+
+    def iterate(self, stage, iterable):
+        """ Yields the items of iterable, timing the production of each one """
+        iterator = iter(iterable)
+        while True:
+            t = self.timer()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stop(stage, t)
+            yield item
+
+    def enable(self):
+        if self.profile:
+            self.profile.enable()
+
+    def disable(self):
+        if self.profile:
+            self.profile.disable()
+
+    def get_summary(self):
+        stages = {}
+        for stage in self.times:
+            stages[stage] = {'calls':self.calls[stage],
+                             'seconds':round(self.times[stage], 6),
+                             'us_per_call':round(1e6 * self.times[stage] / self.calls[stage], 3)}
+        return {'total_seconds':round(self.timer() - self.created, 6),
+                'stages':stages,
+                'counters':dict(self.counters)}
+
+    def serialize(self, summary_file):
+        with open(summary_file, 'w') as f:
+            json.dump(self.get_summary(), f, indent=2, sort_keys=True)
+        if self.profile:
+            self.profile.dump_stats(self.profile_file)
@@ -82,15 +82,79 @@ class Problem(Node):
             return match.group('child_number')
 
     
+class TrieNode(object):
+
+    def __init__(self, node=None):
+        self.node = node
+        self.children = {}
+
+
+class URITrie(object):
+    '''
+    Index of the hierarchy nodes, keyed on the path components
+    of their URI relative to the hierarchy root. Example with root 'https://' :
+      'https://www.edx.org/courses/MITx/' -> ['www.edx.org', 'courses', 'MITx']
+
+    Answers "deepest known ancestor" queries in O(path length),
+    instead of scanning the children of each level.
+    '''
+
+    def __init__(self, root_node):
+        self.root = root_node.uri
+        self.trie = TrieNode(root_node)
+
+    def indexable(self, uri):
+        '''
+        Only URIs below the root and ending with a slash are handled
+        by the trie. For those, being a string prefix amounts to 
+        being a path prefix.
+        '''
+        return uri.startswith(self.root) and uri.endswith('/')
+
+    def get_path(self, uri):
+        path = uri[len(self.root):].split('/')
+        # Remove trailing '' left by the final slash
+        path.pop()
+        return path
+
+    def add(self, node):
+        trie_node = self.trie
+        for level in self.get_path(node.uri):
+            if level not in trie_node.children:
+                trie_node.children[level] = TrieNode()
+            trie_node = trie_node.children[level]
+
+        # When a URI is met twice, the first node is kept, 
+        # as the children scan would do.
+        if not trie_node.node:
+            trie_node.node = node
+
+    def get_known_parent(self, uri):
+        trie_node = self.trie
+        known_parent = trie_node.node
+        for level in self.get_path(uri):
+            trie_node = trie_node.children.get(level, None)
+            if not trie_node:
+                break
+            if trie_node.node:
+                known_parent = trie_node.node
+        return known_parent
+
+
 class ResourceHierarchy:
     
-    def __init__(self, moocdb_table, root='', NodeType=Node):
+    def __init__(self, moocdb_table, root='', NodeType=Node, use_trie=True):
         self.size = 0
         
         # Set root node
         root = NodeType(root)
         root.resource_id = 0
         self.hierarchy = root
+
+        # Index used to find the known parent of a new URI.
+        # Set to None when the hierarchy holds a URI the trie
+        # cannot handle, in which case the children scan is used.
+        self.trie = URITrie(root) if use_trie else None
         
         # Set MOOCdb table object that 
         # the resources are going to be
@@ -128,6 +192,7 @@ class ResourceHierarchy:
             #print tree_to_insert.__str__('-')
             # Insert the tree at the appropriate location
             known_parent.append_child(tree_to_insert)
+            self.index(tree_to_insert)
             inserted_resource_id = self.size
             #print '- Inserted with id :: ' + str(inserted_resource_id)
             return inserted_resource_id
@@ -136,7 +201,27 @@ class ResourceHierarchy:
         self.size +=1
         node._id = self.size
 
+    def index(self, node):
+        '''
+        Adds the vertical tree built by prepare_resource_for_insert 
+        to the trie
+        '''
+        while node and self.trie:
+            if self.trie.indexable(node.uri):
+                self.trie.add(node)
+            elif node.uri.startswith(self.trie.root):
+                # The trie would miss this node when it is a substring
+                # of later URIs : fall back to the children scan.
+                self.trie = None
+            node = node.children[0] if node.children else None
+
     def get_known_parent(self,uri):
+        if self.trie and self.trie.indexable(uri):
+            return self.trie.get_known_parent(uri)
+        else:
+            return self.scan_known_parent(uri)
+
+    def scan_known_parent(self,uri):
         def rec_search(node,uri):
             search_under = None
             for child in node.children:
@@ -249,8 +334,8 @@ class ResourceManager:
         self.resource_types = DictionaryTable(moocdb,'resource_types')
         self.resources_urls = DictionaryTable(moocdb,'resources_urls')
 
-        self.content_rules = util.load_rules(self.CONTENT_RLS, contentmedium)
-        self.medium_rules = util.load_rules(self.MEDIUM_RLS, contentmedium)
+        self.content_rules = util.load_compiled_rules(self.CONTENT_RLS, contentmedium)
+        self.medium_rules = util.load_compiled_rules(self.MEDIUM_RLS, contentmedium)
 
     def create_resource(self,event):
 
@@ -289,8 +374,8 @@ class ResourceManager:
         array['uri'] = event.get_uri()
         array['resource_name'] = event['resource_display_name']
         
-        content = util.apply_rules(self.content_rules, array) 
-        medium = util.apply_rules(self.medium_rules, array)
+        content = self.content_rules.apply(array) 
+        medium = self.medium_rules.apply(array)
         
         return (content, medium)
 
@@ -0,0 +1,44 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from extractor import CSVExtractor
+from ForeignTable_test import make_tables
+
+# Extraction time of CSVExtractor for each join strategy,
+# on synthetic EdxTrackEvent, Answer and CorrectMap tables
+
+SIZES = [10000, 100000]
+
+def timed(paths, join):
+    start = time.time()
+    extractor = CSVExtractor(edx_track_event=paths[0], answer=paths[1], correct_map=paths[2], join=join)
+    loaded = time.time()
+    for event in extractor:
+        pass
+    return loaded - start, time.time() - loaded
+
+if __name__ == '__main__':
+    # The second 'mmap' run reuses the on-disk index
+    joins = ['dict', 'merge', 'mmap', 'mmap']
+    try:
+        import pandas
+        joins.append('pandas')
+    except ImportError:
+        pass
+
+    print '| Events | Join | Load (s) | Extraction (s) | Events/sec |'
+    for n in SIZES:
+        dest = tempfile.mkdtemp()
+        paths = make_tables(dest, n)
+        for join in joins:
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            load, extraction = timed(paths, join)
+            sys.stdout = stdout
+            print '| {} | {} | {:.2f} | {:.2f} | {:.0f} |'.format(n, join, load, extraction, n / (load + extraction))
+        shutil.rmtree(dest)
@@ -0,0 +1,32 @@
+import sys
+import os
+import time
+import random
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import util
+from CompiledRules_test import RULE_FILES, EVENT_TYPES, tagged_rules
+
+# Events/sec when applying each rule file of config/
+# with util.apply_rules and with util.CompiledRules
+
+N_EVENTS = 100000
+
+def timed(apply_function, arrays):
+    start = time.time()
+    for array in arrays:
+        apply_function(array)
+    return len(arrays) / (time.time() - start)
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    print '| Rule file | apply_rules (events/sec) | CompiledRules (events/sec) |'
+    for rule_file in RULE_FILES:
+        rules = tagged_rules(rule_file)
+        compiled = util.CompiledRules(rules)
+        fields = set([rule['field'] for rule in rules])
+        arrays = [dict([(field, rng.choice(EVENT_TYPES)) for field in fields]) for i in range(N_EVENTS)]
+        print '| {} | {:.0f} | {:.0f} |'.format(rule_file,
+                                                timed(lambda array: util.apply_rules(rules, array), arrays),
+                                                timed(compiled.apply, arrays))
@@ -0,0 +1,73 @@
+import sys
+import os
+import re
+import random
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import util
+
+# Differential test : for every rule file in config/, checks that
+# util.CompiledRules picks the same rule as util.apply_rules.
+# Rule functions are replaced by functions returning the rule's rank.
+
+CONFIG_DIR = os.path.join(os.getcwd(), os.path.pardir, 'config')
+
+RULE_FILES = ['filter_rules.txt',
+              'specific_formatting_rules.txt',
+              'inherit_location_rules.txt',
+              'update_loc_rules.txt',
+              'instanciate_event_rules.txt',
+              'content_rules.txt',
+              'medium_rules.txt']
+
+EVENT_TYPES = ['page_close', 'seq_goto', 'seq_next', 'seq_prev', 'play_video', 'pause_video',
+               'load_video', 'seek_video', 'speed_change_video', 'show_transcript', 'hide_transcript',
+               'fullscreen', 'not_fullscreen', 'book', 'problem_check', 'problem_check_fail',
+               'problem_show', 'problem_graded', 'problem_save', 'problem_reset', 'reset_problem',
+               'save_problem_check', 'showanswer', 'show_answer', 'oe_show_question', 'oe_hide_question',
+               'oe_feedback_response_selected', 'combinedopenended', 'rubric_select', 'peer_grading_hide_question',
+               'staff_grading_show_question', 'sequential', 'problem_check_fail_sequential',
+               '/courses/MITx/6.002x/2013_Spring/courseware/Week_10/Homework_10/',
+               '/courses/Medicine/SciWrite/Fall2013/modx/i4x://Medicine/SciWrite/sequential/ff5b301018454eff862deb7a52553ca3/goto_position',
+               '/courses/MITx/6.002x/2013_Spring/modx/i4x:/MITx/6.002x/problem/Op_Amps/problem_get',
+               '/courses/MITx/6.002x/2013_Spring/book/3/', '/courses/MITx/6.002x/2013_Spring/info',
+               '/courses/MITx/6.002x/2013_Spring/wiki/MITx.6.002x.2013_Spring/', '/login', '/account/',
+               '/courses/MITx/6.002x/2013_Spring/discussion/forum/threads/1', 'i4x://MITx/6.002x/problem/X',
+               'https://www.edx.org/courses/MITx/6.002x/2013_Spring/courseware/Week_1/Unit_1/2/video/S1V1/',
+               'https://www.edx.org/courses/MITx/6.002x/2013_Spring/progress/', 'about', 'profile',
+               'https://unknown/', '', 'None', 'sequential\nproblem', 'open_ended_preview']
+
+def tagged_rules(rule_file):
+    rules = util.load_rules(os.path.join(CONFIG_DIR, rule_file))
+    for rank, rule in enumerate(rules):
+        rule['function'] = (lambda r: lambda array: r)(rank)
+    return rules
+
+def make_arrays(rules, rng):
+    values = EVENT_TYPES + [''.join(rng.sample(v + v, len(v))) for v in EVENT_TYPES]
+    fields = set([rule['field'] for rule in rules])
+    arrays = []
+    for value in values:
+        array = dict([(field, rng.choice(values)) for field in fields])
+        for field in fields:
+            array[field] = value
+            arrays.append(dict(array))
+    return arrays
+
+def check(rule_file, rng):
+    rules = tagged_rules(rule_file)
+    compiled = util.CompiledRules(rules)
+    arrays = make_arrays(rules, rng)
+    for array in arrays:
+        expected = util.apply_rules(rules, array)
+        obtained = compiled.apply(array)
+        if expected != obtained:
+            print '(!) %s : rule %s expected for %s, got %s' % (rule_file, expected, array, obtained)
+            return False
+    return True
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    for rule_file in RULE_FILES:
+        print '* %s :: %s' % (rule_file, 'OK' if check(rule_file, rng) else 'FAILED')
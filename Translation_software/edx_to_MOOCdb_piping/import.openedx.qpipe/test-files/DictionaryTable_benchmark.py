@@ -0,0 +1,42 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from helperclasses import DictionaryTable
+
+# Measures the cost per insert in DictionaryTable when the number
+# of distinct URLs grows. The cost should remain flat.
+
+SIZES = [1000, 10000, 100000, 1000000]
+# Every distinct URL is seen REPEAT times, as in real logs
+REPEAT = 5
+
+class FakeMOOCdb(object):
+    TABLES = {'urls':['url_id','url']}
+    def __init__(self):
+        self.urls = None
+
+def run(n):
+    urls = ['https://www.edx.org/courses/MITx/6.002x/2013_Spring/courseware/Week_%d/Unit_%d/' % (i % 17, i) for i in range(n)]
+    table = DictionaryTable(FakeMOOCdb(), 'urls')
+
+    start = time.time()
+    for url in urls:
+        table.insert(url)
+    first_pass = time.time() - start
+
+    start = time.time()
+    for r in range(REPEAT - 1):
+        for url in urls:
+            table.insert(url)
+    next_passes = time.time() - start
+
+    return first_pass / n, next_passes / (n * (REPEAT - 1))
+
+if __name__ == '__main__':
+    print '| Distinct URLs | New value (us/insert) | Known value (us/insert) |'
+    for n in SIZES:
+        new_cost, known_cost = run(n)
+        print '| {} | {:.3f} | {:.3f} |'.format(n, new_cost * 1e6, known_cost * 1e6)
@@ -0,0 +1,44 @@
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from helperclasses import DictionaryTable
+
+class FakeMOOCdb(object):
+    TABLES = {'urls':['url_id','url'],
+              'resources_urls':['resources_urls_id','resource_id','url_id']}
+    def __init__(self):
+        self.urls = None
+        self.resources_urls = None
+
+def list_insert(item_list, value):
+    ''' Former DictionaryTable.insert, based on list.index '''
+    if value in item_list:
+        return item_list.index(value)
+    else:
+        item_list.append(value)
+        return len(item_list) - 1
+
+def check(table_name, values):
+    table = DictionaryTable(FakeMOOCdb(), table_name)
+    item_list = []
+    for value in values:
+        expected = list_insert(item_list, value)
+        obtained = table.insert(value)
+        if expected != obtained:
+            print '(!) %s : id %s expected for %s, got %s' % (table_name, expected, value, obtained)
+            return False
+    if [table[i] for i in range(len(table))] != item_list:
+        print '(!) %s : stored values differ' % table_name
+        return False
+    return True
+
+if __name__ == '__main__':
+    random.seed(0)
+    urls = ['https://www.edx.org/courses/A/B/C/courseware/%d/' % random.randint(0,300) for i in range(5000)]
+    resources_urls = [(random.randint(0,50), random.randint(0,50)) for i in range(5000)]
+
+    print '* urls :: %s' % ('OK' if check('urls', urls) else 'FAILED')
+    print '* resources_urls :: %s' % ('OK' if check('resources_urls', resources_urls) else 'FAILED')
@@ -0,0 +1,51 @@
+import os
+import sys
+import random
+import datetime
+
+sys.path.insert(0, os.path.join(os.getcwd(), os.pardir))
+
+from eventmanager import EventManager
+from events import Event
+
+# Checks that the streaming EventManager, which moves idle users' events
+# to disk, stores the same observed events with the same durations
+# as the batch EventManager.
+
+class FakeTable(object):
+    def __init__(self):
+        self.rows = []
+    def store(self, row):
+        self.rows.append(row)
+
+class FakeMOOCdb(object):
+    def __init__(self):
+        self.observed_events = FakeTable()
+
+def make_events(n, users, seed=0):
+    rng = random.Random(seed)
+    time = datetime.datetime(2013, 11, 10, 6, 0, 0)
+    events = []
+    for i in range(n):
+        time += datetime.timedelta(seconds=rng.randint(0, 300))
+        events.append(Event({'_id':str(i), 'anon_screen_name':'user%d' % rng.randint(0, users),
+                             'time':time, 'event_type':rng.choice(['play_video', 'seq_goto', 'page_close']),
+                             'resource_id':rng.randint(0, 100), 'ip':'', 'os':1, 'agent':2}))
+    return events
+
+def run(events, idle_timeout):
+    moocdb = FakeMOOCdb()
+    manager = EventManager(moocdb, idle_timeout)
+    for event in events:
+        manager.store_event(event)
+    stats = manager.get_stats()
+    manager.serialize()
+    rows = sorted([(r['observed_event_id'], r['observed_event_duration']) for r in moocdb.observed_events.rows])
+    return rows, stats
+
+if __name__ == '__main__':
+    batch_rows, batch_stats = run(make_events(20000, 2000), None)
+    print '* Batch :: %d rows, %s' % (len(batch_rows), batch_stats)
+    for idle_timeout in [60, 3600, 24 * 3600]:
+        rows, stats = run(make_events(20000, 2000), idle_timeout)
+        print '* Streaming, idle timeout %ds :: %s, %s' % (idle_timeout, 'OK' if rows == batch_rows else 'FAILED', stats)
@@ -0,0 +1,34 @@
+import sys
+import os
+import time
+import shutil
+import multiprocessing
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from EventSharder_test import make_raw_events, run
+
+# Translation time of a synthetic event stream, 
+# from 1 to N formatting processes
+
+N_EVENTS = 50000
+
+if __name__ == '__main__':
+    n_cores = multiprocessing.cpu_count()
+    workers = [1] + [w for w in [2, 4, 8, 16] if w <= n_cores]
+
+    results = []
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    for w in workers:
+        raw_events = make_raw_events(N_EVENTS, users=500)
+        start = time.time()
+        dest, stats = run(raw_events, w)
+        results.append((w, time.time() - start, stats))
+        shutil.rmtree(dest)
+    sys.stdout = stdout
+
+    print '| Workers | Seconds | Events/sec | Speedup | Agent cache hits | Agent cache misses |'
+    for w, seconds, stats in results:
+        print '| {} | {:.2f} | {:.0f} | {:.2f} | {} | {} |'.format(w, seconds, N_EVENTS / seconds, results[0][1] / seconds,
+                                                               stats['hits'], stats['misses'])
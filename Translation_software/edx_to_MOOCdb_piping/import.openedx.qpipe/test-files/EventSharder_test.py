@@ -0,0 +1,106 @@
+import sys
+import os
+import random
+import shutil
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import main
+import genformatting
+
+# Runs the translation of the same synthetic event stream serially and 
+# with several worker processes, and checks that the MOOCdb output
+# files are identical.
+
+CONFIG_DIR = os.path.join(os.getcwd(), os.path.pardir, 'config/')
+
+COURSE = 'https://www.edx.org/courses/MITx/6.002x/2013_Spring/'
+AGENTS = ['Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:20.0) Gecko/20100101 Firefox/20.0',
+          'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/30.0.1599.101 Safari/537.36',
+          'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_5) AppleWebKit/536.30.1 (KHTML, like Gecko) Version/6.0.5 Safari/536.30.1']
+
+FIELDS = ['_id','event_id','agent','event_type','ip','page','time','anon_screen_name','resource_display_name',
+          'sequence_id','goto_from','goto_dest','problem_id','question_location','attempts','transcript_id',
+          'transcript_code','video_id','video_code','success','answer','answer_identifier','correctness']
+
+def make_raw_events(n, users=50, seed=0):
+    ''' Returns n raw events, as given by the extractors, ordered by time '''
+    rng = random.Random(seed)
+    time = datetime.datetime(2013, 3, 4, 8, 0, 0)
+    raw_events = []
+    for i in range(n):
+        time += datetime.timedelta(seconds=rng.randint(0, 120))
+        week, unit, seq = rng.randint(1, 12), rng.randint(1, 6), rng.randint(1, 9)
+        courseware = COURSE + 'courseware/Week_%d/Unit_%d/' % (week, unit)
+        problem = 'i4x-MITx-6_002x-problem-W%dU%dP%d' % (week, unit, rng.randint(1, 4))
+
+        raw_event = dict([(field, '') for field in FIELDS])
+        raw_event.update({'_id':str(i), 'event_id':str(i),
+                          'agent':rng.choice(AGENTS),
+                          'ip':'18.9.%d.%d' % (rng.randint(0, 255), rng.randint(0, 255)),
+                          'time':time.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                          'anon_screen_name':'user%03d' % rng.randint(0, users - 1),
+                          'page':courseware})
+
+        kind = rng.randint(0, 6)
+        if kind == 0:
+            raw_event.update({'event_type':'seq_goto', 'goto_from':str(seq), 'goto_dest':str(rng.randint(1, 9))})
+        elif kind == 1:
+            raw_event.update({'event_type':'play_video', 'video_id':'i4x-MITx-6_002x-video-W%dU%dV1' % (week, unit), 'video_code':'abc%d' % unit})
+        elif kind == 2:
+            raw_event.update({'event_type':'problem_check', 'problem_id':problem, 'answer_identifier':problem + '_2_1',
+                              'answer':'choice_%d' % rng.randint(0, 3), 'correctness':rng.choice(['correct', 'incorrect']),
+                              'attempts':str(rng.randint(1, 3))})
+        elif kind == 3:
+            raw_event.update({'event_type':'page_close', 'page':''})
+        elif kind == 4:
+            raw_event.update({'event_type':'/courses/MITx/6.002x/2013_Spring/courseware/Week_%d/' % week, 'page':''})
+        elif kind == 5:
+            raw_event.update({'event_type':'book', 'page':COURSE + 'book/%d/' % unit, 'goto_dest':str(rng.randint(1, 300))})
+        else:
+            raw_event.update({'event_type':'sequential'})
+        raw_events.append(raw_event)
+
+    return raw_events
+
+def run(raw_events, workers):
+    ''' Returns the output directory, and the user agent cache statistics '''
+    # Each run starts with an empty user agent cache
+    genformatting.agent_cache.entries.clear()
+    genformatting.agent_cache.reset_stats()
+    dest = tempfile.mkdtemp() + '/'
+    main.translate(iter(raw_events), dest, CONFIG_DIR, dest + 'resource_hierarchy.org', dest + 'problem_hierarchy.org', workers)
+    return dest, genformatting.agent_cache.get_stats()
+
+def read_outputs(dest):
+    outputs = {}
+    for name in sorted(os.listdir(dest)):
+        if name.endswith('.csv') or name.endswith('.org'):
+            with open(os.path.join(dest, name)) as f:
+                outputs[name] = f.read()
+    return outputs
+
+if __name__ == '__main__':
+    # Raw events are modified by the translation, hence two copies
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    serial, serial_stats = run(make_raw_events(5000), 1)
+    parallel, parallel_stats = run(make_raw_events(5000), 3)
+    sys.stdout = stdout
+
+    serial_outputs = read_outputs(serial)
+    parallel_outputs = read_outputs(parallel)
+    for name in sorted(serial_outputs):
+        identical = serial_outputs[name] == parallel_outputs.get(name)
+        print '* %s :: %s' % (name, 'OK' if identical else 'FAILED')
+
+    # The workers' caches are merged back : all agents were
+    # parsed once per worker at most, and all lookups counted
+    lookups = lambda stats: stats['hits'] + stats['misses']
+    merged = parallel_stats['size'] == serial_stats['size'] and 0 < lookups(parallel_stats) == lookups(serial_stats)
+    print '* agent_cache :: %s' % ('OK' if merged else 'FAILED')
+
+    shutil.rmtree(serial)
+    shutil.rmtree(parallel)
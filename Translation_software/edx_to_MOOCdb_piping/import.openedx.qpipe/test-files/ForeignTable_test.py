@@ -0,0 +1,85 @@
+import sys
+import os
+import csv
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from extractor import CSVExtractor, IndexedTable, csv_reader
+
+# Checks that the 'dict', 'merge' and 'mmap' joins of CSVExtractor
+# yield the same rows ('pandas' as well, when it is installed),
+# on synthetic EdxTrackEvent, Answer and CorrectMap tables.
+
+def write_csv(path, rows):
+    with open(path, 'wb') as f:
+        writer = csv.writer(f, delimiter=',', quotechar="'", escapechar='\\', quoting=csv.QUOTE_ALL, doublequote=False)
+        writer.writerows(rows)
+
+def make_tables(dest, n_events, seed=0):
+    ''' Writes the three tables, sorted by foreign key. 
+    Returns their paths. '''
+    rng = random.Random(seed)
+    keys = sorted(['%032x' % rng.getrandbits(128) for i in range(n_events)])
+
+    answers, correct_maps, events = [], [], []
+    for i, key in enumerate(keys):
+        answers.append([key, 'input_i4x-MITx-6_002x-problem-P%d_2_1' % i, "choice_%d, it's \"quoted\"\nover two lines" % (i % 4), 'MITx/6.002x/2013_Spring'])
+        correct_maps.append([key, 'input_i4x-MITx-6_002x-problem-P%d_2_1' % i, rng.choice(['correct', 'incorrect']), '1', '', '', '', ''])
+        event = [''] * len(CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES)
+        event[0] = str(i)
+        # Some events have no foreign key, some have a broken one
+        if i % 5:
+            event[CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES.index('answer_fk')] = key
+            event[CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES.index('correctMap_fk')] = key if i % 7 else key + 'x'
+        events.append(event)
+
+    paths = [os.path.join(dest, name) for name in ['EdxTrackEvent.csv', 'Answer.csv', 'CorrectMap.csv']]
+    for path, rows in zip(paths, [events, answers, correct_maps]):
+        write_csv(path, rows)
+    return paths
+
+def damage_table(path):
+    ''' Cuts a row of the table short, and adds a blank line '''
+    with open(path) as f:
+        rows = list(csv_reader(f))
+    rows[1] = rows[1][:1]
+    rows.insert(10, [])
+    write_csv(path, rows)
+
+def extract(paths, join):
+    extractor = CSVExtractor(edx_track_event=paths[0], answer=paths[1], correct_map=paths[2], join=join)
+    return [(e.get('answer_identifier'), e.get('answer'), e.get('correctness')) for e in extractor]
+
+if __name__ == '__main__':
+    dest = tempfile.mkdtemp()
+    paths = make_tables(dest, 2000)
+    damage_table(paths[1])
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    reference = extract(paths, 'dict')
+    # The second 'mmap' run uses the index built by the first one
+    results = {}
+    for join in ['merge', 'mmap', 'mmap']:
+        results[join] = extract(paths, join)
+    # Index sorted by several chunks
+    for path in paths[1:]:
+        os.remove(path + '.idx')
+    IndexedTable.CHUNK_RECORDS = 97
+    results['mmap chunks'] = extract(paths, 'mmap')
+    try:
+        import pandas
+        results['pandas'] = extract(paths, 'pandas')
+    except ImportError:
+        results['pandas'] = None
+    sys.stdout = stdout
+
+    for join in ['merge', 'mmap', 'mmap chunks', 'pandas']:
+        if results[join] is None:
+            print '* %s :: SKIPPED' % join
+        else:
+            print '* %s :: %s' % (join, 'OK' if results[join] == reference else 'FAILED')
+    shutil.rmtree(dest)
@@ -0,0 +1,64 @@
+import sys
+import os
+import csv
+import shutil
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import main
+from moocdb import MOOCdb
+from EventSharder_test import make_raw_events, CONFIG_DIR
+
+# Checks the 'sqlite' dry run of the MySQL LOAD DATA output : 
+# escaping of the segment files, and the tables of a translation 
+# against the CSV files of the same translation.
+
+def check_escaping():
+    dest = tempfile.mkdtemp() + '/'
+    connection = sqlite3.connect(dest + 'moocdb.sqlite')
+    connection.text_factory = str
+    moocdb = MOOCdb(dest, 'sqlite', connection, segment_size=3)
+
+    values = ['plain', 'tab\there', 'new\nline', 'back\\slash', '\\N', 'nul\0', u'unicod\xe9', 42, None, '']
+    for i, value in enumerate(values):
+        moocdb.urls.store({'url_id':i, 'url':value})
+    moocdb.close()
+
+    expected = [(str(i), value.encode('utf-8') if isinstance(value, unicode) else value if value is None else str(value)) for i, value in enumerate(values)]
+    rows = list(sqlite3.connect(dest + 'moocdb.sqlite').execute('SELECT url_id, url FROM urls'))
+    rows = [tuple(v.encode('utf-8') if isinstance(v, unicode) else v for v in row) for row in rows]
+    print '* LoadDataWriter.escaping :: %s' % ('OK' if rows == expected else 'FAILED')
+    print '* LoadDataWriter.segments :: %s' % ('OK' if moocdb.urls.segments == 4 and not os.path.exists(moocdb.segment_dir) else 'FAILED')
+    shutil.rmtree(dest)
+
+def translate(output):
+    dest = tempfile.mkdtemp() + '/'
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        main.translate(iter(make_raw_events(2000)), dest, CONFIG_DIR, dest + 'resource_hierarchy.org', dest + 'problem_hierarchy.org', 1, output)
+    finally:
+        sys.stdout = stdout
+    return dest
+
+def check_translation():
+    csv_dest = translate('csv')
+    sqlite_dest = translate('sqlite')
+
+    connection = sqlite3.connect(sqlite_dest + 'moocdb.sqlite')
+    connection.text_factory = str
+    for table, fields in sorted(MOOCdb.TABLES.items()):
+        with open(csv_dest + table + '.csv') as f:
+            expected = [tuple(row) for row in csv.reader(f, delimiter=',', quotechar='"', escapechar='\\')]
+        # Missing values are written as '' to CSV, and loaded as NULL
+        rows = [tuple('' if v is None else v for v in row) for row in connection.execute('SELECT %s FROM %s' % (', '.join(fields), table))]
+        print '* LoadDataWriter.%s :: %s' % (table, 'OK' if rows == expected else 'FAILED')
+
+    shutil.rmtree(csv_dest)
+    shutil.rmtree(sqlite_dest)
+
+if __name__ == '__main__':
+    check_escaping()
+    check_translation()
@@ -0,0 +1,40 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from extractor import CSVExtractor, MySQLExtractor
+from ForeignTable_test import make_tables
+from MySQLExtractor_test import make_database, export_tables
+
+# End-to-end extraction time of MySQLExtractor, against a CSV export 
+# followed by CSVExtractor, with a sqlite database standing in for MySQL
+
+SIZES = [10000, 100000]
+
+def csv_export(connection, dest):
+    paths = [os.path.join(dest, name) for name in ['export_EdxTrackEvent.csv', 'export_Answer.csv', 'export_CorrectMap.csv']]
+    export_tables(connection, paths)
+    return CSVExtractor(edx_track_event=paths[0], answer=paths[1], correct_map=paths[2], join='dict')
+
+if __name__ == '__main__':
+    print '| Events | Extractor | Time (s) | Events/sec |'
+    for n in SIZES:
+        dest = tempfile.mkdtemp()
+        connection = make_database(make_tables(dest, n), os.path.join(dest, 'Edx.db'))
+        runs = [('CSV export + CSVExtractor', lambda: csv_export(connection, dest)),
+                ('MySQLExtractor', lambda: MySQLExtractor(connection))]
+        for name, extractor in runs:
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            start = time.time()
+            for event in extractor():
+                pass
+            elapsed = time.time() - start
+            sys.stdout = stdout
+            print '| {} | {} | {:.2f} | {:.0f} |'.format(n, name, elapsed, n / elapsed)
+        connection.close()
+        shutil.rmtree(dest)
@@ -0,0 +1,72 @@
+import sys
+import os
+import re
+import csv
+import shutil
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from extractor import CSVExtractor, MySQLExtractor, csv_reader
+from ForeignTable_test import make_tables
+
+# Checks that MySQLExtractor yields the same events as CSVExtractor,
+# with a sqlite database standing in for MySQL.
+
+# The parser that creates the Edx database
+EDX_PARSER = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir, os.path.pardir,
+                          'import.openedx.apipe', 'json_to_relation', 'edxTrackLogJSONParser.py')
+
+def get_schema(hints_name):
+    ''' Column names of an Edx table, in the order of the parser's
+    schema hints (read from its source, as importing the parser
+    needs the whole apipe environment). '''
+    with open(EDX_PARSER) as f:
+        return re.findall(r"self\.%s\['(\w+)'\] = ColDataType" % hints_name, f.read())
+
+def make_database(paths, db_path):
+    ''' Loads the CSV tables written by make_tables into
+    sqlite tables having the Edx database schema. '''
+    connection = sqlite3.connect(db_path)
+    connection.text_factory = str
+    tables = [('EdxTrackEvent', get_schema('schemaHintsMainTable')),
+              ('Answer', get_schema('schemaAnswerTbl')),
+              ('CorrectMap', get_schema('schemaCorrectMapTbl'))]
+    for path, (table, fieldnames) in zip(paths, tables):
+        connection.execute('CREATE TABLE %s (%s, PRIMARY KEY (`%s`))' % (table, ', '.join(['`%s` TEXT' % name for name in fieldnames]), fieldnames[0]))
+        with open(path) as f:
+            connection.executemany('INSERT INTO %s VALUES (%s)' % (table, ', '.join(['?'] * len(fieldnames))), csv_reader(f))
+    connection.commit()
+    return connection
+
+def export_tables(connection, paths):
+    ''' Exports the tables back to CSV, as for a CSVExtractor run '''
+    for path, table in zip(paths, ['EdxTrackEvent', 'Answer', 'CorrectMap']):
+        with open(path, 'wb') as f:
+            writer = csv.writer(f, delimiter=',', quotechar="'", escapechar='\\', quoting=csv.QUOTE_ALL, doublequote=False)
+            writer.writerows(connection.execute('SELECT * FROM %s' % table))
+
+def key(event):
+    # Foreign fields of broken foreign keys are left unset by CSVExtractor
+    return (event['_id'], event.get('answer') or '', event.get('answer_identifier') or '', event.get('correctness') or '')
+
+if __name__ == '__main__':
+    dest = tempfile.mkdtemp()
+    paths = make_tables(dest, 2000)
+    connection = make_database(paths, os.path.join(dest, 'Edx.db'))
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    reference = [key(e) for e in CSVExtractor(edx_track_event=paths[0], answer=paths[1], correct_map=paths[2], join='dict')]
+    sys.stdout = stdout
+
+    events = list(MySQLExtractor(connection, fetch_size=300))
+    print '* MySQLExtractor.join :: %s' % ('OK' if [key(e) for e in events] == reference else 'FAILED')
+    print '* MySQLExtractor.fields :: %s' % ('OK' if all(len(e) == len(events[0]) for e in events) and len(events[0]) == len(CSVExtractor.EDX_TRACK_EVENT_FIELDNAMES) + 3 else 'FAILED')
+
+    ordered = [e['_id'] for e in MySQLExtractor(connection, fetch_size=300, order_by='_id')]
+    print '* MySQLExtractor.order_by :: %s' % ('OK' if ordered == sorted(ordered) and len(ordered) == len(reference) else 'FAILED')
+
+    connection.close()
+    shutil.rmtree(dest)
@@ -0,0 +1,65 @@
+import sys
+import os
+import time
+import random
+import bisect
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import httpagentparser
+from helperclasses import ParseCache
+
+# Replays a synthetic user agent distribution, where a few thousand
+# distinct agent strings follow a Zipf-like popularity, and compares
+# the throughput of the bare parser with the cached one.
+
+N_EVENTS = 200000
+N_AGENTS = 3000
+
+BROWSERS = ['Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/%d.0.%d.%d Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_5) AppleWebKit/536.30.1 (KHTML, like Gecko) Version/6.0.%d Safari/536.30.%d.%d',
+            'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:%d.0) Gecko/20100101 Firefox/%d.%d',
+            'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.%d; Trident/%d.%d)',
+            'Mozilla/5.0 (iPad; CPU OS 7_0_%d like Mac OS X) AppleWebKit/537.51.%d (KHTML, like Gecko) Mobile/11B%d']
+
+def make_agents(rng):
+    return [BROWSERS[i % len(BROWSERS)] % (rng.randint(1,40), rng.randint(0,2000), rng.randint(0,200)) for i in range(N_AGENTS)]
+
+def make_stream(rng, agents):
+    weights = [1.0 / (rank + 1) for rank in range(len(agents))]
+    total = sum(weights)
+    cumulated = []
+    acc = 0.0
+    for w in weights:
+        acc += w / total
+        cumulated.append(acc)
+
+    return [agents[min(bisect.bisect(cumulated, rng.random()), len(agents) - 1)] for i in range(N_EVENTS)]
+
+def timed(parse, stream):
+    start = time.time()
+    for agent in stream:
+        parse(agent)
+    return len(stream) / (time.time() - start)
+
+if __name__ == '__main__':
+    rng = random.Random(42)
+    stream = make_stream(rng, make_agents(rng))
+
+    print '| Mode | Events/sec | Stats |'
+    print '| Bare parser | {:.0f} | |'.format(timed(httpagentparser.simple_detect, stream))
+
+    for size in [100, 1000, 10000]:
+        cache = ParseCache(httpagentparser.simple_detect, size)
+        print '| LRU cache, size {} | {:.0f} | {} |'.format(size, timed(cache.get, stream), cache.get_stats())
+
+    # Warm start : second run loads the cache written by the first
+    cache_file = os.path.join(tempfile.mkdtemp(), 'agent_cache.pickle')
+    ParseCache(httpagentparser.simple_detect, 10000, cache_file).serialize()
+    cold = ParseCache(httpagentparser.simple_detect, 10000, cache_file)
+    timed(cold.get, stream)
+    cold.serialize()
+    warm = ParseCache(httpagentparser.simple_detect, 10000, cache_file)
+    print '| Warm start, size 10000 | {:.0f} | {} |'.format(timed(warm.get, stream), warm.get_stats())
+    os.remove(cache_file)
@@ -0,0 +1,41 @@
+import sys
+import os
+import json
+import pstats
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+import main
+from EventSharder_test import make_raw_events, CONFIG_DIR
+
+# Checks the stage summary and the cProfile dump of a translation
+
+STAGES = ['extractor', 'EventFormatter.pass_filter', 'EventFormatter.polish', 'EventFormatter.record_event_metadata',
+          'ResourceManager', 'SubmissionManager', 'CurationHelper', 'EventManager', 'serialize']
+
+if __name__ == '__main__':
+    n = 2000
+    dest = tempfile.mkdtemp() + '/'
+    stdout = sys.stdout
+    sys.stdout = open(os.path.join(dest, 'log.org'), 'w')
+    summary = main.translate(iter(make_raw_events(n)), dest, CONFIG_DIR, dest + 'resource_hierarchy.org', dest + 'problem_hierarchy.org', 1, 'csv', dest + 'profile.prof')
+    sys.stdout = stdout
+
+    with open(dest + 'profile.json') as f:
+        written = json.load(f)
+    stages = written['stages']
+    processed = n - written['counters'].get('filtered_events', 0)
+
+    print '* Profiler.stages :: %s' % ('OK' if sorted(stages) == sorted(STAGES) else 'FAILED')
+    print '* Profiler.calls :: %s' % ('OK' if stages['extractor']['calls'] == n + 1 and stages['EventFormatter.pass_filter']['calls'] == n
+                                      and stages['EventManager']['calls'] == processed and written['counters']['events'] == n else 'FAILED')
+    print '* Profiler.total :: %s' % ('OK' if sum(s['seconds'] for s in stages.values()) <= written['total_seconds'] else 'FAILED')
+    print '* Profiler.summary :: %s' % ('OK' if summary['counters'] == written['counters'] else 'FAILED')
+    print '* Profiler.cprofile :: %s' % ('OK' if pstats.Stats(dest + 'profile.prof').total_calls > 0 else 'FAILED')
+    # Nothing is logged per event
+    with open(os.path.join(dest, 'log.org')) as f:
+        print '* Profiler.log :: %s' % ('OK' if len(f.readlines()) < n / 10 else 'FAILED')
+
+    shutil.rmtree(dest)
@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join( os.getcwd(), os.path.pardir))
+
+from helperclasses import CourseURL, ModuleURI
+from resources import ResourceHierarchy, Resource, Problem
+
+# Checks that the trie index of ResourceHierarchy yields the same
+# hierarchy as the former children scan, on the recorded 6.002x problem IDs
+
+PROBLEM_IDS = os.path.join(os.getcwd(), 'data/inline-problem-IDs.txt')
+
+PAGES = ['https://courses.edx.org/courses/MITx/6.002x/2013_Spring/courseware/Week_10/Homework_10/1',
+         'https://courses.edx.org/courses/MITx/6.002x/2013_Spring/courseware/Week_10/Homework_10/2',
+         'https://courses.edx.org/courses/MITx/6.002x/2013_Spring/courseware/Week_13/Op_Amps_Positive_Feedback/10',
+         '/courses/MITx/6.002x/2013_Spring/courseware/Week_13/',
+         '/courses/MITx/6.002x/2013_Spring/book/3/123',
+         'http://courses.edx.org/courses/MITx/6.002x/2013_Spring/info',
+         '']
+
+def load_modules():
+    with open(PROBLEM_IDS) as f:
+        return [ModuleURI(l.strip()) for l in f if l.strip()]
+
+def resource_uris(modules):
+    uris = []
+    for i, module in enumerate(modules):
+        url = str(CourseURL(PAGES[i % len(PAGES)]))
+        url = url if url else 'https://unknown/'
+        uris.append(url + module.get_relative_uri())
+        uris.append(url)
+    return uris
+
+def build(uris, NodeType, root, use_trie):
+    hierarchy = ResourceHierarchy(None, root, NodeType, use_trie)
+    ids = [hierarchy.insert(NodeType(uri)) for uri in uris]
+    return ids, str(hierarchy)
+
+def check(name, uris, NodeType, root):
+    trie_ids, trie_tree = build(uris, NodeType, root, True)
+    scan_ids, scan_tree = build(uris, NodeType, root, False)
+    identical = (trie_ids == scan_ids) and (trie_tree == scan_tree)
+    print '* %s (%d insertions) :: %s' % (name, len(uris), 'OK' if identical else 'FAILED')
+
+if __name__ == '__main__':
+    modules = load_modules()
+    check('Problem hierarchy', [m.get_uri() for m in modules], Problem, 'i4x://')
+    check('Resource hierarchy', resource_uris(modules), Resource, 'https://')
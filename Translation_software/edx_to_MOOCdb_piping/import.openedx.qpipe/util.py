@@ -84,3 +84,99 @@ def apply_rules(rules, array):
     # print 'No rules applied to ' + str(array)
     return None
 
+
+# Rules compiled for faster application.
+# Consecutive rules testing the same field are combined into
+# a single regular expression, with one alternative per rule :
+#   (?=(?P<r0>[\s\S]*?(?:<regexp 0>)))|(?=(?P<r1>[\s\S]*?(?:<regexp 1>)))|...
+# Matched at the start of the string, alternative i succeeds iff
+# <regexp i> would be found by re.search, and alternatives are tried
+# in order, so the first matching rule wins as in apply_rules.
+#
+# Field values have a low cardinality (event types, URLs), so the
+# function resolved for each value is also remembered.
+class RuleGroup(object):
+
+    ALTERNATIVE = r'(?=(?P<r{}>[\s\S]*?(?:{})))'
+
+    # Number of field values remembered before the memo is reset
+    MEMO_SIZE = 100000
+
+    def __init__(self, rules):
+        self.field = rules[0]['field']
+        self.functions = [rule['function'] for rule in rules]
+        self.memo = {}
+
+        if len(rules) == 1:
+            self.regexp = rules[0]['regexp']
+            self.combined = False
+        else:
+            pattern = '|'.join([self.ALTERNATIVE.format(i, rule['regexp'].pattern) for i, rule in enumerate(rules)])
+            self.regexp = re.compile(pattern)
+            self.combined = True
+
+    def resolve(self, value):
+        ''' Returns the function of the first rule matching value, or None '''
+        try:
+            return self.memo[value]
+        except KeyError:
+            pass
+
+        if self.combined:
+            match = self.regexp.match(value)
+            function = self.functions[int(match.lastgroup[1:])] if match else None
+        else:
+            function = self.functions[0] if self.regexp.search(value) else None
+
+        if len(self.memo) >= self.MEMO_SIZE:
+            self.memo.clear()
+        self.memo[value] = function
+        return function
+
+
+class CompiledRules(object):
+
+    BACK_REFERENCE = re.compile(r'\\[0-9]|\(\?P=')
+
+    def __init__(self, rules):
+        self.groups = []
+
+        group = []
+        for rule in rules:
+            if group and not self.same_group(group[-1], rule):
+                self.add_group(group)
+                group = []
+            group.append(rule)
+        if group:
+            self.add_group(group)
+
+    def same_group(self, previous_rule, rule):
+        return (previous_rule['field'] == rule['field'] 
+                and self.combinable(previous_rule['regexp']) 
+                and self.combinable(rule['regexp']))
+
+    def combinable(self, regexp):
+        # Flags would apply to the whole alternation,
+        # and numbered back references would be shifted
+        return (regexp.flags == re.compile('').flags) and not self.BACK_REFERENCE.search(regexp.pattern)
+
+    def add_group(self, rules):
+        try:
+            self.groups.append(RuleGroup(rules))
+        except re.error:
+            # E.g. the same group name used in two rules :
+            # keep these rules one per group
+            for rule in rules:
+                self.groups.append(RuleGroup([rule]))
+
+    def apply(self, array):
+        for group in self.groups:
+            function = group.resolve(str(array[group.field]))
+            if function:
+                return function(array)
+
+        return None
+
+# Loads a set of rules from a text file and compiles them
+def load_compiled_rules(config_file, module=None):
+    return CompiledRules(load_rules(config_file, module))